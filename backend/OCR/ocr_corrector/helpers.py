@@ -10,6 +10,7 @@ Mirrors the sandbox component's helpers.py pattern — pure
 functions that jobs.py orchestrates.
 """
 
+import functools
 import logging
 from decimal import Decimal
 from io import BytesIO
@@ -30,6 +31,10 @@ logger = logging.getLogger(__name__)
 
 FLAG_CONFIDENCE_THRESHOLD = 0.30  # 30%
 
+# Bulk PDF uploads store one document per class; each submission's image
+# path selects its pages with this suffix (see api/s3.py ``with_pages``).
+PAGES_SELECTOR = "#pages="
+
 # Module-level singletons — initialized once, reused across jobs
 _ocr_client: DocumentAnalysisClient | None = None
 _llm_client: genai.Client | None = None
@@ -43,6 +48,18 @@ def _get_file(key: str) -> bytes:
     return response["Body"].read()
 
 
+@functools.lru_cache(maxsize=2)
+def _get_shared_file(key: str) -> bytes:
+    """Cached ``_get_file`` for bulk PDFs, which many consecutive jobs read."""
+    return _get_file(key)
+
+
+def _split_pages(image_path: str) -> tuple[str, str | None]:
+    """(object key, page range or None) of an image path."""
+    key, _, pages = image_path.partition(PAGES_SELECTOR)
+    return key, pages or None
+
+
 def _build_ocr_client() -> DocumentAnalysisClient:
     global _ocr_client
     if _ocr_client is None:
@@ -60,7 +77,8 @@ def extract_words(image_path: str) -> list[OCRLine]:
     Parameters
     ----------
     image_path : str
-        S3 object key (e.g. ``submissions/{id}/{filename}``) when using cloud storage.
+        S3 object key (e.g. ``submissions/{id}/{filename}``) when using cloud storage,
+        optionally followed by ``#pages=3-4`` to analyze only those PDF pages.
 
     Returns
     -------
@@ -72,7 +90,8 @@ def extract_words(image_path: str) -> list[OCRLine]:
     FileNotFoundError
         If the object is missing or empty in storage.
     """
-    data = _get_file(image_path)
+    key, pages = _split_pages(image_path)
+    data = _get_shared_file(key) if pages else _get_file(key)
     if not data:
         raise FileNotFoundError(f"Image not found or empty: {image_path}")
 
@@ -87,6 +106,7 @@ def extract_words(image_path: str) -> list[OCRLine]:
             "prebuilt-layout",
             document=f,
             features=[AnalysisFeature.OCR_HIGH_RESOLUTION],
+            pages=pages,
         )
     result = poller.result()
 
@@ -15,6 +15,8 @@ Step sequence:
 import asyncio
 import logging
 
+from core.concurrency import is_throttle_error, report_throttle
+from core.metrics import track_call
 from settings import settings
 
 from .helpers import correct_ocr, detect_flags, extract_words
@@ -38,7 +40,8 @@ async def ocr_job(job: OCRJob) -> OCRJob | None:
     Returns the job with ocr_result populated, or None on failure.
     """
     try:
-        ocr_lines = await asyncio.to_thread(extract_words, job.request.image_path)
+        with track_call("azure_ocr"):
+            ocr_lines = await asyncio.to_thread(extract_words, job.request.image_path)
 
         if not ocr_lines:
             logger.error(
@@ -79,6 +82,8 @@ async def ocr_job(job: OCRJob) -> OCRJob | None:
 
     except Exception as exc:
         logger.error("OCR error for Job %s: %s", job.job_id, exc)
+        if is_throttle_error(exc):
+            report_throttle()
         job.result = OCRResult(
             ocr_result=OCRExtractionResult(
                 success=False,
@@ -111,9 +116,10 @@ async def correct_job(job: OCRJob) -> OCRJob | None:
     annotated_lines = [line.annotated() for line in ocr_lines]
 
     try:
-        corrected_code, uncertain_words = await asyncio.to_thread(
-            correct_ocr, annotated_lines
-        )
+        with track_call("gemini"):
+            corrected_code, uncertain_words = await asyncio.to_thread(
+                correct_ocr, annotated_lines
+            )
 
         job.result.llm_result = LLMCorrectionResult(
             success=True,
@@ -134,6 +140,8 @@ async def correct_job(job: OCRJob) -> OCRJob | None:
             job.job_id,
             exc,
         )
+        if is_throttle_error(exc):
+            report_throttle()
         job.result.llm_result = LLMCorrectionResult(
             success=False,
             errors=[str(exc)],
@@ -146,6 +154,8 @@ async def correct_job(job: OCRJob) -> OCRJob | None:
             job.job_id,
             exc,
         )
+        if is_throttle_error(exc):
+            report_throttle()
         job.result.llm_result = LLMCorrectionResult(
             success=False,
             errors=[f"LLM correction failed: {exc}"],
@@ -2,7 +2,7 @@
 OCR Worker — async job consumer from Redis queue.
 
 Mirrors the sandbox_worker.py architecture:
-- Async Redis with blmove (source → processing queue)
+- Batched claims through core/transport.py (Redis list + leases, or a stream)
 - N concurrent coroutines via asyncio.gather
 - Job lifecycle: initialize → process → return result
 - Graceful shutdown via KeyboardInterrupt
@@ -11,13 +11,18 @@ Queue design::
 
     {namespace}:OCRJobQueue                        → pending jobs
     {namespace}:OCRJobQueue:processing             → in-progress jobs
+    {namespace}:OCRJobQueue:leases                 → heartbeated leases (see core/leases.py)
     {namespace}:OCRJobQueue:completed:{job_id}     → results
 """
 
 import asyncio
 import datetime
 import logging
+import time
 
+from core.concurrency import AdaptiveLimiter
+from core.metrics import serve_metrics, watch_worker
+from core.transport import make_transport
 from redis.asyncio import Redis
 from settings import settings
 
@@ -46,6 +51,27 @@ class OCRWorkerClient:
             url=redis_url,
             decode_responses=True,
         )
+        self.transport = make_transport(
+            self.redis_client,
+            OCR_QUEUE,
+            on_dead_letter=self.report_dead_letter,
+        )
+        self.concurrency = AdaptiveLimiter(
+            "OCR",
+            min_limit=settings.ocr_min_concurrency,
+            max_limit=ocr_max_concurrency,
+            target_p95_s=settings.ocr_target_p95_s,
+            queue_depth=self.queue_depth,
+        )
+
+    async def queue_depth(self) -> int:
+        return (await self.transport.lag()).depth
+
+    async def report_dead_letter(self, job_request: str):
+        """Unblock the orchestrator waiting on a job that exhausted its attempts."""
+        job = await initialize_job(job_request)
+        if job:
+            await return_result(self, await set_result(job, JobStatus.FAILED))
 
 
 async def start():
@@ -56,9 +82,13 @@ async def start():
         logger.exception("OCR Worker initialization error: %s", e)
         raise
     logger.info("OCR Worker started")
+    watch_worker(client.transport, client.concurrency)
     try:
         await asyncio.gather(
-            *(main_loop(client, pid) for pid in range(client.ocr_max_concurrency))
+            client.transport.run(),
+            client.concurrency.run(),
+            serve_metrics(settings.ocr_metrics_port),
+            *(main_loop(client, pid) for pid in range(client.ocr_max_concurrency)),
         )
     finally:
         await client.redis_client.aclose()
@@ -70,46 +100,48 @@ async def main_loop(
     process_id: int = 0,
 ):
     while True:
-        try:
-            logger.info(
-                "Process #%d: Waiting for job in %s...",
-                process_id,
-                OCR_QUEUE,
-            )
-            result = await client.redis_client.blmove(
-                first_list=OCR_QUEUE,
-                second_list=f"{OCR_QUEUE}:processing",
-                timeout=0,
-                src="RIGHT",
-                dest="LEFT",
-            )
-        except asyncio.CancelledError:
-            logger.debug(
-                "Process #%d cancelled. Shutting down...",
-                process_id,
-            )
-            return
-
-        logger.info("OCR Job Received.")
-        logger.debug("Details: %s", result)
-
-        initialized_job = await initialize_job(result)
-        if not initialized_job:
-            logger.error("Failed to initialize job, skipping")
-            await client.redis_client.lrem(f"{OCR_QUEUE}:processing", 1, result)
-            continue
-
-        processed_job = await process_job(initialized_job)
-        if (
-            processed_job.status != JobStatus.COMPLETED
-            and processed_job.status != JobStatus.FAILED
-        ):
-            logger.error("Failed to process job, skipping")
-            await client.redis_client.lrem(f"{OCR_QUEUE}:processing", 1, result)
-            continue
-
-        await return_result(client, processed_job)
-        await client.redis_client.lrem(f"{OCR_QUEUE}:processing", 1, result)
+        async with client.concurrency.slot():
+            try:
+                logger.info(
+                    "Process #%d: Waiting for job in %s...",
+                    process_id,
+                    OCR_QUEUE,
+                )
+                deliveries = await client.transport.claim(
+                    count=settings.queue_batch_size,
+                    timeout=0,
+                )
+            except asyncio.CancelledError:
+                logger.debug(
+                    "Process #%d cancelled. Shutting down...",
+                    process_id,
+                )
+                return
+
+            logger.info("OCR Job(s) Received: %d", len(deliveries))
+            handled = []
+            for delivery in deliveries:
+                logger.debug("Details: %s", delivery.payload)
+                initialized_job = await initialize_job(delivery.payload)
+                if not initialized_job:
+                    logger.error("Failed to initialize job, skipping")
+                    handled.append(delivery)
+                    continue
+
+                started = time.monotonic()
+                processed_job = await process_job(initialized_job)
+                client.concurrency.record_latency(time.monotonic() - started)
+                if (
+                    processed_job.status != JobStatus.COMPLETED
+                    and processed_job.status != JobStatus.FAILED
+                ):
+                    logger.error("Failed to process job, leaving it for lease retry")
+                    client.transport.abandon(delivery)
+                    continue
+
+                await return_result(client, processed_job)
+                handled.append(delivery)
+            await client.transport.ack(*handled)
 
 
 async def initialize_job(
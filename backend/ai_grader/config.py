@@ -26,8 +26,12 @@ class Settings(BaseSettings):
     backoff_max_s: Cap on backoff delay (adds jitter)
     redis_url: Redis connection URL
     ai_grading_queue: Redis list name for worker pops.
-    queue_poll_timeout_s: BRPOPLPUSH blocking timeout in seconds
+    queue_poll_timeout_s: Queue claim blocking timeout in seconds
+    queue_batch_size: Max payloads claimed per queue round trip
     ai_grading_max_concurrency: Number of parallel worker loops for queue consumption
+    ai_grading_min_concurrency: Floor for the adaptive concurrency limit
+    ai_grading_target_p95_s: p95 job latency above which concurrency is cut
+    ai_grading_metrics_port: Port serving GET /metrics (0 disables)
     temperature: LLM sampling temperature
     pending_review_status: Status applied after successful grading.
     failure_status_candidates: Ordered list of status strings for failures
@@ -87,11 +91,31 @@ class Settings(BaseSettings):
         validation_alias="QUEUE_POLL_TIMEOUT_S",
         ge=0,
     )
+    queue_batch_size: int = Field(
+        default=1,
+        validation_alias="QUEUE_BATCH_SIZE",
+        ge=1,
+    )
     ai_grading_max_concurrency: int = Field(
         default=5,
         validation_alias=AliasChoices("AI_GRADING_MAX_CONCURRENCY", "MAX_CONCURRENCY"),
         ge=1,
     )
+    ai_grading_min_concurrency: int = Field(
+        default=1,
+        validation_alias="AI_GRADING_MIN_CONCURRENCY",
+        ge=1,
+    )
+    ai_grading_target_p95_s: float = Field(
+        default=90.0,
+        validation_alias="AI_GRADING_TARGET_P95_S",
+        gt=0.0,
+    )
+    ai_grading_metrics_port: int = Field(
+        default=9103,
+        validation_alias="AI_GRADING_METRICS_PORT",
+        ge=0,
+    )
     temperature: float = Field(
         default=0.0,
         validation_alias="LLM_TEMPERATURE",
@@ -7,6 +7,8 @@ from dataclasses import dataclass
 from typing import Any
 
 import httpx
+from core.concurrency import report_throttle
+from core.metrics import EXTERNAL_CALL_RETRIES, track_call
 
 from .config import Settings
 
@@ -88,13 +90,15 @@ class LLMClient:
                 total_attempts,
             )
             try:
-                text = await self._call_once(prompt=prompt)
+                with track_call("llm"):
+                    text = await self._call_once(prompt=prompt)
                 return LLMResponse(text=text, attempt_count=attempt)
             except RetryableLLMAPIError as exc:
                 last_error = exc
                 if attempt >= total_attempts:
                     break
                 delay = self._compute_backoff_with_jitter(attempt)
+                EXTERNAL_CALL_RETRIES.labels("llm").inc()
                 logger.warning(
                     "Retryable LLM error for submission_id=%s attempt=%s/%s: %s. "
                     "Retrying in %.2fs.",
@@ -150,6 +154,8 @@ class LLMClient:
         except (httpx.TimeoutException, httpx.NetworkError) as exc:
             raise RetryableLLMAPIError(f"Network/timeout error: {exc}") from exc
 
+        if response.status_code == 429:
+            report_throttle()
         if response.status_code == 429 or response.status_code >= 500:
             raise RetryableLLMAPIError(
                 f"Retryable HTTP error {response.status_code}: {response.text[:500]}"
@@ -4,8 +4,12 @@ import argparse
 import asyncio
 import json
 import logging
+import time
 from typing import Any
 
+from core.concurrency import AdaptiveLimiter
+from core.metrics import serve_metrics, watch_worker
+from core.transport import make_transport
 from pydantic import AliasChoices, BaseModel, ConfigDict, Field, ValidationError
 from redis.asyncio import Redis
 from settings import settings
@@ -22,11 +26,12 @@ from .prompt_builder import construct_output_repair_prompt, construct_prompt
 
 """
 Queue-first AI grader worker that mirrors sandbox worker methodology:
-- claim jobs from Redis queue into :processing via BRPOPLPUSH
+- claim jobs in batches through the configured queue transport
+  (Redis list + leases, or a Redis Streams consumer group)
 - parse/validate one queue payload per job
 - run LLM grading flow
 - publish completion to :completed:{job_id}
-- remove handled payload from :processing
+- acknowledge handled payloads
 """
 
 logger = logging.getLogger(__name__)
@@ -57,9 +62,42 @@ class AIGraderWorker:
         *,
         redis_url: str,
         ai_grading_max_concurrency: int,
+        ai_grading_min_concurrency: int = 1,
+        ai_grading_target_p95_s: float = 90.0,
     ):
         self.ai_grading_max_concurrency = ai_grading_max_concurrency
         self.redis_client = Redis.from_url(url=redis_url, decode_responses=True)
+        self.transport = make_transport(
+            self.redis_client,
+            AI_GRADING_QUEUE,
+            on_dead_letter=self.report_dead_letter,
+        )
+        self.concurrency = AdaptiveLimiter(
+            "AI Grader",
+            min_limit=ai_grading_min_concurrency,
+            max_limit=ai_grading_max_concurrency,
+            target_p95_s=ai_grading_target_p95_s,
+            queue_depth=self.queue_depth,
+        )
+
+    async def queue_depth(self) -> int:
+        return (await self.transport.lag()).depth
+
+    async def report_dead_letter(self, raw_payload: str) -> None:
+        """
+        Unblock the orchestrator waiting on a job that exhausted its attempts.
+        """
+        job = initialize_job(raw_payload)
+        if not job:
+            return
+        payload = _build_completion_payload(
+            job=job,
+            outcome={"status": "FAILED", "error": "AI grading attempts exhausted."},
+        )
+        await self.redis_client.lpush(
+            f"{AI_GRADING_QUEUE}:completed:{job.job_id}",
+            json.dumps(payload),
+        )
 
 
 async def _parse_with_single_repair(
@@ -103,6 +141,17 @@ def _coerce_lines(value: Any) -> str:
     return str(value)
 
 
+def _format_resources(output: dict) -> str:
+    """Measured cost of a run, so slow or memory-hungry solutions stand out."""
+    fields = [
+        f"{key}={output[key]}"
+        for key in ("wall_time_s", "cpu_user_s", "cpu_sys_s", "peak_rss_kb")
+        if output.get(key) is not None
+    ]
+    fields += [key for key in ("timed_out", "out_of_memory") if output.get(key)]
+    return f"resources: {' '.join(fields)}" if fields else ""
+
+
 def _format_sandbox_logs(sandbox_result: dict | None) -> str:
     if not sandbox_result or not isinstance(sandbox_result, dict):
         return ""
@@ -134,21 +183,26 @@ def _format_sandbox_logs(sandbox_result: dict | None) -> str:
                 actual=output.get("stdout"),
             )
         )
+        resources = _format_resources(output)
+        if resources:
+            output_lines.append(resources)
 
     test_results = test_cases.get("results") or []
     test_case_lines = []
     for index, case in enumerate(test_results, start=1):
         if not isinstance(case, dict):
             continue
-        test_case_lines.append(
-            "testcase {idx}: input={input} expected={expected} actual={actual} passed={passed}".format(
-                idx=index,
-                input=case.get("input"),
-                expected=case.get("expected_output"),
-                actual=case.get("actual_output"),
-                passed=case.get("passed"),
-            )
+        line = "testcase {idx}: input={input} expected={expected} actual={actual} passed={passed}".format(
+            idx=index,
+            input=case.get("input"),
+            expected=case.get("expected_output"),
+            actual=case.get("actual_output"),
+            passed=case.get("passed"),
         )
+        if case.get("skipped"):
+            # Not a wrong answer: the sandbox stopped the job before this case.
+            line += f" skipped={case.get('skip_reason')}"
+        test_case_lines.append(line)
 
     return "\n".join(
         [
@@ -316,80 +370,84 @@ async def main_loop(
     once: bool = False,
 ) -> None:
     queue_name = AI_GRADING_QUEUE
-    processing_queue = f"{queue_name}:processing"
+    batch_size = 1 if once else settings.queue_batch_size
     processed_count = 0
 
     while True:
-        try:
-            logger.info("Process #%s: Waiting for job in %s...", process_id, queue_name)
-            result = await client.redis_client.brpoplpush(
-                src=queue_name,
-                dst=processing_queue,
-                timeout=settings.queue_poll_timeout_s,
-            )
-        except asyncio.CancelledError:
-            logger.debug("Process #%s cancelled. Shutting down...", process_id)
-            return
-
-        if result is None:
-            if once and processed_count == 0:
-                logger.info("No job received from queue '%s'.", queue_name)
+        async with client.concurrency.slot():
+            try:
+                logger.info(
+                    "Process #%s: Waiting for job in %s...", process_id, queue_name
+                )
+                deliveries = await client.transport.claim(
+                    count=batch_size,
+                    timeout=settings.queue_poll_timeout_s,
+                )
+            except asyncio.CancelledError:
+                logger.debug("Process #%s cancelled. Shutting down...", process_id)
                 return
-            continue
 
-        logger.info("AI Grader Job Received.")
-        logger.debug("Details: %s", result)
+            if not deliveries:
+                if once and processed_count == 0:
+                    logger.info("No job received from queue '%s'.", queue_name)
+                    return
+                continue
+
+            logger.info("AI Grader Job(s) Received: %d", len(deliveries))
+            handled = []
+            for delivery in deliveries:
+                logger.debug("Details: %s", delivery.payload)
+                initialized_job = initialize_job(delivery.payload)
+                if not initialized_job:
+                    logger.error("Failed to initialize AI Grader job, skipping")
+                    handled.append(delivery)
+                    continue
+
+                processed_count += 1
+                started = time.monotonic()
+                completion_payload = await process_job(
+                    job=initialized_job,
+                    llm_client=llm_client,
+                )
+                client.concurrency.record_latency(time.monotonic() - started)
+
+                completion_queue = f"{queue_name}:completed:{initialized_job.job_id}"
+                try:
+                    await client.redis_client.lpush(
+                        completion_queue,
+                        json.dumps(completion_payload),
+                    )
+                    logger.debug(
+                        "AI Grader Job: %s result returned successfully",
+                        initialized_job.job_id,
+                    )
+                except Exception:
+                    logger.exception(
+                        "Failed to publish AI grading completion for job_id=%s",
+                        initialized_job.job_id,
+                    )
+                    logger.error(
+                        "Leaving job_id=%s in processing queue for lease retry because "
+                        "completion publish failed.",
+                        initialized_job.job_id,
+                    )
+                    client.transport.abandon(delivery)
+                    continue
+                handled.append(delivery)
+
+            await client.transport.ack(*handled)
 
-        initialized_job = initialize_job(result)
-        if not initialized_job:
-            logger.error("Failed to initialize AI Grader job, skipping")
-            await client.redis_client.lrem(processing_queue, 1, result)
             if once:
+                logger.info("Processed one job and exiting due to --once.")
                 return
-            continue
-
-        processed_count += 1
-        completion_payload = await process_job(
-            job=initialized_job,
-            llm_client=llm_client,
-        )
-
-        completion_published = True
-        completion_queue = f"{queue_name}:completed:{initialized_job.job_id}"
-        try:
-            await client.redis_client.lpush(
-                completion_queue,
-                json.dumps(completion_payload),
-            )
-            logger.debug(
-                "AI Grader Job: %s result returned successfully",
-                initialized_job.job_id,
-            )
-        except Exception:
-            completion_published = False
-            logger.exception(
-                "Failed to publish AI grading completion for job_id=%s",
-                initialized_job.job_id,
-            )
-
-        if completion_published:
-            await client.redis_client.lrem(processing_queue, 1, result)
-        else:
-            logger.error(
-                "Leaving job_id=%s in processing queue because completion publish "
-                "failed.",
-                initialized_job.job_id,
-            )
-
-        if once:
-            logger.info("Processed one job and exiting due to --once.")
-            return
 
 
 async def run_worker(*, settings: Settings, once: bool = False) -> None:
     client = AIGraderWorker(
         redis_url=settings.redis_url,
         ai_grading_max_concurrency=settings.ai_grading_max_concurrency,
+        ai_grading_min_concurrency=settings.ai_grading_min_concurrency,
+        ai_grading_target_p95_s=settings.ai_grading_target_p95_s,
     )
     llm_client = LLMClient(settings)
 
@@ -410,7 +468,11 @@ async def run_worker(*, settings: Settings, once: bool = False) -> None:
             )
             return
 
+        watch_worker(client.transport, client.concurrency)
         await asyncio.gather(
+            client.transport.run(),
+            client.concurrency.run(),
+            serve_metrics(settings.ai_grading_metrics_port),
             *(
                 main_loop(
                     client,
@@ -419,7 +481,7 @@ async def run_worker(*, settings: Settings, once: bool = False) -> None:
                     process_id=pid,
                 )
                 for pid in range(client.ai_grading_max_concurrency)
-            )
+            ),
         )
     finally:
         await client.redis_client.aclose()
@@ -7,6 +7,8 @@ from types import SimpleNamespace
 from typing import Any
 
 import pytest
+from core.concurrency import AdaptiveLimiter
+from core.transport import ListTransport
 
 from ai_grader import main as grader_main
 from ai_grader.config import Settings
@@ -205,6 +207,24 @@ def test_format_sandbox_logs() -> None:
     assert "compiled_ok: True" in logs
     assert "case 1: returncode=0" in logs
     assert "testcase 1: input=6 7 expected=42 actual=42 passed=True" in logs
+    assert "resources:" not in logs
+
+
+def test_format_sandbox_logs_includes_resource_usage() -> None:
+    result = _sandbox_result()
+    result["result"]["execution_result"]["outputs"][0].update(
+        wall_time_s=2.5,
+        cpu_user_s=2.1,
+        cpu_sys_s=0.2,
+        peak_rss_kb=81920,
+        timed_out=False,
+        out_of_memory=True,
+    )
+    logs = grader_main._format_sandbox_logs(result)
+    assert (
+        "resources: wall_time_s=2.5 cpu_user_s=2.1 cpu_sys_s=0.2 "
+        "peak_rss_kb=81920 out_of_memory"
+    ) in logs
 
 
 def test_parse_with_single_repair_uses_one_repair_call() -> None:
@@ -319,7 +339,13 @@ def test_main_loop_once_no_job() -> None:
         async def lpush(self, queue_name: str, payload: str) -> None:
             return None
 
-    client = SimpleNamespace(redis_client=_FakeRedis(), ai_grading_max_concurrency=1)
+    redis_client = _FakeRedis()
+    client = SimpleNamespace(
+        redis_client=redis_client,
+        ai_grading_max_concurrency=1,
+        transport=ListTransport(redis_client, grader_main.AI_GRADING_QUEUE),
+        concurrency=AdaptiveLimiter("AI Grader", 1, 1, target_p95_s=60),
+    )
     settings = _make_settings(queue_poll_timeout_s=0)
     llm_client = _DummyLLMClient(outputs=[])
 
@@ -353,7 +379,22 @@ def test_main_loop_removes_invalid_payload_from_processing() -> None:
         async def lpush(self, queue_name: str, payload: str) -> None:
             return None
 
-    client = SimpleNamespace(redis_client=_FakeRedis(), ai_grading_max_concurrency=1)
+        async def zadd(self, key: str, mapping: dict, **kwargs) -> None:
+            return None
+
+        async def zrem(self, key: str, *members: str) -> None:
+            return None
+
+        async def hdel(self, key: str, *fields: str) -> None:
+            return None
+
+    redis_client = _FakeRedis()
+    client = SimpleNamespace(
+        redis_client=redis_client,
+        ai_grading_max_concurrency=1,
+        transport=ListTransport(redis_client, grader_main.AI_GRADING_QUEUE),
+        concurrency=AdaptiveLimiter("AI Grader", 1, 1, target_p95_s=60),
+    )
     settings = _make_settings(queue_poll_timeout_s=0)
     llm_client = _DummyLLMClient(outputs=[])
 
@@ -408,6 +449,15 @@ def test_main_loop_processes_one_job_and_publishes_completion(
         async def lrem(self, queue_name: str, count: int, payload: str) -> None:
             self.removed.append((queue_name, count, payload))
 
+        async def zadd(self, key: str, mapping: dict, **kwargs) -> None:
+            return None
+
+        async def zrem(self, key: str, *members: str) -> None:
+            return None
+
+        async def hdel(self, key: str, *fields: str) -> None:
+            return None
+
     async def _fake_process_job(*, job, llm_client):
         return {
             "job_id": job.job_id,
@@ -418,7 +468,13 @@ def test_main_loop_processes_one_job_and_publishes_completion(
 
     monkeypatch.setattr(grader_main, "process_job", _fake_process_job)
 
-    client = SimpleNamespace(redis_client=_FakeRedis(), ai_grading_max_concurrency=1)
+    redis_client = _FakeRedis()
+    client = SimpleNamespace(
+        redis_client=redis_client,
+        ai_grading_max_concurrency=1,
+        transport=ListTransport(redis_client, grader_main.AI_GRADING_QUEUE),
+        concurrency=AdaptiveLimiter("AI Grader", 1, 1, target_p95_s=60),
+    )
     settings = _make_settings(queue_poll_timeout_s=0)
     llm_client = _DummyLLMClient(outputs=[])
 
@@ -459,7 +515,9 @@ def test_run_worker_once_uses_main_loop(monkeypatch: pytest.MonkeyPatch) -> None
             return None
 
     class _FakeWorker:
-        def __init__(self, *, redis_url: str, ai_grading_max_concurrency: int):
+        def __init__(
+            self, *, redis_url: str, ai_grading_max_concurrency: int, **_: object
+        ):
             self.redis_client = _FakeRedis()
             self.ai_grading_max_concurrency = ai_grading_max_concurrency
 
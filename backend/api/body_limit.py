@@ -0,0 +1,70 @@
+import json
+import logging
+
+from fastapi import HTTPException
+
+logger = logging.getLogger(__name__)
+
+
+class BodySizeLimitMiddleware:
+    """
+    Refuse request bodies over a per-path byte limit with 413.
+
+    FastAPI spools a multipart body to disk before the route runs, so the
+    limit has to sit in front of it. A declared ``Content-Length`` is refused
+    up front; a chunked body is counted as it is received and stops with an
+    ``HTTPException``, which FastAPI passes through its body parsing.
+    """
+
+    def __init__(self, app, limits: dict[str, int]):
+        self.app = app
+        self.limits = {path.rstrip("/"): limit for path, limit in limits.items()}
+
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http":
+            limit = self.limits.get(scope["path"].rstrip("/"))
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        declared = dict(scope["headers"]).get(b"content-length", b"")
+        if declared.isdigit() and int(declared) > limit:
+            logger.warning("Refused a %s body of %s bytes", scope["path"], declared)
+            await _reject(send, limit)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    logger.warning(
+                        "Refused a %s body over %d bytes", scope["path"], limit
+                    )
+                    raise HTTPException(status_code=413, detail=_detail(limit))
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+def _detail(limit: int) -> str:
+    return f"Upload is larger than {limit} bytes"
+
+
+async def _reject(send, limit: int):
+    body = json.dumps({"detail": _detail(limit)}).encode()
+    await send(
+        {
+            "type": "http.response.start",
+            "status": 413,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
@@ -10,3 +10,20 @@ async def get_db():
     async with async_session() as session:
         yield session
     logger.debug("Database session closed")
+
+
+_event_hub = None
+
+
+def get_event_hub():
+    """Process-wide subscriber for pipeline status events (see core/events.py)."""
+    global _event_hub
+    if _event_hub is None:
+        from core.events import EventHub
+        from redis.asyncio import Redis
+        from settings import settings
+
+        _event_hub = EventHub(
+            Redis.from_url(settings.redis_endpoint, decode_responses=True)
+        )
+    return _event_hub
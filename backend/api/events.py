@@ -0,0 +1,62 @@
+import asyncio
+import logging
+from collections.abc import AsyncIterator, Awaitable, Callable
+
+from core.events import RESYNC, TERMINAL_STATUSES, EventHub
+from fastapi import Request
+from schemas import SubmissionEvent
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def format_sse(data: str, event: str) -> str:
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def relay_events(
+    request: Request,
+    hub: EventHub,
+    channel: str,
+    snapshot: Callable[[], Awaitable[tuple[str, bool] | None]] | None = None,
+    until_terminal: bool = False,
+) -> AsyncIterator[str]:
+    """
+    Server-Sent Events for ``channel``.
+
+    ``snapshot`` returns the current state as JSON and whether it is final.
+    It is read once the hub's subscription is confirmed, and again whenever
+    the hub had to resubscribe, so no transition between the snapshot and the
+    events is lost. With ``until_terminal`` the stream ends once the state is
+    final or a graded/failed event arrives.
+    """
+    queue = await hub.subscribe(channel)
+    try:
+        data = RESYNC
+        while True:
+            if data != RESYNC:
+                yield format_sse(data, "status")
+                if (
+                    until_terminal
+                    and SubmissionEvent.model_validate_json(data).status
+                    in TERMINAL_STATUSES
+                ):
+                    return
+            elif snapshot is not None:
+                state = await snapshot()
+                if state is not None:
+                    current, final = state
+                    yield format_sse(current, "snapshot")
+                    if final and until_terminal:
+                        return
+            data = None
+            while data is None:
+                if await request.is_disconnected():
+                    return
+                try:
+                    data = await asyncio.wait_for(queue.get(), settings.sse_keepalive_s)
+                except TimeoutError:
+                    # Comment line: keeps proxies from closing an idle stream.
+                    yield ": keepalive\n\n"
+    finally:
+        hub.unsubscribe(channel, queue)
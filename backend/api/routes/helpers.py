@@ -1,5 +1,8 @@
+from datetime import datetime
+
 from core.job_queue import MAIN_QUEUE, JobQueue
-from schemas import JobRequest, TestCase
+from core.scheduling import effective_priority
+from schemas import JobPriority, JobRequest, TestCase
 
 
 async def start_job_process(
@@ -11,15 +14,36 @@ async def start_job_process(
     java_code: str,
     test_cases: list[TestCase],
     rubric_json: dict,
+    course_id: int | None = None,
+    priority: JobPriority = JobPriority.INTERACTIVE,
+    deadline: datetime | None = None,
 ):
     job_request = JobRequest(
         submission_id=submission_id,
         question_id=question_id,
         assignment_id=assignment_id,
+        course_id=course_id,
         student_id=student_id,
         image_url=image_url,
         java_code=java_code,
         test_cases=test_cases,
         rubric_json=rubric_json,
+        priority=priority,
+        deadline=deadline,
+    )
+    await JobQueue().transport(MAIN_QUEUE).push(
+        job_request.model_dump_json(),
+        priority=effective_priority(priority, deadline),
+    )
+
+
+async def start_job_processes(
+    job_requests: list[JobRequest], priority: JobPriority = JobPriority.BULK
+):
+    """Enqueue many jobs in one push (a single Redis round trip)."""
+    if not job_requests:
+        return
+    await JobQueue().transport(MAIN_QUEUE).push(
+        *(job_request.model_dump_json() for job_request in job_requests),
+        priority=priority,
     )
-    await JobQueue().redis_client.lpush(MAIN_QUEUE, job_request.model_dump_json())
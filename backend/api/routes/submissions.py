@@ -1,12 +1,19 @@
 import logging
+import re
+import uuid
+import zipfile
+from pathlib import PurePosixPath
 
-from db.crud.courses import is_student_enrolled
+from core.events import assignment_channel, submission_channel
+from db.crud.courses import get_enrolled_student_ids, is_student_enrolled
 from db.crud.submissions import (
     create_submission,
+    create_submissions,
     delete_submission,
     get_submission_by_id,
     get_submissions_by_assignment_id,
     get_submissions_by_student_id,
+    set_submission_fields_bulk,
     set_submission_image_url,
     update_submission_state,
 )
@@ -18,23 +25,42 @@ from fastapi import (
     File,
     Form,
     HTTPException,
+    Request,
     UploadFile,
 )
-from schemas import SubmissionBase, TestCase
+from fastapi.responses import StreamingResponse
+from pydantic import TypeAdapter, ValidationError
+from schemas import (
+    BulkSubmissionItem,
+    BulkSubmissionResult,
+    JobPriority,
+    JobRequest,
+    SubmissionBase,
+    TestCase,
+)
+from settings import settings
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..auth import get_current_user, require_role
-from ..dependencies import get_db
-from ..s3 import save_file
-from .assignments import get_assignment_by_id
-from .helpers import start_job_process
+from ..dependencies import get_db, get_event_hub
+from ..events import relay_events
+from ..s3 import save_file, save_fileobj, submission_key, with_pages
+from .assignments import _verify_instructor_owns_assignment, get_assignment_by_id
+from .helpers import start_job_process, start_job_processes
 from .questions import get_question_by_id, get_testcases_by_question_id
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+_roster_adapter = TypeAdapter(dict[str, int])
+# Disable proxy buffering so events reach the client as they are published.
+_SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+_PAGE_RANGE = re.compile(r"^[1-9]\d*(-[1-9]\d*)?$")
+# Scans barely compress; an entry inflating further than this is a zip bomb.
+_MAX_COMPRESSION_RATIO = 100
+
 
 @router.post("/", response_model=SubmissionBase)
 async def submit_answer(
@@ -93,6 +119,8 @@ async def submit_answer(
                 for tc in test_cases
             ],
             rubric_json=rubric_json,
+            course_id=assignment.course_id,
+            deadline=assignment.due_date,
         )
         logger.info(
             "Submission created (id=%d) by student %d for assignment %d",
@@ -112,6 +140,225 @@ async def submit_answer(
         ) from None
 
 
+@router.post("/bulk", response_model=BulkSubmissionResult)
+async def submit_class_batch(
+    background_tasks: BackgroundTasks,
+    question_id: int = Form(),
+    assignment_id: int = Form(),
+    roster: str = Form(),
+    file: UploadFile = File(...),
+    session: AsyncSession = Depends(get_db),
+    current_user=Depends(require_role(UserRole.instructor)),
+):
+    """
+    Create and grade one submission per student from a single upload.
+
+    ``file`` is either a ZIP with one scan per student, and ``roster`` maps
+    entry names to student ids, or a multi-page PDF, and ``roster`` maps
+    page ranges (``"3"``, ``"3-4"``) to student ids.
+    """
+    assignment = await _verify_instructor_owns_assignment(
+        session, assignment_id, current_user.id
+    )
+    rubric_json = assignment.rubric_json
+    if not rubric_json:
+        raise HTTPException(status_code=404, detail="Rubric not found")
+    question = await get_question_by_id(session, question_id, assignment_id)
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    test_cases = await get_testcases_by_question_id(
+        session, question_id, assignment_id
+    ) or [TestCase(input="", expected_output="")]
+
+    try:
+        roster_map = _roster_adapter.validate_json(roster)
+    except ValidationError:
+        raise HTTPException(
+            status_code=422, detail="Roster must map entries to student ids"
+        ) from None
+    if len(roster_map) > settings.bulk_submission_max_items:
+        raise HTTPException(
+            status_code=413,
+            detail=f"At most {settings.bulk_submission_max_items} items per upload",
+        )
+
+    filename = PurePosixPath(file.filename or "upload").name
+    is_pdf = filename.lower().endswith(".pdf") or file.content_type == "application/pdf"
+    archive = None
+    if is_pdf:
+        bad = [spec for spec in roster_map if not _PAGE_RANGE.match(spec)]
+        if bad:
+            raise HTTPException(
+                status_code=422, detail=f"Invalid page ranges: {', '.join(bad)}"
+            )
+        entries = dict.fromkeys(roster_map)
+    else:
+        # Uploads are spooled to disk, so the archive is read entry by entry
+        # from the spool instead of being held in memory.
+        try:
+            archive = zipfile.ZipFile(file.file)
+        except zipfile.BadZipFile:
+            raise HTTPException(
+                status_code=400, detail="Upload must be a ZIP archive or a PDF"
+            ) from None
+        entries = {
+            info.filename: info
+            for info in archive.infolist()
+            if not info.is_dir() and not info.filename.startswith("__MACOSX/")
+        }
+
+    logger.info(
+        "Instructor %d bulk-submitting %d entries for assignment %d",
+        current_user.id,
+        len(entries),
+        assignment_id,
+    )
+    items: list[BulkSubmissionItem] = []
+    enrolled = await get_enrolled_student_ids(session, assignment.course_id)
+    accepted: list[tuple[str, int]] = []
+    total_bytes = 0
+    for entry, student_id in roster_map.items():
+        if entry not in entries:
+            items.append(
+                BulkSubmissionItem(entry=entry, student_id=student_id, status="missing")
+            )
+            continue
+        if student_id not in enrolled:
+            problem = "Student is not enrolled in the course"
+        elif archive is not None:
+            # Checked on the headers, before the entry is opened; reading an
+            # entry stops at its declared size.
+            problem = _oversized_entry(entries[entry], total_bytes)
+            if problem is None:
+                total_bytes += entries[entry].file_size
+        else:
+            problem = None
+        if problem is not None:
+            items.append(
+                BulkSubmissionItem(
+                    entry=entry,
+                    student_id=student_id,
+                    status="rejected",
+                    detail=problem,
+                )
+            )
+        else:
+            accepted.append((entry, student_id))
+    items.extend(
+        BulkSubmissionItem(entry=entry, status="unmatched")
+        for entry in entries
+        if entry not in roster_map
+    )
+
+    try:
+        submissions = await create_submissions(
+            session, question_id, assignment_id, [sid for _, sid in accepted]
+        )
+    except IntegrityError:
+        logger.error(
+            "Failed to create bulk submissions for assignment %d", assignment_id
+        )
+        raise HTTPException(
+            status_code=400, detail="Failed to create submissions"
+        ) from None
+
+    # The rows are committed already; if anything below fails (a storage
+    # error, a client disconnect, the final update), they must not be left
+    # behind without an image and never queued.
+    stored = False
+    try:
+        pdf_key = None
+        if is_pdf and submissions:
+            # One object for the whole stack; each submission selects its pages.
+            pdf_key = f"submissions/batches/{uuid.uuid4().hex}/{filename}"
+            await file.seek(0)
+            await save_fileobj(file.file, pdf_key)
+
+        updates = []
+        job_requests = []
+        for (entry, student_id), submission in zip(accepted, submissions, strict=True):
+            item = {
+                "entry": entry,
+                "student_id": student_id,
+                "submission_id": submission.id,
+            }
+            try:
+                if pdf_key:
+                    image_url = with_pages(pdf_key, entry)
+                else:
+                    key = submission_key(submission.id, PurePosixPath(entry).name)
+                    with archive.open(entries[entry]) as source:
+                        image_url = await save_fileobj(source, key)
+            except Exception as e:
+                logger.error("Failed to store bulk entry '%s': %s", entry, e)
+                updates.append({"id": submission.id, "state": SubmissionState.failed})
+                items.append(BulkSubmissionItem(**item, status="failed", detail=str(e)))
+                continue
+            updates.append({"id": submission.id, "image_url": image_url})
+            items.append(BulkSubmissionItem(**item, status="queued"))
+            job_requests.append(
+                JobRequest(
+                    submission_id=submission.id,
+                    question_id=question_id,
+                    assignment_id=assignment_id,
+                    course_id=assignment.course_id,
+                    student_id=student_id,
+                    image_url=image_url,
+                    java_code="",
+                    test_cases=[
+                        TestCase(input=tc.input, expected_output=tc.expected_output)
+                        for tc in test_cases
+                    ],
+                    rubric_json=rubric_json,
+                    priority=JobPriority.BULK,
+                    deadline=assignment.due_date,
+                )
+            )
+        await set_submission_fields_bulk(session, updates)
+        stored = True
+    finally:
+        if archive is not None:
+            archive.close()
+        if not stored and submissions:
+            await _fail_submissions(session, [s.id for s in submissions])
+
+    # Enqueue after the response, like single submissions, so the rows are
+    # committed and visible to the workers.
+    background_tasks.add_task(start_job_processes, job_requests)
+    logger.info(
+        "Bulk upload for assignment %d: %d queued of %d entries",
+        assignment_id,
+        len(job_requests),
+        len(items),
+    )
+    return BulkSubmissionResult(queued=len(job_requests), items=items)
+
+
+def _oversized_entry(info: zipfile.ZipInfo, total_bytes: int) -> str | None:
+    """Why a ZIP entry is refused before it is read; None if it is fine."""
+    if info.file_size > settings.bulk_submission_max_entry_bytes:
+        return f"Entry is larger than {settings.bulk_submission_max_entry_bytes} bytes"
+    if info.file_size > _MAX_COMPRESSION_RATIO * max(info.compress_size, 1):
+        return "Entry inflates too far to be a scan"
+    if total_bytes + info.file_size > settings.bulk_submission_max_total_bytes:
+        return (
+            "Upload is larger than "
+            f"{settings.bulk_submission_max_total_bytes} bytes uncompressed"
+        )
+    return None
+
+
+async def _fail_submissions(session: AsyncSession, submission_ids: list[int]):
+    try:
+        await session.rollback()
+        await set_submission_fields_bulk(
+            session,
+            [{"id": sid, "state": SubmissionState.failed} for sid in submission_ids],
+        )
+    except Exception as e:
+        logger.error("Failed to mark bulk submissions %s failed: %s", submission_ids, e)
+
+
 @router.get("/me", response_model=list[SubmissionBase])
 async def get_student_submissions(
     session: AsyncSession = Depends(get_db),
@@ -121,13 +368,7 @@ async def get_student_submissions(
     return await get_submissions_by_student_id(session, current_user.id)
 
 
-@router.get("/{submission_id}", response_model=SubmissionBase)
-async def get_submission(
-    submission_id: int,
-    session: AsyncSession = Depends(get_db),
-    current_user=Depends(get_current_user),
-):
-    logger.debug("Fetching submission %d", submission_id)
+async def _get_visible_submission(session, submission_id: int, current_user):
     submission = await get_submission_by_id(session, submission_id)
     if not submission:
         logger.warning("Submission not found: %d", submission_id)
@@ -142,10 +383,53 @@ async def get_submission(
             submission_id,
         )
         raise HTTPException(status_code=403, detail="Forbidden")
-
     return submission
 
 
+@router.get("/{submission_id}", response_model=SubmissionBase)
+async def get_submission(
+    submission_id: int,
+    session: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    logger.debug("Fetching submission %d", submission_id)
+    return await _get_visible_submission(session, submission_id, current_user)
+
+
+@router.get("/{submission_id}/events")
+async def stream_submission_events(
+    submission_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+    hub=Depends(get_event_hub),
+):
+    """Server-Sent Events: the current state, then each pipeline transition."""
+    await _get_visible_submission(session, submission_id, current_user)
+    # The stream can stay open for minutes; don't hold a pooled connection.
+    await session.close()
+
+    async def snapshot():
+        submission = await get_submission_by_id(session, submission_id)
+        await session.close()
+        if submission is None:
+            return None
+        final = submission.state in (SubmissionState.graded, SubmissionState.failed)
+        return SubmissionBase.model_validate(submission).model_dump_json(), final
+
+    return StreamingResponse(
+        relay_events(
+            request,
+            hub,
+            submission_channel(submission_id),
+            snapshot=snapshot,
+            until_terminal=True,
+        ),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS,
+    )
+
+
 @router.get("/assignment/{assignment_id}", response_model=list[SubmissionBase])
 async def get_assignment_submissions(
     assignment_id: int,
@@ -156,6 +440,24 @@ async def get_assignment_submissions(
     return await get_submissions_by_assignment_id(session, assignment_id)
 
 
+@router.get("/assignment/{assignment_id}/events")
+async def stream_assignment_events(
+    assignment_id: int,
+    request: Request,
+    session: AsyncSession = Depends(get_db),
+    current_user=Depends(require_role(UserRole.instructor)),
+    hub=Depends(get_event_hub),
+):
+    """Server-Sent Events for every submission of an assignment."""
+    await _verify_instructor_owns_assignment(session, assignment_id, current_user.id)
+    await session.close()
+    return StreamingResponse(
+        relay_events(request, hub, assignment_channel(assignment_id)),
+        media_type="text/event-stream",
+        headers=_SSE_HEADERS,
+    )
+
+
 @router.put("/{submission_id}/state", response_model=SubmissionBase)
 async def change_submission_state(
     submission_id: int,
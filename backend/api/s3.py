@@ -1,6 +1,12 @@
+import asyncio
+from typing import BinaryIO
+
 from fastapi import UploadFile
 from settings import s3_client, settings
 
+# Suffix selecting pages of a shared multi-page PDF (read by the OCR worker).
+PAGES_SELECTOR = "#pages="
+
 
 def public_url_for_key(key: str) -> str:
     """Public-style URL for display; path-style for MinIO, virtual-hosted for AWS."""
@@ -12,12 +18,27 @@ async def save_file(file: UploadFile, submission_id: int) -> str:
     """Upload file and return the S3 object key (use with _get_file / public_url_for_key)."""
     if file.filename is None:
         file.filename = "upload"
-    key = f"submissions/{submission_id}/{file.filename}"
+    key = submission_key(submission_id, file.filename)
     await file.seek(0)
     s3_client.upload_fileobj(file.file, settings.s3_bucket, key)
     return key
 
 
+def submission_key(submission_id: int, filename: str) -> str:
+    return f"submissions/{submission_id}/{filename}"
+
+
+def with_pages(key: str, pages: str) -> str:
+    """Image URL for ``pages`` (e.g. ``"3-4"``) of the PDF stored at ``key``."""
+    return f"{key}{PAGES_SELECTOR}{pages}"
+
+
+async def save_fileobj(fileobj: BinaryIO, key: str) -> str:
+    """Stream a file-like object to the bucket (multipart, chunk by chunk)."""
+    await asyncio.to_thread(s3_client.upload_fileobj, fileobj, settings.s3_bucket, key)
+    return key
+
+
 def get_file(key: str) -> bytes:
     response = s3_client.get_object(Bucket=settings.s3_bucket, Key=key)
     return response["Body"].read()
@@ -1,10 +1,14 @@
 from __future__ import annotations
 
+import asyncio
+import io
+import json
+import zipfile
 from types import SimpleNamespace
 
 import pytest
-from db.models import UserRole
-from fastapi import Depends, FastAPI
+from db.models import SubmissionState, UserRole
+from fastapi import Depends, FastAPI, UploadFile
 from fastapi.testclient import TestClient
 from jose import jwt
 from schemas import UserBase
@@ -141,3 +145,344 @@ def test_require_role_forbidden(monkeypatch: pytest.MonkeyPatch) -> None:
     client = TestClient(app)
     resp = client.get("/instructor-only", headers={"Authorization": f"Bearer {token}"})
     assert resp.status_code == 403
+
+
+def _bulk_client(monkeypatch: pytest.MonkeyPatch, stored: dict, queued: list):
+    import api.auth as auth_mod
+    import api.routes.submissions as subs_mod
+
+    async def fake_get_user_by_id(session, user_id: int):
+        return SimpleNamespace(
+            id=user_id,
+            username="prof",
+            email="prof@example.com",
+            role=UserRole.instructor,
+            password_hash="hashed",
+        )
+
+    async def fake_verify(session, assignment_id: int, instructor_id: int):
+        return SimpleNamespace(
+            id=assignment_id, course_id=3, rubric_json={"max": 10}, due_date=None
+        )
+
+    async def fake_question(session, question_id: int, assignment_id: int):
+        return SimpleNamespace(id=question_id)
+
+    async def fake_testcases(session, question_id: int, assignment_id: int):
+        return []
+
+    async def fake_enrolled(session, course_id: int):
+        return {10, 11}
+
+    async def fake_create(session, question_id, assignment_id, student_ids):
+        return [SimpleNamespace(id=100 + i) for i, _ in enumerate(student_ids)]
+
+    async def fake_set_fields(session, rows):
+        stored["rows"] = rows
+
+    async def fake_save(fileobj, key: str) -> str:
+        stored[key] = fileobj.read()
+        return key
+
+    async def fake_start(job_requests):
+        queued.extend(job_requests)
+
+    monkeypatch.setattr(auth_mod, "get_user_by_id", fake_get_user_by_id)
+    monkeypatch.setattr(subs_mod, "_verify_instructor_owns_assignment", fake_verify)
+    monkeypatch.setattr(subs_mod, "get_question_by_id", fake_question)
+    monkeypatch.setattr(subs_mod, "get_testcases_by_question_id", fake_testcases)
+    monkeypatch.setattr(subs_mod, "get_enrolled_student_ids", fake_enrolled)
+    monkeypatch.setattr(subs_mod, "create_submissions", fake_create)
+    monkeypatch.setattr(subs_mod, "set_submission_fields_bulk", fake_set_fields)
+    monkeypatch.setattr(subs_mod, "save_fileobj", fake_save)
+    monkeypatch.setattr(subs_mod, "start_job_processes", fake_start)
+
+    app = FastAPI()
+    app.include_router(subs_mod.router, prefix="/submissions")
+
+    async def fake_get_db():
+        yield None
+
+    app.dependency_overrides[get_db] = fake_get_db
+    token = create_access_token({"sub": "1"})
+    return TestClient(app), {"Authorization": f"Bearer {token}"}
+
+
+def test_bulk_submission_zip_reports_per_item_status(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from schemas import JobPriority
+
+    stored: dict = {}
+    queued: list = []
+    client, headers = _bulk_client(monkeypatch, stored, queued)
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("scans/alice.png", b"alice")
+        zf.writestr("scans/bob.png", b"bob")
+        zf.writestr("scans/stray.png", b"stray")
+    roster = {"scans/alice.png": 10, "scans/bob.png": 99, "scans/carol.png": 11}
+
+    resp = client.post(
+        "/submissions/bulk",
+        headers=headers,
+        data={"question_id": "1", "assignment_id": "2", "roster": json.dumps(roster)},
+        files={"file": ("class.zip", archive.getvalue(), "application/zip")},
+    )
+    assert resp.status_code == 200
+    body = resp.json()
+    statuses = {item["entry"]: item["status"] for item in body["items"]}
+    assert statuses == {
+        "scans/alice.png": "queued",
+        "scans/bob.png": "rejected",
+        "scans/carol.png": "missing",
+        "scans/stray.png": "unmatched",
+    }
+    assert body["queued"] == 1
+    assert stored["submissions/100/alice.png"] == b"alice"
+    assert stored["rows"] == [{"id": 100, "image_url": "submissions/100/alice.png"}]
+    assert [(r.submission_id, r.student_id) for r in queued] == [(100, 10)]
+    assert queued[0].priority == JobPriority.BULK
+
+
+def test_bulk_submission_rejects_oversized_zip_entries_before_reading(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    import api.routes.submissions as subs_mod
+
+    stored: dict = {}
+    client, headers = _bulk_client(monkeypatch, stored, [])
+    monkeypatch.setattr(subs_mod.settings, "bulk_submission_max_entry_bytes", 64)
+    monkeypatch.setattr(subs_mod.settings, "bulk_submission_max_total_bytes", 100)
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("big.png", bytes(range(256)) * 2, zipfile.ZIP_STORED)
+        zf.writestr("bomb.png", b"\0" * 60_000)
+        zf.writestr("a.png", b"a" * 60, zipfile.ZIP_STORED)
+        zf.writestr("b.png", b"b" * 60, zipfile.ZIP_STORED)
+    roster = {"big.png": 10, "bomb.png": 10, "a.png": 10, "b.png": 11}
+
+    resp = client.post(
+        "/submissions/bulk",
+        headers=headers,
+        data={"question_id": "1", "assignment_id": "2", "roster": json.dumps(roster)},
+        files={"file": ("class.zip", archive.getvalue(), "application/zip")},
+    )
+    assert resp.status_code == 200
+    items = {item["entry"]: item for item in resp.json()["items"]}
+    assert [items[e]["status"] for e in roster] == [
+        "rejected",
+        "rejected",
+        "queued",
+        "rejected",
+    ]
+    assert "larger than 64 bytes" in items["big.png"]["detail"]
+    assert "100 bytes uncompressed" in items["b.png"]["detail"]
+    assert [key for key in stored if key != "rows"] == ["submissions/100/a.png"]
+
+
+def test_bulk_submission_marks_rows_failed_when_the_upload_breaks(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    import api.routes.submissions as subs_mod
+
+    client, headers = _bulk_client(monkeypatch, {}, [])
+    writes: list = []
+
+    async def flaky_set_fields(session, rows):
+        writes.append(rows)
+        if len(writes) == 1:
+            raise RuntimeError("database went away")
+
+    class _Session:
+        async def rollback(self) -> None:
+            pass
+
+    async def fake_get_db():
+        yield _Session()
+
+    monkeypatch.setattr(subs_mod, "set_submission_fields_bulk", flaky_set_fields)
+    client.app.dependency_overrides[get_db] = fake_get_db
+
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, "w") as zf:
+        zf.writestr("alice.png", b"alice")
+    with pytest.raises(RuntimeError):
+        client.post(
+            "/submissions/bulk",
+            headers=headers,
+            data={
+                "question_id": "1",
+                "assignment_id": "2",
+                "roster": '{"alice.png": 10}',
+            },
+            files={"file": ("class.zip", archive.getvalue(), "application/zip")},
+        )
+    assert writes[-1] == [{"id": 100, "state": SubmissionState.failed}]
+
+
+def test_body_size_limit_refuses_large_uploads() -> None:
+
+    from api.body_limit import BodySizeLimitMiddleware
+
+    app = FastAPI()
+
+    @app.post("/upload")
+    async def upload(file: UploadFile):
+        return {"size": len(await file.read())}
+
+    app.add_middleware(BodySizeLimitMiddleware, limits={"/upload": 1000})
+    client = TestClient(app)
+
+    small = client.post("/upload", files={"file": ("a", b"x" * 10)})
+    assert small.json() == {"size": 10}
+    declared = client.post("/upload", files={"file": ("a", b"x" * 2000)})
+    assert declared.status_code == 413
+
+    def chunks():
+        yield b"--b\r\nContent-Disposition: form-data; name=file; filename=a\r\n\r\n"
+        for _ in range(20):
+            yield b"x" * 100
+        yield b"\r\n--b--\r\n"
+
+    streamed = client.post(
+        "/upload",
+        content=chunks(),
+        headers={"Content-Type": "multipart/form-data; boundary=b"},
+    )
+    assert streamed.status_code == 413
+
+
+def test_bulk_submission_pdf_selects_pages_of_one_object(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    stored: dict = {}
+    queued: list = []
+    client, headers = _bulk_client(monkeypatch, stored, queued)
+
+    resp = client.post(
+        "/submissions/bulk",
+        headers=headers,
+        data={
+            "question_id": "1",
+            "assignment_id": "2",
+            "roster": json.dumps({"1-2": 10, "3": 11}),
+        },
+        files={"file": ("stack.pdf", b"%PDF-1.7 fake", "application/pdf")},
+    )
+    assert resp.status_code == 200
+    assert resp.json()["queued"] == 2
+    (pdf_key,) = [key for key in stored if key != "rows"]
+    assert stored[pdf_key] == b"%PDF-1.7 fake"
+    assert [r.image_url for r in queued] == [
+        f"{pdf_key}#pages=1-2",
+        f"{pdf_key}#pages=3",
+    ]
+
+
+def test_bulk_submission_rejects_bad_page_ranges(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    client, headers = _bulk_client(monkeypatch, {}, [])
+    resp = client.post(
+        "/submissions/bulk",
+        headers=headers,
+        data={"question_id": "1", "assignment_id": "2", "roster": '{"0-x": 10}'},
+        files={"file": ("stack.pdf", b"%PDF", "application/pdf")},
+    )
+    assert resp.status_code == 422
+
+
+def test_submission_event_stream_relays_until_terminal(
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    from core.events import RESYNC, submission_channel
+    from db.models import SubmissionState
+
+    import api.auth as auth_mod
+    import api.routes.submissions as subs_mod
+    from api.dependencies import get_event_hub
+
+    async def fake_get_user_by_id(session, user_id: int):
+        return SimpleNamespace(
+            id=user_id,
+            username="alice",
+            email="alice@example.com",
+            role=UserRole.student,
+            password_hash="hashed",
+        )
+
+    async def fake_get_submission(session, submission_id: int):
+        return SimpleNamespace(
+            id=submission_id,
+            question_id=1,
+            assignment_id=2,
+            student_id=7,
+            image_url="submissions/5/a.png",
+            state=SubmissionState.processing,
+            submitted_at="2026-01-01T00:00:00Z",
+        )
+
+    def _event(stage, status: str) -> str:
+        return json.dumps(
+            {
+                "submission_id": 5,
+                "assignment_id": 2,
+                "stage": stage,
+                "status": status,
+                "at": "2026-01-01T00:00:00Z",
+            }
+        )
+
+    class _FakeHub:
+        def __init__(self) -> None:
+            self.active: list[str] = []
+
+        async def subscribe(self, channel: str) -> asyncio.Queue:
+            self.active.append(channel)
+            queue: asyncio.Queue = asyncio.Queue()
+            queue.put_nowait(_event("OCR", "done"))
+            # The hub lost Redis and resubscribed: the state is read again.
+            queue.put_nowait(RESYNC)
+            for stage, status in ((None, "graded"), (None, "x")):
+                queue.put_nowait(_event(stage, status))
+            return queue
+
+        def unsubscribe(self, channel: str, queue) -> None:
+            self.active.remove(channel)
+
+    class _FakeSession:
+        async def close(self) -> None:
+            pass
+
+    hub = _FakeHub()
+    monkeypatch.setattr(auth_mod, "get_user_by_id", fake_get_user_by_id)
+    monkeypatch.setattr(subs_mod, "get_submission_by_id", fake_get_submission)
+
+    app = FastAPI()
+    app.include_router(subs_mod.router, prefix="/submissions")
+
+    async def fake_get_db():
+        yield _FakeSession()
+
+    app.dependency_overrides[get_db] = fake_get_db
+    app.dependency_overrides[get_event_hub] = lambda: hub
+
+    token = create_access_token({"sub": "7"})
+    client = TestClient(app)
+    resp = client.get(
+        "/submissions/5/events", headers={"Authorization": f"Bearer {token}"}
+    )
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    blocks = [b for b in resp.text.split("\n\n") if b]
+    assert [b.split("\n")[0] for b in blocks] == [
+        "event: snapshot",
+        "event: status",
+        "event: snapshot",
+        "event: status",
+    ]
+    assert '"status":"graded"' in blocks[-1].replace(" ", "")
+    assert submission_channel(5) not in hub.active
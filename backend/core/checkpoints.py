@@ -0,0 +1,87 @@
+"""
+Per-stage result checkpoints for the grading pipeline.
+
+After a stage completes, the orchestrator stores the raw worker result under
+``{prefix}:checkpoints:{submission_id}:{stage}`` together with a hash of the
+stage's inputs. When a job for the same submission reaches that stage again
+(a retry after a lease expiry or a resubmission) and the inputs hash the same,
+the stored result is replayed instead of paying for OCR, the sandbox or the
+LLM a second time.
+
+Key layout::
+
+    {prefix}:checkpoints:{submission_id}:{stage} → {"input_hash", "result"} (hash)
+"""
+
+import hashlib
+import json
+import logging
+from typing import Any
+
+from pydantic_core import to_jsonable_python
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+
+def input_hash(inputs: Any) -> str:
+    """Stable SHA-256 of a stage's inputs (pydantic models and dicts welcome)."""
+    canonical = json.dumps(
+        to_jsonable_python(inputs), sort_keys=True, separators=(",", ":")
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class StageCheckpoints:
+    def __init__(
+        self,
+        redis_client,
+        prefix: str,
+        ttl_s: int = settings.checkpoint_ttl_s,
+    ):
+        self.redis_client = redis_client
+        self.prefix = prefix
+        self.ttl_s = ttl_s
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_s > 0
+
+    def key(self, submission_id: int, stage: str) -> str:
+        return f"{self.prefix}:checkpoints:{submission_id}:{stage}"
+
+    async def load(self, submission_id: int, stage: str, digest: str) -> str | None:
+        """Stored result for ``stage`` if it was produced from the same inputs."""
+        if not self.enabled:
+            return None
+        try:
+            stored = await self.redis_client.hgetall(self.key(submission_id, stage))
+        except Exception as e:
+            logger.warning(
+                "Failed to load %s checkpoint for submission %s: %s",
+                stage,
+                submission_id,
+                e,
+            )
+            return None
+        if not stored or stored.get("input_hash") != digest:
+            return None
+        return stored.get("result")
+
+    async def save(self, submission_id: int, stage: str, digest: str, result: str):
+        if not self.enabled:
+            return
+        key = self.key(submission_id, stage)
+        try:
+            await self.redis_client.hset(
+                key, mapping={"input_hash": digest, "result": result}
+            )
+            await self.redis_client.expire(key, self.ttl_s)
+        except Exception as e:
+            # A missing checkpoint only costs a re-run of the stage.
+            logger.warning(
+                "Failed to save %s checkpoint for submission %s: %s",
+                stage,
+                submission_id,
+                e,
+            )
@@ -0,0 +1,179 @@
+"""
+Adaptive (AIMD) concurrency limits for the queue consumers.
+
+Each worker starts ``max_limit`` consumer coroutines, but only ``limit`` of
+them may hold a slot (claim and process work) at once. Every
+``ADAPTIVE_INTERVAL_S`` the controller adjusts ``limit``:
+
+- multiplicative decrease when the p95 job latency exceeds its target, the
+  host is short of CPU or memory, or an upstream API answered 429;
+- additive increase when there is a backlog (queue depth, or handlers
+  waiting for a slot) and none of the above applies;
+- otherwise the limit is left alone.
+
+The limit always stays within ``[min_limit, max_limit]``.
+"""
+
+import asyncio
+import logging
+import os
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+INCREASE_STEP = 1
+DECREASE_FACTOR = 0.5
+MAX_LATENCY_SAMPLES = 1000
+
+_throttle_count = 0
+
+
+def report_throttle():
+    """Record an upstream rate-limit (HTTP 429) response in this process."""
+    global _throttle_count
+    _throttle_count += 1
+
+
+def is_throttle_error(exc: BaseException) -> bool:
+    """Best-effort 429 detection across the httpx, Azure and Gemini SDK errors."""
+    for attr in ("status_code", "code", "status"):
+        if getattr(exc, attr, None) == 429:
+            return True
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    # SDK errors are often re-raised wrapped (``raise RuntimeError(...) from e``).
+    return exc.__cause__ is not None and is_throttle_error(exc.__cause__)
+
+
+def host_pressure() -> tuple[float | None, float | None]:
+    """(1-minute load per CPU, fraction of memory in use); None where unknown."""
+    cpu = None
+    try:
+        cpu = os.getloadavg()[0] / (os.cpu_count() or 1)
+    except OSError:
+        pass
+    mem = None
+    try:
+        with open("/proc/meminfo") as f:
+            info = {
+                line.split(":")[0]: int(line.split()[1]) for line in f if ":" in line
+            }
+        mem = 1 - info["MemAvailable"] / info["MemTotal"]
+    except (OSError, KeyError, ValueError, ZeroDivisionError):
+        pass
+    return cpu, mem
+
+
+def _p95(samples: list[float]) -> float | None:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(int(len(ordered) * 0.95), len(ordered) - 1)]
+
+
+class AdaptiveLimiter:
+    def __init__(
+        self,
+        name: str,
+        min_limit: int,
+        max_limit: int,
+        target_p95_s: float,
+        queue_depth: Callable[[], Awaitable[int]] | None = None,
+        interval_s: float = settings.adaptive_interval_s,
+        cpu_high: float = settings.adaptive_cpu_high,
+        mem_high: float = settings.adaptive_mem_high,
+        pressure: Callable[[], tuple[float | None, float | None]] = host_pressure,
+    ):
+        self.name = name
+        self.max_limit = max(max_limit, 1)
+        self.min_limit = min(max(min_limit, 1), self.max_limit)
+        self.limit = self.max_limit
+        self.target_p95_s = target_p95_s
+        self.queue_depth = queue_depth
+        self.interval_s = interval_s
+        self.cpu_high = cpu_high
+        self.mem_high = mem_high
+        self.pressure = pressure
+        self.in_use = 0
+        self.waiting = 0
+        self._latencies: list[float] = []
+        self._throttles_seen = _throttle_count
+        self._changed = asyncio.Condition()
+
+    @asynccontextmanager
+    async def slot(self):
+        async with self._changed:
+            self.waiting += 1
+            try:
+                await self._changed.wait_for(lambda: self.in_use < self.limit)
+            finally:
+                self.waiting -= 1
+            self.in_use += 1
+        try:
+            yield
+        finally:
+            async with self._changed:
+                self.in_use -= 1
+                self._changed.notify_all()
+
+    def record_latency(self, seconds: float):
+        if len(self._latencies) < MAX_LATENCY_SAMPLES:
+            self._latencies.append(seconds)
+
+    async def adjust(self) -> int:
+        """Apply one AIMD step and return the new limit."""
+        p95 = _p95(self._latencies)
+        self._latencies = []
+        throttles = _throttle_count - self._throttles_seen
+        self._throttles_seen = _throttle_count
+        cpu, mem = self.pressure()
+
+        reasons = []
+        if throttles:
+            reasons.append(f"{throttles} upstream 429(s)")
+        if p95 is not None and p95 > self.target_p95_s:
+            reasons.append(f"p95 {p95:.1f}s > {self.target_p95_s:.1f}s")
+        if cpu is not None and cpu > self.cpu_high:
+            reasons.append(f"cpu load {cpu:.2f}")
+        if mem is not None and mem > self.mem_high:
+            reasons.append(f"memory {mem:.0%}")
+
+        if reasons:
+            new_limit = max(self.min_limit, int(self.limit * DECREASE_FACTOR))
+        elif await self._backlogged():
+            new_limit = min(self.max_limit, self.limit + INCREASE_STEP)
+        else:
+            new_limit = self.limit
+
+        if new_limit != self.limit:
+            logger.info(
+                "%s concurrency %d -> %d (%s)",
+                self.name,
+                self.limit,
+                new_limit,
+                ", ".join(reasons) or "backlog",
+            )
+            async with self._changed:
+                self.limit = new_limit
+                self._changed.notify_all()
+        return self.limit
+
+    async def run(self):
+        while True:
+            try:
+                await asyncio.sleep(self.interval_s)
+                await self.adjust()
+            except asyncio.CancelledError:
+                logger.debug("%s concurrency controller shutting down...", self.name)
+                return
+            except Exception as e:
+                logger.error("%s concurrency controller failed: %s", self.name, e)
+
+    async def _backlogged(self) -> bool:
+        if self.queue_depth is None:
+            return self.waiting > 0
+        return self.in_use >= self.limit and await self.queue_depth() > 0
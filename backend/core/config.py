@@ -3,6 +3,8 @@ import logging
 from redis.asyncio import Redis
 from settings import settings
 
+from .transport import PriorityTransport, make_transport
+
 logger = logging.getLogger(__name__)
 
 
@@ -15,3 +17,10 @@ class JobQueue:
         self.redis_url: str = redis_url
         self.ai_grading_max_concurrency: int = ai_grading_max_concurrency
         self.redis_client = Redis.from_url(self.redis_url, decode_responses=True)
+        self._transports: dict[str, PriorityTransport] = {}
+
+    def transport(self, queue: str) -> PriorityTransport:
+        """Producer-side transport for ``queue`` (backend from QUEUE_BACKEND)."""
+        if queue not in self._transports:
+            self._transports[queue] = make_transport(self.redis_client, queue)
+        return self._transports[queue]
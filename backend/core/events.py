@@ -0,0 +1,183 @@
+"""
+Live submission status events over Redis pub/sub.
+
+The orchestrator publishes every pipeline transition (a stage started or
+finished, the submission was graded or failed) as a ``SubmissionEvent`` to
+two channels::
+
+    {QUEUE_NAMESPACE}:events:submission:{submission_id}
+    {QUEUE_NAMESPACE}:events:assignment:{assignment_id}
+
+Each API process holds a single pattern subscription (``EventHub``) and fans
+the events out to its connected Server-Sent Events clients. Pub/sub does not
+store anything: a client that was not connected misses events, so the API
+sends the submission's current state when a stream opens, and again after the
+hub had to resubscribe (``RESYNC``).
+"""
+
+import asyncio
+import logging
+from datetime import UTC, datetime
+
+from schemas import GraderResult, Job, SandboxResult, SubmissionEvent
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+EVENTS_PREFIX = f"{settings.queue_namespace}:events"
+TERMINAL_STATUSES = ("graded", "failed")
+ERROR_BACKOFF_S = 1.0
+# Queued to every subscriber once the pattern subscription is (re)established:
+# events published while it was down are lost, so the state must be re-read.
+RESYNC = "resync"
+
+
+def submission_channel(submission_id: int) -> str:
+    return f"{EVENTS_PREFIX}:submission:{submission_id}"
+
+
+def assignment_channel(assignment_id: int) -> str:
+    return f"{EVENTS_PREFIX}:assignment:{assignment_id}"
+
+
+def stage_detail(job: Job) -> dict:
+    """Client-facing summary of the latest stage result of ``job``."""
+    if not job.job_result_payload:
+        return {}
+    result = job.job_result_payload[-1].job_result
+    if isinstance(result, SandboxResult):
+        sandbox = result.result.result
+        if sandbox is None:
+            return {}
+        detail = {}
+        if sandbox.compilation_result is not None:
+            detail["compiled"] = sandbox.compilation_result.success
+        tests = sandbox.test_cases_results
+        if tests is not None and tests.results is not None:
+            detail["tests_passed"] = sum(r.passed for r in tests.results)
+            detail["tests_total"] = len(tests.results)
+        return detail
+    if isinstance(result, GraderResult):
+        return {"final_grade": result.final_grade}
+    return {}
+
+
+class StatusEvents:
+    """Publisher side; failures are logged and never affect the pipeline."""
+
+    def __init__(self, redis_client):
+        self.redis_client = redis_client
+
+    async def publish(
+        self,
+        job: Job,
+        status: str,
+        stage: str | None = None,
+        detail: dict | None = None,
+    ):
+        request = job.initial_request
+        message = SubmissionEvent(
+            submission_id=request.submission_id,
+            assignment_id=request.assignment_id,
+            stage=stage,
+            status=status,
+            detail=detail or {},
+            at=datetime.now(UTC),
+        ).model_dump_json()
+        try:
+            async with self.redis_client.pipeline(transaction=False) as pipe:
+                pipe.publish(submission_channel(request.submission_id), message)
+                pipe.publish(assignment_channel(request.assignment_id), message)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(
+                "Failed to publish %s event for submission %s: %s",
+                status,
+                request.submission_id,
+                e,
+            )
+
+
+class EventHub:
+    """
+    Subscriber side: one ``PSUBSCRIBE`` per process, fanned out in memory.
+
+    Every subscriber gets a bounded queue; a client that stops reading has
+    further events dropped instead of holding up the others.
+    """
+
+    def __init__(self, redis_client, buffer: int = settings.sse_client_buffer):
+        self.redis_client = redis_client
+        self.buffer = buffer
+        self.subscribers: dict[str, set[asyncio.Queue]] = {}
+        # Set while the pattern subscription is confirmed by Redis.
+        self.ready = asyncio.Event()
+        self._reader: asyncio.Task | None = None
+
+    def start(self):
+        if self._reader is None or self._reader.done():
+            self._reader = asyncio.create_task(self.run())
+
+    async def stop(self):
+        if self._reader is None:
+            return
+        self._reader.cancel()
+        try:
+            await self._reader
+        except asyncio.CancelledError:
+            pass
+        self._reader = None
+
+    async def subscribe(self, channel: str) -> asyncio.Queue:
+        """A queue of ``channel``'s events, once the hub receives them.
+
+        Waits up to ``SSE_KEEPALIVE_S`` for the subscription; if Redis is
+        down longer, the queue gets ``RESYNC`` when it is back.
+        """
+        self.start()
+        try:
+            await asyncio.wait_for(self.ready.wait(), settings.sse_keepalive_s)
+        except TimeoutError:
+            logger.warning("Event hub not subscribed yet; %s may miss events", channel)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.buffer)
+        self.subscribers.setdefault(channel, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue):
+        queues = self.subscribers.get(channel)
+        if queues is None:
+            return
+        queues.discard(queue)
+        if not queues:
+            del self.subscribers[channel]
+
+    def deliver(self, channel: str, data: str):
+        for queue in self.subscribers.get(channel, ()):
+            try:
+                queue.put_nowait(data)
+            except asyncio.QueueFull:
+                logger.debug("Dropping event on %s for a slow client", channel)
+
+    def resync(self):
+        for channel in list(self.subscribers):
+            self.deliver(channel, RESYNC)
+
+    async def run(self):
+        while True:
+            pubsub = self.redis_client.pubsub()
+            try:
+                await pubsub.psubscribe(f"{EVENTS_PREFIX}:*")
+                self.resync()
+                self.ready.set()
+                async for message in pubsub.listen():
+                    if message["type"] == "pmessage":
+                        self.deliver(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                logger.debug("Event hub shutting down...")
+                return
+            except Exception as e:
+                logger.error("Event hub subscription failed: %s", e)
+                await asyncio.sleep(ERROR_BACKOFF_S)
+            finally:
+                self.ready.clear()
+                await pubsub.aclose()
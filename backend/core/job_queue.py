@@ -1,71 +1,449 @@
 import asyncio
 import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
 from datetime import datetime
+from typing import NamedTuple
 from uuid import uuid4
 
-from schemas import Job, JobRequest, JobStatus
+from db.crud.submissions import update_submission_state
+from db.models import SubmissionState
+from db.session import async_session
+from schemas import Job, JobRequest, JobStatus, JobType
 from settings import settings
 
+from .checkpoints import StageCheckpoints, input_hash
+from .concurrency import AdaptiveLimiter
 from .config import JobQueue
+from .events import StatusEvents, stage_detail
+from .metrics import (
+    CHECKPOINT_REPLAYS,
+    JOBS_FINISHED,
+    ORCHESTRATOR_JOBS,
+    REGISTRY,
+    STAGE_DURATION,
+    STAGE_FAILURES,
+    limiter_collector,
+    queue_lag_collector,
+)
 from .process import (
-    # process_final_result_job,
-    process_grader_job,
-    process_ocr_job,
-    process_sandbox_job,
+    complete_grader_job,
+    complete_ocr_job,
+    complete_sandbox_job,
+    dispatch_grader_job,
+    dispatch_ocr_job,
+    dispatch_sandbox_job,
+    grader_job_inputs,
+    ocr_job_inputs,
+    sandbox_job_inputs,
 )
+from .scheduling import FairShare
+from .transport import Delivery, make_transport
 
 logger = logging.getLogger(__name__)
 MAIN_QUEUE = f"{settings.queue_namespace}:{settings.main_queue}"
+ERROR_BACKOFF_S = 1.0
 
 
-async def start():
-    try:
-        logger.info("Starting JobQueue...")
-        client = JobQueue()
-    except Exception as e:
-        logger.error(f"Job Queue Initialization Failed: {e}")
-        raise
-    logger.info("Job Queue Started Successfully")
-    await asyncio.gather(
-        *(main_loop(client, pid) for pid in range(settings.main_max_concurrency))
-    )
+class PipelineStage(NamedTuple):
+    """
+    One step of the grading pipeline.
+
+    ``dispatch`` hands the job to the stage's worker queue and returns the
+    completion key the worker will push its result to (or None on failure).
+    ``complete`` consumes that result, persists it (unless ``persist`` is
+    False, for replayed checkpoints) and returns the job (or None on failure).
+    ``inputs`` returns what the stage's result depends on; stages that define
+    it are checkpointed (see ``core/checkpoints.py``).
+    """
+
+    name: JobType
+    dispatch: Callable[[JobQueue, Job], Awaitable[str | None]]
+    complete: Callable[..., Awaitable[Job | None]]
+    inputs: Callable[[Job], Awaitable[dict]] | None = None
+
+
+PIPELINE: tuple[PipelineStage, ...] = (
+    PipelineStage(JobType.OCR, dispatch_ocr_job, complete_ocr_job, ocr_job_inputs),
+    PipelineStage(
+        JobType.SANDBOX, dispatch_sandbox_job, complete_sandbox_job, sandbox_job_inputs
+    ),
+    PipelineStage(
+        JobType.GRADER, dispatch_grader_job, complete_grader_job, grader_job_inputs
+    ),
+)
+
+
+@dataclass
+class InFlightJob:
+    job: Job
+    delivery: Delivery
+    stage_index: int = 0
+    input_hash: str | None = None
+    # Stage whose per-course gate this entry currently holds, if any.
+    gated_stage: int | None = None
+    # time.monotonic() when the current stage was dispatched.
+    dispatched_at: float = 0.0
+
+    @property
+    def course(self) -> int | None:
+        return self.job.initial_request.course_id
+
+
+class StageOrchestrator:
+    """
+    Event-driven state machine over ``PIPELINE``.
 
+    Instead of parking one coroutine per job on each stage's completion list,
+    a single event loop BRPOPs across the completion keys of every in-flight
+    job (plus a private wake-up key) and advances whichever job completed.
+    The number of admitted jobs is bounded by ``max_in_flight``; the
+    completion handlers (result parsing and DB writes) are bounded by an
+    adaptive limit between ``MAIN_MIN_CONCURRENCY`` and ``max_handlers``
+    (see ``core/concurrency.py``).
 
-async def main_loop(client: JobQueue, process_id: int = 0):
-    while True:
+    Courses share that capacity fairly. A course may hold at most
+    ``course_max_in_flight`` admitted jobs and ``course_stage_max_in_flight``
+    jobs at any one stage. Further claimed jobs are parked, still leased, and
+    handed over course by course as slots free up. A batch upload from one
+    course therefore cannot fill the OCR, sandbox or grader queues ahead of
+    every other course.
+    """
+
+    def __init__(
+        self,
+        client: JobQueue,
+        max_in_flight: int = settings.main_max_in_flight,
+        max_handlers: int = settings.main_max_concurrency,
+        poll_timeout_s: int = settings.main_event_poll_timeout_s,
+        course_max_in_flight: int = settings.course_max_in_flight,
+        course_stage_max_in_flight: int = settings.course_stage_max_in_flight,
+        course_overrides: dict[int, int] = settings.course_max_in_flight_overrides,
+        max_parked: int = settings.main_max_parked,
+    ):
+        self.client = client
+        self.max_in_flight = max_in_flight
+        self.max_parked = max_parked
+        self.admission = FairShare(course_max_in_flight, course_overrides)
+        self.stage_gates = [
+            FairShare(course_stage_max_in_flight, course_overrides) for _ in PIPELINE
+        ]
+        self.poll_timeout_s = poll_timeout_s
+        self.wakeup_key = f"{MAIN_QUEUE}:events:{uuid4()}"
+        self.transport = make_transport(
+            client.redis_client, MAIN_QUEUE, on_dead_letter=self.report_dead_letter
+        )
+        self.checkpoints = StageCheckpoints(client.redis_client, MAIN_QUEUE)
+        self.events = StatusEvents(client.redis_client)
+        self.in_flight: dict[str, InFlightJob] = {}
+        self._slots = asyncio.Semaphore(max_in_flight)
+        self._handlers = AdaptiveLimiter(
+            "Main",
+            min_limit=settings.main_min_concurrency,
+            max_limit=max_handlers,
+            target_p95_s=settings.main_target_p95_s,
+        )
+        self._tasks: set[asyncio.Task] = set()
+
+    async def run(self):
+        collectors = (
+            queue_lag_collector(self.transport),
+            limiter_collector(self._handlers),
+            self.collect_metrics,
+        )
+        for collector in collectors:
+            REGISTRY.add_collector(collector)
         try:
-            logger.info(f"Process #{process_id}: Waiting for Job in {MAIN_QUEUE}...")
-            result = await client.redis_client.brpoplpush(
-                src=MAIN_QUEUE, dst=f"{MAIN_QUEUE}:processing", timeout=0
+            await asyncio.gather(
+                self.transport.run(),
+                self._handlers.run(),
+                self.admit_loop(),
+                self.event_loop(),
+            )
+        finally:
+            for collector in collectors:
+                REGISTRY.remove_collector(collector)
+            for task in self._tasks:
+                task.cancel()
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+            try:
+                await self.client.redis_client.delete(self.wakeup_key)
+            except Exception as e:
+                logger.error(f"Failed to delete wake-up key {self.wakeup_key}: {e}")
+
+    async def collect_metrics(self):
+        parked = self.admission.parked_count + sum(
+            gate.parked_count for gate in self.stage_gates
+        )
+        ORCHESTRATOR_JOBS.labels("in_stage").set(len(self.in_flight))
+        ORCHESTRATOR_JOBS.labels("parked").set(parked)
+
+    async def admit_loop(self):
+        while True:
+            while self.admission.parked_count >= self.max_parked:
+                # Back-pressure: stop claiming until parked jobs drain.
+                await asyncio.sleep(ERROR_BACKOFF_S)
+            await self._slots.acquire()
+            try:
+                logger.info(
+                    "Waiting for Job in %s (%d/%d in flight)...",
+                    MAIN_QUEUE,
+                    len(self.in_flight),
+                    self.max_in_flight,
+                )
+                (delivery,) = await self.transport.claim(count=1, timeout=0)
+            except asyncio.CancelledError:
+                logger.debug("Admission loop cancelled. Shutting down...")
+                return
+            except Exception as e:
+                logger.error(f"Failed to receive Job from {MAIN_QUEUE}: {e}")
+                self._slots.release()
+                await asyncio.sleep(ERROR_BACKOFF_S)
+                continue
+            logger.info(f"Job Received from {MAIN_QUEUE}.")
+            logger.debug(f"Job Request: {delivery.payload}")
+            try:
+                await self.admit(delivery)
+            except asyncio.CancelledError:
+                logger.debug("Admission loop cancelled. Shutting down...")
+                return
+            except Exception as e:
+                # Nothing was registered; let the lease expire so it is retried.
+                logger.error(f"Failed to admit Job, leaving it for lease retry: {e}")
+                self.transport.abandon(delivery)
+                self._slots.release()
+                await asyncio.sleep(ERROR_BACKOFF_S)
+
+    async def admit(self, delivery: Delivery):
+        initialized_job = await initialize_job(delivery.payload)
+        if not initialized_job:
+            logger.error("Failed to initialize job, skipping...")
+            await self.transport.ack(delivery)
+            self._slots.release()
+            return
+
+        initialized_job.status = JobStatus.STARTED
+        entry = InFlightJob(job=initialized_job, delivery=delivery)
+        if not self.admission.try_start(entry.course):
+            logger.info(
+                f"Course {entry.course} at its cap, parking Job {entry.job.job_id}"
             )
-        except asyncio.CancelledError:
-            logger.debug(f"Process #{process_id} cancelled. Shutting down...")
+            self.admission.park(entry.course, entry)
+            self._slots.release()
             return
-        logger.info(f"Job Received from {MAIN_QUEUE}.")
-        if result:
-            logger.debug(f"Job Request: {result}")
-            job_request = result
-
-            initialized_job = await initialize_job(job_request)
-            if not initialized_job:
-                logger.error("Failed to initialize job, skipping...")
+        await self.advance(entry)
+
+    async def event_loop(self):
+        while True:
+            try:
+                popped = await self.client.redis_client.brpop(
+                    [self.wakeup_key, *self.in_flight], timeout=self.poll_timeout_s
+                )
+            except asyncio.CancelledError:
+                logger.debug("Event loop cancelled. Shutting down...")
+                return
+            except Exception as e:
+                logger.error(f"Failed to wait for stage completions: {e}")
+                await asyncio.sleep(ERROR_BACKOFF_S)
                 continue
+            if not popped:
+                continue
+            key, result = popped
+            if key == self.wakeup_key:
+                continue
+            entry = self.in_flight.pop(key, None)
+            if entry is None:
+                logger.warning("Dropping completion for unknown key %s", key)
+                continue
+            self._spawn(self.complete(entry, result))
 
-            processed_job = await process_job(client, initialized_job)
+    async def advance(self, entry: InFlightJob):
+        """Dispatch the entry's current stage, or finish it when none remain."""
+        job = entry.job
+        await self.replay_checkpoints(entry)
+        if entry.stage_index >= len(PIPELINE):
+            logger.info(f"Job {job.job_id} Completed Successfully")
+            logger.debug(f"Job {job.job_id} Result: {job.job_result_payload}")
+            await self.finish(entry, JobStatus.COMPLETED)
+            return
+
+        gate = self.stage_gates[entry.stage_index]
+        if not gate.try_start(entry.course):
+            logger.debug(
+                f"Course {entry.course} at its stage cap, parking {job.job_id}"
+            )
+            gate.park(entry.course, entry)
+            return
+        await self.dispatch(entry)
+
+    async def dispatch(self, entry: InFlightJob):
+        """Hand the entry to its current stage; the stage gate is already held."""
+        job = entry.job
+        entry.gated_stage = entry.stage_index
+        stage = PIPELINE[entry.stage_index]
+        logger.debug(f"Job {job.job_id} {stage.name} Started")
+        try:
+            completion_key = await stage.dispatch(self.client, job)
+        except Exception as e:
+            logger.error(f"Failed to dispatch {stage.name} for Job {job.job_id}: {e}")
+            await self.finish(entry, JobStatus.ERROR)
+            return
+        if not completion_key:
+            logger.error(f"Failed to process {stage.name} for Job: {job.job_id}")
+            await self.finish(entry, JobStatus.FAILED)
+            return
+
+        entry.dispatched_at = time.monotonic()
+        self.in_flight[completion_key] = entry
+        await self.events.publish(job, "started", stage.name)
+        try:
+            await self.client.redis_client.lpush(self.wakeup_key, completion_key)
+        except Exception as e:
+            # The event loop still picks the key up after its poll timeout.
+            logger.warning(f"Failed to wake event loop for Job {job.job_id}: {e}")
+
+    async def replay_checkpoints(self, entry: InFlightJob):
+        """Skip every leading stage whose inputs match a stored checkpoint."""
+        job = entry.job
+        submission_id = job.initial_request.submission_id
+        while entry.stage_index < len(PIPELINE):
+            stage = PIPELINE[entry.stage_index]
+            entry.input_hash = None
+            if stage.inputs is None or not self.checkpoints.enabled:
+                return
+            try:
+                entry.input_hash = input_hash(await stage.inputs(job))
+            except Exception as e:
+                logger.warning(
+                    f"Failed to hash {stage.name} inputs for {job.job_id}: {e}"
+                )
+                return
+            cached = await self.checkpoints.load(
+                submission_id, stage.name, entry.input_hash
+            )
+            if cached is None:
+                return
+            try:
+                replayed = await stage.complete(job, cached, persist=False)
+            except Exception as e:
+                logger.warning(f"Failed to replay {stage.name} for {job.job_id}: {e}")
+                replayed = None
+            if not replayed:
+                # Unusable checkpoint: run the stage for real.
+                return
+            logger.info(f"Job {job.job_id} {stage.name} replayed from checkpoint")
+            CHECKPOINT_REPLAYS.labels(stage.name).inc()
+            await self.events.publish(job, "done", stage.name, stage_detail(job))
+            entry.stage_index += 1
+
+    def leave_stage(self, entry: InFlightJob):
+        """Free the entry's stage gate and dispatch the next parked job, if any."""
+        if entry.gated_stage is None:
+            return
+        gate = self.stage_gates[entry.gated_stage]
+        entry.gated_stage = None
+        gate.done(entry.course)
+        ready = gate.pop_ready()
+        if ready is not None:
+            self._spawn(self.dispatch(ready))
+
+    async def complete(self, entry: InFlightJob, result: str):
+        job = entry.job
+        stage = PIPELINE[entry.stage_index]
+        STAGE_DURATION.labels(stage.name).observe(
+            time.monotonic() - entry.dispatched_at
+        )
+        self.leave_stage(entry)
+        async with self._handlers.slot():
+            started = time.monotonic()
+            try:
+                completed = await stage.complete(job, result)
+                self._handlers.record_latency(time.monotonic() - started)
+            except Exception as e:
+                logger.error(
+                    f"Failed to complete {stage.name} for Job {job.job_id}: {e}"
+                )
+                await self.finish(entry, JobStatus.ERROR)
+                return
+            if not completed:
+                logger.error(f"Failed to process {stage.name} for Job: {job.job_id}")
+                await self.finish(entry, JobStatus.FAILED)
+                return
+            logger.debug(f"Job {job.job_id} {stage.name} Completed")
+            if entry.input_hash:
+                await self.checkpoints.save(
+                    job.initial_request.submission_id,
+                    stage.name,
+                    entry.input_hash,
+                    result,
+                )
+            await self.events.publish(job, "done", stage.name, stage_detail(job))
+            entry.stage_index += 1
+            await self.advance(entry)
+
+    async def finish(self, entry: InFlightJob, status: JobStatus):
+        self.leave_stage(entry)
+        JOBS_FINISHED.labels(status).inc()
+        if status != JobStatus.COMPLETED and entry.stage_index < len(PIPELINE):
+            STAGE_FAILURES.labels(PIPELINE[entry.stage_index].name).inc()
+        try:
+            processed_job = await set_result(entry.job, status)
             if processed_job.status in [JobStatus.FAILED, JobStatus.ERROR]:
                 logger.error("Failed to process job, skipping...")
-                await client.redis_client.lrem(f"{MAIN_QUEUE}:processing", 1, result)
-                continue
-            logger.debug(f"Returning Job Result: {processed_job.model_dump_json()}")
+                await self.events.publish(processed_job, "failed")
+            else:
+                await self.events.publish(
+                    processed_job, "graded", detail=stage_detail(processed_job)
+                )
+                if not await return_result(self.client, processed_job):
+                    logger.error("Failed to return job result, skipping...")
+            await self.transport.ack(entry.delivery)
+        except Exception as e:
+            # ack() already dropped the local hold; the lease/claim expires.
+            logger.error(f"Failed to release Job {entry.job.job_id}: {e}")
+        finally:
+            self.admission.done(entry.course)
+            ready = self.admission.pop_ready()
+            if ready is None:
+                self._slots.release()
+            else:
+                # Hand this job's slot straight to the parked job.
+                self._spawn(self.advance(ready))
+
+    async def report_dead_letter(self, job_request: str):
+        """Fail a job that exhausted its attempts instead of leaving it pending."""
+        job = await initialize_job(job_request)
+        if not job:
+            return
+        submission_id = job.initial_request.submission_id
+        try:
+            async with async_session() as session:
+                await update_submission_state(
+                    session, submission_id, SubmissionState.failed
+                )
+        except Exception as e:
+            logger.error(f"Failed to mark submission {submission_id} as failed: {e}")
+        JOBS_FINISHED.labels(JobStatus.FAILED).inc()
+        await self.events.publish(job, "failed")
+        await return_result(self.client, await set_result(job, JobStatus.FAILED))
+
+    def _spawn(self, coro: Awaitable[None]):
+        task = asyncio.ensure_future(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
 
-            returned_result = await return_result(client, processed_job)
-            if not returned_result:
-                logger.error("Failed to return job result, skipping...")
-                await client.redis_client.lrem(f"{MAIN_QUEUE}:processing", 1, result)
-                continue
 
-            logger.info(f"Job {processed_job.job_id} Completed Successfully")
-        await client.redis_client.lrem(f"{MAIN_QUEUE}:processing", 1, result)
+async def start():
+    try:
+        logger.info("Starting JobQueue...")
+        client = JobQueue()
+        orchestrator = StageOrchestrator(client)
+    except Exception as e:
+        logger.error(f"Job Queue Initialization Failed: {e}")
+        raise
+    logger.info("Job Queue Started Successfully")
+    await orchestrator.run()
 
 
 async def initialize_job(job_request: str) -> Job | None:
@@ -86,48 +464,6 @@ async def initialize_job(job_request: str) -> Job | None:
     return None
 
 
-async def process_job(client: JobQueue, job: Job) -> Job:
-    try:
-        logger.debug(f"Processing Job: {job.job_id}")
-        job.status = JobStatus.STARTED
-
-        logger.debug(f"Job {job.job_id} OCR Started")
-        ocr_result = await process_ocr_job(client, job)
-        if not ocr_result:
-            logger.error(f"Failed to process OCR for Job: {job.job_id}")
-            return await set_result(job, JobStatus.FAILED)
-        logger.debug(f"Job {job.job_id} OCR Completed")
-
-        logger.debug(f"Job {job.job_id} Sandbox Started")
-        sandbox_result = await process_sandbox_job(client, job)
-        if not sandbox_result:
-            logger.error(f"Failed to process Sandbox for Job: {job.job_id}")
-            return await set_result(job, JobStatus.FAILED)
-        logger.debug(f"Job {job.job_id} Sandbox Completed")
-
-        logger.debug(f"Job {job.job_id} Grader Started")
-        grader_result = await process_grader_job(client, job)
-        if not grader_result:
-            logger.error(f"Failed to process Grader for Job: {job.job_id}")
-            return await set_result(job, JobStatus.FAILED)
-        logger.debug(f"Job {job.job_id} Grader Completed")
-
-        # logger.debug(f"Job {job.job_id} Final Result Started")
-        # final_result = await process_final_result_job(client, job)
-        # if not final_result:
-        #     logger.error(f"Failed to process Final Result for Job: {job.job_id}")
-        #     return await set_result(job, JobStatus.FAILED)
-        # logger.debug(f"Job {job.job_id} Final Result Completed")
-
-        logger.info(f"Job {job.job_id} Completed Successfully")
-        logger.debug(f"Job {job.job_id} Result: {job.job_result_payload}")
-        return await set_result(job, JobStatus.COMPLETED)
-
-    except Exception as e:
-        logger.error(f"Failed to process job: {e}")
-        return await set_result(job, JobStatus.ERROR)
-
-
 async def set_result(job: Job, status: JobStatus):
     job.status = status
     job.finished_at = datetime.now()
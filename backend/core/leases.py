@@ -0,0 +1,158 @@
+"""
+Visibility-timeout leases for Redis list queues.
+
+Every consumer moves a payload from ``{queue}`` into ``{queue}:processing``
+before working on it. A lease records, in the ``{queue}:leases`` sorted set,
+the time until which that payload is considered owned; the owning process
+renews it with periodic heartbeats. A reaper re-queues payloads whose lease
+expired (the owner crashed or hung) and dead-letters them into
+``{queue}:dead`` once ``max_attempts`` deliveries have been lost.
+
+Leases and attempt counters are keyed by the payload string itself, so every
+enqueue must produce a distinct payload: stage payloads carry their
+``job_id`` and the main ``JobRequest`` carries a per-enqueue ``request_id``.
+
+Key layout::
+
+    {queue}:processing   → claimed payloads (list, written by BRPOPLPUSH/BLMOVE)
+    {queue}:leases       → payload → lease expiry, unix seconds (sorted set)
+    {queue}:attempts     → payload → expired deliveries so far (hash)
+    {queue}:dead         → payloads that exhausted their attempts (list)
+"""
+
+import asyncio
+import logging
+import time
+from collections import Counter
+from collections.abc import Awaitable, Callable
+
+from settings import settings
+
+from .metrics import QUEUE_DEAD_LETTERS, QUEUE_REDELIVERIES
+
+logger = logging.getLogger(__name__)
+
+
+class LeaseManager:
+    def __init__(
+        self,
+        redis_client,
+        queue: str,
+        ttl_s: int = settings.lease_ttl_s,
+        reap_interval_s: int = settings.lease_reap_interval_s,
+        max_attempts: int = settings.lease_max_attempts,
+        on_dead_letter: Callable[[str], Awaitable[None]] | None = None,
+    ):
+        self.redis_client = redis_client
+        self.queue = queue
+        self.processing_queue = f"{queue}:processing"
+        self.leases_key = f"{queue}:leases"
+        self.attempts_key = f"{queue}:attempts"
+        self.dead_letter_queue = f"{queue}:dead"
+        self.ttl_s = ttl_s
+        self.reap_interval_s = reap_interval_s
+        self.max_attempts = max_attempts
+        self.on_dead_letter = on_dead_letter
+        self.held: Counter[str] = Counter()
+        self._suspected_orphans: set[str] = set()
+
+    async def acquire(self, payload: str):
+        """Lease a payload that was just moved into the processing list."""
+        self.held[payload] += 1
+        await self.redis_client.zadd(
+            self.leases_key, {payload: time.time() + self.ttl_s}
+        )
+
+    async def release(self, payload: str):
+        """Acknowledge a handled payload: drop it from processing and its lease."""
+        self._forget(payload)
+        await self.redis_client.lrem(self.processing_queue, 1, payload)
+        await self.redis_client.zrem(self.leases_key, payload)
+        await self.redis_client.hdel(self.attempts_key, payload)
+
+    def abandon(self, payload: str):
+        """Stop renewing a lease so the reaper re-queues the payload on expiry."""
+        self._forget(payload)
+
+    async def heartbeat(self):
+        if not self.held:
+            return
+        expires_at = time.time() + self.ttl_s
+        await self.redis_client.zadd(
+            self.leases_key, dict.fromkeys(self.held, expires_at), xx=True
+        )
+
+    async def reap(self) -> int:
+        """Re-queue payloads whose lease expired; returns how many were handled."""
+        handled = 0
+        expired = await self.redis_client.zrangebyscore(
+            self.leases_key, "-inf", time.time()
+        )
+        for payload in expired:
+            if payload in self.held:
+                continue
+            # ZREM is the claim: only one reaper across replicas wins it.
+            if await self.redis_client.zrem(self.leases_key, payload):
+                handled += await self._requeue(payload)
+
+        # A crash between the BRPOPLPUSH and acquire() leaves a payload with
+        # no lease at all; re-queue it once it is seen unleased twice in a row.
+        processing = await self.redis_client.lrange(self.processing_queue, 0, -1)
+        leased = set(await self.redis_client.zrange(self.leases_key, 0, -1))
+        orphans = {p for p in processing if p not in leased and p not in self.held}
+        for payload in orphans & self._suspected_orphans:
+            handled += await self._requeue(payload)
+        self._suspected_orphans = orphans - self._suspected_orphans
+        return handled
+
+    async def run(self):
+        """Heartbeat held leases and reap expired ones until cancelled."""
+        interval = min(self.reap_interval_s, self.ttl_s / 3)
+        while True:
+            try:
+                await asyncio.sleep(interval)
+                await self.heartbeat()
+                reaped = await self.reap()
+                if reaped:
+                    logger.warning(
+                        "Re-queued %d expired lease(s) on %s", reaped, self.queue
+                    )
+            except asyncio.CancelledError:
+                logger.debug("Lease manager for %s shutting down...", self.queue)
+                return
+            except Exception as e:
+                logger.error("Lease maintenance failed for %s: %s", self.queue, e)
+
+    async def _requeue(self, payload: str) -> int:
+        if not await self.redis_client.lrem(self.processing_queue, 1, payload):
+            # Acknowledged between the scan and now; nothing to do.
+            return 0
+        attempts = await self.redis_client.hincrby(self.attempts_key, payload, 1)
+        if attempts >= self.max_attempts:
+            QUEUE_DEAD_LETTERS.labels(self.queue).inc()
+            logger.error(
+                "Payload on %s lost %d deliveries, moving to %s",
+                self.queue,
+                attempts,
+                self.dead_letter_queue,
+            )
+            await self.redis_client.hdel(self.attempts_key, payload)
+            await self.redis_client.lpush(self.dead_letter_queue, payload)
+            if self.on_dead_letter:
+                await self.on_dead_letter(payload)
+            return 1
+        logger.warning(
+            "Lease expired on %s (attempt %d/%d), re-queueing",
+            self.queue,
+            attempts,
+            self.max_attempts,
+        )
+        QUEUE_REDELIVERIES.labels(self.queue).inc()
+        # RPUSH puts it at the consuming end so the retry runs next.
+        await self.redis_client.rpush(self.queue, payload)
+        return 1
+
+    def _forget(self, payload: str):
+        self.held[payload] -= 1
+        if self.held[payload] <= 0:
+            del self.held[payload]
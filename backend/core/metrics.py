@@ -0,0 +1,425 @@
+"""
+Prometheus-style metrics for the API and the workers.
+
+Counters, gauges and histograms live in a process-wide ``REGISTRY`` and are
+rendered in the Prometheus text exposition format (version 0.0.4). Updating
+one is a dict lookup and an addition, so it is cheap enough for every job,
+query and external call. Metrics are only updated from the event-loop thread
+(calls made through ``asyncio.to_thread`` are timed around the await, not
+inside the thread), so they need no locking.
+
+Values that cost a Redis round trip, such as queue depth and lag, are not
+tracked on the hot path. Components register collectors that refresh those
+gauges when the registry is scraped.
+
+The API serves the registry at ``GET /metrics``. Standalone workers serve it
+with ``serve_metrics`` on their ``*_METRICS_PORT``.
+"""
+
+import asyncio
+import logging
+import time
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+
+from settings import settings
+
+logger = logging.getLogger(__name__)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1,
+    2.5,
+    5,
+    10,
+    30,
+    60,
+    120,
+    300,
+)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.value -= amount
+
+    def set(self, value: float):
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        # One count per bucket plus the +Inf overflow bucket.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+    @contextmanager
+    def time(self):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: tuple[str, ...] = (),
+        registry: "Registry | None" = None,
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple[str, ...], object] = {}
+        (registry or REGISTRY).register(self)
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(
+                    f"{self.name} takes labels {self.labelnames}, got {values}"
+                )
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _new_child(self):
+        return _Value()
+
+    def _label_text(self, values: tuple, extra: str = "") -> str:
+        pairs = [
+            f'{name}="{_escape(str(value))}"'
+            for name, value in zip(self.labelnames, values, strict=True)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            yield f"{self.name}{self._label_text(values)} {_number(child.value)}"
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def inc(self, amount: float = 1):
+        self.labels().inc(amount)
+
+    def dec(self, amount: float = 1):
+        self.labels().dec(amount)
+
+    def set(self, value: float):
+        self.labels().set(value)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(*args, **kwargs)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[str]:
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), child.counts, strict=True):
+                cumulative += count
+                labels = self._label_text(values, f'le="{_number(bound)}"')
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = self._label_text(values)
+            yield f"{self.name}_sum{labels} {_number(child.sum)}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+class Registry:
+    def __init__(self):
+        self.metrics: dict[str, _Metric] = {}
+        self.collectors: list[Callable[[], Awaitable[None]]] = []
+
+    def register(self, metric: _Metric):
+        if metric.name in self.metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self.metrics[metric.name] = metric
+
+    def add_collector(self, collector: Callable[[], Awaitable[None]]):
+        """Run ``collector`` before every render to refresh scrape-time gauges."""
+        self.collectors.append(collector)
+
+    def remove_collector(self, collector: Callable[[], Awaitable[None]]):
+        if collector in self.collectors:
+            self.collectors.remove(collector)
+
+    async def render(self) -> str:
+        for collector in list(self.collectors):
+            try:
+                await collector()
+            except Exception as e:
+                logger.warning("Metrics collector failed: %s", e)
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value) -> str:
+    if isinstance(value, str):
+        return value
+    return repr(float(value))
+
+
+REGISTRY = Registry()
+
+STAGE_DURATION = Histogram(
+    "jsg_stage_duration_seconds",
+    "Time from dispatching a pipeline stage to handling its completion.",
+    ("stage",),
+)
+STAGE_FAILURES = Counter(
+    "jsg_stage_failures_total",
+    "Pipeline stages that failed or errored.",
+    ("stage",),
+)
+CHECKPOINT_REPLAYS = Counter(
+    "jsg_checkpoint_replays_total",
+    "Pipeline stages replayed from a checkpoint instead of dispatched.",
+    ("stage",),
+)
+JOBS_FINISHED = Counter(
+    "jsg_jobs_finished_total",
+    "Jobs finished by the orchestrator, by final status.",
+    ("status",),
+)
+EXTERNAL_CALL_DURATION = Histogram(
+    "jsg_external_call_duration_seconds",
+    "Latency of calls to Azure OCR, Gemini, docker, the grading LLM and Postgres.",
+    ("service",),
+)
+EXTERNAL_CALL_ERRORS = Counter(
+    "jsg_external_call_errors_total",
+    "External calls that raised.",
+    ("service",),
+)
+EXTERNAL_CALL_RETRIES = Counter(
+    "jsg_external_call_retries_total",
+    "External calls retried after a transient error.",
+    ("service",),
+)
+QUEUE_REDELIVERIES = Counter(
+    "jsg_queue_redeliveries_total",
+    "Deliveries handed out again after their lease or claim expired.",
+    ("queue",),
+)
+QUEUE_DEAD_LETTERS = Counter(
+    "jsg_queue_dead_letters_total",
+    "Payloads moved to the dead-letter list after exhausting their attempts.",
+    ("queue",),
+)
+QUEUE_DEPTH = Gauge(
+    "jsg_queue_depth",
+    "Payloads waiting to be claimed.",
+    ("queue", "priority"),
+)
+QUEUE_PENDING = Gauge(
+    "jsg_queue_pending",
+    "Payloads claimed but not yet acknowledged.",
+    ("queue", "priority"),
+)
+QUEUE_OLDEST_PENDING_AGE = Gauge(
+    "jsg_queue_oldest_pending_age_seconds",
+    "Age of the oldest claimed, unacknowledged payload.",
+    ("queue", "priority"),
+)
+CONCURRENCY_LIMIT = Gauge(
+    "jsg_concurrency_limit",
+    "Current adaptive concurrency limit.",
+    ("component",),
+)
+CONCURRENCY_IN_USE = Gauge(
+    "jsg_concurrency_in_use",
+    "Concurrency slots currently held.",
+    ("component",),
+)
+ORCHESTRATOR_JOBS = Gauge(
+    "jsg_orchestrator_jobs",
+    "Jobs held by the orchestrator, waiting on a stage or parked over a cap.",
+    ("state",),
+)
+DOCKER_CONTAINERS_RUNNING = Gauge(
+    "jsg_docker_containers_running",
+    "Sandbox containers currently running.",
+)
+DOCKER_CONTAINERS_STARTED = Counter(
+    "jsg_docker_containers_started_total",
+    "Sandbox containers started.",
+)
+SANDBOX_READY = Gauge(
+    "jsg_sandbox_ready",
+    "1 once the sandbox worker's images are usable and it consumes jobs.",
+)
+SANDBOX_COMPILE_CACHE_LOOKUPS = Counter(
+    "jsg_sandbox_compile_cache_lookups_total",
+    "Compile cache lookups, by where they were answered (disk, redis or miss).",
+    ("result",),
+)
+SANDBOX_EXECUTION_MEMO_LOOKUPS = Counter(
+    "jsg_sandbox_execution_memo_lookups_total",
+    "Memoized test run lookups, by where they were answered (memory, redis or miss).",
+    ("result",),
+)
+SANDBOX_TEST_WALL_SECONDS = Histogram(
+    "jsg_sandbox_test_wall_seconds",
+    "Wall time of a test case run, as measured inside the container.",
+)
+SANDBOX_TEST_CPU_SECONDS = Histogram(
+    "jsg_sandbox_test_cpu_seconds",
+    "CPU time (user and system) of a test case run.",
+)
+SANDBOX_TEST_PEAK_RSS_BYTES = Histogram(
+    "jsg_sandbox_test_peak_rss_bytes",
+    "Peak resident memory of a test case run.",
+    buckets=tuple(2**power * 1024 * 1024 for power in range(4, 9)),
+)
+SANDBOX_TEST_CASES_SKIPPED = Counter(
+    "jsg_sandbox_test_cases_skipped_total",
+    "Test cases not run because their job stopped early, by reason (timeouts or deadline).",
+    ("reason",),
+)
+SANDBOX_POOL_RETIRED = Counter(
+    "jsg_sandbox_pool_retired_total",
+    "Warm executer containers retired, by reason.",
+    ("reason",),
+)
+
+
+@contextmanager
+def track_call(service: str):
+    """Time one external call and count it as an error if it raises."""
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        EXTERNAL_CALL_ERRORS.labels(service).inc()
+        raise
+    finally:
+        EXTERNAL_CALL_DURATION.labels(service).observe(time.perf_counter() - started)
+
+
+def queue_lag_collector(transport) -> Callable[[], Awaitable[None]]:
+    """Collector refreshing the queue gauges from a ``PriorityTransport``."""
+
+    async def collect():
+        for priority, lag in (await transport.lag_by_class()).items():
+            labels = (transport.queue, priority.lower())
+            QUEUE_DEPTH.labels(*labels).set(lag.depth)
+            QUEUE_PENDING.labels(*labels).set(lag.pending)
+            QUEUE_OLDEST_PENDING_AGE.labels(*labels).set(lag.oldest_pending_age_s or 0)
+
+    return collect
+
+
+def watch_worker(transport, limiter):
+    """Export a worker's queue lag and concurrency limit on every scrape."""
+    REGISTRY.add_collector(queue_lag_collector(transport))
+    REGISTRY.add_collector(limiter_collector(limiter))
+
+
+def limiter_collector(limiter) -> Callable[[], Awaitable[None]]:
+    """Collector refreshing the concurrency gauges from an ``AdaptiveLimiter``."""
+
+    async def collect():
+        CONCURRENCY_LIMIT.labels(limiter.name).set(limiter.limit)
+        CONCURRENCY_IN_USE.labels(limiter.name).set(limiter.in_use)
+
+    return collect
+
+
+async def serve_metrics(
+    port: int,
+    host: str = settings.metrics_host,
+    registry: Registry = REGISTRY,
+):
+    """Serve ``GET /metrics`` on ``host:port`` until cancelled; 0 disables it."""
+    if port <= 0:
+        return
+
+    async def handle(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()).strip():
+                pass  # Headers are not needed.
+            method, path, *_ = request_line.decode("latin-1").split() or ("", "")
+            if method == "GET" and path.split("?")[0] == "/metrics":
+                status, body = "200 OK", (await registry.render()).encode()
+            else:
+                status, body = "404 Not Found", b"Not Found\n"
+            writer.write(
+                f"HTTP/1.1 {status}\r\nContent-Type: {CONTENT_TYPE}\r\n"
+                f"Content-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+        except Exception as e:
+            logger.debug("Metrics request failed: %s", e)
+        finally:
+            writer.close()
+
+    try:
+        server = await asyncio.start_server(handle, host, port)
+    except OSError as e:
+        # Metrics are optional; never take the worker down over a busy port.
+        logger.error("Failed to serve metrics on %s:%d: %s", host, port, e)
+        return
+    logger.info("Serving metrics on %s:%d/metrics", host, port)
+    async with server:
+        try:
+            await server.serve_forever()
+        except asyncio.CancelledError:
+            logger.debug("Metrics server shutting down...")
@@ -1,11 +1,17 @@
 from .final_result import process_final_result_job
-from .grader import process_grader_job
-from .ocr import process_ocr_job
-from .sandbox import process_sandbox_job
+from .grader import complete_grader_job, dispatch_grader_job, grader_job_inputs
+from .ocr import complete_ocr_job, dispatch_ocr_job, ocr_job_inputs
+from .sandbox import complete_sandbox_job, dispatch_sandbox_job, sandbox_job_inputs
 
 __all__ = [
-    "process_ocr_job",
-    "process_sandbox_job",
-    "process_grader_job",
+    "ocr_job_inputs",
+    "dispatch_ocr_job",
+    "complete_ocr_job",
+    "sandbox_job_inputs",
+    "dispatch_sandbox_job",
+    "complete_sandbox_job",
+    "grader_job_inputs",
+    "dispatch_grader_job",
+    "complete_grader_job",
     "process_final_result_job",
 ]
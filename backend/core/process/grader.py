@@ -19,6 +19,7 @@ from settings import settings
 from sqlalchemy import select
 
 from ..config import JobQueue, logger
+from ..scheduling import job_priority
 from .ocr import resolve_java_code_for_job
 
 _queue_prefix = f"{settings.queue_namespace}:"
@@ -27,6 +28,8 @@ AI_GRADER_QUEUE = (
     if settings.ai_grading_queue.startswith(_queue_prefix)
     else f"{_queue_prefix}{settings.ai_grading_queue}"
 )
+# Timings and peak memory of each test case run, measured by the sandbox.
+_RUN_MEASUREMENTS = {"wall_time_s", "cpu_user_s", "cpu_sys_s", "peak_rss_kb"}
 
 
 def _get_sandbox_result(job: Job) -> SandboxResult | None:
@@ -219,7 +222,31 @@ async def _save_failure_to_db(
         return False
 
 
-async def process_grader_job(client: JobQueue, job: Job) -> Job | None:
+def _sandbox_outcome(sandbox_payload: SandboxResult | None) -> dict | None:
+    """
+    The part of a sandbox result a grade depends on: outputs, return codes and
+    their hashes. The job id and the per-run measurements are left out, since
+    they change every time the same program runs.
+    """
+    if not sandbox_payload:
+        return None
+    return sandbox_payload.result.model_dump(
+        exclude={
+            "job_id": True,
+            "result": {"execution_result": {"outputs": {"__all__": _RUN_MEASUREMENTS}}},
+        }
+    )
+
+
+async def grader_job_inputs(job: Job) -> dict:
+    return {
+        "transcribed_text": await resolve_java_code_for_job(job),
+        "sandbox_result": _sandbox_outcome(_get_sandbox_result(job)),
+        "rubric_json": job.initial_request.rubric_json,
+    }
+
+
+async def dispatch_grader_job(client: JobQueue, job: Job) -> str | None:
     submission_id = job.initial_request.submission_id
     try:
         logger.debug("Processing AI Grader Job: %s", job.job_id)
@@ -251,15 +278,27 @@ async def process_grader_job(client: JobQueue, job: Job) -> Job | None:
         )
 
         logger.debug("AI Grader Job: %s pushed to %s", job.job_id, AI_GRADER_QUEUE)
-        await client.redis_client.lpush(
-            AI_GRADER_QUEUE,
+        await client.transport(AI_GRADER_QUEUE).push(
             grader_payload.model_dump_json(),
+            priority=job_priority(job.initial_request),
         )
-
-        _, result = await client.redis_client.brpop(
-            f"{AI_GRADER_QUEUE}:completed:{job.job_id}",
-            timeout=0,
+        return f"{AI_GRADER_QUEUE}:completed:{job.job_id}"
+    except Exception as exc:
+        logger.error("Failed to dispatch AI Grader Job: %s - %s", job.job_id, exc)
+        await _save_failure_to_db(
+            submission_id=submission_id,
+            reason=str(exc),
         )
+        return None
+
+
+async def complete_grader_job(
+    job: Job, result: str, persist: bool = True
+) -> Job | None:
+    # ``persist`` is ignored: the AI feedback write is an upsert that also
+    # moves the submission to ``graded``, so a replay re-applies it safely.
+    submission_id = job.initial_request.submission_id
+    try:
         if not result:
             logger.error(
                 "AI Grader Job: %s not found in %s",
@@ -6,7 +6,7 @@ from db.crud.confidence_flags import create_confidence_flag
 from db.crud.grading import create_transcription, get_transcription_by_submission_id
 from db.crud.submissions import get_submission_by_id
 from db.session import async_session
-from ocr.ocr_corrector.schemas import OCRJobRequest, OCRJobResult
+from OCR.ocr_corrector.schemas import OCRJobRequest, OCRJobResult
 from pydantic import ValidationError
 from schemas import (
     Job,
@@ -20,6 +20,7 @@ from schemas import (
 from settings import settings
 
 from ..config import JobQueue, logger
+from ..scheduling import job_priority
 
 OCR_QUEUE = f"{settings.queue_namespace}:{settings.ocr_queue}"
 
@@ -103,7 +104,11 @@ async def resolve_java_code_for_job(job: Job) -> str:
     return ""
 
 
-async def process_ocr_job(client: JobQueue, job: Job) -> Job | None:
+async def ocr_job_inputs(job: Job) -> dict:
+    return {"image_url": job.initial_request.image_url}
+
+
+async def dispatch_ocr_job(client: JobQueue, job: Job) -> str | None:
     try:
         logger.debug("Processing OCR Job: %s", job.job_id)
         job.status = JobStatus.RUNNING
@@ -124,12 +129,21 @@ async def process_ocr_job(client: JobQueue, job: Job) -> Job | None:
             job_id=job.job_id,
             image_path=job.initial_request.image_url,
         )
-        await client.redis_client.lpush(OCR_QUEUE, ocr_job_request.model_dump_json())
+        await client.transport(OCR_QUEUE).push(
+            ocr_job_request.model_dump_json(),
+            priority=job_priority(job.initial_request),
+        )
         logger.debug("OCR Job %s pushed to %s", job.job_id, OCR_QUEUE)
+        return f"{OCR_QUEUE}:completed:{job.job_id}"
+    except Exception as e:
+        logger.error("Failed to dispatch OCR Job %s: %s", job.job_id, e)
+        return None
 
-        _, raw_result = await client.redis_client.brpop(
-            f"{OCR_QUEUE}:completed:{job.job_id}", timeout=0
-        )
+
+async def complete_ocr_job(
+    job: Job, raw_result: str, persist: bool = True
+) -> Job | None:
+    try:
         if not raw_result:
             logger.error("OCR Job %s: no result received from queue", job.job_id)
             return None
@@ -145,7 +159,8 @@ async def process_ocr_job(client: JobQueue, job: Job) -> Job | None:
         job.status = JobStatus.PENDING
         logger.debug("OCR Job %s result received", job.job_id)
 
-        if not await save_to_db(job):
+        # A replayed checkpoint was saved when it was first produced.
+        if persist and not await save_to_db(job):
             logger.error("Failed to save OCR Job %s to database", job.job_id)
             return None
 
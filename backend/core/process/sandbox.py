@@ -16,12 +16,20 @@ from schemas import (
 from settings import settings
 
 from ..config import JobQueue, logger
+from ..scheduling import job_priority
 from .ocr import resolve_java_code_for_job
 
 SANDBOX_QUEUE = f"{settings.queue_namespace}:{settings.sandbox_queue}"
 
 
-async def process_sandbox_job(client: JobQueue, job: Job) -> Job | None:
+async def sandbox_job_inputs(job: Job) -> dict:
+    return {
+        "java_code": await resolve_java_code_for_job(job),
+        "test_cases": job.initial_request.test_cases,
+    }
+
+
+async def dispatch_sandbox_job(client: JobQueue, job: Job) -> str | None:
     try:
         logger.debug(f"Processing Sandbox Job: {job.job_id}")
         job.status = JobStatus.RUNNING
@@ -39,12 +47,20 @@ async def process_sandbox_job(client: JobQueue, job: Job) -> Job | None:
             )
         )
         logger.debug(f"Sandbox Job: {job.job_id} pushed to {SANDBOX_QUEUE}")
-        await client.redis_client.lpush(
-            SANDBOX_QUEUE, sandbox_payload.model_dump_json()
-        )
-        _, result = await client.redis_client.brpop(
-            f"{SANDBOX_QUEUE}:completed:{job.job_id}", timeout=0
+        await client.transport(SANDBOX_QUEUE).push(
+            sandbox_payload.model_dump_json(),
+            priority=job_priority(job.initial_request),
         )
+        return f"{SANDBOX_QUEUE}:completed:{job.job_id}"
+    except Exception as e:
+        logger.error(f"Failed to dispatch Sandbox Job: {job.job_id} - {e}")
+        return None
+
+
+async def complete_sandbox_job(
+    job: Job, result: str, persist: bool = True
+) -> Job | None:
+    try:
         if not result:
             logger.error(f"Sandbox Job: {job.job_id} not found in {SANDBOX_QUEUE}")
             return None
@@ -60,7 +76,8 @@ async def process_sandbox_job(client: JobQueue, job: Job) -> Job | None:
         )
         job.status = JobStatus.PENDING
         logger.debug(f"Sandbox Job: {job.job_id} completed")
-        if not await save_to_db(job):
+        # A replayed checkpoint was saved when it was first produced.
+        if persist and not await save_to_db(job):
             logger.error(f"Failed to save Sandbox Job: {job.job_id} to database")
             return None
         return job
@@ -0,0 +1,142 @@
+"""
+Priority classes and deadline-aware scheduling for the work queues.
+
+Every queue is split into one sub-queue per ``JobPriority``. ``INTERACTIVE``,
+the default class, keeps the bare queue name so existing payloads and
+producers keep working. The other classes live under ``{queue}:{class}``::
+
+    {queue}:urgent        → interactive work due within DEADLINE_BOOST_WINDOW_S
+    {queue}               → interactive work (live student submissions)
+    {queue}:bulk          → batch work (regrades, bulk uploads)
+
+Consumers pick the class for each claim with a smooth weighted round-robin
+(``PRIORITY_WEIGHT_*``). A backlogged lower class therefore still gets its
+share of claims and cannot starve.
+
+``FairShare`` caps how much of the pipeline a single tenant (course) can
+hold at once. The orchestrator applies it at admission and at each stage
+dispatch.
+"""
+
+from collections import Counter, OrderedDict, deque
+from datetime import UTC, datetime
+from typing import Any
+
+from schemas import JobPriority, JobRequest
+from settings import settings
+
+
+def priority_weights() -> dict[JobPriority, int]:
+    return {
+        JobPriority.URGENT: settings.priority_weight_urgent,
+        JobPriority.INTERACTIVE: settings.priority_weight_interactive,
+        JobPriority.BULK: settings.priority_weight_bulk,
+    }
+
+
+def priority_queue(queue: str, priority: JobPriority) -> str:
+    if priority == JobPriority.INTERACTIVE:
+        return queue
+    return f"{queue}:{priority.lower()}"
+
+
+def effective_priority(
+    priority: JobPriority,
+    deadline: datetime | None,
+    now: datetime | None = None,
+    window_s: int = settings.deadline_boost_window_s,
+) -> JobPriority:
+    """Promote interactive work whose deadline is at most ``window_s`` away."""
+    if priority != JobPriority.INTERACTIVE or deadline is None:
+        return priority
+    now = now or datetime.now(UTC)
+    if deadline.tzinfo is None:
+        deadline = deadline.replace(tzinfo=UTC)
+    remaining_s = (deadline - now).total_seconds()
+    if 0 <= remaining_s <= window_s:
+        return JobPriority.URGENT
+    return priority
+
+
+def job_priority(request: JobRequest) -> JobPriority:
+    """Class a job's next stage is queued under, re-evaluated at each dispatch."""
+    return effective_priority(request.priority, request.deadline)
+
+
+class WeightedRoundRobin:
+    """
+    Smooth weighted round-robin (as in nginx) over keys that may be empty.
+
+    Each round every key earns its weight in credit and keys are tried in
+    order of credit. The key that was served pays back the total weight.
+    A key that turned out empty has its credit reset, so idle time cannot be
+    saved up into a burst later.
+    """
+
+    def __init__(self, weights: dict):
+        self.weights = {key: max(weight, 1) for key, weight in weights.items()}
+        self.total = sum(self.weights.values())
+        self.credit = dict.fromkeys(self.weights, 0)
+
+    def order(self) -> list:
+        for key, weight in self.weights.items():
+            self.credit[key] += weight
+        return sorted(self.weights, key=lambda key: -self.credit[key])
+
+    def served(self, key):
+        self.credit[key] -= self.total
+
+    def idle(self, key):
+        self.credit[key] = 0
+
+
+class FairShare:
+    """
+    Per-tenant concurrency caps with round-robin hand-off of parked work.
+
+    ``try_start`` takes a slot for a tenant if it is below its cap; otherwise
+    the caller parks the item. When a tenant finishes something, ``done``
+    frees its slot. ``pop_ready`` then returns the next parked item whose
+    tenant has room, rotating over tenants so no single one is always first.
+    """
+
+    def __init__(self, default_cap: int, caps: dict | None = None):
+        self.default_cap = max(default_cap, 1)
+        self.caps = caps or {}
+        self.active: Counter = Counter()
+        self.parked: OrderedDict[Any, deque] = OrderedDict()
+
+    def cap(self, tenant) -> int:
+        return max(self.caps.get(tenant, self.default_cap), 1)
+
+    def try_start(self, tenant) -> bool:
+        if self.active[tenant] >= self.cap(tenant):
+            return False
+        self.active[tenant] += 1
+        return True
+
+    def done(self, tenant):
+        self.active[tenant] -= 1
+        if self.active[tenant] <= 0:
+            del self.active[tenant]
+
+    def park(self, tenant, item):
+        self.parked.setdefault(tenant, deque()).append(item)
+
+    def pop_ready(self):
+        """Start and return the next parked item that fits, or None."""
+        for tenant in list(self.parked):
+            if not self.try_start(tenant):
+                continue
+            queue = self.parked[tenant]
+            item = queue.popleft()
+            if queue:
+                self.parked.move_to_end(tenant)
+            else:
+                del self.parked[tenant]
+            return item
+        return None
+
+    @property
+    def parked_count(self) -> int:
+        return sum(len(queue) for queue in self.parked.values())
@@ -2,16 +2,52 @@ from __future__ import annotations
 
 import asyncio
 import json
+import time
 import uuid
-from datetime import UTC, datetime
+from datetime import UTC, datetime, timedelta
 
+from core.checkpoints import input_hash
+from core.concurrency import AdaptiveLimiter, is_throttle_error, report_throttle
+from core.events import RESYNC, EventHub, assignment_channel, submission_channel
 from core.job_queue import (
     MAIN_QUEUE,
     initialize_job,
     return_result,
     set_result,
 )
-from schemas import Job, JobRequest, JobStatus
+from core.leases import LeaseManager
+from core.metrics import (
+    QUEUE_DEPTH,
+    Counter,
+    Gauge,
+    Histogram,
+    Registry,
+    queue_lag_collector,
+    serve_metrics,
+)
+from core.scheduling import (
+    FairShare,
+    WeightedRoundRobin,
+    effective_priority,
+    priority_queue,
+)
+from core.transport import (
+    Delivery,
+    ListTransport,
+    StreamTransport,
+    make_transport,
+)
+from sandbox.schemas import ExecutionJobResult, ExecutionOutput, SandboxJobResult
+from sandbox.schemas import SandboxResult as SandboxJobOutcome
+from schemas import (
+    Job,
+    JobPriority,
+    JobRequest,
+    JobResultPayload,
+    JobStatus,
+    SandboxResult,
+    SubmissionEvent,
+)
 from schemas.shared import TestCase as SchemaTestCase
 
 
@@ -92,3 +128,1171 @@ def test_return_result_pushes_to_completed_queue() -> None:
     assert len(pushed) == 1
     assert pushed[0][0] == f"{MAIN_QUEUE}:completed"
     assert str(job.job_id) in pushed[0][1]
+
+
+class _FakeRedis:
+    """In-memory stand-in for the Redis commands the orchestrator and leases use."""
+
+    def __init__(self) -> None:
+        self.lists: dict[str, list[str]] = {}
+        self.zsets: dict[str, dict[str, float]] = {}
+        self.hashes: dict[str, dict] = {}
+        self.ttls: dict[str, int] = {}
+        self.pipelines_executed = 0
+        self.published: list[tuple[str, str]] = []
+
+    async def lpush(self, key: str, *values: str) -> int:
+        self.lists.setdefault(key, [])[:0] = reversed(values)
+        return len(self.lists[key])
+
+    async def rpush(self, key: str, *values: str) -> int:
+        self.lists.setdefault(key, []).extend(values)
+        return len(self.lists[key])
+
+    async def lrange(self, key: str, start: int, end: int) -> list[str]:
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start : end + 1]
+
+    async def lrem(self, key: str, count: int, value: str) -> int:
+        items = self.lists.get(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
+    async def delete(self, *keys: str) -> int:
+        return sum(1 for key in keys if self.lists.pop(key, None) is not None)
+
+    async def brpoplpush(self, src: str, dst: str, timeout: int = 0):
+        while not self.lists.get(src):
+            await asyncio.sleep(0.001)
+        value = self.lists[src].pop()
+        await self.lpush(dst, value)
+        return value
+
+    async def rpoplpush(self, src: str, dst: str):
+        if not self.lists.get(src):
+            return None
+        value = self.lists[src].pop()
+        await self.lpush(dst, value)
+        return value
+
+    async def llen(self, key: str) -> int:
+        return len(self.lists.get(key, []))
+
+    async def brpop(self, keys: list[str], timeout: int = 0):
+        for _ in range(max(timeout, 1) * 1000):
+            for key in keys:
+                if self.lists.get(key):
+                    return key, self.lists[key].pop()
+            await asyncio.sleep(0.001)
+        return None
+
+    async def zadd(self, key: str, mapping: dict[str, float], xx: bool = False):
+        zset = self.zsets.setdefault(key, {})
+        for member, score in mapping.items():
+            if xx and member not in zset:
+                continue
+            zset[member] = score
+
+    async def zrem(self, key: str, *members: str) -> int:
+        zset = self.zsets.get(key, {})
+        return sum(1 for m in members if zset.pop(m, None) is not None)
+
+    async def zrange(self, key: str, start: int, end: int) -> list[str]:
+        return list(self.zsets.get(key, {}))
+
+    async def zrangebyscore(self, key: str, low, high: float) -> list[str]:
+        return [m for m, score in self.zsets.get(key, {}).items() if score <= high]
+
+    async def hincrby(self, key: str, field: str, amount: int = 1) -> int:
+        fields = self.hashes.setdefault(key, {})
+        fields[field] = fields.get(field, 0) + amount
+        return fields[field]
+
+    async def hdel(self, key: str, *fields: str) -> int:
+        values = self.hashes.get(key, {})
+        return sum(1 for f in fields if values.pop(f, None) is not None)
+
+    async def hset(self, key: str, mapping: dict[str, str]) -> int:
+        self.hashes.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    async def hgetall(self, key: str) -> dict:
+        return dict(self.hashes.get(key, {}))
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        self.ttls[key] = seconds
+        return True
+
+    async def publish(self, channel: str, message: str) -> int:
+        self.published.append((channel, message))
+        return 0
+
+    def pipeline(self, transaction: bool = True) -> _FakePipeline:
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    """Buffers commands and runs them against the fake on ``execute``."""
+
+    def __init__(self, redis: _FakeRedis) -> None:
+        self.redis = redis
+        self.commands: list = []
+
+    async def __aenter__(self) -> _FakePipeline:
+        return self
+
+    async def __aexit__(self, *exc) -> None:
+        self.commands = []
+
+    def __getattr__(self, name: str):
+        def buffer(*args, **kwargs):
+            self.commands.append((name, args, kwargs))
+            return self
+
+        return buffer
+
+    async def execute(self) -> list:
+        self.redis.pipelines_executed += 1
+        return [
+            await getattr(self.redis, name)(*args, **kwargs)
+            for name, args, kwargs in self.commands
+        ]
+
+
+def test_orchestrator_advances_jobs_independently(monkeypatch) -> None:
+    import core.job_queue as job_queue_mod
+
+    redis = _FakeRedis()
+    client = type("_Client", (), {"redis_client": redis})()
+    order: list[tuple[str, int]] = []
+
+    def _stage(name: str):
+        async def dispatch(_client, job: Job) -> str:
+            key = f"{name}:completed:{job.job_id}"
+            order.append((f"{name}:dispatch", job.initial_request.submission_id))
+            return key
+
+        async def complete(job: Job, result: str) -> Job:
+            order.append((f"{name}:complete", job.initial_request.submission_id))
+            return job
+
+        return job_queue_mod.PipelineStage(name, dispatch, complete)
+
+    monkeypatch.setattr(job_queue_mod, "PIPELINE", (_stage("A"), _stage("B")))
+
+    async def _go() -> None:
+        orchestrator = job_queue_mod.StageOrchestrator(
+            client, max_in_flight=2, max_handlers=2, poll_timeout_s=1
+        )
+        runner = asyncio.create_task(orchestrator.run())
+        for submission_id in (1, 2):
+            req = _sample_job_request().model_copy(
+                update={"submission_id": submission_id}
+            )
+            await redis.lpush(MAIN_QUEUE, req.model_dump_json())
+
+        while len(orchestrator.in_flight) < 2:
+            await asyncio.sleep(0.001)
+        jobs = {
+            e.job.initial_request.submission_id: e.job
+            for e in orchestrator.in_flight.values()
+        }
+
+        # Job 2 finishes stage A first and must move on without waiting for job 1.
+        await redis.lpush(f"A:completed:{jobs[2].job_id}", "{}")
+        while ("B:dispatch", 2) not in order:
+            await asyncio.sleep(0.001)
+        assert ("A:complete", 1) not in order
+
+        await redis.lpush(f"B:completed:{jobs[2].job_id}", "{}")
+        await redis.lpush(f"A:completed:{jobs[1].job_id}", "{}")
+        await redis.lpush(f"B:completed:{jobs[1].job_id}", "{}")
+        while len(redis.lists.get(f"{MAIN_QUEUE}:completed", [])) < 2:
+            await asyncio.sleep(0.001)
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+        assert orchestrator.in_flight == {}
+        assert redis.lists[f"{MAIN_QUEUE}:processing"] == []
+
+    _run(asyncio.wait_for(_go(), timeout=10))
+
+
+def test_orchestrator_survives_transient_redis_errors(monkeypatch) -> None:
+    import core.job_queue as job_queue_mod
+
+    class _FlakyRedis(_FakeRedis):
+        def __init__(self) -> None:
+            super().__init__()
+            # Idle claims and result waits both block in BRPOP.
+            self.failures = {"brpop": 2}
+
+        async def brpop(self, keys: list[str], timeout: int = 0):
+            if self.failures["brpop"]:
+                self.failures["brpop"] -= 1
+                raise ConnectionError("redis went away")
+            return await super().brpop(keys, timeout)
+
+    async def dispatch(_client, job: Job) -> str:
+        return f"A:completed:{job.job_id}"
+
+    async def complete(job: Job, result: str) -> Job:
+        return job
+
+    monkeypatch.setattr(job_queue_mod, "ERROR_BACKOFF_S", 0)
+    monkeypatch.setattr(
+        job_queue_mod,
+        "PIPELINE",
+        (job_queue_mod.PipelineStage("A", dispatch, complete),),
+    )
+    redis = _FlakyRedis()
+    client = type("_Client", (), {"redis_client": redis})()
+
+    async def _go() -> None:
+        orchestrator = job_queue_mod.StageOrchestrator(
+            client, max_in_flight=1, max_handlers=1, poll_timeout_s=1
+        )
+        runner = asyncio.create_task(orchestrator.run())
+        await redis.lpush(MAIN_QUEUE, _sample_job_request().model_dump_json())
+        while not orchestrator.in_flight:
+            await asyncio.sleep(0.001)
+        (entry,) = orchestrator.in_flight.values()
+        await redis.lpush(f"A:completed:{entry.job.job_id}", "{}")
+        while not redis.lists.get(f"{MAIN_QUEUE}:completed"):
+            await asyncio.sleep(0.001)
+        assert not runner.done()
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+        assert redis.failures == {"brpop": 0}
+
+    _run(asyncio.wait_for(_go(), timeout=10))
+
+
+def test_orchestrator_replays_checkpointed_stages_with_unchanged_inputs(
+    monkeypatch,
+) -> None:
+    import core.job_queue as job_queue_mod
+
+    redis = _FakeRedis()
+    client = type("_Client", (), {"redis_client": redis})()
+    calls: list[str] = []
+    image_url = {"value": "page-1.png"}
+
+    def _stage(name: str):
+        async def inputs(job: Job) -> dict:
+            return {"image_url": image_url["value"]}
+
+        async def dispatch(_client, job: Job) -> str:
+            calls.append(f"{name}:dispatch")
+            return f"{name}:completed:{job.job_id}"
+
+        async def complete(job: Job, result: str, persist: bool = True) -> Job:
+            calls.append(f"{name}:complete:{'persist' if persist else 'replay'}")
+            return job
+
+        return job_queue_mod.PipelineStage(name, dispatch, complete, inputs)
+
+    monkeypatch.setattr(job_queue_mod, "PIPELINE", (_stage("A"), _stage("B")))
+
+    async def _submit_and_finish(orchestrator, stages: list[str]) -> None:
+        done = len(redis.lists.get(f"{MAIN_QUEUE}:completed", []))
+        await redis.lpush(MAIN_QUEUE, _sample_job_request().model_dump_json())
+        for name in stages:
+            while not any(k.startswith(f"{name}:") for k in orchestrator.in_flight):
+                await asyncio.sleep(0.001)
+            (key,) = orchestrator.in_flight
+            await redis.lpush(key, "{}")
+        while len(redis.lists.get(f"{MAIN_QUEUE}:completed", [])) == done:
+            await asyncio.sleep(0.001)
+
+    async def _go() -> None:
+        orchestrator = job_queue_mod.StageOrchestrator(
+            client, max_in_flight=1, max_handlers=1, poll_timeout_s=1
+        )
+        runner = asyncio.create_task(orchestrator.run())
+        await _submit_and_finish(orchestrator, ["A", "B"])
+        assert calls == ["A:dispatch", "A:complete:persist"] + [
+            "B:dispatch",
+            "B:complete:persist",
+        ]
+
+        # Same submission, same inputs: both stages come from checkpoints.
+        calls.clear()
+        await _submit_and_finish(orchestrator, [])
+        assert calls == ["A:complete:replay", "B:complete:replay"]
+
+        # Changed inputs invalidate the checkpoints.
+        calls.clear()
+        image_url["value"] = "page-2.png"
+        await _submit_and_finish(orchestrator, ["A", "B"])
+        assert "A:dispatch" in calls and "B:dispatch" in calls
+
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+    _run(asyncio.wait_for(_go(), timeout=10))
+    key = f"{MAIN_QUEUE}:checkpoints:1:A"
+    assert redis.hashes[key]["input_hash"] == input_hash({"image_url": "page-2.png"})
+    assert redis.ttls[key] > 0
+
+
+def test_input_hash_ignores_key_order() -> None:
+    assert input_hash({"a": 1, "b": [1, 2]}) == input_hash({"b": [1, 2], "a": 1})
+    assert input_hash({"a": 1}) != input_hash({"a": 2})
+
+
+def test_grader_inputs_hash_ignores_sandbox_run_measurements(monkeypatch) -> None:
+    import core.process.grader as grader_mod
+
+    async def _java_code(job: Job) -> str:
+        return job.initial_request.java_code
+
+    def _job(stdout: str, wall_time_s: float) -> Job:
+        output = ExecutionOutput(
+            returncode=0,
+            stdout=stdout,
+            stderr="",
+            test_case=None,
+            wall_time_s=wall_time_s,
+            cpu_user_s=wall_time_s,
+            peak_rss_kb=int(wall_time_s * 1000),
+        )
+        sandbox = SandboxJobResult(
+            job_id=uuid.uuid4(),
+            status=JobStatus.COMPLETED,
+            result=SandboxJobOutcome(
+                compilation_result=None,
+                execution_result=ExecutionJobResult(
+                    success=True, errors=None, outputs=[output]
+                ),
+                test_cases_results=None,
+            ),
+        )
+        job = Job(
+            job_id=uuid.uuid4(),
+            status=JobStatus.RUNNING,
+            created_at=datetime.now(),
+            initial_request=_sample_job_request(),
+        )
+        job.job_result_payload.append(
+            JobResultPayload(job_result=SandboxResult(result=sandbox))
+        )
+        return job
+
+    monkeypatch.setattr(grader_mod, "resolve_java_code_for_job", _java_code)
+
+    def _hash(job: Job) -> str:
+        return input_hash(_run(grader_mod.grader_job_inputs(job)))
+
+    assert _hash(_job("Hello", 0.2)) == _hash(_job("Hello", 1.7))
+    assert _hash(_job("Hello", 0.2)) != _hash(_job("Goodbye", 0.2))
+
+
+def _recording_stages(job_queue_mod, names: tuple[str, ...]):
+    dispatched: list[tuple[str, int]] = []
+
+    def _stage(name: str):
+        async def dispatch(_client, job: Job) -> str:
+            dispatched.append((name, job.initial_request.submission_id))
+            return f"{name}:completed:{job.job_id}"
+
+        async def complete(job: Job, result: str) -> Job:
+            return job
+
+        return job_queue_mod.PipelineStage(name, dispatch, complete)
+
+    return tuple(_stage(name) for name in names), dispatched
+
+
+def _course_request(submission_id: int, course_id: int) -> str:
+    return (
+        _sample_job_request()
+        .model_copy(update={"submission_id": submission_id, "course_id": course_id})
+        .model_dump_json()
+    )
+
+
+async def _wait_for(predicate) -> None:
+    while not predicate():
+        await asyncio.sleep(0.001)
+
+
+def test_orchestrator_parks_jobs_over_the_course_cap(monkeypatch) -> None:
+    import core.job_queue as job_queue_mod
+
+    stages, dispatched = _recording_stages(job_queue_mod, ("A",))
+    monkeypatch.setattr(job_queue_mod, "PIPELINE", stages)
+    redis = _FakeRedis()
+    client = type("_Client", (), {"redis_client": redis})()
+
+    async def _go() -> None:
+        orchestrator = job_queue_mod.StageOrchestrator(
+            client,
+            max_in_flight=4,
+            max_handlers=2,
+            poll_timeout_s=1,
+            course_max_in_flight=1,
+            course_overrides={},
+        )
+        runner = asyncio.create_task(orchestrator.run())
+        # A large course floods the queue ahead of a small one.
+        for submission_id in (1, 2, 3):
+            await redis.lpush(MAIN_QUEUE, _course_request(submission_id, 100))
+        await redis.lpush(MAIN_QUEUE, _course_request(4, 200))
+
+        await _wait_for(lambda: ("A", 4) in dispatched)
+        assert dispatched == [("A", 1), ("A", 4)]
+        assert orchestrator.admission.parked_count == 2
+
+        # Finishing course 100's job admits its next parked job.
+        (key,) = [k for k, e in orchestrator.in_flight.items() if e.course == 100]
+        await redis.lpush(key, "{}")
+        await _wait_for(lambda: ("A", 2) in dispatched)
+        assert orchestrator.admission.parked_count == 1
+
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+    _run(asyncio.wait_for(_go(), timeout=10))
+
+
+def test_orchestrator_caps_each_course_per_stage(monkeypatch) -> None:
+    import core.job_queue as job_queue_mod
+
+    stages, dispatched = _recording_stages(job_queue_mod, ("A", "B"))
+    monkeypatch.setattr(job_queue_mod, "PIPELINE", stages)
+    redis = _FakeRedis()
+    client = type("_Client", (), {"redis_client": redis})()
+
+    async def _go() -> None:
+        orchestrator = job_queue_mod.StageOrchestrator(
+            client,
+            max_in_flight=4,
+            max_handlers=2,
+            poll_timeout_s=1,
+            course_max_in_flight=4,
+            course_stage_max_in_flight=1,
+            course_overrides={},
+        )
+        runner = asyncio.create_task(orchestrator.run())
+        for submission_id in (1, 2):
+            await redis.lpush(MAIN_QUEUE, _course_request(submission_id, 100))
+        await _wait_for(lambda: orchestrator.stage_gates[0].parked_count == 1)
+        assert dispatched == [("A", 1)]
+
+        # Job 1 moving on to B frees stage A for job 2.
+        (key,) = orchestrator.in_flight
+        await redis.lpush(key, "{}")
+        await _wait_for(lambda: len(dispatched) == 3)
+        assert sorted(dispatched[1:]) == [("A", 2), ("B", 1)]
+
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+    _run(asyncio.wait_for(_go(), timeout=10))
+
+
+def test_orchestrator_publishes_stage_transitions(monkeypatch) -> None:
+    import core.job_queue as job_queue_mod
+
+    stages, _ = _recording_stages(job_queue_mod, ("A", "B"))
+    monkeypatch.setattr(job_queue_mod, "PIPELINE", stages)
+    redis = _FakeRedis()
+    client = type("_Client", (), {"redis_client": redis})()
+
+    def _events(channel: str) -> list[tuple[str | None, str]]:
+        events = [
+            SubmissionEvent.model_validate_json(message)
+            for published_on, message in redis.published
+            if published_on == channel
+        ]
+        return [(event.stage, event.status) for event in events]
+
+    async def _go() -> None:
+        orchestrator = job_queue_mod.StageOrchestrator(
+            client, max_in_flight=1, max_handlers=1, poll_timeout_s=1
+        )
+        runner = asyncio.create_task(orchestrator.run())
+        await redis.lpush(MAIN_QUEUE, _sample_job_request().model_dump_json())
+        for _ in stages:
+            await _wait_for(lambda: orchestrator.in_flight)
+            (key,) = orchestrator.in_flight
+            await redis.lpush(key, "{}")
+            await _wait_for(lambda done=key: done not in orchestrator.in_flight)
+        await _wait_for(lambda: redis.lists.get(f"{MAIN_QUEUE}:completed"))
+        runner.cancel()
+        await asyncio.gather(runner, return_exceptions=True)
+
+    _run(asyncio.wait_for(_go(), timeout=10))
+    expected = [
+        ("A", "started"),
+        ("A", "done"),
+        ("B", "started"),
+        ("B", "done"),
+        (None, "graded"),
+    ]
+    assert _events(submission_channel(1)) == expected
+    assert _events(assignment_channel(3)) == expected
+
+
+def test_event_hub_fans_out_per_channel_and_drops_for_slow_clients() -> None:
+    async def _go() -> None:
+        hub = EventHub(_FakeRedis(), buffer=1)
+        hub._reader = asyncio.get_running_loop().create_future()  # no Redis reader
+        hub.ready.set()
+        first = await hub.subscribe(submission_channel(1))
+        second = await hub.subscribe(submission_channel(1))
+        other = await hub.subscribe(submission_channel(2))
+
+        hub.deliver(submission_channel(1), "e1")
+        hub.deliver(submission_channel(1), "e2")  # buffers are full: dropped
+        assert first.get_nowait() == second.get_nowait() == "e1"
+        assert first.empty() and other.empty()
+
+        hub.unsubscribe(submission_channel(1), first)
+        hub.unsubscribe(submission_channel(1), second)
+        assert submission_channel(1) not in hub.subscribers
+
+    _run(_go())
+
+
+def test_event_hub_subscribes_before_returning_and_resyncs_after_reconnect(
+    monkeypatch,
+) -> None:
+    class _PubSub:
+        def __init__(self, attempt: int) -> None:
+            self.attempt = attempt
+
+        async def psubscribe(self, pattern: str) -> None:
+            await asyncio.sleep(0.01)
+
+        async def listen(self):
+            if self.attempt == 0:
+                await asyncio.sleep(0.02)
+                raise ConnectionError("lost")
+            yield {"type": "pmessage", "channel": submission_channel(1), "data": "e"}
+            await asyncio.Event().wait()
+
+        async def aclose(self) -> None:
+            pass
+
+    class _Redis:
+        attempts = 0
+
+        def pubsub(self) -> _PubSub:
+            self.attempts += 1
+            return _PubSub(self.attempts - 1)
+
+    monkeypatch.setattr("core.events.ERROR_BACKOFF_S", 0)
+
+    async def _go() -> None:
+        hub = EventHub(_Redis())
+        queue = await hub.subscribe(submission_channel(1))
+        # Returned only once PSUBSCRIBE went through.
+        assert hub.ready.is_set() and queue.empty()
+        assert await asyncio.wait_for(queue.get(), 1) == RESYNC
+        assert await asyncio.wait_for(queue.get(), 1) == "e"
+        await hub.stop()
+
+    _run(asyncio.wait_for(_go(), timeout=5))
+
+
+def test_fair_share_hands_parked_work_round_robin_across_tenants() -> None:
+    share = FairShare(default_cap=1, caps={"big": 2})
+    assert share.try_start("big") and share.try_start("big")
+    assert not share.try_start("big")
+    assert share.try_start("small") and not share.try_start("small")
+    for item in ("big-1", "big-2", "big-3"):
+        share.park("big", item)
+    share.park("small", "small-1")
+
+    share.done("big")
+    share.done("small")
+    assert share.pop_ready() == "big-1"
+    assert share.pop_ready() == "small-1"
+    assert share.pop_ready() is None
+    assert share.parked_count == 2
+
+
+# --- LeaseManager ---
+
+_LEASE_QUEUE = "test:LeaseQueue"
+
+
+def _lease_manager(redis: _FakeRedis, **kwargs) -> LeaseManager:
+    return LeaseManager(redis, _LEASE_QUEUE, ttl_s=30, reap_interval_s=5, **kwargs)
+
+
+async def _claim(redis: _FakeRedis, leases: LeaseManager, payload: str) -> None:
+    await redis.lpush(leases.processing_queue, payload)
+    await leases.acquire(payload)
+
+
+def test_reap_requeues_expired_unheld_payload_to_consuming_end() -> None:
+    redis = _FakeRedis()
+    leases = _lease_manager(redis)
+
+    async def _go() -> int:
+        await redis.lpush(_LEASE_QUEUE, "waiting")
+        await _claim(redis, leases, "crashed")
+        leases.abandon("crashed")
+        redis.zsets[leases.leases_key]["crashed"] = time.time() - 1
+        return await leases.reap()
+
+    assert _run(_go()) == 1
+    # Consumers pop from the right, so the retry is served next.
+    assert redis.lists[_LEASE_QUEUE] == ["waiting", "crashed"]
+    assert redis.lists[leases.processing_queue] == []
+    assert "crashed" not in redis.zsets[leases.leases_key]
+    assert redis.hashes[leases.attempts_key]["crashed"] == 1
+
+
+def test_reap_skips_payloads_still_held_locally() -> None:
+    redis = _FakeRedis()
+    leases = _lease_manager(redis)
+
+    async def _go() -> int:
+        await _claim(redis, leases, "busy")
+        redis.zsets[leases.leases_key]["busy"] = time.time() - 1
+        return await leases.reap()
+
+    assert _run(_go()) == 0
+    assert redis.lists[leases.processing_queue] == ["busy"]
+
+
+def test_heartbeat_extends_held_leases_without_recreating_reaped_ones() -> None:
+    redis = _FakeRedis()
+    leases = _lease_manager(redis)
+
+    async def _go() -> None:
+        await _claim(redis, leases, "alive")
+        await _claim(redis, leases, "reaped")
+        redis.zsets[leases.leases_key]["alive"] = 0.0
+        # Another replica's reaper already took this one.
+        await redis.zrem(leases.leases_key, "reaped")
+        await leases.heartbeat()
+
+    _run(_go())
+    assert redis.zsets[leases.leases_key]["alive"] > time.time()
+    assert "reaped" not in redis.zsets[leases.leases_key]
+
+
+def test_orphan_requeued_only_after_two_consecutive_unleased_scans() -> None:
+    redis = _FakeRedis()
+    leases = _lease_manager(redis)
+
+    async def _go() -> list[int]:
+        await redis.lpush(leases.processing_queue, "orphan")
+        first = await leases.reap()
+        second = await leases.reap()
+        return [first, second]
+
+    assert _run(_go()) == [0, 1]
+    assert redis.lists[_LEASE_QUEUE] == ["orphan"]
+    assert redis.lists[leases.processing_queue] == []
+
+
+def test_orphan_that_gets_leased_between_scans_is_left_alone() -> None:
+    redis = _FakeRedis()
+    leases = _lease_manager(redis)
+    other_replica = _lease_manager(redis)
+
+    async def _go() -> list[int]:
+        await redis.lpush(leases.processing_queue, "late")
+        first = await leases.reap()
+        await other_replica.acquire("late")
+        second = await leases.reap()
+        return [first, second]
+
+    assert _run(_go()) == [0, 0]
+    assert redis.lists[leases.processing_queue] == ["late"]
+
+
+def test_payload_dead_lettered_exactly_at_max_attempts() -> None:
+    redis = _FakeRedis()
+    dead: list[str] = []
+
+    async def on_dead_letter(payload: str) -> None:
+        dead.append(payload)
+
+    leases = _lease_manager(redis, max_attempts=2, on_dead_letter=on_dead_letter)
+
+    async def _lose_delivery() -> None:
+        payload = await redis.brpoplpush(_LEASE_QUEUE, leases.processing_queue)
+        await leases.acquire(payload)
+        leases.abandon(payload)
+        redis.zsets[leases.leases_key][payload] = time.time() - 1
+        await leases.reap()
+
+    async def _go() -> None:
+        await redis.lpush(_LEASE_QUEUE, "poison")
+        await _lose_delivery()
+        assert dead == []
+        assert redis.lists[_LEASE_QUEUE] == ["poison"]
+        await _lose_delivery()
+
+    _run(_go())
+    assert dead == ["poison"]
+    assert redis.lists[leases.dead_letter_queue] == ["poison"]
+    assert redis.lists[_LEASE_QUEUE] == []
+    assert "poison" not in redis.hashes[leases.attempts_key]
+
+
+def test_release_clears_lease_and_attempts() -> None:
+    redis = _FakeRedis()
+    leases = _lease_manager(redis)
+
+    async def _go() -> None:
+        await _claim(redis, leases, "retried")
+        await redis.hincrby(leases.attempts_key, "retried", 1)
+        await leases.release("retried")
+
+    _run(_go())
+    assert leases.held == {}
+    assert redis.lists[leases.processing_queue] == []
+    assert "retried" not in redis.zsets[leases.leases_key]
+    assert "retried" not in redis.hashes[leases.attempts_key]
+
+
+# --- Queue transports ---
+
+_TRANSPORT_QUEUE = "test:TransportQueue"
+
+
+def test_list_transport_claims_a_batch_and_acks_it() -> None:
+    redis = _FakeRedis()
+    transport = ListTransport(redis, _TRANSPORT_QUEUE)
+
+    async def _go() -> list[Delivery]:
+        await transport.push("a", "b", "c")
+        claimed = await transport.claim(count=2)
+        await transport.ack(*claimed)
+        return claimed
+
+    claimed = _run(_go())
+    assert [d.payload for d in claimed] == ["a", "b"]
+    assert redis.lists[_TRANSPORT_QUEUE] == ["c"]
+    assert redis.lists[transport.processing_queue] == []
+    assert redis.zsets[transport.leases.leases_key] == {}
+
+
+class _FakeStreamRedis(_FakeRedis):
+    """Single-group Redis Streams model: entries, a cursor and a pending list."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.entries: dict[str, dict[str, str]] = {}
+        self.delivered: set[str] = set()
+        # entry id -> [consumer, last delivery (ms), times delivered]
+        self.pending: dict[str, list] = {}
+        self._seq = 0
+
+    def _now_ms(self) -> int:
+        return int(time.time() * 1000)
+
+    async def xgroup_create(self, name, groupname, id="$", mkstream=False):
+        return True
+
+    async def xadd(self, name: str, fields: dict[str, str]) -> str:
+        self._seq += 1
+        entry_id = f"{self._now_ms()}-{self._seq}"
+        self.entries[entry_id] = dict(fields)
+        return entry_id
+
+    async def xreadgroup(self, groupname, consumername, streams, count=1, block=0):
+        (stream,) = streams
+        fresh = [i for i in self.entries if i not in self.delivered][:count]
+        for entry_id in fresh:
+            self.delivered.add(entry_id)
+            self.pending[entry_id] = [consumername, self._now_ms(), 1]
+        if not fresh:
+            return []
+        return [[stream, [(i, self.entries[i]) for i in fresh]]]
+
+    async def xack(self, name, groupname, *ids: str) -> int:
+        return sum(1 for i in ids if self.pending.pop(i, None) is not None)
+
+    async def xdel(self, name, *ids: str) -> int:
+        return sum(1 for i in ids if self.entries.pop(i, None) is not None)
+
+    async def xrange(self, name, min="-", max="+"):
+        return [(min, self.entries[min])] if min in self.entries else []
+
+    async def xlen(self, name) -> int:
+        return len(self.entries)
+
+    async def xpending(self, name, groupname):
+        ids = sorted(self.pending)
+        return {"pending": len(ids), "min": ids[0] if ids else None}
+
+    async def xpending_range(self, name, groupname, min, max, count, idle=0):
+        now = self._now_ms()
+        return [
+            {"message_id": i, "times_delivered": p[2]}
+            for i, p in self.pending.items()
+            if now - p[1] >= idle
+        ][:count]
+
+    async def xautoclaim(self, name, groupname, consumername, min_idle_time, count):
+        now = self._now_ms()
+        claimed = []
+        for entry_id, p in list(self.pending.items())[:count]:
+            if now - p[1] >= min_idle_time:
+                self.pending[entry_id] = [consumername, now, p[2] + 1]
+                claimed.append((entry_id, self.entries[entry_id]))
+        return ["0-0", claimed, []]
+
+    async def xclaim(
+        self, name, groupname, consumername, min_idle_time, message_ids, justid
+    ):
+        for entry_id in message_ids:
+            if entry_id in self.pending:
+                self.pending[entry_id][1] = self._now_ms()
+        return list(message_ids)
+
+
+def _stream_transport(redis: _FakeStreamRedis, consumer: str, **kwargs):
+    kwargs.setdefault("idle_timeout_s", 30)
+    kwargs.setdefault("claim_interval_s", 30)
+    return StreamTransport(redis, _TRANSPORT_QUEUE, consumer=consumer, **kwargs)
+
+
+def test_stream_transport_claims_a_batch_and_acks_it() -> None:
+    redis = _FakeStreamRedis()
+    transport = _stream_transport(redis, "c1")
+
+    async def _go() -> list[Delivery]:
+        await transport.push("a", "b", "c")
+        claimed = await transport.claim(count=2, timeout=1)
+        await transport.ack(*claimed)
+        return claimed
+
+    claimed = _run(_go())
+    assert [d.payload for d in claimed] == ["a", "b"]
+    assert redis.pending == {}
+    assert list(redis.entries.values()) == [{"payload": "c"}]
+    assert transport.held == set()
+    assert redis.pipelines_executed == 1
+
+
+def test_stream_transport_reclaims_entries_from_a_stalled_consumer() -> None:
+    redis = _FakeStreamRedis()
+    crashed = _stream_transport(redis, "crashed")
+    survivor = _stream_transport(redis, "survivor", idle_timeout_s=0)
+
+    async def _go() -> list[Delivery]:
+        await crashed.push("job")
+        await crashed.claim(count=1, timeout=1)
+        return await survivor.claim(count=1, timeout=1)
+
+    (reclaimed,) = _run(_go())
+    assert reclaimed.payload == "job"
+    assert redis.pending[reclaimed.delivery_id][0] == "survivor"
+    assert reclaimed.delivery_id in survivor.held
+
+
+def test_stream_transport_dead_letters_after_max_deliveries() -> None:
+    redis = _FakeStreamRedis()
+    dead: list[str] = []
+
+    async def _on_dead_letter(payload: str) -> None:
+        dead.append(payload)
+
+    transport = _stream_transport(
+        redis,
+        "c1",
+        idle_timeout_s=0,
+        claim_interval_s=0,
+        max_attempts=2,
+        on_dead_letter=_on_dead_letter,
+    )
+
+    async def _go() -> None:
+        await transport.push("poison")
+        (first,) = await transport.claim(count=1, timeout=1)
+        transport.abandon(first)
+        (second,) = await transport.claim(count=1, timeout=1)
+        assert second.delivery_id == first.delivery_id
+        transport.abandon(second)
+        assert await transport.claim(count=1, timeout=1) == []
+
+    _run(_go())
+    assert dead == ["poison"]
+    assert redis.lists[transport.dead_letter_queue] == ["poison"]
+    assert redis.pending == {}
+    assert redis.entries == {}
+
+
+def test_stream_transport_lag_reports_depth_and_pending_age() -> None:
+    redis = _FakeStreamRedis()
+    transport = _stream_transport(redis, "c1")
+
+    async def _go():
+        await transport.push("a", "b", "c")
+        await transport.claim(count=1, timeout=1)
+        return await transport.lag()
+
+    lag = _run(_go())
+    assert (lag.depth, lag.pending) == (2, 1)
+    assert lag.oldest_pending_age_s is not None and lag.oldest_pending_age_s >= 0
+
+
+# --- Priority scheduling ---
+
+
+def test_effective_priority_promotes_interactive_work_near_its_deadline() -> None:
+    now = datetime(2026, 5, 1, 12, 0, tzinfo=UTC)
+    soon = now + timedelta(minutes=10)
+    later = now + timedelta(days=2)
+    past = now - timedelta(minutes=10)
+
+    def _eff(priority, deadline):
+        return effective_priority(priority, deadline, now=now, window_s=3600)
+
+    assert _eff(JobPriority.INTERACTIVE, soon) == JobPriority.URGENT
+    assert _eff(JobPriority.INTERACTIVE, soon.replace(tzinfo=None)) == (
+        JobPriority.URGENT
+    )
+    assert _eff(JobPriority.INTERACTIVE, later) == JobPriority.INTERACTIVE
+    assert _eff(JobPriority.INTERACTIVE, past) == JobPriority.INTERACTIVE
+    assert _eff(JobPriority.INTERACTIVE, None) == JobPriority.INTERACTIVE
+    # Regrades and bulk uploads never jump ahead of live submissions.
+    assert _eff(JobPriority.BULK, soon) == JobPriority.BULK
+
+
+def test_priority_transport_shares_claims_by_weight_without_starvation() -> None:
+    redis = _FakeRedis()
+    transport = make_transport(redis, _TRANSPORT_QUEUE, backend="list")
+    transport.scheduler = WeightedRoundRobin(
+        {JobPriority.URGENT: 8, JobPriority.INTERACTIVE: 4, JobPriority.BULK: 1}
+    )
+
+    async def _go() -> list[Delivery]:
+        for priority in JobPriority:
+            await transport.push(
+                *(f"{priority}-{i}" for i in range(20)), priority=priority
+            )
+        return [(await transport.claim())[0] for _ in range(13)]
+
+    claimed = _run(_go())
+    served = [d.payload.split("-")[0] for d in claimed]
+    assert served.count(JobPriority.URGENT) == 8
+    assert served.count(JobPriority.INTERACTIVE) == 4
+    assert served.count(JobPriority.BULK) == 1
+
+
+def test_priority_transport_idle_claim_blocks_once_across_classes() -> None:
+    class _CountingRedis(_FakeRedis):
+        def __init__(self) -> None:
+            super().__init__()
+            self.blocking_calls: list[list[str]] = []
+
+        async def brpop(self, keys: list[str], timeout: int = 0):
+            self.blocking_calls.append(list(keys))
+            return await super().brpop(keys, timeout)
+
+    redis = _CountingRedis()
+    transport = make_transport(redis, _TRANSPORT_QUEUE, backend="list")
+
+    async def _go() -> list[Delivery]:
+        claim = asyncio.create_task(transport.claim(count=2, timeout=5))
+        await asyncio.sleep(0.01)
+        await transport.push("regrade", "regrade-2", priority=JobPriority.BULK)
+        return await claim
+
+    claimed = _run(asyncio.wait_for(_go(), timeout=10))
+    assert [d.payload for d in claimed] == ["regrade", "regrade-2"]
+    # One BRPOP over every class, woken by work on a non-interactive one.
+    (keys,) = redis.blocking_calls
+    assert sorted(keys) == sorted(
+        priority_queue(_TRANSPORT_QUEUE, priority) for priority in JobPriority
+    )
+    assert redis.lists[f"{_TRANSPORT_QUEUE}:bulk:processing"] == [
+        "regrade-2",
+        "regrade",
+    ]
+
+
+def test_priority_transport_routes_acks_and_reports_lag_per_class() -> None:
+    redis = _FakeRedis()
+    transport = make_transport(redis, _TRANSPORT_QUEUE, backend="list")
+
+    async def _go():
+        await transport.push("live", "live-2")
+        await transport.push("regrade", priority=JobPriority.BULK)
+        (bulk,) = await transport.transports[JobPriority.BULK].poll()
+        await transport.ack(bulk)
+        return await transport.lag_by_class(), await transport.lag()
+
+    by_class, total = _run(_go())
+    # The default class keeps the bare queue name for existing producers.
+    assert redis.lists[_TRANSPORT_QUEUE] == ["live-2", "live"]
+    assert redis.lists[f"{_TRANSPORT_QUEUE}:bulk:processing"] == []
+    assert by_class[JobPriority.INTERACTIVE].depth == 2
+    assert by_class[JobPriority.BULK].depth == 0
+    assert (total.depth, total.pending) == (2, 0)
+
+
+# --- Adaptive concurrency ---
+
+
+def _limiter(depth: int = 0, pressure=(None, None), **kwargs) -> AdaptiveLimiter:
+    async def _depth() -> int:
+        return depth
+
+    kwargs.setdefault("min_limit", 1)
+    kwargs.setdefault("max_limit", 8)
+    return AdaptiveLimiter(
+        "test",
+        target_p95_s=10,
+        queue_depth=_depth,
+        pressure=lambda: pressure,
+        **kwargs,
+    )
+
+
+def test_limiter_halves_on_upstream_throttling_down_to_min() -> None:
+    limiter = _limiter(min_limit=3)
+
+    async def _go() -> list[int]:
+        limits = []
+        for _ in range(3):
+            report_throttle()
+            limits.append(await limiter.adjust())
+        return limits
+
+    assert _run(_go()) == [4, 3, 3]
+
+
+def test_limiter_backs_off_on_latency_and_host_pressure() -> None:
+    slow = _limiter()
+    for seconds in [1.0] * 18 + [30.0] * 2:
+        slow.record_latency(seconds)
+    assert _run(slow.adjust()) == 4
+
+    busy = _limiter(depth=50, pressure=(0.95, 0.2))
+    assert _run(busy.adjust()) == 4
+
+
+def test_limiter_grows_by_one_only_while_saturated_with_a_backlog() -> None:
+    idle = _limiter(depth=0)
+    idle.limit = 2
+    backlog = _limiter(depth=10)
+    backlog.limit = 2
+
+    async def _go() -> tuple[int, int, int]:
+        unsaturated = await backlog.adjust()
+        async with backlog.slot(), backlog.slot():
+            saturated = await backlog.adjust()
+        async with idle.slot(), idle.slot():
+            no_backlog = await idle.adjust()
+        return unsaturated, saturated, no_backlog
+
+    assert _run(_go()) == (2, 3, 2)
+
+
+def test_limiter_slots_block_beyond_the_current_limit() -> None:
+    limiter = _limiter()
+    limiter.limit = 1
+
+    async def _go() -> None:
+        async with limiter.slot():
+            waiter = asyncio.create_task(limiter.slot().__aenter__())
+            await asyncio.sleep(0.01)
+            assert not waiter.done() and limiter.waiting == 1
+        await asyncio.wait_for(waiter, timeout=1)
+        assert limiter.in_use == 1
+
+    _run(_go())
+
+
+def test_is_throttle_error_sees_through_wrapped_sdk_errors() -> None:
+    class _SDKError(Exception):
+        code = 429
+
+    try:
+        try:
+            raise _SDKError("rate limited")
+        except _SDKError as exc:
+            raise RuntimeError("Gemini API failed") from exc
+    except RuntimeError as wrapped:
+        assert is_throttle_error(wrapped)
+    assert not is_throttle_error(RuntimeError("boom"))
+
+
+# --- Metrics ---
+
+
+def test_registry_renders_prometheus_text_format() -> None:
+    registry = Registry()
+    jobs = Counter("t_jobs_total", "Jobs.", ("status",), registry=registry)
+    depth = Gauge("t_depth", "Depth.", registry=registry)
+    latency = Histogram(
+        "t_latency_seconds", "Latency.", ("stage",), buckets=(0.1, 1), registry=registry
+    )
+    jobs.labels('say "hi"').inc(2)
+    depth.set(3)
+    for value in (0.05, 0.1, 0.5, 7):
+        latency.labels("OCR").observe(value)
+
+    lines = _run(registry.render()).splitlines()
+    assert "# TYPE t_jobs_total counter" in lines
+    assert 't_jobs_total{status="say \\"hi\\""} 2.0' in lines
+    assert "t_depth 3.0" in lines
+    assert [line for line in lines if line.startswith("t_latency_seconds_")] == [
+        't_latency_seconds_bucket{stage="OCR",le="0.1"} 2',
+        't_latency_seconds_bucket{stage="OCR",le="1.0"} 3',
+        't_latency_seconds_bucket{stage="OCR",le="+Inf"} 4',
+        't_latency_seconds_sum{stage="OCR"} 7.65',
+        't_latency_seconds_count{stage="OCR"} 4',
+    ]
+
+
+def test_queue_lag_collector_refreshes_depth_per_class_on_scrape() -> None:
+    redis = _FakeRedis()
+    transport = make_transport(redis, _TRANSPORT_QUEUE, backend="list")
+
+    async def _go() -> None:
+        await transport.push("a", "b", priority=JobPriority.BULK)
+        await queue_lag_collector(transport)()
+
+    _run(_go())
+    assert QUEUE_DEPTH.labels(_TRANSPORT_QUEUE, "bulk").value == 2
+    assert QUEUE_DEPTH.labels(_TRANSPORT_QUEUE, "interactive").value == 0
+
+
+def test_serve_metrics_answers_get_metrics_only() -> None:
+    import socket
+
+    registry = Registry()
+    Counter("t_served_total", "Served.", registry=registry).inc()
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+
+    async def _get(path: str) -> str:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(f"GET {path} HTTP/1.1\r\nHost: x\r\n\r\n".encode())
+        response = (await reader.read()).decode()
+        writer.close()
+        return response
+
+    async def _go() -> tuple[str, str]:
+        server = asyncio.create_task(serve_metrics(port, "127.0.0.1", registry))
+        while True:
+            try:
+                found = await _get("/metrics")
+                break
+            except OSError:
+                await asyncio.sleep(0.01)
+        missing = await _get("/other")
+        server.cancel()
+        await asyncio.gather(server, return_exceptions=True)
+        return found, missing
+
+    found, missing = _run(asyncio.wait_for(_go(), timeout=10))
+    assert found.startswith("HTTP/1.1 200 OK")
+    assert "t_served_total 1.0" in found
+    assert missing.startswith("HTTP/1.1 404")
@@ -0,0 +1,518 @@
+"""
+Queue transports shared by the orchestrator and the OCR, sandbox and AI
+grader workers.
+
+Two backends implement the same small interface (``push``, ``claim``,
+``ack``, ``abandon``, ``run``, ``lag``), selected by ``QUEUE_BACKEND``:
+
+- ``list`` (default): the original Redis lists. ``claim`` moves payloads into
+  ``{queue}:processing`` with BRPOPLPUSH and protects them with heartbeated
+  leases (see ``core/leases.py``).
+- ``stream``: a Redis Stream ``{queue}:stream`` read through the consumer
+  group ``{queue}:group``, which all of a queue's priority classes share.
+  ``claim`` fetches up to ``count`` entries per XREADGROUP round trip,
+  periodically takes over entries whose consumer went quiet with XAUTOCLAIM,
+  and ``ack`` acknowledges a whole batch with one XACK.
+  Pending-entry ages come from XPENDING.
+
+Either backend is wrapped in a ``PriorityTransport`` holding one sub-queue
+per priority class (see ``core/scheduling.py``); that is what
+``make_transport`` returns.
+
+Result lists (``{queue}:completed:{job_id}``) are point-to-point replies and
+stay plain lists under both backends.
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from typing import Protocol
+from uuid import uuid4
+
+from redis.exceptions import ResponseError
+from schemas import JobPriority
+from settings import settings
+
+from .leases import LeaseManager
+from .metrics import QUEUE_DEAD_LETTERS, QUEUE_REDELIVERIES
+from .scheduling import WeightedRoundRobin, priority_queue, priority_weights
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Delivery:
+    """One claimed payload; ``delivery_id`` is what the backend acknowledges."""
+
+    delivery_id: str
+    payload: str
+    # Sub-queue the payload was claimed from; routes ack()/abandon().
+    queue: str = ""
+
+
+@dataclass(frozen=True)
+class QueueLag:
+    depth: int
+    pending: int
+    oldest_pending_age_s: float | None
+
+
+class QueueTransport(Protocol):
+    queue: str
+
+    async def push(self, *payloads: str) -> None: ...
+
+    async def claim(self, count: int = 1, timeout: int = 0) -> list[Delivery]: ...
+
+    async def poll(self, count: int = 1) -> list[Delivery]: ...
+
+    @classmethod
+    async def claim_any(
+        cls, transports: list, count: int, timeout: int
+    ) -> list[Delivery]: ...
+
+    async def ack(self, *deliveries: Delivery) -> None: ...
+
+    def abandon(self, delivery: Delivery) -> None: ...
+
+    async def run(self) -> None: ...
+
+    async def lag(self) -> QueueLag: ...
+
+
+class ListTransport:
+    def __init__(
+        self,
+        redis_client,
+        queue: str,
+        on_dead_letter: Callable[[str], Awaitable[None]] | None = None,
+    ):
+        self.redis_client = redis_client
+        self.queue = queue
+        self.processing_queue = f"{queue}:processing"
+        self.leases = LeaseManager(redis_client, queue, on_dead_letter=on_dead_letter)
+
+    async def push(self, *payloads: str):
+        await self.redis_client.lpush(self.queue, *payloads)
+
+    async def claim(self, count: int = 1, timeout: int = 0) -> list[Delivery]:
+        first = await self.redis_client.brpoplpush(
+            src=self.queue, dst=self.processing_queue, timeout=timeout
+        )
+        if first is None:
+            return []
+        return await self._take([first], count)
+
+    async def poll(self, count: int = 1) -> list[Delivery]:
+        return await self._take([], count)
+
+    @classmethod
+    async def claim_any(
+        cls, transports: list["ListTransport"], count: int, timeout: int
+    ) -> list[Delivery]:
+        """
+        Block on several queues with one BRPOP, then fill up from the first
+        queue that had work. BRPOPLPUSH takes a single source list, so the
+        payload is moved into ``{queue}:processing`` right after the pop.
+        """
+        by_queue = {t.queue: t for t in transports}
+        popped = await transports[0].redis_client.brpop(list(by_queue), timeout=timeout)
+        if popped is None:
+            return []
+        queue, payload = popped
+        transport = by_queue[queue]
+        await transport.redis_client.lpush(transport.processing_queue, payload)
+        return await transport._take([payload], count)
+
+    async def _take(self, payloads: list[str], count: int) -> list[Delivery]:
+        while len(payloads) < count:
+            payload = await self.redis_client.rpoplpush(
+                self.queue, self.processing_queue
+            )
+            if payload is None:
+                break
+            payloads.append(payload)
+        for payload in payloads:
+            await self.leases.acquire(payload)
+        return [Delivery(p, p, self.queue) for p in payloads]
+
+    async def ack(self, *deliveries: Delivery):
+        for delivery in deliveries:
+            await self.leases.release(delivery.payload)
+
+    def abandon(self, delivery: Delivery):
+        self.leases.abandon(delivery.payload)
+
+    async def run(self):
+        await self.leases.run()
+
+    async def lag(self) -> QueueLag:
+        # Lists record no claim time, so the oldest pending age is unknown.
+        return QueueLag(
+            depth=await self.redis_client.llen(self.queue),
+            pending=await self.redis_client.llen(self.processing_queue),
+            oldest_pending_age_s=None,
+        )
+
+
+class StreamTransport:
+    def __init__(
+        self,
+        redis_client,
+        queue: str,
+        on_dead_letter: Callable[[str], Awaitable[None]] | None = None,
+        idle_timeout_s: int = settings.lease_ttl_s,
+        claim_interval_s: int = settings.lease_reap_interval_s,
+        max_attempts: int = settings.lease_max_attempts,
+        consumer: str | None = None,
+        group: str | None = None,
+    ):
+        self.redis_client = redis_client
+        self.queue = queue
+        self.stream = f"{queue}:stream"
+        self.group = group or f"{queue}:group"
+        self.dead_letter_queue = f"{queue}:dead"
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}-{uuid4()}"
+        self.idle_timeout_ms = idle_timeout_s * 1000
+        self.claim_interval_s = claim_interval_s
+        self.max_attempts = max_attempts
+        self.on_dead_letter = on_dead_letter
+        self.held: set[str] = set()
+        self._group_ready = False
+        self._last_autoclaim = 0.0
+
+    async def ensure_group(self):
+        if self._group_ready:
+            return
+        try:
+            await self.redis_client.xgroup_create(
+                self.stream, self.group, id="0", mkstream=True
+            )
+        except ResponseError as e:
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    async def push(self, *payloads: str):
+        # One round trip however many entries (bulk uploads enqueue hundreds).
+        async with self.redis_client.pipeline(transaction=False) as pipe:
+            for payload in payloads:
+                pipe.xadd(self.stream, {"payload": payload})
+            await pipe.execute()
+
+    async def claim(self, count: int = 1, timeout: int = 0) -> list[Delivery]:
+        await self.ensure_group()
+        deadline = None if timeout == 0 else time.monotonic() + timeout
+        while True:
+            reclaimed = await self._autoclaim_if_due(count)
+            if reclaimed:
+                return reclaimed
+
+            # Block for at most one claim interval so stalled entries are
+            # still reclaimed while the stream is otherwise idle.
+            block_s = self.claim_interval_s
+            if deadline is not None:
+                block_s = min(block_s, deadline - time.monotonic())
+            deliveries = await self._read(count, block_ms=max(int(block_s * 1000), 1))
+            if deliveries:
+                return deliveries
+            if deadline is not None and time.monotonic() >= deadline:
+                return []
+
+    async def poll(self, count: int = 1) -> list[Delivery]:
+        await self.ensure_group()
+        return await self._autoclaim_if_due(count) or await self._read(count)
+
+    @classmethod
+    async def claim_any(
+        cls, transports: list["StreamTransport"], count: int, timeout: int
+    ) -> list[Delivery]:
+        """
+        Read several streams with one blocking XREADGROUP. The transports must
+        share a consumer group and consumer name (``make_transport`` sets
+        both). Up to ``count`` entries may come back from each stream.
+        """
+        for transport in transports:
+            await transport.ensure_group()
+            reclaimed = await transport._autoclaim_if_due(count)
+            if reclaimed:
+                return reclaimed
+
+        first = transports[0]
+        block_s = first.claim_interval_s
+        if timeout:
+            block_s = min(block_s, timeout)
+        by_stream = {t.stream: t for t in transports}
+        response = await first.redis_client.xreadgroup(
+            first.group,
+            first.consumer,
+            dict.fromkeys(by_stream, ">"),
+            count=count,
+            block=max(int(block_s * 1000), 1),
+        )
+        return [
+            delivery
+            for stream, entries in _stream_entries(response)
+            for delivery in by_stream[stream]._deliveries(entries)
+        ]
+
+    async def _read(self, count: int, block_ms: int | None = None) -> list[Delivery]:
+        response = await self.redis_client.xreadgroup(
+            self.group,
+            self.consumer,
+            {self.stream: ">"},
+            count=count,
+            block=block_ms,
+        )
+        return [
+            delivery
+            for _, entries in _stream_entries(response)
+            for delivery in self._deliveries(entries)
+        ]
+
+    def _deliveries(self, entries) -> list[Delivery]:
+        deliveries = [
+            Delivery(entry_id, fields["payload"], self.queue)
+            for entry_id, fields in entries
+        ]
+        self.held.update(d.delivery_id for d in deliveries)
+        return deliveries
+
+    async def ack(self, *deliveries: Delivery):
+        if not deliveries:
+            return
+        ids = [d.delivery_id for d in deliveries]
+        self.held.difference_update(ids)
+        await self.redis_client.xack(self.stream, self.group, *ids)
+        await self.redis_client.xdel(self.stream, *ids)
+
+    def abandon(self, delivery: Delivery):
+        # Left pending; another consumer's XAUTOCLAIM takes it once idle.
+        self.held.discard(delivery.delivery_id)
+
+    async def run(self):
+        """Keep held entries from looking idle while they are being worked on."""
+        while True:
+            try:
+                await asyncio.sleep(self.claim_interval_s)
+                if self.held:
+                    await self.redis_client.xclaim(
+                        self.stream,
+                        self.group,
+                        self.consumer,
+                        min_idle_time=0,
+                        message_ids=list(self.held),
+                        justid=True,
+                    )
+            except asyncio.CancelledError:
+                logger.debug("Stream transport for %s shutting down...", self.queue)
+                return
+            except Exception as e:
+                logger.error("Stream heartbeat failed for %s: %s", self.queue, e)
+
+    async def lag(self) -> QueueLag:
+        await self.ensure_group()
+        summary = await self.redis_client.xpending(self.stream, self.group)
+        pending = summary["pending"]
+        oldest_age_s = None
+        if pending and summary["min"]:
+            # Stream ids start with the enqueue time in milliseconds.
+            enqueued_ms = int(str(summary["min"]).split("-")[0])
+            oldest_age_s = max(time.time() - enqueued_ms / 1000, 0.0)
+        return QueueLag(
+            depth=await self.redis_client.xlen(self.stream) - pending,
+            pending=pending,
+            oldest_pending_age_s=oldest_age_s,
+        )
+
+    async def _autoclaim_if_due(self, count: int) -> list[Delivery]:
+        if time.monotonic() - self._last_autoclaim < self.claim_interval_s:
+            return []
+        self._last_autoclaim = time.monotonic()
+        return await self._autoclaim(count)
+
+    async def _autoclaim(self, count: int) -> list[Delivery]:
+        stale = await self.redis_client.xpending_range(
+            self.stream,
+            self.group,
+            min="-",
+            max="+",
+            count=count,
+            idle=self.idle_timeout_ms,
+        )
+        for entry in stale:
+            if entry["times_delivered"] >= self.max_attempts:
+                await self._dead_letter(entry["message_id"])
+
+        _, entries, *_ = await self.redis_client.xautoclaim(
+            self.stream,
+            self.group,
+            self.consumer,
+            min_idle_time=self.idle_timeout_ms,
+            count=count,
+        )
+        deliveries = [
+            Delivery(entry_id, fields["payload"], self.queue)
+            for entry_id, fields in entries
+            if fields
+        ]
+        if deliveries:
+            QUEUE_REDELIVERIES.labels(self.queue).inc(len(deliveries))
+            logger.warning(
+                "Reclaimed %d stalled entries on %s", len(deliveries), self.stream
+            )
+        self.held.update(d.delivery_id for d in deliveries)
+        return deliveries
+
+    async def _dead_letter(self, entry_id: str):
+        entries = await self.redis_client.xrange(self.stream, entry_id, entry_id)
+        await self.redis_client.xack(self.stream, self.group, entry_id)
+        await self.redis_client.xdel(self.stream, entry_id)
+        if not entries:
+            return
+        payload = entries[0][1]["payload"]
+        QUEUE_DEAD_LETTERS.labels(self.queue).inc()
+        logger.error(
+            "Entry %s on %s exhausted %d deliveries, moving to %s",
+            entry_id,
+            self.stream,
+            self.max_attempts,
+            self.dead_letter_queue,
+        )
+        await self.redis_client.lpush(self.dead_letter_queue, payload)
+        if self.on_dead_letter:
+            await self.on_dead_letter(payload)
+
+
+class PriorityTransport:
+    """
+    One transport per ``JobPriority`` class behind the same interface.
+
+    ``claim`` polls the classes in weighted round-robin order. When every
+    class is empty it waits on all of them with one blocking command (BRPOP
+    over the lists, XREADGROUP over the streams), so an idle consumer costs a
+    single round trip and wakes for work on any class. A stream read may
+    return entries from more than one class; those beyond the served class
+    are kept and handed out by the next claims.
+    """
+
+    def __init__(
+        self,
+        queue: str,
+        transports: dict[JobPriority, QueueTransport],
+        weights: dict[JobPriority, int] | None = None,
+    ):
+        self.queue = queue
+        self.transports = transports
+        self.scheduler = WeightedRoundRobin(weights or priority_weights())
+        self._by_queue = {t.queue: t for t in transports.values()}
+        self._prefetched: list[Delivery] = []
+
+    async def push(self, *payloads: str, priority=JobPriority.INTERACTIVE):
+        await self.transports[priority].push(*payloads)
+
+    async def poll(self, count: int = 1) -> list[Delivery]:
+        if self._prefetched:
+            return self._take_prefetched(count)
+        for priority in self.scheduler.order():
+            deliveries = await self.transports[priority].poll(count)
+            if deliveries:
+                self.scheduler.served(priority)
+                return deliveries
+            self.scheduler.idle(priority)
+        return []
+
+    async def claim(self, count: int = 1, timeout: int = 0) -> list[Delivery]:
+        deliveries = await self.poll(count)
+        if deliveries:
+            return deliveries
+        deadline = None if timeout == 0 else time.monotonic() + timeout
+        while True:
+            block_s = 0
+            if deadline is not None:
+                remaining_s = deadline - time.monotonic()
+                if remaining_s <= 0:
+                    return []
+                block_s = max(int(remaining_s), 1)
+            order = [self.transports[p] for p in self.scheduler.order()]
+            deliveries = await type(order[0]).claim_any(order, count, block_s)
+            if deliveries:
+                self._prefetched = deliveries
+                return self._take_prefetched(count)
+
+    def _take_prefetched(self, count: int) -> list[Delivery]:
+        """Serve the highest-credit class among the prefetched deliveries."""
+        queues = {d.queue for d in self._prefetched}
+        priority = next(
+            p for p in self.scheduler.order() if self.transports[p].queue in queues
+        )
+        queue = self.transports[priority].queue
+        served = [d for d in self._prefetched if d.queue == queue][:count]
+        self._prefetched = [d for d in self._prefetched if d not in served]
+        self.scheduler.served(priority)
+        return served
+
+    async def ack(self, *deliveries: Delivery):
+        for queue in {d.queue for d in deliveries}:
+            await self._by_queue[queue].ack(
+                *(d for d in deliveries if d.queue == queue)
+            )
+
+    def abandon(self, delivery: Delivery):
+        self._by_queue[delivery.queue].abandon(delivery)
+
+    async def run(self):
+        await asyncio.gather(*(t.run() for t in self.transports.values()))
+
+    async def lag(self) -> QueueLag:
+        lags = list((await self.lag_by_class()).values())
+        ages = [lag.oldest_pending_age_s for lag in lags if lag.oldest_pending_age_s]
+        return QueueLag(
+            depth=sum(lag.depth for lag in lags),
+            pending=sum(lag.pending for lag in lags),
+            oldest_pending_age_s=max(ages) if ages else None,
+        )
+
+    async def lag_by_class(self) -> dict[JobPriority, QueueLag]:
+        return {
+            priority: await transport.lag()
+            for priority, transport in self.transports.items()
+        }
+
+
+def _stream_entries(response) -> list:
+    """XREADGROUP replies ``[[stream, entries]]``, or None on timeout."""
+    return list(response or [])
+
+
+def make_transport(
+    redis_client,
+    queue: str,
+    on_dead_letter: Callable[[str], Awaitable[None]] | None = None,
+    backend: str = settings.queue_backend,
+) -> PriorityTransport:
+    transport_cls = StreamTransport if backend == "stream" else ListTransport
+    shared = {}
+    if backend == "stream":
+        # One group and consumer across the classes, so a single XREADGROUP
+        # can wait on all of their streams.
+        shared = {
+            "group": f"{queue}:group",
+            "consumer": f"{socket.gethostname()}-{os.getpid()}-{uuid4()}",
+        }
+    return PriorityTransport(
+        queue,
+        {
+            priority: transport_cls(
+                redis_client,
+                priority_queue(queue, priority),
+                on_dead_letter=on_dead_letter,
+                **shared,
+            )
+            for priority in JobPriority
+        },
+    )
@@ -49,6 +49,7 @@ from .questions import (
 )
 from .submissions import (
     create_submission,
+    create_submissions,
     delete_submission,
     get_submission_by_id,
     get_submissions_by_assignment_id,
@@ -80,6 +81,7 @@ __all__ = [
     "get_transcription_by_submission_id",
     "update_grade",
     "create_submission",
+    "create_submissions",
     "delete_submission",
     "get_submission_by_id",
     "get_submissions_by_assignment_id",
@@ -84,6 +84,15 @@ async def is_student_enrolled(
     return result.first() is not None
 
 
+async def get_enrolled_student_ids(session: AsyncSession, course_id: int) -> set[int]:
+    result = await session.execute(
+        select(course_students.c.student_id).where(
+            course_students.c.course_id == course_id
+        )
+    )
+    return set(result.scalars().all())
+
+
 async def update_course(
     session: AsyncSession, course_id: int, **fields
 ) -> Course | None:
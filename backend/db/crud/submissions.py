@@ -1,6 +1,6 @@
 import logging
 
-from sqlalchemy import select, update
+from sqlalchemy import insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..models import Submission, SubmissionState
@@ -31,6 +31,34 @@ async def create_submission(
     return submission
 
 
+async def create_submissions(
+    session: AsyncSession,
+    question_id: int,
+    assignment_id: int,
+    student_ids: list[int],
+) -> list[Submission]:
+    """Insert one submission per student in a single statement."""
+    if not student_ids:
+        return []
+    logger.info(
+        "Creating %d submissions for assignment %d", len(student_ids), assignment_id
+    )
+    result = await session.scalars(
+        insert(Submission).returning(Submission, sort_by_parameter_order=True),
+        [
+            {
+                "question_id": question_id,
+                "assignment_id": assignment_id,
+                "student_id": student_id,
+            }
+            for student_id in student_ids
+        ],
+    )
+    submissions = list(result.all())
+    await session.commit()
+    return submissions
+
+
 async def get_submission_by_id(
     session: AsyncSession, submission_id: int
 ) -> Submission | None:
@@ -85,6 +113,15 @@ async def set_submission_image_url(
     return await get_submission_by_id(session, submission_id)
 
 
+async def set_submission_fields_bulk(session: AsyncSession, rows: list[dict]) -> None:
+    """Apply per-row updates (each row carries its ``id``) in one executemany."""
+    if not rows:
+        return
+    logger.debug("Updating %d submissions", len(rows))
+    await session.execute(update(Submission), rows)
+    await session.commit()
+
+
 async def update_submission(
     session: AsyncSession, submission_id: int, **fields
 ) -> Submission | None:
@@ -1,7 +1,9 @@
 import logging
+import time
 
+from core.metrics import EXTERNAL_CALL_DURATION, EXTERNAL_CALL_ERRORS
 from settings import settings
-from sqlalchemy import text
+from sqlalchemy import event, text
 from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 
 logger = logging.getLogger(__name__)
@@ -13,6 +15,23 @@ engine = create_async_engine(ASYNC_DATABASE_URL, echo=False)
 async_session = async_sessionmaker(bind=engine, expire_on_commit=False)
 
 
+@event.listens_for(engine.sync_engine, "before_cursor_execute")
+def _start_query_timer(conn, cursor, statement, parameters, context, executemany):
+    context._query_started = time.perf_counter()
+
+
+@event.listens_for(engine.sync_engine, "after_cursor_execute")
+def _record_query(conn, cursor, statement, parameters, context, executemany):
+    EXTERNAL_CALL_DURATION.labels("postgres").observe(
+        time.perf_counter() - context._query_started
+    )
+
+
+@event.listens_for(engine.sync_engine, "handle_error")
+def _count_query_error(exception_context):
+    EXTERNAL_CALL_ERRORS.labels("postgres").inc()
+
+
 async def main():
     async with async_session() as session:
         result = await session.execute(text("SELECT version();"))
@@ -3,6 +3,8 @@ import logging
 import os
 from contextlib import asynccontextmanager
 
+from api.body_limit import BodySizeLimitMiddleware
+from api.dependencies import get_event_hub
 from api.routes import (
     assignments,
     confidence_flags,
@@ -14,8 +16,9 @@ from api.routes import (
     users,
 )
 from core.job_queue import start as start_job_queue
+from core.metrics import CONTENT_TYPE, REGISTRY
 from db.session import engine
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 from logs import setup_logging
 from settings import settings
@@ -35,9 +38,12 @@ async def lifespan(app: FastAPI):
     app.state.job_queue = asyncio.create_task(start_job_queue())
     logger.info("Job queue started successfully")
 
+    # Subscribe before the first stream opens, not on its request.
+    get_event_hub().start()
+
     if settings.app_env == "local":
         from ai_grader.main import start as start_ai_grader_worker
-        from ocr.main import start as start_ocr_worker
+        from OCR.main import start as start_ocr_worker
         from sandbox.sandbox_worker import start as start_sandbox_worker
 
         app.state.ocr_worker = asyncio.create_task(start_ocr_worker())
@@ -62,6 +68,8 @@ async def lifespan(app: FastAPI):
             pass
         logger.debug("Job queue shut down successfully")
 
+        await get_event_hub().stop()
+
         if settings.app_env == "local":
             app.state.ocr_worker.cancel()
             try:
@@ -89,6 +97,11 @@ async def lifespan(app: FastAPI):
 
 app = FastAPI(lifespan=lifespan)
 
+app.add_middleware(
+    BodySizeLimitMiddleware,
+    limits={"/submissions/bulk": settings.bulk_submission_max_upload_bytes},
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["http://localhost:3000"],
@@ -114,4 +127,10 @@ app.include_router(
 )
 app.include_router(generate_report.router, prefix="/reports", tags=["reports"])
 
+
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    return Response(await REGISTRY.render(), media_type=CONTENT_TYPE)
+
+
 logger.info("All routers registered successfully")
@@ -0,0 +1,154 @@
+"""
+Bounded capture of program output.
+
+A program printing in a loop until its timeout can write hundreds of MB.
+``OutputCapture`` consumes a stream chunk by chunk and keeps only the first
+``SANDBOX_OUTPUT_HEAD_BYTES`` and last ``SANDBOX_OUTPUT_TAIL_BYTES``, joined
+by a truncation marker, along with the total byte count and a SHA-256 of the
+full stream.
+
+It also hashes the stream with leading and trailing whitespace stripped, so
+``run_test_cases`` can compare a truncated output against the expected output
+without ever holding the whole stream.
+"""
+
+import asyncio
+import hashlib
+import os
+import stat
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO
+
+from settings import settings
+
+# ASCII whitespace, as ``str.strip`` removes it.
+WHITESPACE = b" \t\n\r\x0b\x0c\x1c\x1d\x1e\x1f"
+READ_CHUNK_BYTES = 64 * 1024
+
+
+@dataclass
+class CapturedOutput:
+    text: str
+    total_bytes: int
+    sha256: str
+    # SHA-256 of the stream without leading and trailing whitespace.
+    stripped_sha256: str
+    truncated: bool
+
+
+class OutputCapture:
+    def __init__(
+        self,
+        head_bytes: int | None = None,
+        tail_bytes: int | None = None,
+    ):
+        self.head_bytes = (
+            settings.sandbox_output_head_bytes if head_bytes is None else head_bytes
+        )
+        self.tail_bytes = (
+            settings.sandbox_output_tail_bytes if tail_bytes is None else tail_bytes
+        )
+        self.head = bytearray()
+        self.tail = bytearray()
+        self.total_bytes = 0
+        self.digest = hashlib.sha256()
+        self.leading = True
+        # Everything after the leading whitespace; ``stripped`` is a snapshot
+        # of it taken after the last non-whitespace byte.
+        self.unstripped = hashlib.sha256()
+        self.stripped = hashlib.sha256()
+
+    def feed(self, chunk: bytes):
+        if not chunk:
+            return
+        self.total_bytes += len(chunk)
+        self.digest.update(chunk)
+        self._strip(chunk)
+
+        room = self.head_bytes - len(self.head)
+        if room > 0:
+            self.head += chunk[:room]
+            chunk = chunk[room:]
+        if chunk and self.tail_bytes > 0:
+            self.tail += chunk
+            if len(self.tail) > 2 * self.tail_bytes:
+                del self.tail[: -self.tail_bytes]
+
+    def _strip(self, chunk: bytes):
+        if self.leading:
+            chunk = chunk.lstrip(WHITESPACE)
+            if not chunk:
+                return
+            self.leading = False
+        body = chunk.rstrip(WHITESPACE)
+        if body:
+            self.unstripped.update(body)
+            self.stripped = self.unstripped.copy()
+            self.unstripped.update(chunk[len(body) :])
+        else:
+            self.unstripped.update(chunk)
+
+    def result(self) -> CapturedOutput:
+        tail = bytes(self.tail[-self.tail_bytes :]) if self.tail_bytes > 0 else b""
+        omitted = self.total_bytes - len(self.head) - len(tail)
+        text = self.head.decode(errors="replace")
+        if omitted > 0:
+            text += f"\n... [{omitted} bytes truncated] ...\n"
+        text += tail.decode(errors="replace")
+        return CapturedOutput(
+            text=text,
+            total_bytes=self.total_bytes,
+            sha256=self.digest.hexdigest(),
+            stripped_sha256=self.stripped.hexdigest(),
+            truncated=omitted > 0,
+        )
+
+
+def capture_text(text: str) -> CapturedOutput:
+    capture = OutputCapture()
+    capture.feed(text.encode())
+    return capture.result()
+
+
+async def capture_stream(stream: asyncio.StreamReader) -> CapturedOutput:
+    """Capture a pipe as the output arrives."""
+    capture = OutputCapture()
+    while chunk := await stream.read(READ_CHUNK_BYTES):
+        capture.feed(chunk)
+    return capture.result()
+
+
+def open_regular(path: Path) -> BinaryIO | None:
+    """Open a file the sandboxed program could have tampered with.
+
+    Links and other non-regular files are refused: a link planted by the
+    program would resolve against the host filesystem, and a FIFO would block.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_NOFOLLOW | os.O_NONBLOCK)
+    except OSError:
+        return None
+    if not stat.S_ISREG(os.fstat(fd).st_mode):
+        os.close(fd)
+        return None
+    return os.fdopen(fd, "rb")
+
+
+def capture_file(path: Path, fallback: str = "") -> CapturedOutput:
+    """Capture a file the sandboxed program wrote; ``fallback`` if it has none."""
+    file = open_regular(path)
+    if file is None:
+        return capture_text(fallback)
+    capture = OutputCapture()
+    with file:
+        try:
+            while chunk := file.read(READ_CHUNK_BYTES):
+                capture.feed(chunk)
+        except OSError:
+            pass
+    return capture.result()
+
+
+def stripped_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode().strip(WHITESPACE)).hexdigest()
@@ -0,0 +1,146 @@
+"""
+Content-addressed cache of compile results.
+
+Resubmissions, regrades and identical programs compile to the same classes.
+Entries are keyed by a SHA-256 of the ``compiler-image`` ID and the source
+after ``_normalize_ocr_java_keywords``. Each holds the
+``CompilationJobResult`` (diagnostics included) and the class file bytes, so
+a hit needs no compiler at all. Rebuilding the image changes its ID, so
+results from another JDK are never reused.
+
+Entries live on local disk under ``SANDBOX_COMPILE_CACHE_DIR`` (default
+``compile-cache`` in the sandbox workspace directory) and are evicted least recently used once they
+exceed ``SANDBOX_COMPILE_CACHE_MAX_BYTES`` (0 disables the cache). With
+``SANDBOX_COMPILE_CACHE_REDIS_TTL_S`` above 0 they are also shared between
+workers through Redis.
+"""
+
+import hashlib
+import logging
+import os
+from pathlib import Path
+
+from core.metrics import SANDBOX_COMPILE_CACHE_LOOKUPS
+from pydantic import BaseModel, ConfigDict, ValidationError
+from settings import settings
+
+from .schemas import CompilationJobResult
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = f"{settings.queue_namespace}:sandbox:compile-cache"
+
+
+class CompiledProgram(BaseModel):
+    model_config = ConfigDict(ser_json_bytes="base64", val_json_bytes="base64")
+
+    result: CompilationJobResult
+    # Binary class name → class file bytes; empty when compilation failed.
+    classes: dict[str, bytes] = {}
+
+
+class CompileCache:
+    def __init__(
+        self,
+        image_id: str,
+        directory: Path,
+        max_bytes: int = settings.sandbox_compile_cache_max_bytes,
+        redis_client=None,
+        redis_ttl_s: int = settings.sandbox_compile_cache_redis_ttl_s,
+    ):
+        self.image_id = image_id
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.redis_client = redis_client if redis_ttl_s > 0 else None
+        self.redis_ttl_s = redis_ttl_s
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.size = sum(path.stat().st_size for path in self._entries())
+
+    def key(self, code: str) -> str:
+        return hashlib.sha256(f"{self.image_id}\0{code}".encode()).hexdigest()
+
+    async def get(self, code: str) -> CompiledProgram | None:
+        key = self.key(code)
+        path = self._path(key)
+        try:
+            program = CompiledProgram.model_validate_json(path.read_bytes())
+            os.utime(path)  # Mark as recently used.
+            SANDBOX_COMPILE_CACHE_LOOKUPS.labels("disk").inc()
+            return program
+        except FileNotFoundError:
+            pass
+        except (OSError, ValidationError) as e:
+            logger.warning("Dropping unreadable compile cache entry %s: %s", key, e)
+            self._remove(path)
+
+        if self.redis_client is not None:
+            try:
+                data = await self.redis_client.get(f"{REDIS_PREFIX}:{key}")
+                if data is not None:
+                    program = CompiledProgram.model_validate_json(data)
+                    self._write(key, program)
+                    SANDBOX_COMPILE_CACHE_LOOKUPS.labels("redis").inc()
+                    return program
+            except Exception as e:
+                logger.warning("Compile cache lookup in Redis failed: %s", e)
+        SANDBOX_COMPILE_CACHE_LOOKUPS.labels("miss").inc()
+        return None
+
+    async def put(self, code: str, program: CompiledProgram):
+        key = self.key(code)
+        data = self._write(key, program)
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.set(
+                    f"{REDIS_PREFIX}:{key}", data, ex=self.redis_ttl_s
+                )
+            except Exception as e:
+                logger.warning("Compile cache store in Redis failed: %s", e)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / key[:2] / f"{key}.json"
+
+    def _entries(self):
+        return self.directory.glob("*/*.json")
+
+    def _write(self, key: str, program: CompiledProgram) -> str:
+        data = program.model_dump_json()
+        path = self._path(key)
+        try:
+            path.parent.mkdir(exist_ok=True)
+            previous = path.stat().st_size if path.exists() else 0
+            # Write then rename, so concurrent readers never see half an entry.
+            partial = path.with_suffix(f".{os.getpid()}.tmp")
+            partial.write_text(data)
+            partial.replace(path)
+            self.size += len(data) - previous
+            if self.size > self.max_bytes:
+                self._evict()
+        except OSError as e:
+            logger.warning("Failed to store compile cache entry %s: %s", key, e)
+        return data
+
+    def _evict(self):
+        """Drop least recently used entries down to 90% of the size limit."""
+        entries = []
+        for path in self._entries():
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        entries.sort()
+        self.size = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if self.size <= target:
+                break
+            if self._remove(path):
+                self.size -= size
+
+    def _remove(self, path: Path) -> bool:
+        try:
+            path.unlink()
+            return True
+        except OSError:
+            return False
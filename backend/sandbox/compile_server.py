@@ -0,0 +1,266 @@
+"""
+Long-lived compile servers.
+
+A cold ``compile.sh`` run starts a container and a fresh ``javac`` JVM per
+submission. Instead, ``SANDBOX_COMPILE_SERVERS`` ``compiler-image``
+containers each run ``CompileServer`` (``scripts/CompileServer.java``), a
+JVM that compiles through ``javax.tools`` with an in-memory file manager and
+answers over the container's stdin/stdout. The containers have the cold
+run's limits (256MB, no network, PID limit 50) plus a read-only root and no
+mounts, and annotation processing is off, so no student code runs in them.
+
+A server is restarted after ``SANDBOX_COMPILE_SERVER_MAX_USES`` compiles and
+whenever it crashes, times out or breaks the protocol. A compile that fails
+that way falls back to the cold container.
+"""
+
+import asyncio
+import logging
+import uuid
+from dataclasses import dataclass, field
+
+from core.metrics import DOCKER_CONTAINERS_RUNNING, DOCKER_CONTAINERS_STARTED
+from settings import settings
+
+from .schemas import CompilerDiagnostic
+
+logger = logging.getLogger(__name__)
+
+COMPILER_IMAGE = "compiler-image"
+SERVER_COMMAND = [
+    "java",
+    "-Xmx192m",
+    "-XX:+UseSerialGC",
+    "-XX:-UsePerfData",
+    # The image's CDS archive of javac's classes (see ``scripts/jvm.sh``).
+    "-Xshare:auto",
+    "-XX:SharedArchiveFile=/opt/jsg/jsg.jsa",
+    "-cp",
+    "/opt/compile-server",
+    "CompileServer",
+]
+ERROR_BACKOFF_S = 1.0
+# Prefix of the diagnostic ``CompileServer`` reports when javac itself fails.
+INTERNAL_ERROR_PREFIX = "internal compiler error"
+
+
+class CompileServerError(Exception):
+    pass
+
+
+@dataclass
+class CompileOutput:
+    success: bool
+    diagnostics: list[CompilerDiagnostic] = field(default_factory=list)
+    # Binary class name (``pkg.Main$Inner``) → class file bytes.
+    classes: dict[str, bytes] = field(default_factory=dict)
+
+    @property
+    def internal_error(self) -> bool:
+        """The compiler itself failed, so the outcome says nothing about the code."""
+        return any(
+            d.message.startswith(INTERNAL_ERROR_PREFIX) for d in self.diagnostics
+        )
+
+    def errors(self, class_name: str) -> str:
+        """The error diagnostics in javac's ``File.java:line: error: ...`` form."""
+        return "\n".join(
+            f"{class_name}.java:{d.line}: error: {d.message}"
+            for d in self.diagnostics
+            if d.kind == "ERROR"
+        )
+
+
+class CompileServer:
+    def __init__(self):
+        self.name = f"jsg-compiler-{uuid.uuid4().hex[:8]}"
+        self.proc: asyncio.subprocess.Process | None = None
+        self.uses = 0
+
+    async def start(self):
+        self.proc = await asyncio.create_subprocess_exec(
+            "docker",
+            "run",
+            "-i",
+            "--rm",
+            "--name",
+            self.name,
+            "--memory=256m",
+            "--network=none",
+            "--pids-limit=50",
+            "--read-only",
+            COMPILER_IMAGE,
+            *SERVER_COMMAND,
+            stdin=asyncio.subprocess.PIPE,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        DOCKER_CONTAINERS_STARTED.inc()
+        DOCKER_CONTAINERS_RUNNING.inc()
+        logger.debug("Compile server %s started", self.name)
+
+    async def stop(self):
+        if self.proc is None:
+            return
+        proc, self.proc = self.proc, None
+        DOCKER_CONTAINERS_RUNNING.dec()
+        if proc.returncode is None:
+            proc.stdin.close()
+            try:
+                await asyncio.wait_for(proc.wait(), timeout=ERROR_BACKOFF_S)
+            except TimeoutError:
+                proc.kill()
+                await proc.wait()
+        # Killing the docker client does not always stop the container.
+        remove = await asyncio.create_subprocess_exec(
+            "docker",
+            "rm",
+            "-f",
+            self.name,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        await remove.wait()
+        logger.debug("Compile server %s stopped", self.name)
+
+    async def compile(self, class_name: str, source: str) -> CompileOutput:
+        if self.proc is None or self.proc.returncode is not None:
+            raise CompileServerError(f"Compile server {self.name} is not running")
+        self.proc.stdin.write(encode_request(class_name, source))
+        await self.proc.stdin.drain()
+        self.uses += 1
+        try:
+            return await read_output(self.proc.stdout)
+        except CompileServerError as e:
+            raise CompileServerError(f"Compile server {self.name} exited") from e
+
+
+def encode_request(class_name: str, source: str) -> bytes:
+    body = source.encode()
+    return f"{class_name} {len(body)}\n".encode() + body
+
+
+async def read_output(stream: asyncio.StreamReader) -> CompileOutput:
+    """Read one ``CompileServer`` response."""
+    status, diagnostic_count, class_count = (await _header(stream)).split(" ")
+    output = CompileOutput(success=status == "OK")
+    for _ in range(int(diagnostic_count)):
+        kind, line, column, size = (await _header(stream)).split(" ")
+        output.diagnostics.append(
+            CompilerDiagnostic(
+                kind=kind,
+                line=int(line),
+                column=int(column),
+                message=(await _read(stream, int(size))).decode(errors="replace"),
+            )
+        )
+    for _ in range(int(class_count)):
+        binary_name, size = (await _header(stream)).split(" ")
+        output.classes[binary_name] = await _read(stream, int(size))
+    return output
+
+
+async def read_outputs(data: bytes, count: int) -> list[CompileOutput | None]:
+    """The responses to ``count`` batched requests; None past where they end."""
+    stream = asyncio.StreamReader()
+    stream.feed_data(data)
+    stream.feed_eof()
+    outputs: list[CompileOutput | None] = []
+    try:
+        while len(outputs) < count:
+            outputs.append(await read_output(stream))
+    except (CompileServerError, ValueError):
+        pass
+    return outputs + [None] * (count - len(outputs))
+
+
+async def _header(stream: asyncio.StreamReader) -> str:
+    line = await stream.readline()
+    if not line.endswith(b"\n"):
+        raise CompileServerError("Compile server output ended")
+    return line.decode().strip()
+
+
+async def _read(stream: asyncio.StreamReader, size: int) -> bytes:
+    try:
+        return await stream.readexactly(size)
+    except asyncio.IncompleteReadError as e:
+        raise CompileServerError("Compile server output ended") from e
+
+
+class CompileServers:
+    """A fixed set of compile servers, each serving one compile at a time."""
+
+    def __init__(
+        self,
+        size: int = settings.sandbox_compile_servers,
+        max_uses: int = settings.sandbox_compile_server_max_uses,
+        timeout_s: float = settings.sandbox_compile_timeout_s,
+    ):
+        self.size = size
+        self.max_uses = max(max_uses, 1)
+        self.timeout_s = timeout_s
+        self.idle: asyncio.Queue[CompileServer] = asyncio.Queue()
+        self._restarting: set[asyncio.Task] = set()
+        self._closed = False
+        self._servers: set[CompileServer] = set()
+
+    async def start(self):
+        logger.info("Starting %d compile servers...", self.size)
+        for _ in range(self.size):
+            self._restart()
+
+    async def close(self):
+        self._closed = True
+        for task in list(self._restarting):
+            task.cancel()
+        await asyncio.gather(
+            *(server.stop() for server in list(self._servers)),
+            return_exceptions=True,
+        )
+        logger.info("Compile servers closed")
+
+    async def compile(self, class_name: str, source: str) -> CompileOutput:
+        try:
+            server = await asyncio.wait_for(self.idle.get(), timeout=self.timeout_s)
+        except TimeoutError as e:
+            raise CompileServerError("No compile server became free") from e
+        healthy = False
+        try:
+            output = await asyncio.wait_for(
+                server.compile(class_name, source), timeout=self.timeout_s
+            )
+            healthy = True
+            return output
+        except TimeoutError as e:
+            raise CompileServerError(f"Compile server {server.name} timed out") from e
+        except (ValueError, OSError) as e:
+            raise CompileServerError(f"Compile server {server.name}: {e}") from e
+        finally:
+            if healthy and server.uses < self.max_uses and not self._closed:
+                self.idle.put_nowait(server)
+            else:
+                self._restart(server)
+
+    def _restart(self, old: CompileServer | None = None):
+        task = asyncio.create_task(self._replace(old))
+        self._restarting.add(task)
+        task.add_done_callback(self._restarting.discard)
+
+    async def _replace(self, old: CompileServer | None):
+        if old is not None:
+            self._servers.discard(old)
+            await old.stop()
+        while not self._closed:
+            server = CompileServer()
+            try:
+                await server.start()
+                self._servers.add(server)
+                self.idle.put_nowait(server)
+                return
+            except asyncio.CancelledError:
+                await server.stop()
+                return
+            except Exception as e:
+                logger.error("Failed to start compile server: %s", e)
+                await asyncio.sleep(ERROR_BACKOFF_S)
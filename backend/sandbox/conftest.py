@@ -0,0 +1,108 @@
+"""Fixtures shared by the sandbox test modules."""
+
+from __future__ import annotations
+
+import io
+import tarfile
+import uuid
+from datetime import UTC, datetime
+
+import pytest
+from schemas.shared import TestCase as SchemaTestCase
+
+from sandbox.schemas import (
+    CompilationJobResult,
+    JobStatus,
+    SandboxJob,
+    SandboxJobRequest,
+    SandboxResult,
+)
+
+
+@pytest.fixture(autouse=True)
+def _fresh_docker_slots(monkeypatch):
+    # The process-wide semaphore binds to the event loop of its first waiter.
+    monkeypatch.setattr("sandbox.helpers._docker_slots", None)
+
+
+@pytest.fixture
+def batch_job(tmp_path):
+    """Build a compiled job with one test case per input, its workspace in ``tmp_path``."""
+
+    def make(inputs) -> SandboxJob:
+        jid = uuid.uuid4()
+        ws = tmp_path / str(jid)
+        (ws / "input").mkdir(parents=True)
+        (ws / "out").mkdir()
+        return SandboxJob(
+            job_id=jid,
+            status=JobStatus.RUNNING,
+            created_at=datetime.now(UTC),
+            request=SandboxJobRequest(
+                job_id=jid,
+                java_code="public class Main {}",
+                test_cases=[
+                    SchemaTestCase(input=text, expected_output=f"out {text}")
+                    for text in inputs
+                ],
+            ),
+            result=SandboxResult(
+                compilation_result=CompilationJobResult(success=True, errors=None),
+                execution_result=None,
+                test_cases_results=None,
+            ),
+        )
+
+    return make
+
+
+class _FakeCacheRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+
+@pytest.fixture
+def cache_redis():
+    """The GET/SET subset of Redis the compile cache and execution memo use."""
+    return _FakeCacheRedis()
+
+
+@pytest.fixture
+def server_response():
+    """Build a compile server reply: a header, then diagnostics and class files."""
+
+    def make(status, diagnostics=(), classes=()) -> bytes:
+        body = f"{status} {len(diagnostics)} {len(classes)}\n".encode()
+        for kind, line, message in diagnostics:
+            body += f"{kind} {line} 1 {len(message.encode())}\n{message}".encode()
+        for name, data in classes:
+            body += f"{name} {len(data)}\n".encode() + data
+        return body
+
+    return make
+
+
+@pytest.fixture
+def tar_archive():
+    """Build a tar of ``{name: bytes}``; ``None`` plants a symlink to /etc/passwd."""
+
+    def make(files) -> bytes:
+        buffer = io.BytesIO()
+        with tarfile.open(fileobj=buffer, mode="w") as tar:
+            for name, data in files.items():
+                info = tarfile.TarInfo(name)
+                if data is None:
+                    info.type, info.linkname = tarfile.SYMTYPE, "/etc/passwd"
+                    tar.addfile(info)
+                else:
+                    info.size = len(data)
+                    tar.addfile(info, io.BytesIO(data))
+        return buffer.getvalue()
+
+    return make
@@ -0,0 +1,360 @@
+"""
+Docker Engine API client over the daemon's unix socket.
+
+Shelling out to the ``docker`` CLI costs a process fork, the CLI's startup
+and a fresh API connection per container. ``DockerEngine`` talks HTTP to
+``SANDBOX_DOCKER_SOCKET`` over a pool of keep-alive connections instead.
+
+It understands the fixed set of commands the sandbox issues (``run``,
+``exec``, ``rm`` and ``image inspect``, see ``run_args``) with the same
+flags and limits, so call sites keep building CLI-style argument lists and
+the CLI stays the fallback. Container output is read incrementally from the
+multiplexed log stream while the container runs, keeping only its head and
+tail (see ``capture.py``).
+
+``run_in_workspace`` and ``extract``/``archive`` move a job's files in and
+out of a container's tmpfs ``/workspace`` as tar streams over ``exec``.
+"""
+
+import logging
+import struct
+
+import httpx
+
+from .capture import OutputCapture
+
+logger = logging.getLogger(__name__)
+
+API_VERSION = "v1.41"
+# ``docker run`` exits with 125 when the daemon rejects the request.
+DAEMON_ERROR_RETURNCODE = 125
+STREAM_HEADER = struct.Struct(">BxxxL")
+SIZE_UNITS = {"b": 1, "k": 1024, "m": 1024**2, "g": 1024**3}
+STREAM_READ_BYTES = 64 * 1024
+UPGRADE_HEADERS = {"Connection": "Upgrade", "Upgrade": "tcp"}
+WORKSPACE = "/workspace"
+IDLE_COMMAND = ["sleep", "infinity"]
+# The API cannot half-close an exec's stdin, so read exactly the archive.
+EXTRACT_COMMAND = ["sh", "-c", f'head -c "$1" | tar -x -C {WORKSPACE}', "sh"]
+
+
+class UnsupportedCommandError(Exception):
+    """The command is not one ``DockerEngine`` translates; use the CLI."""
+
+
+class DockerEngineError(Exception):
+    def __init__(self, status_code: int, message: str):
+        super().__init__(f"Docker Engine API error {status_code}: {message}")
+        self.status_code = status_code
+
+
+def parse_size(value: str) -> int:
+    """``256m`` → bytes, as the CLI's ``--memory`` accepts it."""
+    value = value.strip().lower()
+    if value and value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+class RawOutput(bytearray):
+    """Keeps a stream whole, for output that is data rather than program text."""
+
+    def feed(self, chunk: bytes):
+        self.extend(chunk)
+
+
+class StreamDemuxer:
+    """Splits Docker's multiplexed stdout/stderr stream as chunks arrive.
+
+    Both streams go to an ``OutputCapture`` unless another sink is given.
+    """
+
+    def __init__(self, stdout: OutputCapture | RawOutput | None = None):
+        self.buffer = bytearray()
+        self.stdout = stdout if stdout is not None else OutputCapture()
+        self.stderr = OutputCapture()
+
+    def feed(self, chunk: bytes):
+        self.buffer += chunk
+        while len(self.buffer) >= STREAM_HEADER.size:
+            stream, size = STREAM_HEADER.unpack_from(self.buffer)
+            end = STREAM_HEADER.size + size
+            if len(self.buffer) < end:
+                return
+            payload = bytes(self.buffer[STREAM_HEADER.size : end])
+            del self.buffer[:end]
+            # 1 is stdout and 2 is stderr; 0 (stdin) is never sent here.
+            (self.stderr if stream == 2 else self.stdout).feed(payload)
+
+    def result(self) -> tuple[str, str]:
+        return self.stdout.result().text, self.stderr.result().text
+
+
+def parse_run_args(args: list[str]) -> tuple[dict, dict, str, list[str]]:
+    """``docker run`` arguments as options, an API ``HostConfig``, image and command."""
+    options = {"rm": False, "detach": False, "name": None, "labels": {}}
+    host_config: dict = {}
+    index = 0
+    while index < len(args) and args[index].startswith("-"):
+        flag, _, value = args[index].partition("=")
+        takes_value = flag in ("--name", "--label", "-v", "--tmpfs", "--memory")
+        if takes_value and not value:
+            index += 1
+            value = args[index]
+        if flag == "--rm":
+            options["rm"] = True
+        elif flag == "-d":
+            options["detach"] = True
+        elif flag == "--name":
+            options["name"] = value
+        elif flag == "--label":
+            key, _, label = value.partition("=")
+            options["labels"][key] = label
+        elif flag == "-v":
+            host_config.setdefault("Binds", []).append(value)
+        elif flag == "--tmpfs":
+            path, _, mount_options = value.partition(":")
+            host_config.setdefault("Tmpfs", {})[path] = mount_options
+        elif flag == "--memory":
+            host_config["Memory"] = parse_size(value)
+        elif flag == "--network":
+            host_config["NetworkMode"] = value
+        elif flag == "--pids-limit":
+            host_config["PidsLimit"] = int(value)
+        elif flag == "--read-only":
+            host_config["ReadonlyRootfs"] = True
+        else:
+            raise UnsupportedCommandError(f"run {flag}")
+        index += 1
+    return options, host_config, args[index], args[index + 1 :]
+
+
+class DockerEngine:
+    def __init__(
+        self,
+        socket_path: str,
+        max_connections: int = 32,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.client = httpx.AsyncClient(
+            transport=transport
+            or httpx.AsyncHTTPTransport(
+                uds=socket_path,
+                limits=httpx.Limits(
+                    max_connections=max_connections,
+                    max_keepalive_connections=max_connections,
+                ),
+            ),
+            base_url=f"http://docker/{API_VERSION}",
+            # Reads follow a container until it exits; the runs own that timeout.
+            timeout=httpx.Timeout(30, read=None, pool=None),
+        )
+
+    async def close(self):
+        await self.client.aclose()
+
+    async def ping(self) -> bool:
+        try:
+            return (await self.client.get("/_ping")).status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    async def run_args(self, args: list[str]) -> tuple[int, str, str]:
+        """Run ``docker <args>``; returns (exit code, stdout, stderr) like the CLI."""
+        try:
+            if args[:1] == ["run"]:
+                return await self._run(args[1:])
+            if args[:1] == ["exec"]:
+                return await self.exec(args[1], args[2:])
+            if args[:2] == ["rm", "-f"]:
+                for container in args[2:]:
+                    await self.remove(container)
+                return 0, "\n".join(args[2:]), ""
+            if args[:2] == ["image", "inspect"] and args[2:4] == [
+                "--format",
+                "{{.Id}}",
+            ]:
+                return 0, await self.image_id(args[4]), ""
+        except (DockerEngineError, httpx.HTTPError) as e:
+            return DAEMON_ERROR_RETURNCODE, "", str(e) or type(e).__name__
+        raise UnsupportedCommandError(" ".join(args[:2]))
+
+    async def _run(self, args: list[str]) -> tuple[int, str, str]:
+        options, host_config, image, command = parse_run_args(args)
+        container = await self.create(
+            image,
+            command,
+            host_config,
+            name=options["name"],
+            labels=options["labels"],
+        )
+        try:
+            await self._call("POST", f"/containers/{container}/start")
+            if options["detach"]:
+                return 0, container, ""
+            stdout, stderr = await self.logs(container)
+            status = await self._call("POST", f"/containers/{container}/wait")
+            return status["StatusCode"], stdout, stderr
+        finally:
+            if options["rm"]:
+                await self.remove(container)
+
+    async def run_in_workspace(
+        self, args: list[str], archive: bytes, collect: list[str]
+    ) -> tuple[int, str, str, bytes]:
+        """
+        ``docker run <args>`` for a container with a tmpfs ``/workspace``.
+
+        The container idles while ``archive`` is unpacked into the workspace,
+        runs the command through ``exec`` and hands back a tar of the
+        ``collect`` paths, so nothing is bind-mounted from the host.
+        """
+        if args[:1] != ["run"]:
+            raise UnsupportedCommandError(" ".join(args[:2]))
+        options, host_config, image, command = parse_run_args(args[1:])
+        if WORKSPACE not in host_config.get("Tmpfs", {}):
+            raise UnsupportedCommandError("run without --tmpfs /workspace")
+        try:
+            container = await self.create(
+                image, IDLE_COMMAND, host_config, labels=options["labels"]
+            )
+        except (DockerEngineError, httpx.HTTPError) as e:
+            return DAEMON_ERROR_RETURNCODE, "", str(e) or type(e).__name__, b""
+        try:
+            await self._call("POST", f"/containers/{container}/start")
+            await self.extract(container, archive)
+            returncode, stdout, stderr = await self.exec(container, command)
+            try:
+                results = await self.archive(container, collect)
+            except DockerEngineError as e:
+                logger.warning("Failed to collect %s: %s", collect, e)
+                results = b""
+            return returncode, stdout, stderr, results
+        except (DockerEngineError, httpx.HTTPError) as e:
+            return DAEMON_ERROR_RETURNCODE, "", str(e) or type(e).__name__, b""
+        finally:
+            await self.remove(container)
+
+    async def create(
+        self,
+        image: str,
+        command: list[str],
+        host_config: dict,
+        name: str | None = None,
+        labels: dict | None = None,
+    ) -> str:
+        body = {
+            "Image": image,
+            "Cmd": command,
+            "Labels": labels or {},
+            "AttachStdout": True,
+            "AttachStderr": True,
+            "NetworkDisabled": host_config.get("NetworkMode") == "none",
+            "HostConfig": host_config,
+        }
+        params = {"name": name} if name else None
+        created = await self._call(
+            "POST", "/containers/create", json=body, params=params
+        )
+        return created["Id"]
+
+    async def logs(self, container: str) -> tuple[str, str]:
+        """Follow the container's output until it exits."""
+        demuxer = StreamDemuxer()
+        params = {"follow": "1", "stdout": "1", "stderr": "1"}
+        async with self.client.stream(
+            "GET", f"/containers/{container}/logs", params=params
+        ) as response:
+            await self._check(response)
+            async for chunk in response.aiter_bytes():
+                demuxer.feed(chunk)
+        return demuxer.result()
+
+    async def exec(self, container: str, command: list[str]) -> tuple[int, str, str]:
+        returncode, demuxer = await self._exec(container, command)
+        return (returncode, *demuxer.result())
+
+    async def extract(self, container: str, archive: bytes):
+        """Unpack a tar archive into the container's ``/workspace``."""
+        command = [*EXTRACT_COMMAND, str(len(archive))]
+        returncode, demuxer = await self._exec(container, command, stdin=archive)
+        if returncode != 0:
+            stderr = demuxer.stderr.result().text
+            raise DockerEngineError(returncode, f"tar -x: {stderr}")
+
+    async def archive(self, container: str, paths: list[str]) -> bytes:
+        """A tar archive of ``paths`` under the container's ``/workspace``."""
+        command = ["tar", "-c", "-C", WORKSPACE, *paths]
+        returncode, demuxer = await self._exec(container, command, stdout=RawOutput())
+        if returncode != 0:
+            stderr = demuxer.stderr.result().text
+            raise DockerEngineError(returncode, f"tar -c: {stderr}")
+        return bytes(demuxer.stdout)
+
+    async def _exec(
+        self,
+        container: str,
+        command: list[str],
+        stdin: bytes | None = None,
+        stdout: RawOutput | None = None,
+    ) -> tuple[int, StreamDemuxer]:
+        created = await self._call(
+            "POST",
+            f"/containers/{container}/exec",
+            json={
+                "AttachStdin": stdin is not None,
+                "AttachStdout": True,
+                "AttachStderr": True,
+                "Cmd": command,
+            },
+        )
+        exec_id = created["Id"]
+        demuxer = StreamDemuxer(stdout)
+        # Writing stdin needs the raw connection, which Docker hands over
+        # after upgrading it.
+        headers = UPGRADE_HEADERS if stdin is not None else None
+        async with self.client.stream(
+            "POST",
+            f"/exec/{exec_id}/start",
+            json={"Detach": False, "Tty": False},
+            headers=headers,
+        ) as response:
+            if response.status_code == 101:
+                stream = response.extensions["network_stream"]
+                try:
+                    await stream.write(stdin)
+                    while chunk := await stream.read(STREAM_READ_BYTES):
+                        demuxer.feed(chunk)
+                finally:
+                    await stream.aclose()
+            else:
+                await self._check(response)
+                async for chunk in response.aiter_bytes():
+                    demuxer.feed(chunk)
+        inspected = await self._call("GET", f"/exec/{exec_id}/json")
+        return inspected["ExitCode"], demuxer
+
+    async def remove(self, container: str):
+        response = await self.client.delete(
+            f"/containers/{container}", params={"force": "1"}
+        )
+        if response.status_code not in (204, 404):
+            await self._check(response)
+
+    async def image_id(self, tag: str) -> str:
+        return (await self._call("GET", f"/images/{tag}/json"))["Id"]
+
+    async def _call(self, method: str, path: str, **kwargs) -> dict:
+        response = await self.client.request(method, path, **kwargs)
+        await self._check(response)
+        return response.json() if response.content else {}
+
+    async def _check(self, response: httpx.Response):
+        if response.status_code < 400:
+            return
+        await response.aread()
+        try:
+            message = response.json().get("message", response.text)
+        except ValueError:
+            message = response.text
+        raise DockerEngineError(response.status_code, message)
@@ -0,0 +1,156 @@
+"""
+Memoized test case runs.
+
+Regrading after a rubric change runs the same programs on the same inputs
+again. A run's outcome is memoized under a SHA-256 of the ``executer-image``
+ID, the compiled class files, the run limits and the input, and replayed
+instead of starting a container.
+
+Only deterministic runs are memoized. A program whose class files reference
+randomness, clocks, threads or concurrency (see ``NONDETERMINISTIC_MARKERS``)
+is never memoized, and neither is a run that timed out, was killed or
+skipped, or whose output contains identity hash codes (``Object@1b6d3586``).
+
+Entries are kept in memory for ``SANDBOX_EXECUTION_MEMO_TTL_S``, evicted
+least recently used beyond ``SANDBOX_EXECUTION_MEMO_MAX_BYTES``, and shared
+between workers through Redis with the same TTL.
+"""
+
+import hashlib
+import logging
+import re
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+from core.metrics import SANDBOX_EXECUTION_MEMO_LOOKUPS
+from settings import settings
+
+from .schemas import CaseRun
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = f"{settings.queue_namespace}:sandbox:execution-memo"
+# Constant-pool strings of APIs whose results vary between runs. Matching is
+# by substring, so "Random" covers SecureRandom and ThreadLocalRandom and
+# "random" covers Math.random and UUID.randomUUID.
+NONDETERMINISTIC_MARKERS = (
+    b"Random",
+    b"random",
+    b"currentTimeMillis",
+    b"nanoTime",
+    b"java/time/",
+    b"java/util/Date",
+    b"java/util/Calendar",
+    b"java/lang/Thread",
+    b"java/lang/Runtime",
+    b"java/util/concurrent",
+    b"parallel",
+    b"identityHashCode",
+    b"getenv",
+)
+IDENTITY_HASH = re.compile(r"@[0-9a-f]{5,8}\b")
+# ``timeout`` (124), docker (125-127) and signals (128+).
+UNSTABLE_RETURNCODE = 124
+# A single entry may take at most this share of the memory budget.
+MAX_ENTRY_SHARE = 0.05
+
+
+def program_hash(workspace: Path) -> str | None:
+    """Hash of the class files in ``compiled/``; None if nondeterministic."""
+    digest = hashlib.sha256()
+    compiled = workspace / "compiled"
+    for path in sorted(compiled.rglob("*.class")):
+        data = path.read_bytes()
+        if any(marker in data for marker in NONDETERMINISTIC_MARKERS):
+            return None
+        digest.update(str(path.relative_to(compiled)).encode() + b"\0")
+        digest.update(data)
+    return digest.hexdigest()
+
+
+def is_stable(run: CaseRun) -> bool:
+    if run.skipped:
+        return False
+    return run.returncode < UNSTABLE_RETURNCODE and not IDENTITY_HASH.search(
+        run.stdout + run.stderr
+    )
+
+
+class ExecutionMemo:
+    def __init__(
+        self,
+        image_id: str,
+        limits: str,
+        max_bytes: int = settings.sandbox_execution_memo_max_bytes,
+        ttl_s: int = settings.sandbox_execution_memo_ttl_s,
+        redis_client=None,
+        clock=time.monotonic,
+    ):
+        self.image_id = image_id
+        self.limits = limits
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self.redis_client = redis_client
+        self.clock = clock
+        # key → (expires_at, size, run), least recently used first.
+        self.entries: OrderedDict[str, tuple[float, int, CaseRun]] = OrderedDict()
+        self.size = 0
+
+    def key(self, program: str, input_text: str) -> str:
+        digest = hashlib.sha256()
+        for part in (self.image_id, program, self.limits, input_text):
+            digest.update(part.encode() + b"\0")
+        return digest.hexdigest()
+
+    async def get(self, program: str, input_text: str) -> CaseRun | None:
+        key = self.key(program, input_text)
+        entry = self.entries.get(key)
+        if entry is not None:
+            expires_at, size, run = entry
+            if expires_at > self.clock():
+                self.entries.move_to_end(key)
+                SANDBOX_EXECUTION_MEMO_LOOKUPS.labels("memory").inc()
+                return run
+            self._drop(key)
+
+        if self.redis_client is not None:
+            try:
+                data = await self.redis_client.get(f"{REDIS_PREFIX}:{key}")
+                if data is not None:
+                    run = CaseRun.model_validate_json(data)
+                    self._remember(key, run, len(data))
+                    SANDBOX_EXECUTION_MEMO_LOOKUPS.labels("redis").inc()
+                    return run
+            except Exception as e:
+                logger.warning("Execution memo lookup in Redis failed: %s", e)
+        SANDBOX_EXECUTION_MEMO_LOOKUPS.labels("miss").inc()
+        return None
+
+    async def put(self, program: str, input_text: str, run: CaseRun):
+        if not is_stable(run):
+            return
+        data = run.model_dump_json()
+        if len(data) > self.max_bytes * MAX_ENTRY_SHARE:
+            return
+        key = self.key(program, input_text)
+        self._remember(key, run, len(data))
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.set(
+                    f"{REDIS_PREFIX}:{key}", data, ex=self.ttl_s
+                )
+            except Exception as e:
+                logger.warning("Execution memo store in Redis failed: %s", e)
+
+    def _remember(self, key: str, run: CaseRun, size: int):
+        self._drop(key)
+        self.entries[key] = (self.clock() + self.ttl_s, size, run)
+        self.size += size
+        while self.size > self.max_bytes and self.entries:
+            self._drop(next(iter(self.entries)))
+
+    def _drop(self, key: str):
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
@@ -0,0 +1,136 @@
+"""
+Fail-fast execution of test cases.
+
+A program stuck in a loop runs into the per-case timeout on every input, so
+without a policy a job with N test cases holds a container for N times the
+timeout. ``ExecutionPolicy`` stops a job's test cases early:
+
+- after ``SANDBOX_MAX_CONSECUTIVE_TIMEOUTS`` cases in a row timed out, and
+- once its cases have run for ``SANDBOX_JOB_MAX_WALL_S`` in total; the case
+  running at that point finishes, no new one starts.
+
+Both are off by default. Only the wall time measured inside the container
+counts against the budget, never time spent waiting for a Docker slot, a
+warm container or a parallel fork, so host load does not change grades.
+
+The cases not run come back as skipped runs (``CaseRun.skipped``) with the
+reason, which ``run_test_cases`` passes on to the test case results.
+
+``RuntimeHistory`` remembers how long each input took, so a job's inputs can
+run fastest first and the slow ones are the ones the policy skips.
+"""
+
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from pathlib import Path
+
+from core.metrics import SANDBOX_TEST_CASES_SKIPPED
+from settings import settings
+
+from .schemas import CaseRun
+
+# Written by ``execute_batch.sh`` next to the outputs of a case it skipped.
+SKIP_TIMEOUTS = "timeouts"
+SKIP_DEADLINE = "deadline"
+SKIP_MESSAGES = {
+    SKIP_TIMEOUTS: "Not run: the test cases before it timed out one after another",
+    SKIP_DEADLINE: "Not run: the job reached its time limit for running test cases",
+}
+# Exit code reported for a skipped case.
+SKIPPED_RETURNCODE = -1
+POLICY_FILE = Path("input") / "policy"
+HISTORY_MAX_ENTRIES = 10_000
+
+
+@dataclass
+class ExecutionPolicy:
+    # 0 disables either limit.
+    max_consecutive_timeouts: int = 0
+    max_wall_s: float = 0
+    # Wall time the cases run under this policy took so far.
+    spent_s: float = 0
+
+    @classmethod
+    def from_settings(cls) -> "ExecutionPolicy":
+        return cls(
+            settings.sandbox_max_consecutive_timeouts, settings.sandbox_job_max_wall_s
+        )
+
+    def fork(self) -> "ExecutionPolicy":
+        """A copy for one parallel chunk, which charges its own cases."""
+        return replace(self)
+
+    def charge(self, run: CaseRun):
+        self.spent_s += run.wall_time_s or 0.0
+
+    def remaining_s(self) -> float | None:
+        if self.max_wall_s <= 0:
+            return None
+        return max(0.0, self.max_wall_s - self.spent_s)
+
+    def skip_reason(self, consecutive_timeouts: int) -> str | None:
+        """Why the next case should not start; None to run it."""
+        if 0 < self.max_consecutive_timeouts <= consecutive_timeouts:
+            return SKIP_TIMEOUTS
+        if self.remaining_s() == 0:
+            return SKIP_DEADLINE
+        return None
+
+    def stage(self, workspace: Path):
+        """Hand the policy to ``execute_batch.sh`` as "<timeouts> <seconds left>"."""
+        remaining = self.remaining_s()
+        seconds = 0 if remaining is None else max(remaining, 0.01)
+        path = workspace / POLICY_FILE
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(f"{self.max_consecutive_timeouts} {seconds:.2f}\n")
+
+
+class RuntimeHistory:
+    """Moving average of the wall time per input, least recently used evicted."""
+
+    def __init__(self, max_entries: int = HISTORY_MAX_ENTRIES, weight: float = 0.5):
+        self.max_entries = max_entries
+        self.weight = weight
+        self.entries: OrderedDict[str, float] = OrderedDict()
+
+    def estimate(self, text: str) -> float | None:
+        key = _key(text)
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def record(self, text: str, run: CaseRun):
+        if run.skipped or run.wall_time_s is None:
+            return
+        key = _key(text)
+        previous = self.entries.pop(key, None)
+        self.entries[key] = (
+            run.wall_time_s
+            if previous is None
+            else previous + self.weight * (run.wall_time_s - previous)
+        )
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    def order(self, inputs: list[str]) -> list[int]:
+        """Indices of ``inputs``, fastest first; inputs never seen count as instant."""
+        estimates = [self.estimate(text) for text in inputs]
+        return sorted(range(len(inputs)), key=lambda index: estimates[index] or 0.0)
+
+
+def skipped_run(reason: str) -> CaseRun:
+    SANDBOX_TEST_CASES_SKIPPED.labels(reason).inc()
+    message = SKIP_MESSAGES[reason]
+    return CaseRun(
+        returncode=SKIPPED_RETURNCODE,
+        stdout="",
+        stderr=message,
+        skipped=True,
+        skip_reason=message,
+    )
+
+
+def _key(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
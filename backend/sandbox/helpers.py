@@ -1,50 +1,106 @@
 import asyncio
+import hashlib
+import io
 import logging
 import os
 import re
 import shutil
 import subprocess
 import sys
+import tarfile
 import uuid
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Protocol
+
+from core.metrics import (
+    DOCKER_CONTAINERS_RUNNING,
+    DOCKER_CONTAINERS_STARTED,
+    track_call,
+)
+from settings import settings
+
+from .capture import (
+    CapturedOutput,
+    OutputCapture,
+    capture_file,
+    capture_stream,
+    capture_text,
+    open_regular,
+)
+from .compile_cache import CompiledProgram
+from .compile_server import CompileOutput, CompileServerError
+from .docker_engine import UnsupportedCommandError
+from .execution_memo import program_hash
+from .fail_fast import SKIP_MESSAGES, skipped_run
+from .schemas import CaseRun
 
 SANDBOX_DIR = Path(__file__).parent
 SANDBOX_DOCKER_DIR = SANDBOX_DIR / "docker"
-SANDBOX_TMP_DIR = SANDBOX_DIR / "tmp"
+SANDBOX_TMP_DIR = Path(settings.sandbox_workspace_dir or SANDBOX_DIR / "tmp")
 SANDBOX_HOST_TMP_PATH = Path(os.getenv("SANDBOX_HOST_TMP_PATH", str(SANDBOX_TMP_DIR)))
 
 logger = logging.getLogger(__name__)
 
+_executer_pool = None
+_compile_servers = None
+_compile_cache = None
+_execution_memo = None
+_runtime_history = None
+_docker_slots: asyncio.Semaphore | None = None
+_docker_engine = None
+_container_runner = None
+# Binary class names as reported by the compile server, e.g. ``pkg.Main$1``.
+_BINARY_NAME = re.compile(r"^[\w$]+(\.[\w$]+)*$")
+
+SANDBOX_IMAGES = {
+    "compiler-image": "Dockerfile.compiler",
+    "executer-image": "Dockerfile.executer",
+}
+# Image label holding ``image_content_hash`` of what the image was built from.
+IMAGE_CONTENT_LABEL = "jsg.sandbox.content"
+
+EXECUTE_SCRIPT = "/scripts/execute.sh"
+EXECUTE_BATCH_SCRIPT = "/scripts/execute_batch.sh"
+# ``execute.sh`` stops a program after CASE_TIMEOUT_S; RUN_TIMEOUT_S bounds a
+# whole single-case run, docker overhead included.
+CASE_TIMEOUT_S = 10
+RUN_TIMEOUT_S = 20
+# ``timeout``'s exit code, and what the JVM prints when its heap runs out.
+TIMEOUT_RETURNCODE = 124
+OUT_OF_MEMORY_ERROR = "java.lang.OutOfMemoryError"
+# Harness files (``.code``, ``.time``, ``.usage``) hold a line of numbers.
+HARNESS_FILE_BYTES = 4096
+# Mount options of the tmpfs ``/workspace`` (see ``_tmpfs_workspaces``).
+WORKSPACE_TMPFS = (
+    f"/workspace:rw,noexec,nosuid,nodev,size={settings.sandbox_tmpfs_size},mode=1777"
+)
+# Everything besides the program and its input that decides a run's outcome.
+EXECUTION_LIMITS = f"timeout={CASE_TIMEOUT_S} memory=256m pids=50 network=none"
 
-async def _docker_build_image(tag: str, dockerfile_path: Path) -> None:
+
+async def _docker_build_image(tag: str, dockerfile_path: Path, content: str) -> None:
     logger.debug("Building Docker image '%s' from %s", tag, dockerfile_path.name)
+    cmd = [
+        "docker",
+        "build",
+        "-t",
+        tag,
+        "--label",
+        f"{IMAGE_CONTENT_LABEL}={content}",
+        "-f",
+        str(dockerfile_path),
+        str(SANDBOX_DIR),
+    ]
     if sys.platform == "win32":
-        result = subprocess.run(
-            [
-                "docker",
-                "build",
-                "-t",
-                tag,
-                "-f",
-                str(dockerfile_path),
-                str(SANDBOX_DIR),
-            ],
-            capture_output=True,
-            text=True,
-        )
+        result = subprocess.run(cmd, capture_output=True, text=True)
         if result.returncode != 0:
             err = result.stderr or result.stdout or "(no output)"
             logger.error("Failed to build Docker image '%s': %s", tag, err)
             raise RuntimeError(f"Failed to build {tag}: {err}")
     else:
         proc = await asyncio.create_subprocess_exec(
-            "docker",
-            "build",
-            "-t",
-            tag,
-            "-f",
-            str(dockerfile_path),
-            str(SANDBOX_DIR),
+            *cmd,
             stdout=asyncio.subprocess.PIPE,
             stderr=asyncio.subprocess.PIPE,
         )
@@ -56,26 +112,81 @@ async def _docker_build_image(tag: str, dockerfile_path: Path) -> None:
     logger.debug("Docker image '%s' built successfully", tag)
 
 
+def image_content_hash(dockerfile_path: Path) -> str:
+    """SHA-256 of a Dockerfile and every file under ``scripts/`` it can copy."""
+    scripts = sorted(
+        path for path in (SANDBOX_DIR / "scripts").rglob("*") if path.is_file()
+    )
+    digest = hashlib.sha256()
+    for path in [dockerfile_path, *scripts]:
+        data = path.read_bytes()
+        name = path.relative_to(SANDBOX_DIR).as_posix().encode()
+        digest.update(b"%d:%s:%d:" % (len(name), name, len(data)))
+        digest.update(data)
+    return digest.hexdigest()
+
+
+async def _image_content(tag: str) -> str | None:
+    """The content hash label of a local image; None if there is no such image."""
+    returncode, stdout, _ = await run_container(
+        [
+            "docker",
+            "image",
+            "inspect",
+            "--format",
+            f'{{{{index .Config.Labels "{IMAGE_CONTENT_LABEL}"}}}}',
+            tag,
+        ]
+    )
+    return stdout.strip() if returncode == 0 else None
+
+
+async def _pull_image(tag: str, content: str) -> bool:
+    """Pull ``{SANDBOX_IMAGE_REGISTRY}/{tag}:{content}`` and tag it as ``tag``."""
+    reference = f"{settings.sandbox_image_registry.rstrip('/')}/{tag}:{content}"
+    returncode, _, stderr = await run_container(["docker", "pull", reference])
+    if returncode != 0:
+        logger.warning("Failed to pull '%s': %s", reference, stderr.strip())
+        return False
+    returncode, _, stderr = await run_container(["docker", "tag", reference, tag])
+    if returncode != 0:
+        logger.warning("Failed to tag '%s': %s", reference, stderr.strip())
+        return False
+    return await _image_content(tag) == content
+
+
+async def _prepare_image(tag: str, dockerfile_path: Path) -> None:
+    """Make sure ``tag`` was built from the current Dockerfile and scripts."""
+    content = image_content_hash(dockerfile_path)
+    if await _image_content(tag) == content:
+        logger.info("Docker image '%s' is up to date (%s)", tag, content[:12])
+        return
+    mode = settings.sandbox_image_mode
+    if mode == "verify":
+        raise RuntimeError(f"{tag} is missing or was not built from {content[:12]}")
+    if mode == "pull" and settings.sandbox_image_registry:
+        if await _pull_image(tag, content):
+            logger.info("Pulled Docker image '%s' (%s)", tag, content[:12])
+            return
+        logger.warning("Building '%s' after the pull failed", tag)
+    await _docker_build_image(tag, dockerfile_path, content)
+
+
 async def docker_build_images():
-    logger.info("Building sandbox Docker images...")
+    """Build, pull or verify the sandbox images (see ``SANDBOX_IMAGE_MODE``)."""
+    logger.info("Preparing sandbox Docker images...")
     if sys.platform == "win32":
         # Sequential builds to avoid Windows Docker contention
-        await _docker_build_image(
-            "compiler-image", SANDBOX_DOCKER_DIR / "Dockerfile.compiler"
-        )
-        await _docker_build_image(
-            "executer-image", SANDBOX_DOCKER_DIR / "Dockerfile.executer"
-        )
+        for tag, dockerfile in SANDBOX_IMAGES.items():
+            await _prepare_image(tag, SANDBOX_DOCKER_DIR / dockerfile)
     else:
         await asyncio.gather(
-            _docker_build_image(
-                "compiler-image", SANDBOX_DOCKER_DIR / "Dockerfile.compiler"
-            ),
-            _docker_build_image(
-                "executer-image", SANDBOX_DOCKER_DIR / "Dockerfile.executer"
-            ),
+            *(
+                _prepare_image(tag, SANDBOX_DOCKER_DIR / dockerfile)
+                for tag, dockerfile in SANDBOX_IMAGES.items()
+            )
         )
-    logger.info("All sandbox Docker images built successfully")
+    logger.info("All sandbox Docker images are ready")
 
 
 def _normalize_ocr_java_keywords(java_code: str) -> str:
@@ -114,14 +225,192 @@ def _cleanup_workspace(job_id: uuid.UUID):
         logger.debug("No workspace to clean up for job %s", job_id)
 
 
+def use_compile_servers(servers) -> None:
+    """Compile through started ``CompileServers`` (None: cold compiles)."""
+    global _compile_servers
+    _compile_servers = servers
+
+
+def _compile_servers_running() -> bool:
+    return _compile_servers is not None
+
+
+async def _compile_in_server(class_name: str, code: str) -> CompileOutput | None:
+    """Compile with a warm compile server; None when none is available."""
+    if _compile_servers is None:
+        return None
+    try:
+        return await _compile_servers.compile(class_name, code)
+    except CompileServerError as e:
+        logger.warning("Compile server unavailable, compiling cold: %s", e)
+        return None
+
+
+def use_compile_cache(cache) -> None:
+    """Reuse compile results from a ``CompileCache`` (None: always compile)."""
+    global _compile_cache
+    _compile_cache = cache
+
+
+async def _cached_compile(code: str) -> CompiledProgram | None:
+    if _compile_cache is None:
+        return None
+    return await _compile_cache.get(code)
+
+
+async def _store_compile(code: str, program: CompiledProgram) -> None:
+    if _compile_cache is not None:
+        await _compile_cache.put(code, program)
+
+
+def use_execution_memo(memo) -> None:
+    """Replay deterministic runs from an ``ExecutionMemo`` (None: always run)."""
+    global _execution_memo
+    _execution_memo = memo
+
+
+async def _recall_runs(
+    workspace: Path, inputs: list[str]
+) -> tuple[str | None, list[CaseRun | None]]:
+    """The program's hash (None: not memoizable) and any memoized run per input."""
+    if _execution_memo is None:
+        return None, [None] * len(inputs)
+    program = program_hash(workspace)
+    if program is None:
+        return None, [None] * len(inputs)
+    return program, [await _execution_memo.get(program, text) for text in inputs]
+
+
+async def _memoize_runs(
+    program: str | None, inputs: list[str], runs: list[CaseRun]
+) -> None:
+    if _execution_memo is None or program is None:
+        return
+    for text, run in zip(inputs, runs, strict=True):
+        await _execution_memo.put(program, text, run)
+
+
+def use_runtime_history(history) -> None:
+    """Run inputs fastest first by a ``RuntimeHistory`` (None: in test case order)."""
+    global _runtime_history
+    _runtime_history = history
+
+
+def _runtime_order(inputs: list[str]) -> list[int]:
+    if _runtime_history is None:
+        return list(range(len(inputs)))
+    return _runtime_history.order(inputs)
+
+
+def _record_runtimes(inputs: list[str], runs: list[CaseRun]) -> None:
+    if _runtime_history is None:
+        return
+    for text, run in zip(inputs, runs, strict=True):
+        _runtime_history.record(text, run)
+
+
+async def _image_id(tag: str) -> str | None:
+    returncode, stdout, stderr = await run_container(
+        ["docker", "image", "inspect", "--format", "{{.Id}}", tag]
+    )
+    if returncode != 0:
+        logger.error("Failed to inspect image '%s': %s", tag, stderr.strip())
+        return None
+    return stdout.strip()
+
+
+def _read_classes(workspace: Path) -> dict[str, bytes]:
+    """Class files under ``compiled/``, keyed by binary class name."""
+    compiled = workspace / "compiled"
+    return {
+        ".".join(path.relative_to(compiled).with_suffix("").parts): path.read_bytes()
+        for path in compiled.rglob("*.class")
+        if path.is_file()
+    }
+
+
+def _write_classes(workspace: Path, classes: dict[str, bytes]) -> None:
+    compiled = workspace / "compiled"
+    for binary_name, data in classes.items():
+        if not _BINARY_NAME.match(binary_name):
+            raise ValueError(f"Invalid class name from compiler: {binary_name!r}")
+        path = compiled.joinpath(*binary_name.split(".")).with_suffix(".class")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+
+
+class ContainerRunner(Protocol):
+    """A backend for the sandbox's ``docker`` commands (``SANDBOX_RUNNER``).
+
+    ``run_args`` takes the arguments after ``docker`` and returns (exit code,
+    stdout, stderr) like the CLI. It raises ``UnsupportedCommandError`` for
+    commands it leaves to the Docker Engine API or the CLI.
+    """
+
+    async def run_args(self, args: list[str]) -> tuple[int, str, str]: ...
+
+
+def use_container_runner(runner: ContainerRunner | None) -> None:
+    """Run containers with ``runner`` (None: docker)."""
+    global _container_runner
+    _container_runner = runner
+
+
+def use_docker_engine(engine) -> None:
+    """Send docker commands to a ``DockerEngine`` (None: the docker CLI)."""
+    global _docker_engine
+    _docker_engine = engine
+
+
 def _run_container_sync(cmd: list[str]) -> tuple[int, str, str]:
     """Sync container run for Windows (avoids asyncio subprocess issues)."""
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    return result.returncode, result.stdout, result.stderr
+    result = subprocess.run(cmd, capture_output=True)
+    return (
+        result.returncode,
+        _capture_bytes(result.stdout).text,
+        _capture_bytes(result.stderr).text,
+    )
+
+
+def _capture_bytes(data: bytes) -> CapturedOutput:
+    capture = OutputCapture()
+    capture.feed(data)
+    return capture.result()
+
+
+@contextmanager
+def _count_container(cmd: list[str]):
+    starts_container = cmd[1:2] == ["run"]
+    # Detached (warm pool) containers are counted as running by their owner.
+    attached = starts_container and "-d" not in cmd
+    if starts_container:
+        DOCKER_CONTAINERS_STARTED.inc()
+    if attached:
+        DOCKER_CONTAINERS_RUNNING.inc()
+    try:
+        with track_call("docker"):
+            yield
+    finally:
+        if attached:
+            DOCKER_CONTAINERS_RUNNING.dec()
 
 
 async def run_container(cmd: list[str]) -> tuple[int, str, str]:
     logger.debug("Running container: %s", " ".join(cmd[:6]))
+    with _count_container(cmd):
+        return await _run_container(cmd)
+
+
+async def _run_container(cmd: list[str]) -> tuple[int, str, str]:
+    # The runner backend (see ``use_container_runner``), then the Engine API,
+    # then the CLI, for whatever the previous one does not handle.
+    for runner in (_container_runner, _docker_engine):
+        if runner is None:
+            continue
+        try:
+            return await runner.run_args(cmd[1:])
+        except UnsupportedCommandError:
+            pass
     if sys.platform == "win32":
         return await asyncio.to_thread(_run_container_sync, cmd)
     proc = await asyncio.create_subprocess_exec(
@@ -129,15 +418,132 @@ async def run_container(cmd: list[str]) -> tuple[int, str, str]:
         stdout=asyncio.subprocess.PIPE,
         stderr=asyncio.subprocess.PIPE,
     )
-    stdout, stderr = await proc.communicate()
+    # Read both pipes as the output arrives, keeping only its head and tail.
+    stdout, stderr = await asyncio.gather(
+        capture_stream(proc.stdout), capture_stream(proc.stderr)
+    )
+    await proc.wait()
     logger.debug("Container exited with code %d", proc.returncode)
-    return proc.returncode, stdout.decode(), stderr.decode()
+    return proc.returncode, stdout.text, stderr.text
+
+
+def _tmpfs_workspaces() -> bool:
+    """Stream workspaces into tmpfs mounts instead of bind-mounting them."""
+    return _docker_engine is not None and settings.sandbox_tmpfs_workspaces
+
+
+def _pack_workspace(workspace: Path, paths: list[str]) -> bytes:
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode="w") as tar:
+        for path in paths:
+            if (workspace / path).exists():
+                tar.add(workspace / path, arcname=path)
+    return buffer.getvalue()
+
+
+def _result_filter(member: tarfile.TarInfo, path: str) -> tarfile.TarInfo | None:
+    # Links and devices a program planted are dropped, like ``_read_text`` does.
+    if not (member.isfile() or member.isdir()):
+        return None
+    try:
+        return tarfile.data_filter(member, path)
+    except tarfile.FilterError:
+        return None
+
+
+def _unpack_workspace(workspace: Path, archive: bytes) -> None:
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        tar.extractall(workspace, filter=_result_filter)
+
+
+async def run_workspace_container(
+    cmd: list[str], workspace: Path, stage: list[str], collect: list[str]
+) -> tuple[int, str, str]:
+    """
+    ``docker run`` with a tmpfs ``/workspace`` (``WORKSPACE_TMPFS`` in ``cmd``).
+
+    ``stage`` paths of the job's workspace are streamed in before the command
+    runs and ``collect`` paths are streamed back afterwards.
+    """
+    archive = _pack_workspace(workspace, stage)
+    logger.debug("Running container in a tmpfs workspace: %s", " ".join(cmd[:6]))
+    with _count_container(cmd):
+        returncode, stdout, stderr, results = await _docker_engine.run_in_workspace(
+            cmd[1:], archive, collect
+        )
+    if results:
+        _unpack_workspace(workspace, results)
+    return returncode, stdout, stderr
+
+
+async def stage_workspace(container: str, workspace: Path, paths: list[str]) -> None:
+    """Stream ``paths`` of the job's workspace into a running container's tmpfs."""
+    with track_call("docker"):
+        await _docker_engine.extract(container, _pack_workspace(workspace, paths))
+
+
+async def collect_workspace(container: str, workspace: Path, paths: list[str]) -> None:
+    """Stream ``paths`` of a running container's tmpfs back to the job."""
+    with track_call("docker"):
+        _unpack_workspace(workspace, await _docker_engine.archive(container, paths))
+
+
+def docker_slot_count() -> int:
+    """Concurrent sandbox containers allowed; never more than the host's CPUs."""
+    cpus = os.cpu_count() or 1
+    configured = settings.sandbox_docker_max_concurrency
+    return min(configured, cpus) if configured > 0 else cpus
+
+
+def docker_slots() -> asyncio.Semaphore:
+    """Process-wide bound on running sandbox containers, shared by all jobs."""
+    global _docker_slots
+    if _docker_slots is None:
+        _docker_slots = asyncio.Semaphore(docker_slot_count())
+    return _docker_slots
+
+
+def _fork_workspace(workspace: Path, index: int) -> Path:
+    """A sibling workspace with the same classes, for one parallel chunk."""
+    fork = workspace.with_name(f"{workspace.name}-{index}")
+    if (workspace / "compiled").is_dir():
+        shutil.copytree(workspace / "compiled", fork / "compiled", dirs_exist_ok=True)
+    for sub in ("compiled", "input", "out"):
+        (fork / sub).mkdir(parents=True, exist_ok=True)
+    return fork
+
+
+def use_executer_pool(pool) -> None:
+    """Route execution runs through a started ``ExecuterPool`` (None: cold runs)."""
+    global _executer_pool
+    _executer_pool = pool
 
 
 async def _run_execution_container(
-    workspace: Path, class_name: str
+    workspace: Path,
+    class_name: str,
+    script: str = EXECUTE_SCRIPT,
+    timeout_s: float = RUN_TIMEOUT_S,
+) -> tuple[int, str, str]:
+    async with docker_slots():
+        if _executer_pool is not None:
+            return await _executer_pool.run(workspace, class_name, script, timeout_s)
+        return await _run_cold_execution_container(workspace, class_name, script)
+
+
+async def _run_cold_execution_container(
+    workspace: Path, class_name: str, script: str = EXECUTE_SCRIPT
 ) -> tuple[int, str, str]:
     logger.debug("Running execution container for class '%s'", class_name)
+    limits = ["--memory=256m", "--network=none", "--pids-limit=50", "--read-only"]
+    command = ["executer-image", "sh", script, class_name]
+    if _tmpfs_workspaces():
+        return await run_workspace_container(
+            ["docker", "run", "--rm", "--tmpfs", WORKSPACE_TMPFS, *limits, *command],
+            workspace,
+            stage=["compiled", "input", "out"],
+            collect=["out"],
+        )
     return await run_container(
         [
             "docker",
@@ -145,13 +551,111 @@ async def _run_execution_container(
             "--rm",
             "-v",
             f"{SANDBOX_HOST_TMP_PATH / workspace.name}:/workspace",
-            "--memory=256m",
-            "--network=none",
-            "--pids-limit=50",
-            "--read-only",
-            "executer-image",
-            "sh",
-            "/scripts/execute.sh",
-            class_name,
+            *limits,
+            *command,
         ]
     )
+
+
+def _stage_batch_inputs(workspace: Path, inputs: list[str]) -> None:
+    cases = workspace / "input" / "cases"
+    cases.mkdir(parents=True, exist_ok=True)
+    for index, text in enumerate(inputs):
+        (cases / f"{index:04d}.txt").write_text(text)
+
+
+def _read_batch_outputs(
+    workspace: Path, count: int, returncode: int, stderr: str
+) -> list[CaseRun]:
+    """Per-case runs recorded by the harness.
+
+    Cases the harness skipped (see ``fail_fast.py``) come back as skipped
+    runs; others without a result (the harness was killed) get the harness's
+    own exit code and error output.
+    """
+    out = workspace / "out"
+    runs = []
+    for index in range(count):
+        prefix = out / f"{index:04d}"
+        try:
+            case_code = int(_read_text(prefix.with_suffix(".code")))
+        except ValueError:
+            reason = _read_text(prefix.with_suffix(".skipped")).strip()
+            if reason in SKIP_MESSAGES:
+                runs.append(skipped_run(reason))
+                continue
+            runs.append(
+                _measured_run(
+                    prefix,
+                    returncode or 1,
+                    capture_text(""),
+                    capture_text(stderr or "No result recorded"),
+                )
+            )
+            continue
+        runs.append(
+            _measured_run(
+                prefix,
+                case_code,
+                capture_file(prefix.with_suffix(".stdout")),
+                capture_file(prefix.with_suffix(".stderr")),
+            )
+        )
+    return runs
+
+
+def _measured_run(
+    prefix: Path, returncode: int, stdout: CapturedOutput, stderr: CapturedOutput
+) -> CaseRun:
+    """A run with the wall time and usage ``measure.sh`` wrote next to ``prefix``."""
+    usage = _read_text(prefix.with_suffix(".usage")).split()
+    usage += ["-"] * (4 - len(usage))
+    oom_kills = _parse_number(usage[3], int)
+    return CaseRun(
+        returncode=returncode,
+        stdout=stdout.text,
+        stderr=stderr.text,
+        stdout_bytes=stdout.total_bytes,
+        stdout_sha256=stdout.sha256,
+        stdout_stripped_sha256=stdout.stripped_sha256,
+        stdout_truncated=stdout.truncated,
+        wall_time_s=_parse_number(_read_text(prefix.with_suffix(".time")), float),
+        cpu_user_s=_parse_number(usage[0], float),
+        cpu_sys_s=_parse_number(usage[1], float),
+        peak_rss_kb=_parse_number(usage[2], int),
+        timed_out=returncode == TIMEOUT_RETURNCODE,
+        out_of_memory=bool(oom_kills) or OUT_OF_MEMORY_ERROR in stderr.text,
+    )
+
+
+def _parse_number(text: str, kind: type):
+    try:
+        return kind(text.strip())
+    except ValueError:
+        return None
+
+
+def _read_text(path: Path) -> str:
+    """The start of a harness file; ``""`` if the program replaced it."""
+    file = open_regular(path)
+    if file is None:
+        return ""
+    with file:
+        try:
+            return file.read(HARNESS_FILE_BYTES).decode(errors="replace")
+        except OSError:
+            return ""
+
+
+async def _run_batch_execution_container(
+    workspace: Path, class_name: str, inputs: list[str]
+) -> list[CaseRun]:
+    """Run every input through one container launch of ``execute_batch.sh``."""
+    _stage_batch_inputs(workspace, inputs)
+    returncode, _, stderr = await _run_execution_container(
+        workspace,
+        class_name,
+        script=EXECUTE_BATCH_SCRIPT,
+        timeout_s=RUN_TIMEOUT_S + CASE_TIMEOUT_S * len(inputs),
+    )
+    return _read_batch_outputs(workspace, len(inputs), returncode, stderr)
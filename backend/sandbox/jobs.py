@@ -1,15 +1,49 @@
+import asyncio
 import logging
+import shutil
+import uuid
+from pathlib import Path
 
+from core.metrics import (
+    SANDBOX_TEST_CPU_SECONDS,
+    SANDBOX_TEST_PEAK_RSS_BYTES,
+    SANDBOX_TEST_WALL_SECONDS,
+)
+from settings import settings
+
+from .capture import capture_file, stripped_sha256
+from .compile_cache import CompiledProgram
+from .compile_server import SERVER_COMMAND, CompileOutput, encode_request, read_outputs
+from .fail_fast import ExecutionPolicy, skipped_run
 from .helpers import (
     SANDBOX_HOST_TMP_PATH,
     SANDBOX_TMP_DIR,
+    WORKSPACE_TMPFS,
+    _cached_compile,
+    _cleanup_workspace,
+    _compile_in_server,
+    _compile_servers_running,
     _create_workspace,
     _extract_class_name,
+    _fork_workspace,
+    _measured_run,
+    _memoize_runs,
     _normalize_ocr_java_keywords,
+    _read_classes,
+    _recall_runs,
+    _record_runtimes,
+    _run_batch_execution_container,
     _run_execution_container,
+    _runtime_order,
+    _store_compile,
+    _tmpfs_workspaces,
+    _write_classes,
+    docker_slots,
     run_container,
+    run_workspace_container,
 )
 from .schemas import (
+    CaseRun,
     CompilationJobResult,
     ExecutionJobResult,
     ExecutionOutput,
@@ -23,8 +57,14 @@ from .schemas import (
 
 logger = logging.getLogger(__name__)
 
+COMPILER_LIMITS = ["--memory=256m", "--network=none", "--pids-limit=50"]
+# Feeds a batch's requests to one ``CompileServer`` run (``"$@"``).
+COMPILE_BATCH_SCRIPT = '"$@" < /workspace/src/requests > /workspace/compiled/responses'
+
 
-async def compile_job(job: SandboxJob) -> SandboxJob | None:
+async def compile_job(
+    job: SandboxJob, precompiled: CompileOutput | None = None
+) -> SandboxJob | None:
     try:
         code = _normalize_ocr_java_keywords(job.request.java_code)
         class_name = _extract_class_name(code)
@@ -40,41 +80,161 @@ async def compile_job(job: SandboxJob) -> SandboxJob | None:
     src_file = workspace / "src" / f"{class_name}.java"
     src_file.write_text(code)
 
-    returncode, stdout, stderr = await run_container(
-        [
-            "docker",
-            "run",
-            "--rm",
-            "-v",
-            f"{SANDBOX_HOST_TMP_PATH / workspace.name}:/workspace",
-            "--memory=256m",
-            "--network=none",
-            "--pids-limit=50",
-            "compiler-image",
-            "sh",
-            "/scripts/compile.sh",
-            class_name,
-        ]
-    )
-
-    if returncode != 0:
-        logger.error(f"Compilation failed for Job {job.job_id}: {stderr}")
-        job.result = SandboxResult(
-            compilation_result=CompilationJobResult(success=False, errors=[stderr]),
-            execution_result=None,
-            test_cases_results=None,
+    program = await _cached_compile(code)
+    if program is not None:
+        logger.info(f"Job {job.job_id} reused a cached compile result")
+        _write_classes(workspace, program.classes)
+    else:
+        program, cacheable = await _compile_program(
+            workspace, class_name, code, precompiled
         )
-        return job
+        if cacheable:
+            await _store_compile(code, program)
 
     job.result = SandboxResult(
-        compilation_result=CompilationJobResult(success=True, errors=None),
+        compilation_result=program.result,
         execution_result=None,
         test_cases_results=None,
     )
-    logger.info(f"Job {job.job_id} compiled successfully")
+    if program.result.success:
+        logger.info(f"Job {job.job_id} compiled successfully")
+    else:
+        logger.error(
+            f"Compilation failed for Job {job.job_id}: {program.result.errors}"
+        )
     return job
 
 
+async def _compile_program(
+    workspace: Path,
+    class_name: str,
+    code: str,
+    precompiled: CompileOutput | None = None,
+) -> tuple[CompiledProgram, bool]:
+    """Compile into ``workspace``; also says whether the outcome may be cached."""
+    compiled = precompiled or await _compile_in_server(class_name, code)
+    if compiled is not None:
+        if compiled.success:
+            _write_classes(workspace, compiled.classes)
+        result = CompilationJobResult(
+            success=compiled.success,
+            errors=None if compiled.success else [compiled.errors(class_name)],
+            diagnostics=compiled.diagnostics,
+        )
+        return (
+            CompiledProgram(result=result, classes=compiled.classes),
+            not compiled.internal_error,
+        )
+
+    returncode, stdout, stderr = await _run_compiler_container(
+        workspace, ["sh", "/scripts/compile.sh", class_name]
+    )
+    success = returncode == 0
+    result = CompilationJobResult(success=success, errors=None if success else [stderr])
+    classes = _read_classes(workspace) if success else {}
+    # javac exits with 1 on compile errors; anything else is docker or the JVM.
+    return CompiledProgram(result=result, classes=classes), returncode in (0, 1)
+
+
+async def _run_compiler_container(
+    workspace: Path, command: list[str]
+) -> tuple[int, str, str]:
+    """A cold ``compiler-image`` run over the workspace's ``src`` and ``compiled``."""
+    async with docker_slots():
+        if _tmpfs_workspaces():
+            return await run_workspace_container(
+                [
+                    "docker",
+                    "run",
+                    "--rm",
+                    "--tmpfs",
+                    WORKSPACE_TMPFS,
+                    *COMPILER_LIMITS,
+                    "compiler-image",
+                    *command,
+                ],
+                workspace,
+                stage=["src"],
+                collect=["compiled"],
+            )
+        return await run_container(
+            [
+                "docker",
+                "run",
+                "--rm",
+                "-v",
+                f"{SANDBOX_HOST_TMP_PATH / workspace.name}:/workspace",
+                *COMPILER_LIMITS,
+                "compiler-image",
+                *command,
+            ]
+        )
+
+
+def compile_batching() -> bool:
+    return settings.sandbox_compile_batch_size > 1 and not _compile_servers_running()
+
+
+async def compile_batch(jobs: list[SandboxJob]) -> dict[uuid.UUID, CompileOutput]:
+    """
+    Compile the jobs' sources in one compiler JVM; the outputs by job ID.
+
+    Only used without compile servers, whose JVMs are warm already. Jobs left
+    out (cached, unparsable, or past the point where the batch broke) compile
+    on their own in ``compile_job``.
+    """
+    if not compile_batching():
+        return {}
+    sources: dict[uuid.UUID, tuple[str, str]] = {}
+    for job in jobs:
+        try:
+            code = _normalize_ocr_java_keywords(job.request.java_code)
+            class_name = _extract_class_name(code)
+        except ValueError:
+            continue
+        if await _cached_compile(code) is None:
+            sources[job.job_id] = (class_name, code)
+    if len(sources) < 2:
+        return {}
+    outputs = await _run_compile_batch(list(sources.values()))
+    logger.info(
+        "Compiled %d of %d sources in one batch",
+        sum(output is not None for output in outputs),
+        len(outputs),
+    )
+    return {
+        job_id: output
+        for job_id, output in zip(sources, outputs, strict=True)
+        # A compiler crash says nothing about the code; retry that one alone.
+        if output is not None and not output.internal_error
+    }
+
+
+async def _run_compile_batch(
+    sources: list[tuple[str, str]],
+) -> list[CompileOutput | None]:
+    """Run ``CompileServer`` once over every request, then read its responses."""
+    batch_id = uuid.uuid4()
+    workspace = _create_workspace(batch_id)
+    try:
+        (workspace / "src" / "requests").write_bytes(
+            b"".join(encode_request(class_name, code) for class_name, code in sources)
+        )
+        timeout_s = settings.sandbox_compile_timeout_s * len(sources)
+        returncode, _, stderr = await _run_compiler_container(
+            workspace,
+            ["timeout", str(int(timeout_s)), "sh", "-c", COMPILE_BATCH_SCRIPT]
+            + ["sh", *SERVER_COMMAND],
+        )
+        if returncode != 0:
+            logger.warning("Compile batch exited with %d: %s", returncode, stderr)
+        responses = workspace / "compiled" / "responses"
+        data = responses.read_bytes() if responses.is_file() else b""
+    finally:
+        _cleanup_workspace(batch_id)
+    return await read_outputs(data, len(sources))
+
+
 async def execute_job(job: SandboxJob) -> SandboxJob | None:
     try:
         code = _normalize_ocr_java_keywords(job.request.java_code)
@@ -92,32 +252,19 @@ async def execute_job(job: SandboxJob) -> SandboxJob | None:
 
     if not test_cases:
         input_file.write_text("")
-        returncode, stdout, stderr = await _run_execution_container(
-            workspace, class_name
-        )
-        if returncode != 0:
-            errors.append(stderr)
-        outputs.append(
-            ExecutionOutput(
-                returncode=returncode, stdout=stdout, stderr=stderr, test_case=None
-            )
-        )
+        run = await _run_measured(workspace, class_name)
+        if run.returncode != 0:
+            errors.append(run.stderr)
+        outputs.append(ExecutionOutput(**run.model_dump(), test_case=None))
     else:
-        for test_case in test_cases:
-            input_file.write_text(str(test_case.input))
-            returncode, stdout, stderr = await _run_execution_container(
-                workspace, class_name
-            )
-            if returncode != 0:
-                errors.append(stderr)
-            outputs.append(
-                ExecutionOutput(
-                    returncode=returncode,
-                    stdout=stdout,
-                    stderr=stderr,
-                    test_case=test_case,
-                )
-            )
+        inputs = [str(test_case.input) for test_case in test_cases]
+        runs = await _run_inputs(
+            workspace, class_name, inputs, ExecutionPolicy.from_settings()
+        )
+        for test_case, run in zip(test_cases, runs, strict=True):
+            if run.returncode != 0:
+                errors.append(run.stderr)
+            outputs.append(ExecutionOutput(**run.model_dump(), test_case=test_case))
 
     if errors:
         logger.error(f"Execution failed for Job {job.job_id}: {errors}")
@@ -133,6 +280,112 @@ async def execute_job(job: SandboxJob) -> SandboxJob | None:
     return job
 
 
+async def _run_inputs(
+    workspace: Path, class_name: str, inputs: list[str], policy: ExecutionPolicy
+) -> list[CaseRun]:
+    """Run the program once per input, replaying memoized runs where possible.
+
+    Fresh inputs run fastest first (see ``RuntimeHistory``) under ``policy``.
+    """
+    program, runs = await _recall_runs(workspace, inputs)
+    missing = [index for index, run in enumerate(runs) if run is None]
+    if not missing:
+        logger.info(f"All {len(inputs)} runs replayed from the execution memo")
+        return runs
+    fresh_inputs = [inputs[index] for index in missing]
+    order = _runtime_order(fresh_inputs)
+    ordered = await _execute_inputs(
+        workspace, class_name, [fresh_inputs[index] for index in order], policy
+    )
+    fresh = [None] * len(fresh_inputs)
+    for index, run in zip(order, ordered, strict=True):
+        fresh[index] = run
+    for run in fresh:
+        _observe_usage(run)
+    _record_runtimes(fresh_inputs, fresh)
+    for index, run in zip(missing, fresh, strict=True):
+        runs[index] = run
+    await _memoize_runs(program, fresh_inputs, fresh)
+    return runs
+
+
+async def _execute_inputs(
+    workspace: Path, class_name: str, inputs: list[str], policy: ExecutionPolicy
+) -> list[CaseRun]:
+    """Run the inputs in up to ``SANDBOX_JOB_PARALLELISM`` containers at once.
+
+    Each chunk of consecutive inputs runs in its own copy of the workspace;
+    results come back in input order.
+    """
+    chunk_count = max(1, min(settings.sandbox_job_parallelism, len(inputs)))
+    if chunk_count == 1:
+        return await _execute_chunk(workspace, class_name, inputs, policy)
+    size = -(-len(inputs) // chunk_count)
+    chunks = [inputs[start : start + size] for start in range(0, len(inputs), size)]
+    forks = [_fork_workspace(workspace, index) for index in range(len(chunks))]
+    try:
+        results = await asyncio.gather(
+            *(
+                _execute_chunk(fork, class_name, chunk, policy.fork())
+                for fork, chunk in zip(forks, chunks, strict=True)
+            )
+        )
+    finally:
+        for fork in forks:
+            shutil.rmtree(fork, ignore_errors=True)
+    return [run for chunk_runs in results for run in chunk_runs]
+
+
+async def _execute_chunk(
+    workspace: Path, class_name: str, inputs: list[str], policy: ExecutionPolicy
+) -> list[CaseRun]:
+    """Run the inputs one after another, skipping the rest once ``policy`` says so."""
+    reason = policy.skip_reason(0)
+    if reason is not None:
+        return [skipped_run(reason) for _ in inputs]
+    if settings.sandbox_batch_execution:
+        policy.stage(workspace)
+        return await _run_batch_execution_container(workspace, class_name, inputs)
+    runs = []
+    timeouts = 0
+    input_file = workspace / "input" / "input.txt"
+    for text in inputs:
+        reason = policy.skip_reason(timeouts)
+        if reason is not None:
+            runs.append(skipped_run(reason))
+            continue
+        input_file.write_text(text)
+        run = await _run_measured(workspace, class_name)
+        policy.charge(run)
+        timeouts = timeouts + 1 if run.timed_out else 0
+        runs.append(run)
+    return runs
+
+
+async def _run_measured(workspace: Path, class_name: str) -> CaseRun:
+    """Run ``execute.sh`` once, with the output and usage it records in ``out/run.*``."""
+    prefix = workspace / "out" / "run"
+    for suffix in (".stdout", ".stderr", ".code", ".time", ".usage"):
+        prefix.with_suffix(suffix).unlink(missing_ok=True)
+    returncode, stdout, stderr = await _run_execution_container(workspace, class_name)
+    return _measured_run(
+        prefix,
+        returncode,
+        capture_file(prefix.with_suffix(".stdout"), fallback=stdout),
+        capture_file(prefix.with_suffix(".stderr"), fallback=stderr),
+    )
+
+
+def _observe_usage(run: CaseRun) -> None:
+    """Feed a fresh run's measurements to the test run histograms."""
+    if run.wall_time_s is not None:
+        SANDBOX_TEST_WALL_SECONDS.observe(run.wall_time_s)
+    if run.cpu_user_s is not None and run.cpu_sys_s is not None:
+        SANDBOX_TEST_CPU_SECONDS.observe(run.cpu_user_s + run.cpu_sys_s)
+    if run.peak_rss_kb is not None:
+        SANDBOX_TEST_PEAK_RSS_BYTES.observe(run.peak_rss_kb * 1024)
+
+
 def run_test_cases(job: SandboxJob) -> SandboxJob:
     outputs = job.result.execution_result.outputs or []
     results = []
@@ -140,11 +393,28 @@ def run_test_cases(job: SandboxJob) -> SandboxJob:
     for output in outputs:
         if output.test_case is None:
             continue
+        if output.skipped:
+            results.append(
+                TestCaseResult(
+                    input=output.test_case.input,
+                    expected_output=output.test_case.expected_output,
+                    actual_output="",
+                    passed=False,
+                    skipped=True,
+                    skip_reason=output.skip_reason,
+                )
+            )
+            continue
         actual_output = (
             output.stdout.strip() if output.returncode == 0 else output.stderr.strip()
         )
         expected = str(output.test_case.expected_output).strip()
-        passed = output.returncode == 0 and actual_output == expected
+        if output.stdout_truncated and output.stdout_stripped_sha256:
+            # Only the head and tail were kept; compare the whole stream's hash.
+            matches = stripped_sha256(expected) == output.stdout_stripped_sha256
+        else:
+            matches = actual_output == expected
+        passed = output.returncode == 0 and matches
 
         results.append(
             TestCaseResult(
@@ -0,0 +1,188 @@
+"""
+Container runs without the Docker daemon.
+
+Every ``docker run`` goes through the daemon, which serializes container
+setup when dozens start per second. With ``SANDBOX_RUNNER=namespace`` the
+sandbox's runs go to ``NamespaceRunner`` instead. It starts the command
+under nsjail in fresh user, mount, PID, IPC, UTS and network namespaces. The
+root is a read-only copy of the image's filesystem, and the command runs in
+a cgroup v2 with the same memory and PID limits and a seccomp filter. Setup
+takes milliseconds and involves no daemon.
+
+Like ``DockerEngine``, it takes the CLI-style ``docker run`` arguments the
+call sites already build (see ``run_args``). Images are still built with
+docker and exported once per content hash into ``SANDBOX_ROOTFS_DIR``.
+"""
+
+import asyncio
+import json
+import logging
+import shutil
+import tarfile
+import uuid
+from pathlib import Path
+
+from settings import settings
+
+from .capture import capture_stream
+from .docker_engine import UnsupportedCommandError, parse_run_args
+
+logger = logging.getLogger(__name__)
+
+ROOTFS_DIR = Path(__file__).parent / "tmp" / "rootfs"
+# Roughly what Docker's default seccomp profile denies: kernel, mount,
+# namespace and tracing calls no program here needs.
+SECCOMP_POLICY = (
+    "ERRNO(1) { ptrace, process_vm_readv, process_vm_writev, mount, umount2,"
+    " pivot_root, swapon, swapoff, reboot, kexec_load, init_module,"
+    " finit_module, delete_module, bpf, perf_event_open, userfaultfd, setns,"
+    " unshare, keyctl, add_key, request_key, open_by_handle_at, acct,"
+    " quotactl } DEFAULT ALLOW"
+)
+# Device nodes bind-mounted from the host, which a read-only image root lacks.
+DEVICES = ["/dev/null", "/dev/zero", "/dev/random", "/dev/urandom"]
+
+
+class NamespaceRunner:
+    def __init__(
+        self,
+        root: Path,
+        nsjail: str = settings.sandbox_nsjail_path,
+        cgroup_mount: str = settings.sandbox_nsjail_cgroup,
+    ):
+        self.root = root
+        self.nsjail = nsjail
+        self.cgroup_mount = cgroup_mount
+        # Image tag → (root filesystem, image config).
+        self.images: dict[str, tuple[Path, dict]] = {}
+
+    async def add_image(self, tag: str, content: str):
+        """Export ``tag``'s filesystem unless this content was exported before."""
+        target = self.root / f"{tag}-{content[:12]}"
+        if not (target / "config.json").exists():
+            await export_image(tag, target)
+            for stale in self.root.glob(f"{tag}-*"):
+                if stale != target:
+                    shutil.rmtree(stale, ignore_errors=True)
+        config = json.loads((target / "config.json").read_text())
+        self.images[tag] = (target / "rootfs", config)
+
+    async def run_args(self, args: list[str]) -> tuple[int, str, str]:
+        """Run ``docker <args>``; returns (exit code, stdout, stderr) like the CLI."""
+        if args[:1] != ["run"]:
+            raise UnsupportedCommandError(" ".join(args[:2]))
+        proc = await asyncio.create_subprocess_exec(
+            *self.command(args[1:]),
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+        )
+        stdout, stderr = await asyncio.gather(
+            capture_stream(proc.stdout), capture_stream(proc.stderr)
+        )
+        await proc.wait()
+        return proc.returncode, stdout.text, stderr.text
+
+    def command(self, args: list[str]) -> list[str]:
+        """The nsjail command line for ``docker run <args>``."""
+        options, host_config, image, command = parse_run_args(args)
+        if options["detach"] or image not in self.images:
+            raise UnsupportedCommandError(f"run {image}")
+        if host_config.get("NetworkMode", "none") != "none":
+            raise UnsupportedCommandError("run with a network")
+        rootfs, config = self.images[image]
+        cmd = [
+            self.nsjail,
+            "--mode",
+            "o",
+            "--quiet",
+            "--chroot",
+            str(rootfs),
+            "--cwd",
+            config.get("WorkingDir") or "/",
+            "--hostname",
+            "sandbox",
+            "--time_limit",
+            "0",
+            "--disable_rlimits",
+            "--seccomp_string",
+            SECCOMP_POLICY,
+        ]
+        for device in DEVICES:
+            cmd += ["--bindmount", f"{device}:{device}"]
+        cmd += ["--tmpfsmount", "/dev/shm"]
+        # The root is shared by every run, so writes never reach it; a
+        # writable root becomes a tmpfs /tmp, gone with the run.
+        if not host_config.get("ReadonlyRootfs"):
+            cmd += ["--tmpfsmount", "/tmp"]
+        for bind in host_config.get("Binds", []):
+            source, _, rest = bind.partition(":")
+            target, _, mode = rest.partition(":")
+            flag = "--bindmount_ro" if mode == "ro" else "--bindmount"
+            cmd += [flag, f"{source}:{target}"]
+        for path, mount_options in host_config.get("Tmpfs", {}).items():
+            cmd += ["--mount", f"none:{path}:tmpfs:{mount_options}"]
+        cmd += ["--use_cgroupv2", "--cgroupv2_mount", self.cgroup_mount]
+        if "Memory" in host_config:
+            cmd += ["--cgroup_mem_max", str(host_config["Memory"])]
+        if "PidsLimit" in host_config:
+            cmd += ["--cgroup_pids_max", str(host_config["PidsLimit"])]
+        for variable in config.get("Env") or []:
+            cmd += ["--env", variable]
+        return [*cmd, "--", *self._resolve(rootfs, config, command)]
+
+    def _resolve(self, rootfs: Path, config: dict, command: list[str]) -> list[str]:
+        """nsjail execs without a shell's PATH lookup; find the binary in the image."""
+        if not command or "/" in command[0]:
+            return command
+        for variable in config.get("Env") or []:
+            if variable.startswith("PATH="):
+                for directory in variable[5:].split(":"):
+                    binary = rootfs / directory.lstrip("/") / command[0]
+                    # Links in the image point into it, not into the host.
+                    if binary.is_symlink() or binary.exists():
+                        return [f"{directory.rstrip('/')}/{command[0]}", *command[1:]]
+        return command
+
+
+async def export_image(tag: str, target: Path):
+    """Unpack ``tag``'s filesystem and config into ``target``."""
+    staging = target.with_name(f".{target.name}.{uuid.uuid4().hex}")
+    archive = staging.with_name(f"{staging.name}.tar")
+    staging.mkdir(parents=True)
+    try:
+        container = (await _docker("create", tag)).strip()
+        try:
+            await _docker("export", "-o", str(archive), container)
+        finally:
+            await _docker("rm", "-f", container)
+        with tarfile.open(archive) as tar:
+            tar.extractall(staging / "rootfs", filter=_rootfs_filter)
+        config = await _docker("image", "inspect", "--format", "{{json .Config}}", tag)
+        (staging / "config.json").write_text(config)
+        shutil.rmtree(target, ignore_errors=True)
+        staging.rename(target)
+        logger.info("Exported image '%s' to %s", tag, target)
+    finally:
+        archive.unlink(missing_ok=True)
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def _rootfs_filter(member: tarfile.TarInfo, path: str) -> tarfile.TarInfo | None:
+    # Device nodes need privileges to create; the devices used are bind-mounted.
+    if member.ischr() or member.isblk() or member.isfifo():
+        return None
+    return tarfile.tar_filter(member, path)
+
+
+async def _docker(*args: str) -> str:
+    proc = await asyncio.create_subprocess_exec(
+        "docker",
+        *args,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise RuntimeError(f"docker {' '.join(args)} failed: {stderr.decode()}")
+    return stdout.decode()
@@ -0,0 +1,289 @@
+"""
+Warm pool of executer containers.
+
+A cold ``docker run --rm executer-image`` per test case pays container
+creation on every run. The pool starts ``SANDBOX_POOL_SIZE`` executer
+containers up front, with the same limits as a cold run (memory, pids, no
+network, read-only root), idling on ``sleep``. Each run borrows one, stages
+the job's ``compiled/`` and ``input/`` directories into the container's own
+``/workspace``, runs ``execute.sh`` or ``execute_batch.sh`` through
+``docker exec`` and copies ``out/`` back to the job. With tmpfs workspaces
+(``SANDBOX_TMPFS_WORKSPACES``) ``/workspace`` is a tmpfs mount and the files
+travel as tar streams through the Docker Engine API instead.
+
+Between borrowers a container is reset: every process it started is killed,
+the writable tmpfs mounts are emptied and its workspace is cleared. A
+container is retired (removed and replaced) after ``SANDBOX_POOL_MAX_USES``
+runs, and immediately after any violation: a timeout, a kill by signal (OOM
+or pids limit), a failed reset or any docker error. The JVM itself still
+starts per run, so no state survives between test cases in the JVM either.
+"""
+
+import asyncio
+import logging
+import shutil
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+
+from core.metrics import DOCKER_CONTAINERS_RUNNING, SANDBOX_POOL_RETIRED
+from settings import settings
+
+from . import helpers
+from .helpers import EXECUTE_SCRIPT, RUN_TIMEOUT_S, run_container
+
+logger = logging.getLogger(__name__)
+
+EXECUTER_IMAGE = "executer-image"
+POOL_LABEL = "jsg.sandbox.pool"
+# Exit codes from ``timeout`` (124), docker exec (125-127) and signals (128+).
+VIOLATION_RETURNCODE = 124
+# Runs the script, then resets: ``kill -1`` spares only PID 1 (the idle
+# ``sleep``) and this shell.
+RESET_SCRIPT = (
+    'sh "$@"; rc=$?; '
+    "kill -9 -1 2>/dev/null; "
+    "rm -rf /dev/shm/* /dev/mqueue/* 2>/dev/null; "
+    "exit $rc"
+)
+CLEAR_WORKSPACE_SCRIPT = (
+    "rm -rf /workspace/* /workspace/.[!.]* /workspace/..?* && "
+    "mkdir /workspace/compiled /workspace/input /workspace/out"
+)
+ERROR_BACKOFF_S = 1.0
+
+
+@dataclass
+class WarmContainer:
+    name: str
+    # Host directory bind-mounted at /workspace; None with a tmpfs workspace.
+    workspace: Path | None
+    uses: int = 0
+
+
+class ExecuterPool:
+    def __init__(
+        self,
+        size: int = settings.sandbox_pool_size,
+        max_uses: int = settings.sandbox_pool_max_uses,
+        acquire_timeout_s: float = settings.sandbox_pool_acquire_timeout_s,
+        root: Path | None = None,
+        host_root: Path | None = None,
+    ):
+        self.size = size
+        self.max_uses = max(max_uses, 1)
+        self.acquire_timeout_s = acquire_timeout_s
+        self.root = root or helpers.SANDBOX_TMP_DIR / "pool"
+        self.host_root = host_root or helpers.SANDBOX_HOST_TMP_PATH / "pool"
+        self.pool_id = uuid.uuid4().hex[:8]
+        self.tmpfs = helpers._tmpfs_workspaces()
+        self.idle: asyncio.Queue[WarmContainer] = asyncio.Queue()
+        self.live: dict[str, WarmContainer] = {}
+        self._replacing: set[asyncio.Task] = set()
+        self._closed = False
+
+    async def start(self):
+        logger.info("Starting %d warm executer containers...", self.size)
+        if not self.tmpfs:
+            self.root.mkdir(parents=True, exist_ok=True)
+        started = await asyncio.gather(
+            *(self._start_container() for _ in range(self.size)),
+            return_exceptions=True,
+        )
+        for container in started:
+            if isinstance(container, WarmContainer):
+                self.idle.put_nowait(container)
+            else:
+                logger.error("Failed to start warm executer: %s", container)
+                self._replace()
+        logger.info("Executer pool ready with %d containers", self.idle.qsize())
+
+    async def close(self):
+        self._closed = True
+        for task in list(self._replacing):
+            task.cancel()
+        await asyncio.gather(
+            *(self._remove(container) for container in list(self.live.values())),
+            return_exceptions=True,
+        )
+        logger.info("Executer pool closed")
+
+    async def run(
+        self,
+        workspace: Path,
+        class_name: str,
+        script: str = EXECUTE_SCRIPT,
+        timeout_s: float = RUN_TIMEOUT_S,
+    ) -> tuple[int, str, str]:
+        try:
+            container = await asyncio.wait_for(
+                self.idle.get(), timeout=self.acquire_timeout_s
+            )
+        except TimeoutError:
+            logger.warning("No warm executer free, falling back to a cold run")
+            return await helpers._run_cold_execution_container(
+                workspace, class_name, script
+            )
+
+        violation = None
+        try:
+            await self._stage(container, workspace)
+            returncode, stdout, stderr = await asyncio.wait_for(
+                run_container(
+                    [
+                        "docker",
+                        "exec",
+                        container.name,
+                        "sh",
+                        "-c",
+                        RESET_SCRIPT,
+                        "sh",
+                        script,
+                        class_name,
+                    ]
+                ),
+                timeout=timeout_s,
+            )
+            await self._collect(container, workspace)
+            if returncode >= VIOLATION_RETURNCODE:
+                violation = f"exit code {returncode}"
+            return returncode, stdout, stderr
+        except TimeoutError:
+            violation = "timeout"
+            return VIOLATION_RETURNCODE, "", "Execution timed out"
+        except Exception as e:
+            violation = "error"
+            logger.error("Warm executer %s failed: %s", container.name, e)
+            raise
+        finally:
+            container.uses += 1
+            if violation is None and not await self._reset(container):
+                violation = "reset"
+            if violation is None and container.uses >= self.max_uses:
+                violation = "max_uses"
+            if violation is None and not self._closed:
+                self.idle.put_nowait(container)
+            else:
+                self._retire(container, violation or "closed")
+
+    async def _start_container(self) -> WarmContainer:
+        name = f"jsg-executer-{self.pool_id}-{uuid.uuid4().hex[:8]}"
+        if self.tmpfs:
+            workspace = None
+            mount = ["--tmpfs", helpers.WORKSPACE_TMPFS]
+        else:
+            workspace = self.root / name
+            for sub in ("compiled", "input", "out"):
+                (workspace / sub).mkdir(parents=True, exist_ok=True)
+            mount = ["-v", f"{self.host_root / name}:/workspace"]
+        returncode, _, stderr = await run_container(
+            [
+                "docker",
+                "run",
+                "-d",
+                "--name",
+                name,
+                "--label",
+                f"{POOL_LABEL}={self.pool_id}",
+                *mount,
+                "--memory=256m",
+                "--network=none",
+                "--pids-limit=50",
+                "--read-only",
+                EXECUTER_IMAGE,
+                "sleep",
+                "infinity",
+            ]
+        )
+        if returncode != 0:
+            if workspace is not None:
+                shutil.rmtree(workspace, ignore_errors=True)
+            raise RuntimeError(f"docker run failed: {stderr.strip()}")
+        container = WarmContainer(name=name, workspace=workspace)
+        self.live[name] = container
+        DOCKER_CONTAINERS_RUNNING.inc()
+        logger.debug("Warm executer %s started", name)
+        return container
+
+    async def _stage(self, container: WarmContainer, workspace: Path):
+        if container.workspace is None:
+            await helpers.stage_workspace(
+                container.name, workspace, ["compiled", "input"]
+            )
+            return
+        for sub in ("compiled", "input"):
+            shutil.copytree(
+                workspace / sub, container.workspace / sub, dirs_exist_ok=True
+            )
+
+    async def _collect(self, container: WarmContainer, workspace: Path):
+        """Copy files the run wrote to ``out/`` back to the job's workspace."""
+        if container.workspace is None:
+            await helpers.collect_workspace(container.name, workspace, ["out"])
+            return
+        # Links are copied as links: their targets resolve on the host.
+        shutil.copytree(
+            container.workspace / "out",
+            workspace / "out",
+            symlinks=True,
+            dirs_exist_ok=True,
+        )
+
+    async def _reset(self, container: WarmContainer) -> bool:
+        """Empty the container's workspace, keeping the mounted root."""
+        if container.workspace is None:
+            returncode, _, stderr = await run_container(
+                ["docker", "exec", container.name, "sh", "-c", CLEAR_WORKSPACE_SCRIPT]
+            )
+            if returncode != 0:
+                logger.warning(
+                    "Failed to reset warm executer %s: %s", container.name, stderr
+                )
+            return returncode == 0
+        try:
+            for child in container.workspace.iterdir():
+                if child.is_dir() and not child.is_symlink():
+                    shutil.rmtree(child)
+                else:
+                    child.unlink()
+            for sub in ("compiled", "input", "out"):
+                (container.workspace / sub).mkdir()
+            return True
+        except OSError as e:
+            logger.warning("Failed to reset warm executer %s: %s", container.name, e)
+            return False
+
+    def _retire(self, container: WarmContainer, reason: str):
+        logger.debug("Retiring warm executer %s (%s)", container.name, reason)
+        SANDBOX_POOL_RETIRED.labels(reason).inc()
+        self._replace(retired=container)
+
+    def _replace(self, retired: WarmContainer | None = None):
+        task = asyncio.create_task(self._replace_container(retired))
+        self._replacing.add(task)
+        task.add_done_callback(self._replacing.discard)
+
+    async def _replace_container(self, retired: WarmContainer | None):
+        if retired is not None:
+            await self._remove(retired)
+        while not self._closed:
+            try:
+                self.idle.put_nowait(await self._start_container())
+                return
+            except asyncio.CancelledError:
+                return
+            except Exception as e:
+                logger.error("Failed to start warm executer: %s", e)
+                await asyncio.sleep(ERROR_BACKOFF_S)
+
+    async def _remove(self, container: WarmContainer):
+        if self.live.pop(container.name, None) is None:
+            return
+        try:
+            await run_container(["docker", "rm", "-f", container.name])
+        except Exception as e:
+            logger.error("Failed to remove warm executer %s: %s", container.name, e)
+        finally:
+            DOCKER_CONTAINERS_RUNNING.dec()
+            if container.workspace is not None:
+                shutil.rmtree(container.workspace, ignore_errors=True)
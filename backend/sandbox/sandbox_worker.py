@@ -1,18 +1,51 @@
 import asyncio
 import datetime
 import logging
+import os
+import sys
+import time
+import uuid
+from pathlib import Path
 
+from core.concurrency import AdaptiveLimiter
+from core.metrics import SANDBOX_READY, serve_metrics, watch_worker
+from core.transport import make_transport
 from redis.asyncio import Redis
 from settings import settings
 
-from .helpers import _cleanup_workspace, docker_build_images
+from .compile_cache import CompileCache
+from .compile_server import CompileOutput, CompileServers
+from .docker_engine import DockerEngine
+from .execution_memo import ExecutionMemo
+from .fail_fast import RuntimeHistory
+from .helpers import (
+    EXECUTION_LIMITS,
+    SANDBOX_DOCKER_DIR,
+    SANDBOX_IMAGES,
+    SANDBOX_TMP_DIR,
+    _cleanup_workspace,
+    _image_id,
+    docker_build_images,
+    image_content_hash,
+    use_compile_cache,
+    use_compile_servers,
+    use_container_runner,
+    use_docker_engine,
+    use_executer_pool,
+    use_execution_memo,
+    use_runtime_history,
+)
 from .jobs import (
+    compile_batch,
+    compile_batching,
     compile_job,
     execute_job,
     run_test_cases,
     set_result,
 )
 from .logs import setup_logging
+from .namespace_runner import ROOTFS_DIR, NamespaceRunner
+from .pool import ExecuterPool
 from .schemas import (
     JobStatus,
     SandboxJob,
@@ -33,9 +66,30 @@ class Sandbox:
     ):
         self.sandbox_max_concurrency = sandbox_max_concurrency
         self.redis_client = Redis.from_url(url=redis_url, decode_responses=True)
+        self.transport = make_transport(
+            self.redis_client, SANDBOX_QUEUE, on_dead_letter=self.report_dead_letter
+        )
+        self.concurrency = AdaptiveLimiter(
+            "Sandbox",
+            min_limit=settings.sandbox_min_concurrency,
+            max_limit=sandbox_max_concurrency,
+            target_p95_s=settings.sandbox_target_p95_s,
+            queue_depth=self.queue_depth,
+        )
+
+    async def queue_depth(self) -> int:
+        return (await self.transport.lag()).depth
+
+    async def report_dead_letter(self, job_request: str):
+        """Unblock the orchestrator waiting on a job that exhausted its attempts."""
+        job = await initialize_job(job_request)
+        if job:
+            await return_result(self, await set_result(job, JobStatus.FAILED))
 
 
 async def start():
+    # A ready file left by a worker that was killed must not outlive it.
+    signal_ready(False)
     try:
         logger.info("Starting Sandbox Worker...")
         await docker_build_images()
@@ -43,44 +97,181 @@ async def start():
     except Exception as e:
         logger.exception("Sandbox Worker Initialization error: %s", e)
         raise
+    engine = None
+    namespaces = settings.sandbox_runner == "namespace"
+    if namespaces:
+        await start_namespace_runner()
+    else:
+        engine = await connect_docker_engine()
+    pool = None
+    # Warm containers only pay off against docker's startup cost.
+    if settings.sandbox_pool_size > 0 and not namespaces:
+        pool = ExecuterPool()
+        await pool.start()
+        use_executer_pool(pool)
+    compile_servers = None
+    # Long-lived pipes to docker need the asyncio subprocess support Windows lacks.
+    if (
+        settings.sandbox_compile_servers > 0
+        and sys.platform != "win32"
+        and not namespaces
+    ):
+        compile_servers = CompileServers()
+        await compile_servers.start()
+        use_compile_servers(compile_servers)
+    await use_result_caches(client)
     logger.info("Sandbox Worker started")
-    await asyncio.gather(
-        *(main_loop(client, pid) for pid in range(client.sandbox_max_concurrency))
-    )
+    watch_worker(client.transport, client.concurrency)
+    signal_ready(True)
+    try:
+        await asyncio.gather(
+            client.transport.run(),
+            client.concurrency.run(),
+            serve_metrics(settings.sandbox_metrics_port),
+            *(main_loop(client, pid) for pid in range(client.sandbox_max_concurrency)),
+        )
+    finally:
+        signal_ready(False)
+        if compile_servers is not None:
+            use_compile_servers(None)
+            await compile_servers.close()
+        if pool is not None:
+            use_executer_pool(None)
+            await pool.close()
+        if engine is not None:
+            use_docker_engine(None)
+            await engine.close()
+        use_container_runner(None)
+
+
+def signal_ready(ready: bool):
+    """Publish readiness as ``jsg_sandbox_ready`` and ``SANDBOX_READY_FILE``."""
+    SANDBOX_READY.set(1 if ready else 0)
+    if not settings.sandbox_ready_file:
+        return
+    ready_file = Path(settings.sandbox_ready_file)
+    if ready:
+        ready_file.write_text(f"{os.getpid()}\n")
+    else:
+        ready_file.unlink(missing_ok=True)
+
+
+async def start_namespace_runner() -> NamespaceRunner:
+    """Run containers under nsjail from exported copies of the images."""
+    if sys.platform != "linux":
+        raise RuntimeError("SANDBOX_RUNNER=namespace needs Linux")
+    runner = NamespaceRunner(Path(settings.sandbox_rootfs_dir or ROOTFS_DIR))
+    for tag, dockerfile in SANDBOX_IMAGES.items():
+        await runner.add_image(tag, image_content_hash(SANDBOX_DOCKER_DIR / dockerfile))
+    use_container_runner(runner)
+    logger.info("Running containers under %s", settings.sandbox_nsjail_path)
+    return runner
+
+
+async def connect_docker_engine() -> DockerEngine | None:
+    """Talk to the Docker daemon over its socket; None keeps the docker CLI."""
+    socket_path = settings.sandbox_docker_socket
+    if sys.platform == "win32" or not socket_path or not Path(socket_path).exists():
+        return None
+    engine = DockerEngine(socket_path)
+    if not await engine.ping():
+        logger.warning(
+            "Docker Engine API unreachable at %s, using the CLI", socket_path
+        )
+        await engine.close()
+        return None
+    use_docker_engine(engine)
+    logger.info("Using the Docker Engine API at %s", socket_path)
+    return engine
+
+
+async def use_result_caches(client: Sandbox):
+    """Set up the compile cache and execution memo (keyed by the image IDs) and
+    the runtime history that orders test cases.
+    """
+    if settings.sandbox_compile_cache_max_bytes > 0:
+        image_id = await _image_id("compiler-image")
+        if image_id:
+            use_compile_cache(
+                CompileCache(
+                    image_id,
+                    Path(
+                        settings.sandbox_compile_cache_dir
+                        or SANDBOX_TMP_DIR / "compile-cache"
+                    ),
+                    redis_client=client.redis_client,
+                )
+            )
+    if settings.sandbox_execution_memo_max_bytes > 0:
+        image_id = await _image_id("executer-image")
+        if image_id:
+            use_execution_memo(
+                ExecutionMemo(
+                    image_id, EXECUTION_LIMITS, redis_client=client.redis_client
+                )
+            )
+    if settings.sandbox_order_by_runtime:
+        use_runtime_history(RuntimeHistory())
 
 
 async def main_loop(client: Sandbox, process_id: int = 0):
     while True:
-        try:
-            logger.info(f"Process #{process_id}: Waiting for job in {SANDBOX_QUEUE}...")
-            result = await client.redis_client.brpoplpush(
-                src=SANDBOX_QUEUE, dst=f"{SANDBOX_QUEUE}:processing", timeout=0
-            )
-        except asyncio.CancelledError:
-            logger.debug(f"Process #{process_id} cancelled. Shutting down...")
-            return
-        logger.info("Sandbox Job Received.")
-        if result:
-            logger.debug(f"Details: {result}")
-            initialized_job = await initialize_job(result)
-            if not initialized_job:
-                logger.error("Failed to initialize job, skipping")
-                continue
-
-            processed_job = await process_job(initialized_job)
-            if (
-                processed_job.status != JobStatus.COMPLETED
-                and processed_job.status != JobStatus.FAILED
-            ):
-                logger.error("Failed to process job, skipping")
-                continue
-
-            await return_result(client, processed_job)
-            await client.redis_client.lrem(f"{SANDBOX_QUEUE}:processing", 1, result)
-        else:
-            logger.error(f"No job found in {SANDBOX_QUEUE}")
-            await client.redis_client.lrem(f"{SANDBOX_QUEUE}:processing", 1, result)
-            continue
+        async with client.concurrency.slot():
+            try:
+                logger.info(
+                    f"Process #{process_id}: Waiting for job in {SANDBOX_QUEUE}..."
+                )
+                deliveries = await client.transport.claim(
+                    count=claim_count(), timeout=0
+                )
+            except asyncio.CancelledError:
+                logger.debug(f"Process #{process_id} cancelled. Shutting down...")
+                return
+            logger.info(f"Sandbox Job(s) Received: {len(deliveries)}")
+            jobs = []
+            for delivery in deliveries:
+                logger.debug(f"Details: {delivery.payload}")
+                jobs.append(await initialize_job(delivery.payload))
+            precompiled = await precompile([job for job in jobs if job])
+            for delivery, initialized_job in zip(deliveries, jobs, strict=True):
+                if not initialized_job:
+                    logger.error("Failed to initialize job, skipping")
+                    await client.transport.ack(delivery)
+                    continue
+
+                started = time.monotonic()
+                processed_job = await process_job(
+                    initialized_job, precompiled.get(initialized_job.job_id)
+                )
+                client.concurrency.record_latency(time.monotonic() - started)
+                if (
+                    processed_job.status != JobStatus.COMPLETED
+                    and processed_job.status != JobStatus.FAILED
+                ):
+                    logger.error("Failed to process job, leaving it for lease retry")
+                    client.transport.abandon(delivery)
+                    continue
+
+                await return_result(client, processed_job)
+                # Acked one by one: a crash later in the batch must not
+                # redeliver the jobs whose results are already out.
+                await client.transport.ack(delivery)
+
+
+def claim_count() -> int:
+    """Payloads per claim; up to a compile batch when compiles are batched."""
+    if compile_batching():
+        return max(settings.queue_batch_size, settings.sandbox_compile_batch_size)
+    return settings.queue_batch_size
+
+
+async def precompile(jobs: list[SandboxJob]) -> dict[uuid.UUID, CompileOutput]:
+    """Compile the claimed jobs together; each job compiles alone if this fails."""
+    try:
+        return await compile_batch(jobs)
+    except Exception as e:
+        logger.exception("Compile batch failed: %s", e)
+        return {}
 
 
 async def initialize_job(job_request: str) -> SandboxJob | None:
@@ -101,13 +292,15 @@ async def initialize_job(job_request: str) -> SandboxJob | None:
         return None
 
 
-async def process_job(job: SandboxJob) -> SandboxJobResult:
+async def process_job(
+    job: SandboxJob, precompiled: CompileOutput | None = None
+) -> SandboxJobResult:
     try:
         logger.info(f"Processing Job: {job.job_id}")
         job.status = JobStatus.RUNNING
 
         logger.debug(f"Job {job.job_id} compilation started")
-        compiled_job = await compile_job(job)
+        compiled_job = await compile_job(job, precompiled)
         if not compiled_job:
             logger.error(f"Compilation failed for Job: {job.job_id}")
             return await set_result(job, JobStatus.FAILED)
@@ -131,14 +324,19 @@ async def process_job(job: SandboxJob) -> SandboxJobResult:
 
 
 async def return_result(client: Sandbox, job: SandboxJobResult):
-    await client.redis_client.lpush(
-        f"{SANDBOX_QUEUE}:completed:{job.job_id}", job.model_dump_json()
-    )
+    key = f"{SANDBOX_QUEUE}:completed:{job.job_id}"
+    await client.redis_client.lpush(key, job.model_dump_json())
+    # Nobody reads the result of a job the orchestrator gave up on.
+    await client.redis_client.expire(key, settings.result_ttl_s)
     logger.debug(f"Sandbox Job: {job.job_id} result returned successfully")
     return True
 
 
 if __name__ == "__main__":
+    if "--prepare-images" in sys.argv:
+        # Build, pull or verify the images and exit, e.g. while baking a host image.
+        asyncio.run(docker_build_images())
+        sys.exit()
     try:
         asyncio.run(start())
     except KeyboardInterrupt:
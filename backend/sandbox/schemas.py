@@ -14,9 +14,17 @@ class CompilationJobRequest(BaseModel):
     java_code: str
 
 
+class CompilerDiagnostic(BaseModel):
+    kind: str
+    line: int
+    column: int
+    message: str
+
+
 class CompilationJobResult(BaseModel):
     success: bool
     errors: list[str] | None
+    diagnostics: list[CompilerDiagnostic] | None = None
 
 
 class TestCasesRequest(BaseModel):
@@ -28,6 +36,9 @@ class TestCaseResult(BaseModel):
     expected_output: Any
     actual_output: Any
     passed: bool
+    # Not run because the job stopped early (see ``fail_fast.py``).
+    skipped: bool = False
+    skip_reason: str | None = None
 
 
 class TestCasesResult(BaseModel):
@@ -44,6 +55,43 @@ class ExecutionOutput(BaseModel):
     stdout: str
     stderr: str
     test_case: TestCase | None
+    wall_time_s: float | None = None
+    cpu_user_s: float | None = None
+    cpu_sys_s: float | None = None
+    peak_rss_kb: int | None = None
+    timed_out: bool = False
+    out_of_memory: bool = False
+    stdout_bytes: int | None = None
+    stdout_sha256: str | None = None
+    stdout_stripped_sha256: str | None = None
+    stdout_truncated: bool = False
+    skipped: bool = False
+    skip_reason: str | None = None
+
+
+class CaseRun(BaseModel):
+    """Outcome of running the program on one input."""
+
+    returncode: int
+    stdout: str
+    stderr: str
+    wall_time_s: float | None = None
+    cpu_user_s: float | None = None
+    cpu_sys_s: float | None = None
+    peak_rss_kb: int | None = None
+    # Hit the per-case timeout, or the memory limit (OOM kill or a JVM
+    # ``OutOfMemoryError``).
+    timed_out: bool = False
+    out_of_memory: bool = False
+    # Size and SHA-256 of the whole stdout, of which ``stdout`` may only hold
+    # the head and tail (see ``capture.py``).
+    stdout_bytes: int | None = None
+    stdout_sha256: str | None = None
+    stdout_stripped_sha256: str | None = None
+    stdout_truncated: bool = False
+    # Not run because the job stopped early (see ``fail_fast.py``).
+    skipped: bool = False
+    skip_reason: str | None = None
 
 
 class ExecutionJobResult(BaseModel):
@@ -0,0 +1,67 @@
+import java.io.BufferedReader;
+import java.io.IOException;
+import java.io.InputStreamReader;
+import java.util.ArrayDeque;
+import java.util.ArrayList;
+import java.util.Arrays;
+import java.util.Collections;
+import java.util.HashMap;
+import java.util.HashSet;
+import java.util.LinkedList;
+import java.util.List;
+import java.util.Map;
+import java.util.PriorityQueue;
+import java.util.Scanner;
+import java.util.TreeMap;
+import java.util.stream.Collectors;
+import java.util.stream.IntStream;
+
+/**
+ * Training run for the images' CDS archives (see the Dockerfiles).
+ *
+ * <p>Touches the JDK classes typical student programs load: stdin through
+ * {@code Scanner} and {@code BufferedReader}, collections, streams and
+ * lambdas, string formatting and concatenation. Compiling this file is the
+ * training run for javac. Reads "n" and then n pairs of integers.
+ */
+public class CdsWarmup {
+    record Pair(int left, int right) {}
+
+    public static void main(String[] args) throws IOException {
+        Scanner scanner = new Scanner(System.in);
+        int count = scanner.hasNextInt() ? scanner.nextInt() : 0;
+        List<Pair> pairs = new ArrayList<>();
+        for (int i = 0; i < count && scanner.hasNextInt(); i++) {
+            pairs.add(new Pair(scanner.nextInt(), scanner.nextInt()));
+        }
+        BufferedReader reader = new BufferedReader(new InputStreamReader(System.in));
+        String rest = reader.readLine();
+
+        Map<Integer, Integer> sums = new HashMap<>();
+        TreeMap<String, Integer> names = new TreeMap<>();
+        PriorityQueue<Integer> queue = new PriorityQueue<>(Collections.reverseOrder());
+        ArrayDeque<Integer> deque = new ArrayDeque<>();
+        LinkedList<Integer> linked = new LinkedList<>();
+        for (Pair pair : pairs) {
+            int sum = Math.addExact(pair.left(), pair.right());
+            sums.merge(sum, 1, Integer::sum);
+            names.put("pair" + pair.left(), sum);
+            queue.add(sum);
+            deque.push(sum);
+            linked.add(Math.max(pair.left(), pair.right()));
+        }
+        int[] sorted = pairs.stream().mapToInt(Pair::left).sorted().toArray();
+        Arrays.sort(sorted);
+        String joined = IntStream.of(sorted).mapToObj(Integer::toString)
+                .collect(Collectors.joining(" "));
+        StringBuilder builder = new StringBuilder(joined).reverse();
+
+        System.out.println(String.format("%d pairs, %.2f average", pairs.size(),
+                pairs.stream().mapToInt(Pair::right).average().orElse(0)));
+        System.out.printf("%s %s %s%n", names, new HashSet<>(sums.values()), builder);
+        System.out.println(queue.peek() + " " + deque.peek() + " " + linked + " "
+                + Integer.parseInt("42") + Long.parseLong("7") + Double.parseDouble("1.5")
+                + String.valueOf(rest).trim().toUpperCase());
+        System.err.println(Arrays.toString(sorted));
+    }
+}
@@ -0,0 +1,157 @@
+import java.io.BufferedInputStream;
+import java.io.BufferedOutputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.DataInputStream;
+import java.io.IOException;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.io.StringWriter;
+import java.net.URI;
+import java.nio.charset.StandardCharsets;
+import java.util.LinkedHashMap;
+import java.util.List;
+import java.util.Map;
+import javax.tools.Diagnostic;
+import javax.tools.DiagnosticCollector;
+import javax.tools.FileObject;
+import javax.tools.ForwardingJavaFileManager;
+import javax.tools.JavaCompiler;
+import javax.tools.JavaFileObject;
+import javax.tools.SimpleJavaFileObject;
+import javax.tools.StandardJavaFileManager;
+import javax.tools.ToolProvider;
+
+/**
+ * Compiles Java sources in memory for the sandbox worker, one request at a time.
+ *
+ * <pre>
+ * request:  "&lt;className&gt; &lt;sourceBytes&gt;\n" + UTF-8 source
+ * response: "&lt;OK|FAIL&gt; &lt;diagnosticCount&gt; &lt;classCount&gt;\n"
+ *           per diagnostic: "&lt;kind&gt; &lt;line&gt; &lt;column&gt; &lt;messageBytes&gt;\n" + message
+ *           per class:      "&lt;binaryName&gt; &lt;classBytes&gt;\n" + bytes
+ * </pre>
+ *
+ * Nothing touches the filesystem and annotation processing is off, so student
+ * code is parsed and compiled but never run. The server exits after a VM
+ * error so the worker starts a fresh one.
+ */
+public final class CompileServer {
+    private static final JavaCompiler COMPILER = ToolProvider.getSystemJavaCompiler();
+    private static final List<String> OPTIONS = List.of("-proc:none", "-Xlint:none");
+
+    public static void main(String[] args) throws IOException {
+        DataInputStream in = new DataInputStream(new BufferedInputStream(System.in));
+        OutputStream out = new BufferedOutputStream(System.out);
+        // Keep stray prints off the protocol stream.
+        System.setOut(new PrintStream(System.err, true));
+        StandardJavaFileManager standard =
+                COMPILER.getStandardFileManager(null, null, StandardCharsets.UTF_8);
+        String header;
+        while ((header = readLine(in)) != null) {
+            String[] parts = header.split(" ");
+            byte[] source = new byte[Integer.parseInt(parts[1])];
+            in.readFully(source);
+            try {
+                compile(standard, parts[0], new String(source, StandardCharsets.UTF_8), out);
+            } catch (VirtualMachineError e) {
+                writeInternalError(out, e);
+                out.flush();
+                System.exit(2);
+            } catch (RuntimeException e) {
+                writeInternalError(out, e);
+            }
+            out.flush();
+        }
+    }
+
+    private static void compile(
+            StandardJavaFileManager standard, String className, String source, OutputStream out)
+            throws IOException {
+        JavaFileObject unit =
+                new SimpleJavaFileObject(
+                        URI.create("string:///" + className + ".java"), JavaFileObject.Kind.SOURCE) {
+                    @Override
+                    public CharSequence getCharContent(boolean ignoreEncodingErrors) {
+                        return source;
+                    }
+                };
+        DiagnosticCollector<JavaFileObject> diagnostics = new DiagnosticCollector<>();
+        MemoryFileManager files = new MemoryFileManager(standard);
+        boolean ok =
+                COMPILER.getTask(new StringWriter(), files, diagnostics, OPTIONS, null, List.of(unit))
+                        .call();
+
+        List<Diagnostic<? extends JavaFileObject>> reported = diagnostics.getDiagnostics();
+        Map<String, byte[]> classes = ok ? files.classes() : Map.of();
+        writeLine(out, (ok ? "OK" : "FAIL") + " " + reported.size() + " " + classes.size());
+        for (Diagnostic<? extends JavaFileObject> diagnostic : reported) {
+            byte[] message = diagnostic.getMessage(null).getBytes(StandardCharsets.UTF_8);
+            writeLine(
+                    out,
+                    diagnostic.getKind()
+                            + " "
+                            + diagnostic.getLineNumber()
+                            + " "
+                            + diagnostic.getColumnNumber()
+                            + " "
+                            + message.length);
+            out.write(message);
+        }
+        for (Map.Entry<String, byte[]> entry : classes.entrySet()) {
+            writeLine(out, entry.getKey() + " " + entry.getValue().length);
+            out.write(entry.getValue());
+        }
+    }
+
+    private static void writeInternalError(OutputStream out, Throwable e) throws IOException {
+        byte[] message = ("internal compiler error: " + e).getBytes(StandardCharsets.UTF_8);
+        writeLine(out, "FAIL 1 0");
+        writeLine(out, "ERROR -1 -1 " + message.length);
+        out.write(message);
+    }
+
+    private static String readLine(DataInputStream in) throws IOException {
+        ByteArrayOutputStream line = new ByteArrayOutputStream();
+        int b;
+        while ((b = in.read()) != '\n') {
+            if (b == -1) {
+                return line.size() == 0 ? null : line.toString(StandardCharsets.UTF_8);
+            }
+            line.write(b);
+        }
+        return line.toString(StandardCharsets.UTF_8);
+    }
+
+    private static void writeLine(OutputStream out, String line) throws IOException {
+        out.write((line + "\n").getBytes(StandardCharsets.UTF_8));
+    }
+
+    private static final class MemoryFileManager
+            extends ForwardingJavaFileManager<StandardJavaFileManager> {
+        private final Map<String, ByteArrayOutputStream> outputs = new LinkedHashMap<>();
+
+        MemoryFileManager(StandardJavaFileManager standard) {
+            super(standard);
+        }
+
+        @Override
+        public JavaFileObject getJavaFileForOutput(
+                Location location, String className, JavaFileObject.Kind kind, FileObject sibling) {
+            return new SimpleJavaFileObject(
+                    URI.create("mem:///" + className.replace('.', '/') + kind.extension), kind) {
+                @Override
+                public OutputStream openOutputStream() {
+                    ByteArrayOutputStream bytes = new ByteArrayOutputStream();
+                    outputs.put(className, bytes);
+                    return bytes;
+                }
+            };
+        }
+
+        Map<String, byte[]> classes() {
+            Map<String, byte[]> classes = new LinkedHashMap<>();
+            outputs.forEach((name, bytes) -> classes.put(name, bytes.toByteArray()));
+            return classes;
+        }
+    }
+}
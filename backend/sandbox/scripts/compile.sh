@@ -3,5 +3,7 @@ set -e
 
 MAIN_CLASS="${1:?Usage: compile.sh <MainClassName>}"
 
+. /scripts/jvm.sh
+
 mkdir -p /workspace/compiled
-javac -d /workspace/compiled /workspace/src/${MAIN_CLASS}.java
+javac $JAVAC_FLAGS -d /workspace/compiled /workspace/src/${MAIN_CLASS}.java
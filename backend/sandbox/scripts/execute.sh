@@ -1,7 +1,14 @@
 #!/bin/sh
-set -e
+# Runs the class on /workspace/input/input.txt. Its output goes to
+# /workspace/out/run.stdout and run.stderr, which the worker reads with a
+# bound; exit code, wall time and resource usage go to run.code, run.time and
+# run.usage (see measure.sh).
 
 MAIN_CLASS="${1:?Usage: execute.sh <MainClassName>}"
 TIMEOUT="${2:-10}"
 
-timeout "${TIMEOUT}" java -cp /workspace/compiled "$MAIN_CLASS" < /workspace/input/input.txt
+. /scripts/measure.sh
+. /scripts/jvm.sh
+
+measure /workspace/out/run timeout "${TIMEOUT}" java $JAVA_FLAGS -cp /workspace/compiled "$MAIN_CLASS" < /workspace/input/input.txt \
+    > /workspace/out/run.stdout 2> /workspace/out/run.stderr
@@ -0,0 +1,57 @@
+#!/bin/sh
+# Runs the class once per /workspace/input/cases/<id>.txt and writes
+# <id>.stdout, <id>.stderr, <id>.code, <id>.time (wall seconds) and
+# <id>.usage (see measure.sh) to /workspace/out. Exits with the worst
+# timeout/signal code seen, else 0.
+#
+# /workspace/input/policy, if present, holds "<timeouts> <seconds>": after
+# that many timeouts in a row, or once that many seconds have passed, the
+# remaining cases are not run and get <id>.skipped with the reason
+# ("timeouts" or "deadline") instead. 0 disables either limit.
+
+MAIN_CLASS="${1:?Usage: execute_batch.sh <MainClassName> [timeout]}"
+TIMEOUT="${2:-10}"
+
+. /scripts/measure.sh
+. /scripts/jvm.sh
+
+MAX_TIMEOUTS=0
+BUDGET=0
+if [ -r /workspace/input/policy ]; then
+    read -r MAX_TIMEOUTS BUDGET < /workspace/input/policy
+fi
+job_started="$(cut -d' ' -f1 /proc/uptime)"
+
+past_budget() {
+    awk -v s="$job_started" -v b="$BUDGET" -v n="$(cut -d' ' -f1 /proc/uptime)" \
+        'BEGIN { exit !(b > 0 && n - s >= b) }'
+}
+
+status=0
+timeouts=0
+skip=""
+for input in /workspace/input/cases/*.txt; do
+    [ -e "$input" ] || continue
+    out="/workspace/out/$(basename "$input" .txt)"
+    if [ -z "$skip" ] && past_budget; then
+        skip=deadline
+    fi
+    if [ -n "$skip" ]; then
+        echo "$skip" > "$out.skipped"
+        continue
+    fi
+    measure "$out" timeout "${TIMEOUT}" java $JAVA_FLAGS -cp /workspace/compiled "$MAIN_CLASS" < "$input" > "$out.stdout" 2> "$out.stderr"
+    code=$?
+    if [ "$code" -ge 124 ] && [ "$code" -gt "$status" ]; then
+        status=$code
+    fi
+    if [ "$code" -eq 124 ]; then
+        timeouts=$((timeouts + 1))
+    else
+        timeouts=0
+    fi
+    if [ "${MAX_TIMEOUTS:-0}" -gt 0 ] && [ "$timeouts" -ge "$MAX_TIMEOUTS" ]; then
+        skip=timeouts
+    fi
+done
+exit $status
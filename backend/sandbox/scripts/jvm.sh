@@ -0,0 +1,17 @@
+#!/bin/sh
+# JVM flags for the sandbox's short-lived JVMs; sourced by the scripts.
+#
+# /opt/jsg/jsg.jsa is a CDS archive of the JDK classes a typical run loads,
+# dumped when the image is built (see the Dockerfiles). Mapping it replaces
+# loading, parsing and verifying those classes on every start; with
+# -Xshare:auto a missing or unusable archive only costs that time back.
+CDS_FLAGS="-Xshare:auto -XX:SharedArchiveFile=/opt/jsg/jsg.jsa"
+
+# Student programs: the serial collector and two JIT threads keep the JVM's
+# own threads well under the container's PID limit; C2 stays on so
+# CPU-bound solutions are not slowed down towards the timeout. The heap
+# leaves room in the 256m limit for metaspace, code and the tmpfs workspace.
+JAVA_FLAGS="$CDS_FLAGS -XX:+UseSerialGC -XX:CICompilerCount=2 -XX:-UsePerfData -Xms32m -Xmx128m"
+
+# javac finishes in about a second, before C2 would pay off.
+JAVAC_FLAGS="-J-Xshare:auto -J-XX:SharedArchiveFile=/opt/jsg/jsg.jsa -J-XX:+UseSerialGC -J-XX:TieredStopAtLevel=1 -J-XX:-UsePerfData -J-Xmx192m"
@@ -0,0 +1,43 @@
+#!/bin/sh
+# Sourced by execute.sh and execute_batch.sh.
+#
+# measure PREFIX CMD [ARGS...] runs CMD and writes, next to PREFIX:
+#   PREFIX.code   its exit code
+#   PREFIX.time   wall seconds
+#   PREFIX.usage  "<user s> <sys s> <peak RSS KB> <OOM kills>"; "-" when unknown
+# CPU and peak RSS come from busybox time (the rusage of CMD and everything
+# it waited for), OOM kills from the container's cgroup memory.events.
+
+if command time -o /dev/null -f "%U" true 2>/dev/null; then
+    HAS_TIME=1
+fi
+
+oom_kills() {
+    if [ -r /sys/fs/cgroup/memory.events ]; then
+        awk '$1 == "oom_kill" { n = $2 } END { print n + 0 }' /sys/fs/cgroup/memory.events
+    else
+        echo 0
+    fi
+}
+
+measure() {
+    prefix="$1"
+    shift
+    kills="$(oom_kills)"
+    started="$(cut -d' ' -f1 /proc/uptime)"
+    # The inner shell records the real exit code; busybox time reports a
+    # signal death as the bare signal number.
+    if [ -n "$HAS_TIME" ]; then
+        command time -o "$prefix.rusage" -f "%U %S %M" sh -c '"$@"; echo $? > "$0"' "$prefix.code" "$@"
+    else
+        sh -c '"$@"; echo $? > "$0"' "$prefix.code" "$@"
+    fi
+    finished="$(cut -d' ' -f1 /proc/uptime)"
+    awk -v s="$started" -v f="$finished" 'BEGIN { printf "%.2f\n", f - s }' > "$prefix.time"
+    rusage="$(tail -n 1 "$prefix.rusage" 2>/dev/null)"
+    rm -f "$prefix.rusage"
+    echo "${rusage:-- - -} $(($(oom_kills) - kills))" > "$prefix.usage"
+    code="$(cat "$prefix.code" 2>/dev/null)"
+    # No code means the wrapper itself was killed.
+    return "${code:-137}"
+}
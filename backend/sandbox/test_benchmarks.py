@@ -0,0 +1,118 @@
+"""JVM startup and runner benchmarks; skipped without docker and the built images."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# --- JVM startup benchmark (needs docker and the built images) ---
+
+STARTUP_BENCHMARK_RUNS = 7
+WARMUP_INPUT = "printf '3\\n1 2\\n3 4\\n5 6\\n' | "
+
+
+def _container_seconds(image: str, script: str) -> float:
+    import subprocess
+    import time
+
+    started = time.perf_counter()
+    result = subprocess.run(
+        ["docker", "run", "--rm", "--memory=256m", "--network=none"]
+        + ["--pids-limit=50", image, "sh", "-c", script],
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+    return time.perf_counter() - started
+
+
+@pytest.mark.parametrize(
+    "image, before, after",
+    [
+        (
+            "executer-image",
+            WARMUP_INPUT + "java -cp /opt/jsg/cds CdsWarmup",
+            ". /scripts/jvm.sh; "
+            + WARMUP_INPUT
+            + "java $JAVA_FLAGS -cp /opt/jsg/cds CdsWarmup",
+        ),
+        (
+            "compiler-image",
+            "javac -d /tmp /opt/jsg/CdsWarmup.java",
+            ". /scripts/jvm.sh; javac $JAVAC_FLAGS -d /tmp /opt/jsg/CdsWarmup.java",
+        ),
+    ],
+)
+def test_cds_archive_reduces_startup_per_container(image, before, after):
+    import shutil
+    import statistics
+    import subprocess
+
+    if (
+        shutil.which("docker") is None
+        or subprocess.run(
+            ["docker", "image", "inspect", image], capture_output=True
+        ).returncode
+    ):
+        pytest.skip(f"docker with a built {image} is required")
+
+    timings = {before: [], after: []}
+    # Interleaved, so a busy host slows both commands alike.
+    for _ in range(STARTUP_BENCHMARK_RUNS):
+        for script, runs in timings.items():
+            runs.append(_container_seconds(image, script))
+    default, tuned = (statistics.median(timings[script]) for script in (before, after))
+    print(f"{image}: {default * 1000:.0f} ms -> {tuned * 1000:.0f} ms per container")
+    assert tuned < default
+
+
+# --- Runner benchmark (needs docker and the built images; nsjail for namespace) ---
+
+
+@pytest.mark.parametrize("backend", ["docker", "namespace"])
+def test_runner_backends_benchmark(backend, tmp_path, monkeypatch):
+    import shutil
+    import statistics
+    import subprocess
+    import time
+
+    from sandbox.helpers import SANDBOX_DOCKER_DIR, image_content_hash, run_container
+    from sandbox.namespace_runner import NamespaceRunner
+
+    if (
+        shutil.which("docker") is None
+        or subprocess.run(
+            ["docker", "image", "inspect", "executer-image"], capture_output=True
+        ).returncode
+    ):
+        pytest.skip("docker with a built executer-image is required")
+    if backend == "namespace":
+        if shutil.which("nsjail") is None:
+            pytest.skip("nsjail is required")
+        runner = NamespaceRunner(tmp_path)
+        content = image_content_hash(SANDBOX_DOCKER_DIR / "Dockerfile.executer")
+        _run(runner.add_image("executer-image", content))
+        monkeypatch.setattr("sandbox.helpers._container_runner", runner)
+    monkeypatch.setattr("sandbox.helpers._docker_engine", None)
+
+    cmd = ["docker", "run", "--rm", "--memory=256m", "--network=none"]
+    cmd += ["--pids-limit=50", "--read-only", "executer-image", "sh", "-c"]
+    cmd += [
+        ". /scripts/jvm.sh; "
+        + WARMUP_INPUT
+        + "java $JAVA_FLAGS -cp /opt/jsg/cds CdsWarmup"
+    ]
+    timings = []
+    for _ in range(STARTUP_BENCHMARK_RUNS):
+        started = time.perf_counter()
+        returncode, stdout, stderr = _run(run_container(cmd))
+        timings.append(time.perf_counter() - started)
+        assert returncode == 0, stderr
+        assert stdout.startswith("3 pairs")
+    print(f"{backend}: {statistics.median(timings) * 1000:.0f} ms per JVM run")
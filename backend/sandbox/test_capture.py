@@ -0,0 +1,67 @@
+"""Tests for bounded output capture (``capture.py``)."""
+
+from __future__ import annotations
+
+import asyncio
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# --- Bounded output capture ---
+
+
+def test_output_capture_keeps_head_and_tail_and_hashes_everything():
+    import hashlib
+
+    from sandbox.capture import OutputCapture, stripped_sha256
+
+    data = b"\n  " + b"".join(b"line %d\n" % i for i in range(1000)) + b"\t\n"
+    capture = OutputCapture(head_bytes=10, tail_bytes=8)
+    for index in range(0, len(data), 7):
+        capture.feed(data[index : index + 7])
+    result = capture.result()
+
+    assert result.truncated and result.total_bytes == len(data)
+    omitted = len(data) - 18
+    assert result.text == (
+        data[:10].decode() + f"\n... [{omitted} bytes truncated] ...\n" + "e 999\n\t\n"
+    )
+    assert result.sha256 == hashlib.sha256(data).hexdigest()
+    assert result.stripped_sha256 == stripped_sha256(data.decode())
+
+    small = OutputCapture(head_bytes=10, tail_bytes=8)
+    small.feed(b" ok \n")
+    assert small.result().text == " ok \n" and not small.result().truncated
+
+
+def test_capture_file_refuses_links_and_fifos(tmp_path):
+    import os
+
+    from sandbox.capture import capture_file
+
+    secret = tmp_path / "secret"
+    secret.write_text("host data")
+    (tmp_path / "link").symlink_to(secret)
+    os.mkfifo(tmp_path / "fifo")
+
+    assert capture_file(tmp_path / "link").text == ""
+    assert capture_file(tmp_path / "fifo", fallback="none").text == "none"
+    assert capture_file(tmp_path / "missing").total_bytes == 0
+    assert capture_file(secret).text == "host data"
+
+
+def test_run_container_bounds_cli_output(monkeypatch):
+    import sys
+
+    from sandbox.helpers import run_container
+
+    monkeypatch.setattr("sandbox.capture.settings.sandbox_output_head_bytes", 100)
+    monkeypatch.setattr("sandbox.capture.settings.sandbox_output_tail_bytes", 10)
+    script = "import sys; sys.stdout.write('x' * 1_000_000); sys.stderr.write('e')"
+
+    returncode, stdout, stderr = _run(run_container([sys.executable, "-c", script]))
+
+    assert (returncode, stderr) == (0, "e")
+    assert stdout == "x" * 100 + "\n... [999890 bytes truncated] ...\n" + "x" * 10
@@ -0,0 +1,117 @@
+"""Tests for the content-addressed compile cache (``compile_cache.py``)."""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import UTC, datetime
+
+from sandbox.jobs import compile_job
+from sandbox.schemas import (
+    CompilationJobResult,
+    JobStatus,
+    SandboxJob,
+    SandboxJobRequest,
+)
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# --- Compile cache ---
+
+
+def _program(success=True, classes=None):
+    from sandbox.compile_cache import CompiledProgram
+
+    return CompiledProgram(
+        result=CompilationJobResult(
+            success=success, errors=None if success else ["Main.java:1: error: x"]
+        ),
+        classes=classes or {},
+    )
+
+
+def test_compile_cache_round_trips_and_is_keyed_by_image(tmp_path, cache_redis):
+    from sandbox.compile_cache import CompileCache
+
+    redis = cache_redis
+    cache = CompileCache("sha256:jdk21", tmp_path / "a", redis_client=redis)
+
+    async def scenario():
+        await cache.put("class A {}", _program(classes={"A": b"\xca\xfe\x00"}))
+        hit = await cache.get("class A {}")
+        miss = await cache.get("class B {}")
+        # Another worker with an empty disk fills it from Redis.
+        other = CompileCache("sha256:jdk21", tmp_path / "b", redis_client=redis)
+        shared = await other.get("class A {}")
+        rebuilt = CompileCache("sha256:jdk22", tmp_path / "a", redis_client=redis)
+        stale = await rebuilt.get("class A {}")
+        return hit, miss, shared, stale, other
+
+    hit, miss, shared, stale, other = _run(scenario())
+    assert hit.classes == {"A": b"\xca\xfe\x00"}
+    assert miss is None and stale is None
+    assert shared == hit
+    assert other._path(other.key("class A {}")).exists()
+
+
+def test_compile_cache_evicts_least_recently_used(tmp_path):
+    import os
+
+    from sandbox.compile_cache import CompileCache
+
+    entry_size = len(_program(classes={"A": b"x" * 100}).model_dump_json())
+    cache = CompileCache("img", tmp_path, max_bytes=int(entry_size * 2.5))
+
+    async def scenario():
+        for index, code in enumerate(("a", "b")):
+            await cache.put(code, _program(classes={"A": b"x" * 100}))
+            path = cache._path(cache.key(code))
+            os.utime(path, (index, index))
+        await cache.get("a")  # "b" is now least recently used.
+        await cache.put("c", _program(classes={"A": b"x" * 100}))
+        return [await cache.get(code) is not None for code in ("a", "b", "c")]
+
+    assert _run(scenario()) == [True, False, True]
+    assert cache.size == entry_size * 2
+
+
+def test_compile_job_cache_hit_skips_the_compiler(tmp_path, monkeypatch):
+    from sandbox.compile_cache import CompileCache
+
+    monkeypatch.setattr("sandbox.helpers.SANDBOX_TMP_DIR", tmp_path)
+    monkeypatch.setattr(
+        "sandbox.helpers._compile_cache", CompileCache("img", tmp_path / "cache")
+    )
+    compiles = []
+
+    async def fake_run_container(cmd):
+        compiles.append(cmd)
+        workspace = tmp_path / cmd[4].split(":")[0].rsplit("/", 1)[-1]
+        (workspace / "compiled" / "Main.class").write_bytes(b"\xca\xfe")
+        return 0, "", ""
+
+    monkeypatch.setattr("sandbox.jobs.run_container", fake_run_container)
+    monkeypatch.setattr("sandbox.jobs.SANDBOX_HOST_TMP_PATH", tmp_path)
+
+    def job(code):
+        jid = uuid.uuid4()
+        return SandboxJob(
+            job_id=jid,
+            status=JobStatus.RUNNING,
+            created_at=datetime.now(UTC),
+            request=SandboxJobRequest(job_id=jid, java_code=code, test_cases=None),
+            result=None,
+        )
+
+    first = _run(compile_job(job("public class Main {}")))
+    # OCR casing normalizes to the same source, so it hits the cache.
+    second = _run(compile_job(job("Public class Main {}")))
+
+    assert len(compiles) == 1
+    assert second.result.compilation_result.success is True
+    class_file = tmp_path / str(second.job_id) / "compiled" / "Main.class"
+    assert class_file.read_bytes() == b"\xca\xfe"
+    assert first.result.compilation_result == second.result.compilation_result
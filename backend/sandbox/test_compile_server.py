@@ -0,0 +1,158 @@
+"""Tests for the persistent compile servers (``compile_server.py``)."""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import UTC, datetime
+
+import pytest
+
+from sandbox.jobs import compile_job
+from sandbox.schemas import JobStatus, SandboxJob, SandboxJobRequest
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# --- Compile server ---
+
+
+class _FakeServerProcess:
+    """Pipes of a compile server process replying with canned responses."""
+
+    def __init__(self, *responses: bytes):
+        self.returncode = None
+        self.requests = bytearray()
+        self.stdin = self
+        self.stdout = asyncio.StreamReader()
+        for response in responses:
+            self.stdout.feed_data(response)
+        self.stdout.feed_eof()
+
+    def write(self, data):
+        self.requests += data
+
+    async def drain(self):
+        pass
+
+
+def test_compile_server_parses_diagnostics_and_class_bytes(server_response):
+    from sandbox.compile_server import CompileServer
+
+    server = CompileServer()
+    response = server_response(
+        "OK",
+        diagnostics=[("WARNING", 2, "unchecked\ncall")],
+        classes=[("Main", b"\xca\xfe\n\xba\xbe"), ("Main$Inner", b"\x00")],
+    )
+
+    async def scenario():
+        server.proc = _FakeServerProcess(response)
+        return await server.compile("Main", "public class Main {}")
+
+    output = _run(scenario())
+
+    assert server.proc.requests == b"Main 20\npublic class Main {}"
+    assert output.success is True
+    assert output.classes == {"Main": b"\xca\xfe\n\xba\xbe", "Main$Inner": b"\x00"}
+    [diagnostic] = output.diagnostics
+    assert (diagnostic.kind, diagnostic.line, diagnostic.message) == (
+        "WARNING",
+        2,
+        "unchecked\ncall",
+    )
+    assert output.errors("Main") == ""
+
+
+def test_compile_servers_restart_broken_and_worn_out_servers(
+    monkeypatch, server_response
+):
+    from sandbox.compile_server import CompileServer, CompileServerError, CompileServers
+
+    started = []
+    ok = server_response("OK", classes=[("Main", b"x")])
+    scripts = [[ok, ok], [b"OK 0"], [ok]]
+
+    async def fake_start(self):
+        self.proc = _FakeServerProcess(*scripts[len(started)])
+        started.append(self)
+
+    async def fake_stop(self):
+        self.proc = None
+
+    monkeypatch.setattr(CompileServer, "start", fake_start)
+    monkeypatch.setattr(CompileServer, "stop", fake_stop)
+
+    async def scenario():
+        servers = CompileServers(size=1, max_uses=2, timeout_s=10)
+        await servers.start()
+        first = await servers.compile("Main", "a")
+        second = await servers.compile("Main", "b")  # Second use: worn out.
+        with pytest.raises(CompileServerError):
+            await servers.compile("Main", "c")  # Truncated reply.
+        third = await servers.compile("Main", "d")
+        await servers.close()
+        return first, second, third
+
+    outputs = _run(scenario())
+    assert [o.classes for o in outputs] == [{"Main": b"x"}] * 3
+    assert len(started) == 3
+
+
+def test_compile_job_uses_compile_server_without_docker(tmp_path, monkeypatch):
+    from sandbox.compile_server import CompileOutput
+    from sandbox.schemas import CompilerDiagnostic
+
+    monkeypatch.setattr("sandbox.helpers.SANDBOX_TMP_DIR", tmp_path)
+
+    class _Servers:
+        def __init__(self, output):
+            self.output = output
+
+        async def compile(self, class_name, source):
+            return self.output
+
+    async def no_docker(cmd):
+        raise AssertionError("compile server hit must not start a container")
+
+    monkeypatch.setattr("sandbox.jobs.run_container", no_docker)
+
+    def job():
+        jid = uuid.uuid4()
+        return SandboxJob(
+            job_id=jid,
+            status=JobStatus.RUNNING,
+            created_at=datetime.now(UTC),
+            request=SandboxJobRequest(
+                job_id=jid, java_code="public class Main {}", test_cases=None
+            ),
+            result=None,
+        )
+
+    monkeypatch.setattr(
+        "sandbox.helpers._compile_servers",
+        _Servers(CompileOutput(success=True, classes={"pkg.Main$1": b"\xca\xfe"})),
+    )
+    ok = _run(compile_job(job()))
+    assert ok.result.compilation_result.success is True
+    class_file = tmp_path / str(ok.job_id) / "compiled" / "pkg" / "Main$1.class"
+    assert class_file.read_bytes() == b"\xca\xfe"
+
+    diagnostic = CompilerDiagnostic(kind="ERROR", line=3, column=9, message="boom")
+    monkeypatch.setattr(
+        "sandbox.helpers._compile_servers",
+        _Servers(CompileOutput(success=False, diagnostics=[diagnostic])),
+    )
+    failed = _run(compile_job(job())).result.compilation_result
+    assert failed.success is False
+    assert failed.errors == ["Main.java:3: error: boom"]
+    assert failed.diagnostics == [diagnostic]
+
+
+def test_write_classes_rejects_path_traversal(tmp_path):
+    from sandbox.helpers import _write_classes
+
+    with pytest.raises(ValueError):
+        _write_classes(tmp_path, {"../../evil": b"x"})
@@ -0,0 +1,274 @@
+"""Tests for the Docker Engine API client and tmpfs workspaces (``docker_engine.py``)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# --- Docker Engine API ---
+
+
+def _frame(stream, data):
+    from sandbox.docker_engine import STREAM_HEADER
+
+    return STREAM_HEADER.pack(stream, len(data)) + data
+
+
+def _fake_engine(responses):
+    """A ``DockerEngine`` over a mock transport; records every request."""
+    import httpx
+
+    from sandbox.docker_engine import DockerEngine
+
+    requests = []
+
+    def handler(request):
+        requests.append(request)
+        for (method, suffix), response in responses.items():
+            if request.method == method and request.url.path.endswith(suffix):
+                return response(request) if callable(response) else response
+        return httpx.Response(404, json={"message": "no such object"})
+
+    return DockerEngine("unused.sock", transport=httpx.MockTransport(handler)), requests
+
+
+def test_docker_engine_runs_container_with_cli_limits():
+    import json
+
+    import httpx
+
+    log = _frame(1, b"hel") + _frame(2, b"oops\n") + _frame(1, b"lo\n")
+    engine, requests = _fake_engine(
+        {
+            ("POST", "/containers/create"): httpx.Response(201, json={"Id": "c1"}),
+            ("POST", "/c1/start"): httpx.Response(204),
+            ("GET", "/c1/logs"): httpx.Response(200, content=log),
+            ("POST", "/c1/wait"): httpx.Response(200, json={"StatusCode": 3}),
+            ("DELETE", "/containers/c1"): httpx.Response(204),
+        }
+    )
+
+    result = _run(
+        engine.run_args(
+            [
+                "run",
+                "--rm",
+                "-v",
+                "/host/ws:/workspace",
+                "--memory=256m",
+                "--network=none",
+                "--pids-limit=50",
+                "--read-only",
+                "executer-image",
+                "sh",
+                "/scripts/execute.sh",
+                "Main",
+            ]
+        )
+    )
+
+    assert result == (3, "hello\n", "oops\n")
+    create = json.loads(requests[0].content)
+    assert create["Image"] == "executer-image"
+    assert create["Cmd"] == ["sh", "/scripts/execute.sh", "Main"]
+    assert create["NetworkDisabled"] is True
+    assert create["HostConfig"] == {
+        "Binds": ["/host/ws:/workspace"],
+        "Memory": 256 * 1024 * 1024,
+        "NetworkMode": "none",
+        "PidsLimit": 50,
+        "ReadonlyRootfs": True,
+    }
+    assert [(r.method, r.url.path.split("/")[-1]) for r in requests] == [
+        ("POST", "create"),
+        ("POST", "start"),
+        ("GET", "logs"),
+        ("POST", "wait"),
+        ("DELETE", "c1"),
+    ]
+
+
+def test_docker_engine_exec_and_daemon_errors():
+    import httpx
+
+    from sandbox.docker_engine import UnsupportedCommandError
+
+    engine, requests = _fake_engine(
+        {
+            ("POST", "/warm/exec"): httpx.Response(201, json={"Id": "e1"}),
+            ("POST", "/e1/start"): httpx.Response(200, content=_frame(1, b"42\n")),
+            ("GET", "/e1/json"): httpx.Response(200, json={"ExitCode": 0}),
+            ("POST", "/containers/create"): httpx.Response(
+                404, json={"message": "No such image: missing-image"}
+            ),
+        }
+    )
+
+    assert _run(engine.run_args(["exec", "warm", "sh", "-c", "echo 42"])) == (
+        0,
+        "42\n",
+        "",
+    )
+    returncode, _, stderr = _run(engine.run_args(["run", "--rm", "missing-image"]))
+    assert returncode == 125 and "No such image" in stderr
+    with pytest.raises(UnsupportedCommandError):
+        _run(engine.run_args(["build", "-t", "x", "."]))
+
+
+def test_stream_demuxer_handles_split_frames():
+    from sandbox.docker_engine import StreamDemuxer
+
+    data = _frame(1, b"out") + _frame(2, b"err") + _frame(1, b"!")
+    demuxer = StreamDemuxer()
+    for index in range(len(data)):
+        demuxer.feed(data[index : index + 1])
+    assert demuxer.result() == ("out!", "err")
+
+
+def test_run_container_goes_through_docker_engine(monkeypatch):
+    from sandbox.helpers import run_container, use_docker_engine
+
+    class FakeEngine:
+        async def run_args(self, args):
+            return 0, " ".join(args), ""
+
+    async def no_cli(*args, **kwargs):
+        raise AssertionError("docker CLI used")
+
+    monkeypatch.setattr("sandbox.helpers.asyncio.create_subprocess_exec", no_cli)
+    use_docker_engine(FakeEngine())
+    try:
+        assert _run(run_container(["docker", "rm", "-f", "x"])) == (0, "rm -f x", "")
+    finally:
+        use_docker_engine(None)
+
+
+# --- tmpfs workspaces ---
+
+
+class _FakeNetworkStream:
+    """The raw connection Docker hands over after upgrading an exec."""
+
+    def __init__(self, reply):
+        self.written = b""
+        self.chunks = [reply]
+
+    async def write(self, data, timeout=None):
+        self.written += data
+
+    async def read(self, max_bytes, timeout=None):
+        return self.chunks.pop(0) if self.chunks else b""
+
+    async def aclose(self):
+        pass
+
+
+def test_docker_engine_runs_in_a_tmpfs_workspace(tar_archive):
+    import json
+
+    import httpx
+
+    stdin = _FakeNetworkStream(reply=b"")
+    results = tar_archive({"compiled/Main.class": b"\xca\xfe"})
+    execs = iter(["stage", "run", "collect"])
+    exec_commands = []
+
+    def create_exec(request):
+        exec_commands.append(json.loads(request.content))
+        return httpx.Response(201, json={"Id": next(execs)})
+
+    engine, requests = _fake_engine(
+        {
+            ("POST", "/containers/create"): httpx.Response(201, json={"Id": "c1"}),
+            ("POST", "/c1/start"): httpx.Response(204),
+            ("POST", "/c1/exec"): create_exec,
+            ("POST", "/stage/start"): httpx.Response(
+                101, extensions={"network_stream": stdin}
+            ),
+            ("POST", "/run/start"): httpx.Response(200, content=_frame(1, b"ok")),
+            ("POST", "/collect/start"): httpx.Response(200, content=_frame(1, results)),
+            ("GET", "/json"): httpx.Response(200, json={"ExitCode": 0}),
+            ("DELETE", "/containers/c1"): httpx.Response(204),
+        }
+    )
+    archive = tar_archive({"src/Main.java": b"class Main {}"})
+
+    returncode, stdout, _, collected = _run(
+        engine.run_in_workspace(
+            [
+                "run",
+                "--rm",
+                "--tmpfs",
+                "/workspace:rw,size=64m",
+                "--memory=256m",
+                "compiler-image",
+                "sh",
+                "/scripts/compile.sh",
+                "Main",
+            ],
+            archive,
+            ["compiled"],
+        )
+    )
+
+    assert (returncode, stdout, collected) == (0, "ok", results)
+    create = json.loads(requests[0].content)
+    assert create["Cmd"] == ["sleep", "infinity"]
+    assert create["HostConfig"]["Tmpfs"] == {"/workspace": "rw,size=64m"}
+    assert "Binds" not in create["HostConfig"]
+    assert stdin.written == archive
+    assert exec_commands[0]["AttachStdin"] is True
+    assert exec_commands[0]["Cmd"][-1] == str(len(archive))
+    assert exec_commands[1]["Cmd"] == ["sh", "/scripts/compile.sh", "Main"]
+    assert exec_commands[2]["Cmd"] == ["tar", "-c", "-C", "/workspace", "compiled"]
+    assert requests[-1].method == "DELETE"
+
+
+def test_cold_execution_streams_workspace_through_tmpfs(
+    tmp_path, monkeypatch, tar_archive
+):
+    import io
+    import tarfile
+
+    from sandbox.helpers import _run_cold_execution_container, use_docker_engine
+
+    workspace = tmp_path / "job"
+    for sub in ("compiled", "input", "out"):
+        (workspace / sub).mkdir(parents=True)
+    (workspace / "input" / "input.txt").write_text("7")
+    seen = {}
+
+    class FakeEngine:
+        async def run_in_workspace(self, args, archive, collect):
+            seen["args"], seen["collect"] = args, collect
+            with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+                seen["staged"] = sorted(tar.getnames())
+            planted = tar_archive(
+                {
+                    "out/0000.code": b"0",
+                    "out/leak": None,
+                    "../escape": b"x",
+                }
+            )
+            return 0, "7", "", planted
+
+    monkeypatch.setattr("sandbox.helpers.settings.sandbox_tmpfs_workspaces", True)
+    use_docker_engine(FakeEngine())
+    try:
+        result = _run(_run_cold_execution_container(workspace, "Main"))
+    finally:
+        use_docker_engine(None)
+
+    assert result == (0, "7", "")
+    assert "-v" not in seen["args"] and "--tmpfs" in seen["args"]
+    assert "input/input.txt" in seen["staged"] and seen["collect"] == ["out"]
+    assert (workspace / "out" / "0000.code").read_text() == "0"
+    # Links and paths outside the workspace are dropped on the way back.
+    assert not (workspace / "out" / "leak").exists()
+    assert not (tmp_path / "escape").exists()
@@ -0,0 +1,113 @@
+"""Tests for memoized test case runs (``execution_memo.py``)."""
+
+from __future__ import annotations
+
+import asyncio
+
+from sandbox.jobs import execute_job
+from sandbox.schemas import CaseRun
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# --- Execution memo ---
+
+
+def _compiled_workspace(tmp_path, class_bytes=b"\xca\xfe plain"):
+    (tmp_path / "compiled").mkdir(parents=True, exist_ok=True)
+    (tmp_path / "compiled" / "Main.class").write_bytes(class_bytes)
+    return tmp_path
+
+
+def test_program_hash_refuses_nondeterministic_programs(tmp_path):
+    from sandbox.execution_memo import program_hash
+
+    plain = program_hash(_compiled_workspace(tmp_path / "a"))
+    assert plain == program_hash(_compiled_workspace(tmp_path / "b"))
+    assert plain != program_hash(_compiled_workspace(tmp_path / "c", b"other"))
+    for marker in (b"java/util/Random", b"currentTimeMillis", b"java/lang/Thread"):
+        assert program_hash(_compiled_workspace(tmp_path / "d", marker)) is None
+
+
+def test_execution_memo_skips_unstable_runs_and_expires(tmp_path, cache_redis):
+    from sandbox.execution_memo import ExecutionMemo
+    from sandbox.schemas import CaseRun
+
+    now = [0.0]
+    redis = cache_redis
+    memo = ExecutionMemo(
+        "img", "limits", ttl_s=60, redis_client=redis, clock=lambda: now[0]
+    )
+
+    async def scenario():
+        await memo.put("p", "1", CaseRun(returncode=0, stdout="2", stderr=""))
+        await memo.put("p", "t", CaseRun(returncode=124, stdout="", stderr=""))
+        await memo.put(
+            "p", "h", CaseRun(returncode=0, stdout="Obj@1b6d3586", stderr="")
+        )
+        found = [await memo.get("p", text) for text in ("1", "t", "h")]
+        other_limits = ExecutionMemo("img", "other", redis_client=redis)
+        limited = await other_limits.get("p", "1")
+        now[0] = 61
+        memo.redis_client = None
+        expired = await memo.get("p", "1")
+        return found, limited, expired
+
+    (run, timed_out, identity), limited, expired = _run(scenario())
+    assert run.stdout == "2"
+    assert timed_out is None and identity is None
+    assert limited is None and expired is None
+    assert len(redis.data) == 1
+
+
+def test_execution_memo_evicts_least_recently_used(tmp_path):
+    from sandbox.execution_memo import ExecutionMemo
+    from sandbox.schemas import CaseRun
+
+    run = CaseRun(returncode=0, stdout="x", stderr="")
+    size = len(run.model_dump_json())
+    memo = ExecutionMemo("img", "limits", max_bytes=size * 20)
+
+    async def scenario():
+        await memo.put("p", "a", run)
+        await memo.put("p", "b", run)
+        await memo.get("p", "a")
+        for index in range(19):
+            await memo.put("p", f"fill{index}", run)
+        return [await memo.get("p", text) is not None for text in ("a", "b")]
+
+    assert _run(scenario()) == [True, False]
+    assert memo.size <= size * 20
+
+
+def test_execute_job_replays_memoized_runs(tmp_path, monkeypatch, batch_job):
+    from sandbox.execution_memo import ExecutionMemo
+
+    monkeypatch.setattr("sandbox.jobs.SANDBOX_TMP_DIR", tmp_path)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_batch_execution", True)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_job_parallelism", 1)
+    monkeypatch.setattr("sandbox.helpers._execution_memo", ExecutionMemo("img", "l"))
+    staged = []
+
+    async def fake_batch(workspace, class_name, inputs):
+        staged.append(inputs)
+        return [
+            CaseRun(returncode=0, stdout=f"out {text}", stderr="", wall_time_s=0.1)
+            for text in inputs
+        ]
+
+    monkeypatch.setattr("sandbox.jobs._run_batch_execution_container", fake_batch)
+
+    first = batch_job(["a", "b"])
+    _compiled_workspace(tmp_path / str(first.job_id))
+    _run(execute_job(first))
+    second = batch_job(["b", "c", "a"])
+    _compiled_workspace(tmp_path / str(second.job_id))
+    _run(execute_job(second))
+
+    assert staged == [["a", "b"], ["c"]]
+    outputs = second.result.execution_result.outputs
+    assert [o.stdout for o in outputs] == ["out b", "out c", "out a"]
+    assert [o.test_case.input for o in outputs] == ["b", "c", "a"]
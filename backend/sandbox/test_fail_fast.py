@@ -0,0 +1,161 @@
+"""Tests for fail-fast execution and runtime history (``fail_fast.py``)."""
+
+from __future__ import annotations
+
+import asyncio
+
+from sandbox.jobs import execute_job, run_test_cases
+from sandbox.schemas import CaseRun
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# --- Fail-fast execution ---
+
+
+def test_execute_job_skips_cases_after_consecutive_timeouts(
+    tmp_path, monkeypatch, batch_job
+):
+    monkeypatch.setattr("sandbox.jobs.SANDBOX_TMP_DIR", tmp_path)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_batch_execution", False)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_job_parallelism", 1)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_max_consecutive_timeouts", 2)
+    ran = []
+
+    async def fake_exec_container(workspace, class_name):
+        text = (workspace / "input" / "input.txt").read_text()
+        ran.append(text)
+        return (124, "", "") if text.startswith("loop") else (0, f"out {text}", "")
+
+    monkeypatch.setattr("sandbox.jobs._run_execution_container", fake_exec_container)
+    job = batch_job(["a", "loop1", "b", "loop2", "loop3", "c", "d"])
+
+    outputs = _run(execute_job(job)).result.execution_result.outputs
+
+    assert ran == ["a", "loop1", "b", "loop2", "loop3"]
+    assert [o.skipped for o in outputs] == [False] * 5 + [True] * 2
+    assert outputs[-1].returncode == -1 and "timed out" in outputs[-1].stderr
+    results = run_test_cases(job).result.test_cases_results.results
+    assert [r.passed for r in results] == [
+        True,
+        False,
+        True,
+        False,
+        False,
+        False,
+        False,
+    ]
+    assert results[-1].skipped and results[-1].skip_reason == outputs[-1].stderr
+    assert results[-1].actual_output == ""
+    assert not results[3].skipped
+
+
+def test_batch_harness_gets_the_policy_and_reports_skipped_cases(
+    tmp_path, monkeypatch, batch_job
+):
+    monkeypatch.setattr("sandbox.jobs.SANDBOX_TMP_DIR", tmp_path)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_batch_execution", True)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_job_parallelism", 1)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_max_consecutive_timeouts", 3)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_job_max_wall_s", 30)
+    policies = []
+
+    async def fake(workspace, class_name, script, timeout_s):
+        policies.append((workspace / "input" / "policy").read_text().split())
+        out = workspace / "out"
+        (out / "0000.code").write_text("0\n")
+        (out / "0000.stdout").write_text("out a")
+        (out / "0001.skipped").write_text("deadline\n")
+        return 0, "", ""
+
+    monkeypatch.setattr("sandbox.helpers._run_execution_container", fake)
+    job = _run(execute_job(batch_job(["a", "b"])))
+
+    [[timeouts, seconds]] = policies
+    assert (timeouts, seconds) == ("3", "30.00")
+    first, second = job.result.execution_result.outputs
+    assert (first.skipped, first.stdout) == (False, "out a")
+    assert second.skipped and "time limit" in second.skip_reason
+    assert second.wall_time_s is None
+
+
+def test_execution_policy_budget_counts_only_case_run_time(tmp_path, monkeypatch):
+    from sandbox.fail_fast import SKIP_DEADLINE, ExecutionPolicy
+    from sandbox.jobs import _execute_chunk
+
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_batch_execution", False)
+    (tmp_path / "input").mkdir()
+    ran = []
+
+    async def slow_to_start(workspace, class_name):
+        # Waiting for a slot or a warm container costs no budget.
+        await asyncio.sleep(0.05)
+        ran.append((workspace / "input" / "input.txt").read_text())
+        (workspace / "out" / "run.time").write_text("2.0\n")
+        return 0, "", ""
+
+    monkeypatch.setattr("sandbox.jobs._run_execution_container", slow_to_start)
+    (tmp_path / "out").mkdir()
+    policy = ExecutionPolicy(max_wall_s=5)
+    runs = _run(_execute_chunk(tmp_path, "Main", ["a", "b", "c", "d"], policy))
+
+    assert ran == ["a", "b", "c"]
+    assert [run.skipped for run in runs] == [False, False, False, True]
+    assert policy.remaining_s() == 0 and policy.skip_reason(0) == SKIP_DEADLINE
+    # Parallel chunks charge their own copies.
+    fork = ExecutionPolicy(max_wall_s=5).fork()
+    fork.charge(CaseRun(returncode=0, stdout="", stderr="", wall_time_s=1.0))
+    assert fork.remaining_s() == 4.0
+    # The defaults never skip.
+    assert ExecutionPolicy().skip_reason(100) is None
+
+
+def test_execute_job_runs_known_fast_inputs_first(tmp_path, monkeypatch, batch_job):
+    from sandbox.fail_fast import RuntimeHistory
+
+    monkeypatch.setattr("sandbox.jobs.SANDBOX_TMP_DIR", tmp_path)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_job_parallelism", 1)
+    monkeypatch.setattr("sandbox.helpers._runtime_history", RuntimeHistory())
+    times = {"slow": 9.0, "mid": 1.0, "fast": 0.1, "new": 0.5}
+    staged = []
+
+    async def fake_batch(workspace, class_name, inputs):
+        staged.append(inputs)
+        return [
+            CaseRun(
+                returncode=0, stdout=f"out {text}", stderr="", wall_time_s=times[text]
+            )
+            for text in inputs
+        ]
+
+    monkeypatch.setattr("sandbox.jobs._run_batch_execution_container", fake_batch)
+    _run(execute_job(batch_job(["slow", "mid", "fast"])))
+    job = batch_job(["slow", "mid", "new", "fast"])
+    _run(execute_job(job))
+
+    assert staged[1] == ["new", "fast", "mid", "slow"]
+    outputs = job.result.execution_result.outputs
+    assert [o.stdout for o in outputs] == ["out slow", "out mid", "out new", "out fast"]
+
+
+def test_skipped_runs_are_neither_memoized_nor_timed():
+    from sandbox.execution_memo import is_stable
+    from sandbox.fail_fast import SKIP_TIMEOUTS, RuntimeHistory, skipped_run
+
+    run = skipped_run(SKIP_TIMEOUTS)
+    assert not is_stable(run)
+    history = RuntimeHistory(max_entries=2)
+    history.record("a", run)
+    assert history.estimate("a") is None
+    for text, seconds in (("a", 2.0), ("a", 4.0), ("b", 1.0), ("c", 1.0)):
+        history.record(
+            text, CaseRun(returncode=0, stdout="", stderr="", wall_time_s=seconds)
+        )
+    # Averaged, and "a" was evicted as the least recently used.
+    assert history.estimate("a") is None and history.estimate("b") == 1.0
+    history = RuntimeHistory()
+    history.record("a", CaseRun(returncode=0, stdout="", stderr="", wall_time_s=2.0))
+    history.record("a", CaseRun(returncode=0, stdout="", stderr="", wall_time_s=4.0))
+    assert history.estimate("a") == 3.0
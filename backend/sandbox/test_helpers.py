@@ -0,0 +1,113 @@
+"""Tests for image preparation and Docker concurrency in ``helpers.py``."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# --- Docker concurrency ---
+
+
+def test_docker_slots_never_exceed_host_cpus(monkeypatch):
+    from sandbox.helpers import docker_slot_count
+
+    monkeypatch.setattr("sandbox.helpers.os.cpu_count", lambda: 4)
+    monkeypatch.setattr("sandbox.helpers.settings.sandbox_docker_max_concurrency", 0)
+    assert docker_slot_count() == 4
+    monkeypatch.setattr("sandbox.helpers.settings.sandbox_docker_max_concurrency", 64)
+    assert docker_slot_count() == 4
+    monkeypatch.setattr("sandbox.helpers.settings.sandbox_docker_max_concurrency", 2)
+    assert docker_slot_count() == 2
+
+
+# --- Image preparation ---
+
+
+def _fake_images(monkeypatch, labels: dict, pullable: dict | None = None):
+    """Docker with ``labels`` as local images' content labels; records commands."""
+    commands = []
+
+    async def fake_run_container(cmd):
+        commands.append(cmd[1:3])
+        if cmd[1] == "image":
+            tag = cmd[-1]
+            return (0, labels[tag] + "\n", "") if tag in labels else (1, "", "No such")
+        if cmd[1] == "pull":
+            return (0, "", "") if cmd[2] in (pullable or {}) else (1, "", "denied")
+        labels[cmd[3]] = (pullable or {})[cmd[2]]
+        return 0, "", ""
+
+    async def fake_build(tag, dockerfile_path, content):
+        commands.append(["build", tag])
+        labels[tag] = content
+
+    monkeypatch.setattr("sandbox.helpers.run_container", fake_run_container)
+    monkeypatch.setattr("sandbox.helpers._docker_build_image", fake_build)
+    return commands
+
+
+def test_image_content_hash_covers_dockerfile_and_scripts(tmp_path, monkeypatch):
+    from sandbox.helpers import image_content_hash
+
+    monkeypatch.setattr("sandbox.helpers.SANDBOX_DIR", tmp_path)
+    (tmp_path / "scripts").mkdir()
+    (tmp_path / "scripts" / "run.sh").write_text("echo 1")
+    dockerfile = tmp_path / "Dockerfile"
+    dockerfile.write_text("FROM alpine")
+
+    first = image_content_hash(dockerfile)
+    assert image_content_hash(dockerfile) == first
+    (tmp_path / "scripts" / "run.sh").write_text("echo 2")
+    assert image_content_hash(dockerfile) != first
+
+
+def test_docker_build_images_reuses_images_with_matching_content(monkeypatch):
+    from sandbox.helpers import (
+        SANDBOX_DOCKER_DIR,
+        docker_build_images,
+        image_content_hash,
+    )
+
+    current = image_content_hash(SANDBOX_DOCKER_DIR / "Dockerfile.compiler")
+    labels = {"compiler-image": current, "executer-image": "stale"}
+    commands = _fake_images(monkeypatch, labels)
+
+    _run(docker_build_images())
+    assert ["build", "compiler-image"] not in commands
+    assert ["build", "executer-image"] in commands
+
+    commands.clear()
+    _run(docker_build_images())
+    assert all(command[0] == "image" for command in commands)
+
+
+def test_docker_build_images_pull_and_verify_modes(monkeypatch):
+    from sandbox.helpers import (
+        SANDBOX_DOCKER_DIR,
+        docker_build_images,
+        image_content_hash,
+    )
+
+    executer = image_content_hash(SANDBOX_DOCKER_DIR / "Dockerfile.executer")
+    monkeypatch.setattr("sandbox.helpers.settings.sandbox_image_mode", "verify")
+    _fake_images(monkeypatch, {})
+    with pytest.raises(RuntimeError, match="not built from"):
+        _run(docker_build_images())
+
+    monkeypatch.setattr("sandbox.helpers.settings.sandbox_image_mode", "pull")
+    monkeypatch.setattr(
+        "sandbox.helpers.settings.sandbox_image_registry", "registry.local/jsg/"
+    )
+    reference = f"registry.local/jsg/executer-image:{executer}"
+    commands = _fake_images(monkeypatch, {}, pullable={reference: executer})
+    _run(docker_build_images())
+    assert ["pull", reference] in commands
+    assert ["build", "executer-image"] not in commands
+    # The compiler image is not in the registry and is built instead.
+    assert ["build", "compiler-image"] in commands
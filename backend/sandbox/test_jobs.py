@@ -0,0 +1,276 @@
+"""Tests for batch, parallel and batch-compiled job runs (``jobs.py``)."""
+
+from __future__ import annotations
+
+import asyncio
+import uuid
+from datetime import UTC, datetime
+
+from sandbox.jobs import compile_job, execute_job, run_test_cases
+from sandbox.schemas import JobStatus, SandboxJob, SandboxJobRequest
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# --- Batch execution harness ---
+
+
+def _fake_harness(results):
+    """Stand-in for ``execute_batch.sh``: writes one result per staged case."""
+    calls = []
+
+    async def fake(workspace, class_name, script, timeout_s):
+        calls.append(script)
+        cases = sorted((workspace / "input" / "cases").iterdir())
+        for case, (code, stdout) in zip(cases, results, strict=False):
+            prefix = workspace / "out" / case.stem
+            (prefix.with_suffix(".stdout")).write_text(stdout + case.read_text())
+            (prefix.with_suffix(".stderr")).write_text("boom" if code else "")
+            (prefix.with_suffix(".code")).write_text(f"{code}\n")
+            (prefix.with_suffix(".time")).write_text("0.25\n")
+        return (137, "", "Killed") if len(results) < len(cases) else (0, "", "")
+
+    return fake, calls
+
+
+def test_execute_job_batch_runs_all_cases_in_one_launch(
+    tmp_path, monkeypatch, batch_job
+):
+    from sandbox.helpers import EXECUTE_BATCH_SCRIPT
+
+    monkeypatch.setattr("sandbox.jobs.SANDBOX_TMP_DIR", tmp_path)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_batch_execution", True)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_job_parallelism", 1)
+    fake, calls = _fake_harness([(0, "out "), (1, "out "), (0, "out ")])
+    monkeypatch.setattr("sandbox.helpers._run_execution_container", fake)
+
+    job = _run(execute_job(batch_job(["a", "b", "c"])))
+
+    assert calls == [EXECUTE_BATCH_SCRIPT]
+    outputs = job.result.execution_result.outputs
+    assert [o.stdout for o in outputs] == ["out a", "out b", "out c"]
+    assert [o.returncode for o in outputs] == [0, 1, 0]
+    assert [o.test_case.input for o in outputs] == ["a", "b", "c"]
+    assert outputs[0].wall_time_s == 0.25
+    assert job.result.execution_result.errors == ["boom"]
+    passed = [r.passed for r in run_test_cases(job).result.test_cases_results.results]
+    assert passed == [True, False, True]
+
+
+def test_execute_job_batch_reports_cases_lost_with_the_harness(
+    tmp_path, monkeypatch, batch_job
+):
+    monkeypatch.setattr("sandbox.jobs.SANDBOX_TMP_DIR", tmp_path)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_batch_execution", True)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_job_parallelism", 1)
+    fake, _ = _fake_harness([(0, "out ")])
+    monkeypatch.setattr("sandbox.helpers._run_execution_container", fake)
+
+    job = _run(execute_job(batch_job(["a", "b"])))
+
+    first, second = job.result.execution_result.outputs
+    assert (first.returncode, first.stdout) == (0, "out a")
+    assert (second.returncode, second.stderr, second.wall_time_s) == (
+        137,
+        "Killed",
+        None,
+    )
+
+
+def test_batch_outputs_ignore_planted_symlinks(tmp_path):
+    from sandbox.helpers import _read_batch_outputs
+
+    secret = tmp_path / "secret"
+    secret.write_text("host data")
+    out = tmp_path / "out"
+    out.mkdir()
+    (out / "0000.code").write_text("0")
+    (out / "0000.stdout").symlink_to(secret)
+
+    [run] = _read_batch_outputs(tmp_path, 1, 0, "")
+    assert (run.returncode, run.stdout) == (0, "")
+
+
+# --- Parallel test execution ---
+
+
+def test_execute_job_runs_chunks_in_parallel_in_order(tmp_path, monkeypatch, batch_job):
+    monkeypatch.setattr("sandbox.jobs.SANDBOX_TMP_DIR", tmp_path)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_batch_execution", True)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_job_parallelism", 3)
+    monkeypatch.setattr("sandbox.helpers.settings.sandbox_docker_max_concurrency", 2)
+    monkeypatch.setattr("sandbox.helpers.os.cpu_count", lambda: 8)
+    running = 0
+    peak = 0
+    workspaces = []
+
+    async def fake_cold(workspace, class_name, script):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        workspaces.append(workspace)
+        cases = sorted((workspace / "input" / "cases").iterdir())
+        # Later chunks finish first.
+        await asyncio.sleep(0.01 * (5 - len(workspaces)))
+        for case in cases:
+            prefix = workspace / "out" / case.stem
+            prefix.with_suffix(".stdout").write_text(case.read_text())
+            prefix.with_suffix(".code").write_text("0")
+        running -= 1
+        return 0, "", ""
+
+    monkeypatch.setattr("sandbox.helpers._run_cold_execution_container", fake_cold)
+    job = batch_job(["a", "b", "c", "d", "e"])
+
+    _run(execute_job(job))
+
+    outputs = job.result.execution_result.outputs
+    assert [o.stdout for o in outputs] == ["a", "b", "c", "d", "e"]
+    assert len(workspaces) == 3 and peak == 2
+    assert not any(workspace.exists() for workspace in workspaces)
+
+
+# --- Resource accounting ---
+
+
+def test_batch_outputs_carry_resource_usage(tmp_path):
+    from sandbox.helpers import _read_batch_outputs
+
+    out = tmp_path / "out"
+    out.mkdir()
+    for index, (code, stderr, usage) in enumerate(
+        [
+            (0, "", "1.50 0.20 65536 0"),
+            (124, "", "9.90 0.10 70000 0"),
+            (137, "", "0.30 0.05 262144 1"),
+            (1, "java.lang.OutOfMemoryError: Java heap space", "- - - 0"),
+        ]
+    ):
+        prefix = out / f"{index:04d}"
+        prefix.with_suffix(".code").write_text(f"{code}\n")
+        prefix.with_suffix(".stderr").write_text(stderr)
+        prefix.with_suffix(".time").write_text("1.75\n")
+        prefix.with_suffix(".usage").write_text(usage + "\n")
+
+    fast, slow, killed, heap = _read_batch_outputs(tmp_path, 5, 137, "Killed")[:4]
+    assert (fast.wall_time_s, fast.cpu_user_s, fast.cpu_sys_s) == (1.75, 1.5, 0.2)
+    assert fast.peak_rss_kb == 65536
+    assert not (fast.timed_out or fast.out_of_memory)
+    assert slow.timed_out and not slow.out_of_memory
+    assert killed.out_of_memory and killed.peak_rss_kb == 262144
+    assert heap.out_of_memory and heap.cpu_user_s is None
+    # A case the harness never reached has no measurements.
+    lost = _read_batch_outputs(tmp_path, 5, 137, "Killed")[4]
+    assert (lost.returncode, lost.wall_time_s, lost.peak_rss_kb) == (137, None, None)
+
+
+def test_single_runs_read_usage_and_feed_histograms(tmp_path, monkeypatch, batch_job):
+    from core.metrics import SANDBOX_TEST_PEAK_RSS_BYTES
+
+    monkeypatch.setattr("sandbox.jobs.SANDBOX_TMP_DIR", tmp_path)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_batch_execution", False)
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_job_parallelism", 1)
+
+    async def fake_exec_container(workspace, class_name):
+        prefix = workspace / "out" / "run"
+        assert not prefix.with_suffix(".usage").exists()
+        prefix.with_suffix(".time").write_text("0.40\n")
+        prefix.with_suffix(".usage").write_text("0.31 0.04 40960 0\n")
+        return 0, "out " + (workspace / "input" / "input.txt").read_text(), ""
+
+    monkeypatch.setattr("sandbox.jobs._run_execution_container", fake_exec_container)
+    observed = SANDBOX_TEST_PEAK_RSS_BYTES.labels().sum
+    job = batch_job(["a", "b"])
+
+    _run(execute_job(job))
+
+    outputs = job.result.execution_result.outputs
+    assert [o.stdout for o in outputs] == ["out a", "out b"]
+    assert [(o.wall_time_s, o.cpu_user_s, o.peak_rss_kb) for o in outputs] == [
+        (0.4, 0.31, 40960)
+    ] * 2
+    assert SANDBOX_TEST_PEAK_RSS_BYTES.labels().sum == observed + 2 * 40960 * 1024
+
+
+# --- Batch compilation ---
+
+
+def _compile_request_job(code: str) -> SandboxJob:
+    jid = uuid.uuid4()
+    return SandboxJob(
+        job_id=jid,
+        status=JobStatus.RUNNING,
+        created_at=datetime.now(UTC),
+        request=SandboxJobRequest(job_id=jid, java_code=code, test_cases=None),
+        result=None,
+    )
+
+
+def test_compile_batch_demultiplexes_one_compiler_run(
+    tmp_path, monkeypatch, server_response
+):
+    from pathlib import Path
+
+    from sandbox.jobs import compile_batch
+
+    monkeypatch.setattr("sandbox.helpers.SANDBOX_TMP_DIR", tmp_path)
+    monkeypatch.setattr("sandbox.jobs.SANDBOX_HOST_TMP_PATH", tmp_path)
+    monkeypatch.setattr("sandbox.helpers._compile_servers", None)
+    monkeypatch.setattr("sandbox.jobs._tmpfs_workspaces", lambda: False)
+    runs = []
+    responses = [
+        server_response("OK", classes=[("A", b"\xca\xfe")]),
+        server_response("FAIL", diagnostics=[("ERROR", 1, "';' expected")]),
+        server_response("FAIL", diagnostics=[("ERROR", -1, "internal compiler error")]),
+        # The JVM died in the middle of the fourth response.
+        b"OK 0 1\nD 10\n\xca",
+    ]
+
+    async def fake_run_container(cmd):
+        runs.append(cmd)
+        workspace = Path(cmd[4].split(":")[0])
+        requests = (workspace / "src" / "requests").read_bytes()
+        assert requests.startswith(b"A 16\npublic class A{}B ")
+        (workspace / "compiled" / "responses").write_bytes(b"".join(responses))
+        return 137, "", "Killed"
+
+    monkeypatch.setattr("sandbox.jobs.run_container", fake_run_container)
+    jobs = [
+        _compile_request_job(f"public class {name}{{}}")
+        for name in ("A", "B", "C", "D", "E")
+    ]
+    jobs.append(_compile_request_job("class NoPublicClass {}"))
+
+    outputs = _run(compile_batch(jobs))
+
+    assert len(runs) == 1 and "CompileServer" in runs[0]
+    assert set(outputs) == {jobs[0].job_id, jobs[1].job_id}
+    assert outputs[jobs[0].job_id].classes == {"A": b"\xca\xfe"}
+    assert not outputs[jobs[1].job_id].success
+    # The batch workspace is removed.
+    assert list(tmp_path.iterdir()) == []
+
+    async def no_docker(cmd):
+        raise AssertionError("a precompiled job must not start a container")
+
+    monkeypatch.setattr("sandbox.jobs.run_container", no_docker)
+    compiled = _run(compile_job(jobs[0], outputs[jobs[0].job_id]))
+    assert compiled.result.compilation_result.success
+    assert (tmp_path / str(jobs[0].job_id) / "compiled" / "A.class").exists()
+
+
+def test_compile_batch_is_off_with_compile_servers(monkeypatch):
+    from sandbox.jobs import compile_batch
+    from sandbox.sandbox_worker import claim_count
+
+    monkeypatch.setattr("sandbox.helpers._compile_servers", object())
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_compile_batch_size", 16)
+    monkeypatch.setattr("sandbox.sandbox_worker.settings.queue_batch_size", 1)
+    jobs = [_compile_request_job("public class A{}") for _ in range(3)]
+
+    assert _run(compile_batch(jobs)) == {}
+    assert claim_count() == 1
+    monkeypatch.setattr("sandbox.helpers._compile_servers", None)
+    assert claim_count() == 16
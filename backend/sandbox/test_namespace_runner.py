@@ -0,0 +1,99 @@
+"""Tests for the nsjail container runner (``namespace_runner.py``)."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# --- Namespace runner ---
+
+
+def _namespace_runner(tmp_path, nsjail: str = "nsjail"):
+    from sandbox.namespace_runner import NamespaceRunner
+
+    rootfs = tmp_path / "rootfs"
+    (rootfs / "bin").mkdir(parents=True)
+    (rootfs / "bin" / "sh").symlink_to("/bin/busybox")
+    runner = NamespaceRunner(tmp_path / "images", nsjail=nsjail, cgroup_mount="/cg")
+    config = {"Env": ["PATH=/usr/bin:/bin", "LANG=C"], "WorkingDir": "/workspace"}
+    runner.images["executer-image"] = (rootfs, config)
+    return runner
+
+
+def test_namespace_runner_translates_docker_run(tmp_path):
+    from sandbox.docker_engine import UnsupportedCommandError
+
+    runner = _namespace_runner(tmp_path)
+    cmd = runner.command(
+        ["--rm", "-v", "/host/ws:/workspace", "--memory=256m", "--network=none"]
+        + ["--pids-limit=50", "--read-only", "executer-image", "sh", "/x.sh", "Main"]
+    )
+
+    def value(flag):
+        return cmd[cmd.index(flag) + 1]
+
+    assert cmd[0] == "nsjail" and cmd[-4:] == ["--", "/bin/sh", "/x.sh", "Main"]
+    assert value("--chroot") == str(tmp_path / "rootfs")
+    assert value("--cwd") == "/workspace"
+    assert value("--bindmount") == "/dev/null:/dev/null"
+    assert "/host/ws:/workspace" in cmd
+    assert value("--cgroup_mem_max") == str(256 * 1024**2)
+    assert value("--cgroup_pids_max") == "50"
+    assert value("--cgroupv2_mount") == "/cg"
+    assert "LANG=C" in cmd and "ptrace" in value("--seccomp_string")
+    # A read-only run gets no writable /tmp.
+    assert "/tmp" not in cmd
+    assert "/tmp" in runner.command(["--rm", "executer-image", "true"])
+
+    for args in (["-d", "executer-image"], ["--rm", "other-image", "true"]):
+        with pytest.raises(UnsupportedCommandError):
+            runner.command(args)
+    with pytest.raises(UnsupportedCommandError):
+        runner.command(["--network=bridge", "executer-image", "true"])
+
+
+def test_run_container_goes_through_namespace_runner(tmp_path, monkeypatch):
+    from sandbox.helpers import run_container
+
+    nsjail = tmp_path / "nsjail"
+    nsjail.write_text('#!/bin/sh\necho "$@"\necho jailed >&2\nexit 3\n')
+    nsjail.chmod(0o755)
+    runner = _namespace_runner(tmp_path, nsjail=str(nsjail))
+    monkeypatch.setattr("sandbox.helpers._container_runner", runner)
+
+    returncode, stdout, stderr = _run(
+        run_container(["docker", "run", "--rm", "executer-image", "sh", "-c", "x"])
+    )
+    assert (returncode, stderr) == (3, "jailed\n")
+    assert stdout.startswith("--mode o --quiet --chroot")
+    assert stdout.rstrip().endswith("-- /bin/sh -c x")
+
+
+def test_namespace_runner_exports_each_image_content_once(tmp_path, monkeypatch):
+    import json
+
+    from sandbox.namespace_runner import NamespaceRunner
+
+    exports = []
+
+    async def fake_export(tag, target):
+        exports.append(target.name)
+        (target / "rootfs").mkdir(parents=True)
+        (target / "config.json").write_text(json.dumps({"Env": []}))
+
+    monkeypatch.setattr("sandbox.namespace_runner.export_image", fake_export)
+    runner = NamespaceRunner(tmp_path)
+
+    _run(runner.add_image("executer-image", "a" * 64))
+    _run(runner.add_image("executer-image", "a" * 64))
+    _run(runner.add_image("executer-image", "b" * 64))
+
+    assert exports == ["executer-image-aaaaaaaaaaaa", "executer-image-bbbbbbbbbbbb"]
+    assert [path.name for path in tmp_path.iterdir()] == exports[1:]
+    assert runner.images["executer-image"][0] == tmp_path / exports[1] / "rootfs"
@@ -9,6 +9,7 @@ from datetime import UTC, datetime
 import pytest
 from schemas.shared import TestCase as SchemaTestCase
 
+from sandbox import schemas as sandbox_schemas
 from sandbox.helpers import _cleanup_workspace, _create_workspace, _extract_class_name
 from sandbox.jobs import compile_job, execute_job, run_test_cases, set_result
 from sandbox.schemas import (
@@ -19,7 +20,6 @@ from sandbox.schemas import (
     SandboxJob,
     SandboxJobRequest,
     SandboxResult,
-    TestCaseResult,
 )
 
 
@@ -130,7 +130,7 @@ def test_compilation_job_result_with_errors():
 
 
 def test_test_case_result_model():
-    tcr = TestCaseResult(
+    tcr = sandbox_schemas.TestCaseResult(
         input="5", expected_output="10", actual_output="10", passed=True
     )
     assert tcr.passed
@@ -229,6 +229,35 @@ def test_run_test_cases_nonzero_returncode_always_fails():
     assert r.passed is False
 
 
+def test_batch_outputs_bound_huge_stdout(tmp_path, monkeypatch):
+    from sandbox.helpers import _read_batch_outputs
+
+    monkeypatch.setattr("sandbox.capture.settings.sandbox_output_head_bytes", 64)
+    monkeypatch.setattr("sandbox.capture.settings.sandbox_output_tail_bytes", 16)
+    expected = "\n".join(str(i) for i in range(100_000))
+    out = tmp_path / "out"
+    out.mkdir()
+    for index, stdout in enumerate([expected + "\n", expected + "!"]):
+        (out / f"{index:04d}.code").write_text("0")
+        (out / f"{index:04d}.stdout").write_text(stdout)
+
+    runs = _read_batch_outputs(tmp_path, 2, 0, "")
+    assert all(len(run.stdout) < 200 and run.stdout_truncated for run in runs)
+    assert runs[0].stdout_bytes == len(expected) + 1
+
+    job = _make_job(
+        [
+            ExecutionOutput(
+                **run.model_dump(),
+                test_case=SchemaTestCase(input="", expected_output=expected),
+            )
+            for run in runs
+        ]
+    )
+    results = run_test_cases(job).result.test_cases_results.results
+    assert [r.passed for r in results] == [True, False]
+
+
 # --- set_result tests ---
 
 
@@ -359,6 +388,7 @@ def test_execute_job_no_test_cases(tmp_path, monkeypatch):
 
 
 def test_execute_job_with_test_cases(tmp_path, monkeypatch):
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_batch_execution", False)
     monkeypatch.setattr("sandbox.helpers.SANDBOX_TMP_DIR", tmp_path)
     monkeypatch.setattr("sandbox.jobs.SANDBOX_TMP_DIR", tmp_path)
 
@@ -400,6 +430,7 @@ def test_execute_job_with_test_cases(tmp_path, monkeypatch):
 
 
 def test_execute_job_runtime_error(tmp_path, monkeypatch):
+    monkeypatch.setattr("sandbox.jobs.settings.sandbox_batch_execution", False)
     monkeypatch.setattr("sandbox.helpers.SANDBOX_TMP_DIR", tmp_path)
     monkeypatch.setattr("sandbox.jobs.SANDBOX_TMP_DIR", tmp_path)
 
@@ -0,0 +1,195 @@
+"""Tests for the warm executer pool (``pool.py``)."""
+
+from __future__ import annotations
+
+import asyncio
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+# --- Warm executer pool ---
+
+
+class _FakeDocker:
+    def __init__(self, root, exec_results=None):
+        self.root = root
+        self.commands: list[list[str]] = []
+        self.exec_results = list(exec_results or [])
+        self.staged: list[str] = []
+
+    async def __call__(self, cmd):
+        self.commands.append(cmd)
+        if cmd[1] == "exec":
+            workspace = self.root / cmd[2]
+            self.staged.append((workspace / "input" / "input.txt").read_text())
+            (workspace / "out" / "0000.code").write_text("0")
+            return self.exec_results.pop(0) if self.exec_results else (0, "ok", "")
+        return 0, "", ""
+
+    def verbs(self, verb):
+        return [cmd for cmd in self.commands if cmd[1] == verb]
+
+
+def _pool_fixture(tmp_path, monkeypatch, **kwargs):
+    from sandbox.pool import ExecuterPool
+
+    root = tmp_path / "pool"
+    docker = _FakeDocker(root, kwargs.pop("exec_results", None))
+    monkeypatch.setattr("sandbox.pool.run_container", docker)
+    pool = ExecuterPool(root=root, host_root=root, **kwargs)
+    workspace = tmp_path / "job"
+    (workspace / "compiled").mkdir(parents=True)
+    (workspace / "compiled" / "Main.class").write_bytes(b"\xca\xfe")
+    (workspace / "input").mkdir()
+    return pool, docker, workspace
+
+
+def test_executer_pool_reuses_isolated_containers_and_resets_them(
+    tmp_path, monkeypatch
+):
+    pool, docker, workspace = _pool_fixture(tmp_path, monkeypatch, size=1)
+
+    async def scenario():
+        await pool.start()
+        outputs = []
+        for text in ("first", "second"):
+            (workspace / "input" / "input.txt").write_text(text)
+            outputs.append(await pool.run(workspace, "Main"))
+        await pool.close()
+        return outputs
+
+    assert _run(scenario()) == [(0, "ok", ""), (0, "ok", "")]
+    [started] = docker.verbs("run")
+    for flag in ("-d", "--network=none", "--read-only", "--memory=256m"):
+        assert flag in started
+    execs = docker.verbs("exec")
+    assert len(execs) == 2 and {cmd[2] for cmd in execs} == {started[4]}
+    assert execs[0][-1] == "Main"
+    assert docker.staged == ["first", "second"]
+    # Results written to the container's out/ are copied back to the job.
+    assert (workspace / "out" / "0000.code").read_text() == "0"
+    # Closing removes the container and its workspace.
+    assert docker.verbs("rm") == [["docker", "rm", "-f", started[4]]]
+    assert not (docker.root / started[4]).exists()
+
+
+def test_executer_pool_clears_workspace_between_runs(tmp_path, monkeypatch):
+    pool, docker, workspace = _pool_fixture(tmp_path, monkeypatch, size=1)
+    (workspace / "input" / "input.txt").write_text("x")
+
+    async def scenario():
+        await pool.start()
+        await pool.run(workspace, "Main")
+        container = pool.idle.get_nowait()
+        leftover = sorted(
+            str(p.relative_to(container.workspace))
+            for p in container.workspace.rglob("*")
+        )
+        await pool.close()
+        return leftover
+
+    assert _run(scenario()) == ["compiled", "input", "out"]
+
+
+def test_executer_pool_recycles_on_violation_and_max_uses(tmp_path, monkeypatch):
+    pool, docker, workspace = _pool_fixture(
+        tmp_path,
+        monkeypatch,
+        size=1,
+        max_uses=2,
+        exec_results=[(124, "", "timed out"), (0, "a", ""), (0, "b", "")],
+    )
+    (workspace / "input" / "input.txt").write_text("x")
+
+    async def scenario():
+        await pool.start()
+        results = []
+        for _ in range(3):
+            results.append(await pool.run(workspace, "Main"))
+        # Let the last replacement finish before closing.
+        container = await asyncio.wait_for(pool.idle.get(), timeout=10)
+        pool.idle.put_nowait(container)
+        await pool.close()
+        return results
+
+    results = _run(scenario())
+    assert [r[0] for r in results] == [124, 0, 0]
+    execs = docker.verbs("exec")
+    # Timed out on the first container, then two uses of the replacement.
+    assert execs[0][2] != execs[1][2] == execs[2][2]
+    assert len(docker.verbs("run")) == 3
+
+
+def test_executer_pool_falls_back_to_cold_run_when_exhausted(tmp_path, monkeypatch):
+    pool, docker, workspace = _pool_fixture(
+        tmp_path, monkeypatch, size=0, acquire_timeout_s=0.01
+    )
+
+    async def fake_cold(workspace, class_name, script):
+        return 0, "cold", ""
+
+    monkeypatch.setattr("sandbox.helpers._run_cold_execution_container", fake_cold)
+    assert _run(pool.run(workspace, "Main")) == (0, "cold", "")
+    assert docker.commands == []
+
+
+def test_run_execution_container_routes_through_pool(tmp_path, monkeypatch):
+    from sandbox import helpers
+
+    class _Pool:
+        async def run(self, workspace, class_name, script, timeout_s):
+            return 0, f"pooled {class_name}", ""
+
+    monkeypatch.setattr("sandbox.helpers._executer_pool", _Pool())
+    assert _run(helpers._run_execution_container(tmp_path, "Main")) == (
+        0,
+        "pooled Main",
+        "",
+    )
+
+
+def test_executer_pool_with_tmpfs_workspaces(tmp_path, monkeypatch, tar_archive):
+    from sandbox.helpers import use_docker_engine
+
+    class FakeEngine:
+        def __init__(self):
+            self.staged = []
+
+        async def extract(self, container, archive):
+            self.staged.append(archive)
+
+        async def archive(self, container, paths):
+            return tar_archive({"out/0000.code": b"0"})
+
+    engine = FakeEngine()
+    monkeypatch.setattr("sandbox.helpers.settings.sandbox_tmpfs_workspaces", True)
+    use_docker_engine(engine)
+    try:
+        pool, _, workspace = _pool_fixture(tmp_path, monkeypatch, size=1)
+        commands = []
+
+        async def fake_docker(cmd):
+            commands.append(cmd)
+            return 0, "ok", ""
+
+        monkeypatch.setattr("sandbox.pool.run_container", fake_docker)
+
+        async def scenario():
+            await pool.start()
+            result = await pool.run(workspace, "Main")
+            await pool.close()
+            return result
+
+        assert _run(scenario()) == (0, "ok", "")
+    finally:
+        use_docker_engine(None)
+
+    started, run, reset, removed = commands
+    assert "--tmpfs" in started and "-v" not in started
+    assert run[1] == reset[1] == "exec" and reset[-1].startswith("rm -rf")
+    assert removed[1] == "rm"
+    assert len(engine.staged) == 1
+    assert (workspace / "out" / "0000.code").read_text() == "0"
+    assert not (tmp_path / "pool").exists()
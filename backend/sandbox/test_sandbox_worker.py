@@ -0,0 +1,93 @@
+"""Tests for the sandbox worker loop (``sandbox_worker.py``)."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from sandbox.schemas import JobStatus
+
+
+def _run(coro):
+    return asyncio.run(coro)
+
+
+def test_signal_ready_writes_and_removes_ready_file(tmp_path, monkeypatch):
+    from core.metrics import SANDBOX_READY
+
+    from sandbox.sandbox_worker import signal_ready
+
+    ready_file = tmp_path / "ready"
+    monkeypatch.setattr(
+        "sandbox.sandbox_worker.settings.sandbox_ready_file", str(ready_file)
+    )
+    signal_ready(True)
+    assert ready_file.exists() and SANDBOX_READY.labels().value == 1
+    signal_ready(False)
+    assert not ready_file.exists() and SANDBOX_READY.labels().value == 0
+
+
+def test_main_loop_acks_each_job_once_its_result_is_out(monkeypatch):
+    from contextlib import asynccontextmanager
+
+    from core.transport import Delivery
+
+    from sandbox import sandbox_worker
+
+    events = []
+
+    class _Transport:
+        claims = 0
+
+        async def claim(self, count, timeout):
+            self.claims += 1
+            if self.claims > 1:
+                raise asyncio.CancelledError
+            return [Delivery("1", "a"), Delivery("2", "b")]
+
+        async def ack(self, *deliveries):
+            events.append(("ack", [d.delivery_id for d in deliveries]))
+
+    class _Redis:
+        async def lpush(self, key, value):
+            events.append(("result", key))
+
+        async def expire(self, key, ttl):
+            events.append(("expire", key, ttl))
+
+    class _Limiter:
+        @asynccontextmanager
+        async def slot(self):
+            yield
+
+        def record_latency(self, seconds):
+            pass
+
+    async def fake_initialize(payload):
+        return SimpleNamespace(job_id=payload)
+
+    async def fake_precompile(jobs):
+        return {}
+
+    async def fake_process(job, precompiled=None):
+        if job.job_id == "b":
+            raise RuntimeError("worker died")
+        return SimpleNamespace(
+            job_id=job.job_id, status=JobStatus.COMPLETED, model_dump_json=lambda: "{}"
+        )
+
+    monkeypatch.setattr(sandbox_worker, "initialize_job", fake_initialize)
+    monkeypatch.setattr(sandbox_worker, "precompile", fake_precompile)
+    monkeypatch.setattr(sandbox_worker, "process_job", fake_process)
+    monkeypatch.setattr(sandbox_worker.settings, "result_ttl_s", 60)
+    client = SimpleNamespace(
+        transport=_Transport(), redis_client=_Redis(), concurrency=_Limiter()
+    )
+
+    with pytest.raises(RuntimeError):
+        _run(sandbox_worker.main_loop(client))
+
+    key = f"{sandbox_worker.SANDBOX_QUEUE}:completed:a"
+    assert events == [("result", key), ("expire", key, 60), ("ack", ["1"])]
@@ -20,9 +20,12 @@ from .questions import (
     QuestionBase,
     TestcaseBase,
 )
-from .shared import JobStatus, TestCase
+from .shared import JobPriority, JobStatus, TestCase
 from .submissions import (
+    BulkSubmissionItem,
+    BulkSubmissionResult,
     SubmissionBase,
+    SubmissionEvent,
 )
 from .users import (
     LoginRequest,
@@ -41,11 +44,15 @@ __all__ = [
     "RegisterRequest",
     "UserBase",
     "SubmissionBase",
+    "BulkSubmissionItem",
+    "BulkSubmissionResult",
+    "SubmissionEvent",
     "TranscriptionBase",
     "CompileResultBase",
     "AIFeedbackBase",
     "GradeBase",
     "Job",
+    "JobPriority",
     "JobRequest",
     "JobStatus",
     "JobType",
@@ -1,13 +1,13 @@
 from datetime import datetime
 from enum import StrEnum
 from typing import Annotated, Literal
-from uuid import UUID
+from uuid import UUID, uuid4
 
-from ocr.ocr_corrector.schemas import OCRJobResult as _OCRWorkerResult
+from OCR.ocr_corrector.schemas import OCRJobResult as _OCRWorkerResult
 from pydantic import BaseModel, Field
 from sandbox.schemas import SandboxJobResult
 
-from .shared import JobStatus, TestCase
+from .shared import JobPriority, JobStatus, TestCase
 
 
 class JobType(StrEnum):
@@ -92,14 +92,22 @@ JobResultUnion = Annotated[
 
 
 class JobRequest(BaseModel):
+    # Unique per enqueue so two runs of the same submission never share a
+    # queue payload (and therefore a lease; see core/leases.py).
+    request_id: UUID = Field(default_factory=uuid4)
     submission_id: int
     question_id: int
     assignment_id: int
+    # Tenant for fair-share scheduling; None for jobs queued before it existed.
+    course_id: int | None = None
     student_id: int
     image_url: str | None = None
     java_code: str
     test_cases: list[TestCase]
     rubric_json: dict
+    priority: JobPriority = JobPriority.INTERACTIVE
+    # Assignment due date; work close to it is promoted to URGENT.
+    deadline: datetime | None = None
 
 
 class JobRequestPayload(BaseModel):
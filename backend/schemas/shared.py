@@ -20,6 +20,14 @@ class JobStatus(StrEnum):
     ERROR = "ERROR"
 
 
+class JobPriority(StrEnum):
+    """Scheduling classes, most urgent first (see core/scheduling.py)."""
+
+    URGENT = "URGENT"
+    INTERACTIVE = "INTERACTIVE"
+    BULK = "BULK"
+
+
 class TestCase(BaseModel):
     input: Any
     expected_output: Any
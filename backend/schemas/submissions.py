@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Literal
 
 from db.models import SubmissionState
 from pydantic import BaseModel
@@ -14,3 +15,30 @@ class SubmissionBase(BaseModel):
     submitted_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+class BulkSubmissionItem(BaseModel):
+    """Outcome for one archive entry (or PDF page range) of a bulk upload."""
+
+    entry: str
+    student_id: int | None = None
+    submission_id: int | None = None
+    status: Literal["queued", "unmatched", "missing", "rejected", "failed"]
+    detail: str | None = None
+
+
+class BulkSubmissionResult(BaseModel):
+    queued: int
+    items: list[BulkSubmissionItem]
+
+
+class SubmissionEvent(BaseModel):
+    """A pipeline transition, streamed to clients (see core/events.py)."""
+
+    submission_id: int
+    assignment_id: int
+    # Pipeline stage (OCR, SANDBOX, GRADER); None for graded/failed.
+    stage: str | None = None
+    status: Literal["started", "done", "graded", "failed"]
+    detail: dict = {}
+    at: datetime
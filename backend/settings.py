@@ -26,20 +26,82 @@ class Settings(BaseSettings):
     queue_namespace: str = "jsg.v1"
     redis_endpoint: str = "redis://localhost:6379"
     redis_port: int = 6379
+    lease_ttl_s: int = 60
+    lease_reap_interval_s: int = 15
+    lease_max_attempts: int = 3
+    queue_backend: Literal["list", "stream"] = "list"
+    queue_batch_size: int = 1
+    checkpoint_ttl_s: int = 7 * 24 * 3600
+    result_ttl_s: int = 24 * 3600
+    adaptive_interval_s: float = 10
+    adaptive_cpu_high: float = 0.9
+    adaptive_mem_high: float = 0.9
+    priority_weight_urgent: int = 8
+    priority_weight_interactive: int = 4
+    priority_weight_bulk: int = 1
+    deadline_boost_window_s: int = 3600
+    sse_keepalive_s: float = 15
+    sse_client_buffer: int = 100
+    metrics_host: str = "0.0.0.0"
 
     main_queue: str = "MainJobQueue"
     main_max_concurrency: int = 5
+    main_min_concurrency: int = 1
+    main_target_p95_s: float = 5
+    main_max_in_flight: int = 50
+    main_event_poll_timeout_s: int = 5
+    main_max_parked: int = 1000
+    course_max_in_flight: int = 20
+    course_stage_max_in_flight: int = 10
+    course_max_in_flight_overrides: dict[int, int] = {}
 
     azure_ocr_endpoint: str = "https://gpfirsttrydoc.cognitiveservices.azure.com/"
     api_azure: str = ""
     api_gemini: str = ""
     ocr_queue: str = "OCRJobQueue"
     ocr_max_concurrency: int = 5
+    ocr_min_concurrency: int = 1
+    ocr_target_p95_s: float = 60
+    ocr_metrics_port: int = 9101
 
     gemini_model: str = "gemini-3.1-flash-lite-preview"
 
     sandbox_queue: str = "SandboxJobQueue"
     sandbox_max_concurrency: int = 5
+    sandbox_min_concurrency: int = 1
+    sandbox_target_p95_s: float = 30
+    sandbox_metrics_port: int = 9102
+    sandbox_batch_execution: bool = True
+    sandbox_job_parallelism: int = 4
+    sandbox_max_consecutive_timeouts: int = 0
+    sandbox_job_max_wall_s: float = 0
+    sandbox_order_by_runtime: bool = True
+    sandbox_docker_max_concurrency: int = 0
+    sandbox_docker_socket: str = "/var/run/docker.sock"
+    sandbox_runner: Literal["docker", "namespace"] = "docker"
+    sandbox_nsjail_path: str = "nsjail"
+    sandbox_nsjail_cgroup: str = "/sys/fs/cgroup"
+    sandbox_rootfs_dir: str = ""
+    sandbox_image_mode: Literal["build", "pull", "verify"] = "build"
+    sandbox_image_registry: str = ""
+    sandbox_ready_file: str = ""
+    sandbox_tmpfs_workspaces: bool = True
+    sandbox_tmpfs_size: str = "64m"
+    sandbox_workspace_dir: str = ""
+    sandbox_output_head_bytes: int = 64 * 1024
+    sandbox_output_tail_bytes: int = 16 * 1024
+    sandbox_compile_servers: int = 2
+    sandbox_compile_server_max_uses: int = 500
+    sandbox_compile_timeout_s: float = 30
+    sandbox_compile_batch_size: int = 16
+    sandbox_compile_cache_dir: str = ""
+    sandbox_compile_cache_max_bytes: int = 512 * 1024 * 1024
+    sandbox_compile_cache_redis_ttl_s: int = 86400
+    sandbox_execution_memo_max_bytes: int = 64 * 1024 * 1024
+    sandbox_execution_memo_ttl_s: int = 86400
+    sandbox_pool_size: int = 5
+    sandbox_pool_max_uses: int = 50
+    sandbox_pool_acquire_timeout_s: float = 30
 
     ai_grading_queue: str = "AIGradingJobQueue"
     openai_api_key: str = ""
@@ -52,6 +114,10 @@ class Settings(BaseSettings):
     s3_secret_key: str = ""
     s3_bucket: str = "java-smart-grader-bucket"
     s3_region: str = "us-east-1"
+    bulk_submission_max_items: int = 1000
+    bulk_submission_max_upload_bytes: int = 512 * 1024 * 1024
+    bulk_submission_max_entry_bytes: int = 25 * 1024 * 1024
+    bulk_submission_max_total_bytes: int = 1024 * 1024 * 1024
 
     sandbox_host_tmp_path: str = ""
 
@@ -2,7 +2,11 @@ import { useState, useEffect } from "react";
 import { useParams } from "react-router-dom";
 import InstructorNavButton from "../../../components/InstructorNavButton";
 import { getAssignment } from "../../../services/courseService";
-import { getAssignmentSubmissions } from "../../../services/submissionService";
+import {
+  getAssignmentSubmissions,
+  submissionStateFromEvent,
+  subscribeToAssignmentSubmissions,
+} from "../../../services/submissionService";
 
 const STATE_LABEL = {
   submitted: "Processing",
@@ -68,6 +72,19 @@ export default function InstructorAssignmentSubmissions() {
     };
   }, [cid, aid]);
 
+  // Status changes are pushed over one stream for the whole assignment.
+  useEffect(() => {
+    if (!Number.isFinite(aid)) return undefined;
+    return subscribeToAssignmentSubmissions(aid, (event) => {
+      const state = submissionStateFromEvent(event);
+      setRows((prev) =>
+        prev.map((s) =>
+          s.id === event.data.submission_id ? { ...s, state } : s,
+        ),
+      );
+    });
+  }, [aid]);
+
   if (!Number.isFinite(cid) || !Number.isFinite(aid)) {
     return <p className="text-red-600 text-sm">Invalid link.</p>;
   }
@@ -1,5 +1,10 @@
 import { useEffect, useMemo, useState } from "react";
-import { getMySubmissions } from "../../../services/submissionService";
+import {
+  getMySubmissions,
+  submissionStateFromEvent,
+  subscribeToSubmission,
+  TERMINAL_STATES,
+} from "../../../services/submissionService";
 import {
   getAssignment,
   getAssignmentQuestions,
@@ -218,6 +223,28 @@ export default function StudentSubmissions() {
     };
   }, []);
 
+  // Submissions still in the pipeline get their status pushed until final.
+  const pendingIds = mySubmissions
+    .filter((s) => !TERMINAL_STATES.includes(s.state))
+    .map((s) => s.id)
+    .join(",");
+
+  useEffect(() => {
+    if (!pendingIds) return undefined;
+    const closers = pendingIds.split(",").map((value) => {
+      const id = Number(value);
+      return subscribeToSubmission(id, (event) => {
+        const state = submissionStateFromEvent(event);
+        setMySubmissions((prev) =>
+          prev.some((s) => s.id === id && s.state !== state)
+            ? prev.map((s) => (s.id === id ? { ...s, state } : s))
+            : prev,
+        );
+      });
+    });
+    return () => closers.forEach((close) => close());
+  }, [pendingIds]);
+
   useEffect(() => {
     if (!selectedCourseId) return;
     let cancelled = false;
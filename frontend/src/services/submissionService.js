@@ -19,3 +19,79 @@ export const submitAnswer = (questionId, assignmentId, file) => {
   // Let the browser set multipart boundary; a bare "multipart/form-data" header breaks uploads.
   return api.post("/submissions/", form);
 };
+
+/**
+ * Read a Server-Sent Events stream with the auth header (EventSource cannot
+ * send one). Calls onEvent({ event, data }) per message and onError(error)
+ * if the stream cannot be opened (non-2xx) or breaks; returns a function
+ * that closes the stream.
+ */
+const streamEvents = (path, onEvent, onError) => {
+  const controller = new AbortController();
+  const token = localStorage.getItem("token");
+  (async () => {
+    const response = await fetch(`${api.defaults.baseURL}${path}`, {
+      headers: token ? { Authorization: `Bearer ${token}` } : {},
+      signal: controller.signal,
+    });
+    if (!response.ok) {
+      const error = new Error(`Event stream ${path}: HTTP ${response.status}`);
+      error.status = response.status;
+      throw error;
+    }
+    const reader = response.body
+      .pipeThrough(new TextDecoderStream())
+      .getReader();
+    let buffer = "";
+    for (;;) {
+      const { value, done } = await reader.read();
+      if (done) return;
+      buffer += value;
+      const blocks = buffer.split("\n\n");
+      buffer = blocks.pop();
+      for (const block of blocks) {
+        const fields = Object.fromEntries(
+          block
+            .split("\n")
+            .filter((line) => line && !line.startsWith(":"))
+            .map((line) => {
+              const colon = line.indexOf(":");
+              return [line.slice(0, colon), line.slice(colon + 2)];
+            }),
+        );
+        if (fields.data) {
+          onEvent({ event: fields.event, data: JSON.parse(fields.data) });
+        }
+      }
+    }
+  })().catch((error) => {
+    if (error.name === "AbortError") return;
+    console.error("Event stream failed", error);
+    onError?.(error);
+  });
+  return () => controller.abort();
+};
+
+/** GET /submissions/{id}/events — snapshot, then stage transitions until graded/failed */
+export const subscribeToSubmission = (id, onEvent, onError) =>
+  streamEvents(`/submissions/${id}/events`, onEvent, onError);
+
+/** GET /submissions/assignment/{assignmentId}/events  (instructor) */
+export const subscribeToAssignmentSubmissions = (
+  assignmentId,
+  onEvent,
+  onError,
+) =>
+  streamEvents(
+    `/submissions/assignment/${assignmentId}/events`,
+    onEvent,
+    onError,
+  );
+
+export const TERMINAL_STATES = ["graded", "failed"];
+
+/** Submission state after a stream message (snapshot or transition). */
+export const submissionStateFromEvent = ({ event, data }) => {
+  if (event === "snapshot") return data.state;
+  return TERMINAL_STATES.includes(data.status) ? data.status : "processing";
+};